@@ -131,7 +131,9 @@ class Config:
     # =============================================================================
     
     # RAG Context Processing
-    RAG_MAX_CONTEXT_LENGTH = int(os.environ.get('RAG_MAX_CONTEXT_LENGTH', '8000'))
+    # Budget token blok context (dihitung dengan tokenizer model) dan ambang chunk hampir sama
+    RAG_CONTEXT_TOKEN_BUDGET = int(os.environ.get('RAG_CONTEXT_TOKEN_BUDGET', '2000'))
+    RAG_DEDUP_THRESHOLD = float(os.environ.get('RAG_DEDUP_THRESHOLD', '0.85'))
     RAG_MIN_SIMILARITY = float(os.environ.get('RAG_MIN_SIMILARITY', '0.3'))
     RAG_MAX_CHUNKS = int(os.environ.get('RAG_MAX_CHUNKS', '10'))
     
@@ -246,7 +248,8 @@ class Config:
                 'max_tokens': cls.AI_MAX_TOKENS
             },
             'rag': {
-                'max_context_length': cls.RAG_MAX_CONTEXT_LENGTH,
+                'context_token_budget': cls.RAG_CONTEXT_TOKEN_BUDGET,
+                'dedup_threshold': cls.RAG_DEDUP_THRESHOLD,
                 'min_similarity': cls.RAG_MIN_SIMILARITY,
                 'max_chunks': cls.RAG_MAX_CHUNKS
             },
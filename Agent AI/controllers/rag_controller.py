@@ -4,8 +4,9 @@
 RAG Controller untuk Agent AI
 """
 
+import json
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime
 from utils.validators import validate_rag_request
 from services.llm_service import llm_service
@@ -76,7 +77,8 @@ def rag_chat():
                         'context_used': processed_context.get('context_available', False),
                         'chunks_processed': processed_context.get('total_chunks', 0),
                         'avg_similarity': processed_context.get('avg_similarity', 0.0),
-                        'context_processing_time': processed_context.get('processing_time', 0)
+                        'context_processing_time': processed_context.get('processing_time', 0),
+                        'context_packing': processed_context.get('packing', {})
                     }
                 },
                 'timestamp': datetime.now().isoformat()
@@ -99,6 +101,90 @@ def rag_chat():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def _sse(event: dict) -> str:
+    """Format satu event Server-Sent Events"""
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@rag_bp.route('/chat/stream', methods=['POST'])
+def rag_chat_stream():
+    """Handle RAG-enhanced chat messages sebagai Server-Sent Events.
+    
+    Event (field `type`): `meta` (RAG metadata), `delta` (potongan jawaban),
+    `done` (jawaban lengkap + processing_time, ttft_ms, tokens_used), atau `error`.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': 'No data provided',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        validation_result = validate_rag_request(data)
+        if not validation_result['valid']:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid request data',
+                'errors': validation_result['errors'],
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        user_id = data.get('user_id')
+        message = data.get('message')
+        context = data.get('context', {})
+        session_id = data.get('session_id', f'rag_{user_id}')
+        source = data.get('source', 'rag')
+        metadata = data.get('metadata', {})
+        
+        logger.info(f"📨 Streaming RAG-enhanced message from user {user_id}: {message[:50]}...")
+        
+        # Context diproses sebelum stream dimulai agar error validasi tetap menjadi response JSON biasa
+        processed_context = rag_context_service.process_context(context)
+        rag_metadata = {
+            'context_used': processed_context.get('context_available', False),
+            'chunks_processed': processed_context.get('total_chunks', 0),
+            'avg_similarity': processed_context.get('avg_similarity', 0.0),
+            'context_processing_time': processed_context.get('processing_time', 0),
+            'context_packing': processed_context.get('packing', {})
+        }
+        
+        def generate_events():
+            yield _sse({'type': 'meta', 'rag_metadata': rag_metadata})
+            for event in llm_service.generate_response_stream(
+                message=message,
+                user_id=user_id,
+                session_id=session_id,
+                source=source,
+                context=processed_context,
+                metadata=metadata
+            ):
+                if event['type'] == 'done':
+                    event['rag_metadata'] = rag_metadata
+                    logger.info(f"✅ RAG-enhanced response streamed for user {user_id} (TTFT {event.get('ttft_ms')}ms)")
+                elif event['type'] == 'error':
+                    logger.error(f"❌ Failed to stream RAG-enhanced response: {event.get('error')}")
+                yield _sse(event)
+        
+        return Response(
+            stream_with_context(generate_events()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                # Nonaktifkan buffering reverse proxy (nginx) agar token langsung diteruskan
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"❌ RAG chat stream error: {e}")
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
 @rag_bp.route('/status', methods=['GET'])
 def rag_status():
     """Get RAG service status"""
@@ -116,6 +202,7 @@ def rag_status():
                 'llm_service': llm_status,
                 'endpoints': {
                     'rag_chat': '/api/rag/chat',
+                    'rag_chat_stream': '/api/rag/chat/stream',
                     'rag_status': '/api/rag/status',
                     'rag_test': '/api/rag/test'
                 }
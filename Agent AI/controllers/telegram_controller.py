@@ -78,7 +78,8 @@ def telegram_chat():
                     'tokens_used': response.get('tokens_used'),
                     'rag_context_used': processed_context.get('context_available', False) if processed_context else False,
                     'rag_chunks_used': processed_context.get('total_chunks', 0) if processed_context else 0,
-                    'rag_avg_similarity': processed_context.get('avg_similarity', 0.0) if processed_context else 0.0
+                    'rag_avg_similarity': processed_context.get('avg_similarity', 0.0) if processed_context else 0.0,
+                    'rag_context_packing': processed_context.get('packing', {}) if processed_context else {}
                 },
                 'timestamp': datetime.now().isoformat()
             }), 200
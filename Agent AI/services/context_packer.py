@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Context Packer untuk Agent AI
+Menyusun satu blok context RAG dalam budget token (bukan potong karakter).
+
+- Token dihitung dengan tiktoken sesuai model; encoder dimuat saat pertama dipakai (bukan saat import,
+  karena tiktoken mengunduh file BPE) dengan fallback estimasi ~4 karakter/token jika gagal dimuat
+- Chunk yang hampir sama (Jaccard shingle kata >= RAG_DEDUP_THRESHOLD) dibuang, yang relevansinya lebih tinggi disimpan
+- Chunk dipilih berdasarkan relevansi dan dimasukkan utuh selama muat di budget; chunk yang tidak muat dilewati
+- Hanya jika chunk teratas sendiri melebihi budget, chunk tersebut dipotong di batas kalimat
+- Statistik per request: token sebelum/sesudah packing dan token yang dihemat
+"""
+
+import re
+import logging
+import threading
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+# Pemisah antar chunk di blok context
+CHUNK_SEPARATOR = "\n\n"
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_SENTENCE_END_RE = re.compile(r'[.!?](?=\s)|\n')
+
+
+class TokenCounter:
+    """Penghitung token untuk model chat"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = None
+        self._encoding_loaded = False
+        self._lock = threading.Lock()
+
+    def _load_encoding(self):
+        if not TIKTOKEN_AVAILABLE:
+            logger.warning("⚠️ tiktoken not installed, context token counts are estimated (~4 chars/token)")
+            return None
+        # Nama model OpenRouter memakai prefix provider (mis. "openai/gpt-4o-mini")
+        model_name = self.model.split('/')[-1] if self.model else ''
+        try:
+            try:
+                return tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                return tiktoken.get_encoding('cl100k_base')
+        except Exception as e:
+            # Mis. file BPE tidak bisa diunduh (offline / proxy): estimasi, jangan gagalkan request
+            logger.warning(f"⚠️ Failed to load tiktoken encoding for {self.model}, using estimate: {e}")
+            return None
+
+    @property
+    def encoding(self):
+        """Encoder tiktoken, dimuat sekali saat pertama dipakai; None jika tidak tersedia"""
+        if not self._encoding_loaded:
+            with self._lock:
+                if not self._encoding_loaded:
+                    self._encoding = self._load_encoding()
+                    self._encoding_loaded = True
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Potong text ke <= max_tokens, mundur ke akhir kalimat terakhir jika ada"""
+        if max_tokens <= 0:
+            return ''
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            cut = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        else:
+            cut = text[:max_tokens * 4]
+        ends = [match.end() for match in _SENTENCE_END_RE.finditer(cut)]
+        # Batas kalimat terlalu dekat ke awal membuang terlalu banyak isi; pakai potongan kata
+        if ends and ends[-1] >= len(cut) // 2:
+            return cut[:ends[-1]].rstrip()
+        return cut.rsplit(' ', 1)[0].rstrip() + ' ...'
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(left: set, right: set) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class ContextPacker:
+    """Pilih, deduplikasi, dan susun chunk RAG menjadi satu blok context dalam budget token"""
+
+    def __init__(self, model: str, token_budget: int, dedup_threshold: float = 0.85):
+        self.counter = TokenCounter(model)
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+
+    @staticmethod
+    def format_entry(index: int, result: Dict[str, Any]) -> str:
+        """Format satu chunk di blok context"""
+        entry = f"[{index}] {result.get('source_document', 'Dokumen')}"
+        if result.get('chunk_id'):
+            entry += f" (Chunk: {result['chunk_id']})"
+        return entry + f" [Relevansi: {result.get('similarity', 0.0):.2f}]\n{result.get('content', '').strip()}"
+
+    def _deduplicate(self, results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        # results sudah urut relevansi (desc), jadi chunk pertama dari pasangan duplikat yang disimpan
+        kept: List[Tuple[Dict[str, Any], set]] = []
+        duplicates = 0
+        for result in results:
+            shingles = _shingles(result.get('content', ''))
+            if any(_jaccard(shingles, kept_shingles) >= self.dedup_threshold for _, kept_shingles in kept):
+                duplicates += 1
+                continue
+            kept.append((result, shingles))
+        return [result for result, _ in kept], duplicates
+
+    def pack(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Susun blok context dari hasil RAG.
+
+        Return: {'content', 'results' (chunk yang dipakai), 'stats'}
+        """
+        candidates = [result for result in results if (result.get('content') or '').strip()]
+        candidates.sort(key=lambda result: result.get('similarity', 0.0), reverse=True)
+        # Baseline: semua kandidat digabung apa adanya (tanpa dedup/budget)
+        tokens_before = self.counter.count(CHUNK_SEPARATOR.join(
+            self.format_entry(index, result) for index, result in enumerate(candidates, 1)
+        ))
+
+        unique, duplicates = self._deduplicate(candidates)
+        separator_tokens = self.counter.count(CHUNK_SEPARATOR)
+        selected: List[Dict[str, Any]] = []
+        used_tokens = 0
+        truncated = False
+        for result in unique:
+            # Nomor entry tidak mengubah jumlah token secara berarti; dihitung dengan posisi berikutnya
+            cost = self.counter.count(self.format_entry(len(selected) + 1, result))
+            cost += separator_tokens if selected else 0
+            if used_tokens + cost <= self.token_budget:
+                selected.append(result)
+                used_tokens += cost
+
+        if not selected and unique:
+            # Chunk teratas sendiri lebih besar dari budget: potong di batas kalimat agar context tidak kosong
+            top = unique[0]
+            header_tokens = self.counter.count(self.format_entry(1, {**top, 'content': ''}))
+            content = self.counter.truncate(top.get('content', '').strip(), self.token_budget - header_tokens)
+            if content:
+                selected.append({**top, 'content': content})
+                truncated = True
+
+        content = CHUNK_SEPARATOR.join(self.format_entry(index, result) for index, result in enumerate(selected, 1))
+        tokens_after = self.counter.count(content)
+        return {
+            'content': content,
+            'results': selected,
+            'stats': {
+                'token_budget': self.token_budget,
+                'tokens_before': tokens_before,
+                'tokens_after': tokens_after,
+                'tokens_saved': max(0, tokens_before - tokens_after),
+                'chunks_in': len(candidates),
+                'chunks_packed': len(selected),
+                'duplicates_removed': duplicates,
+                'chunks_over_budget': len(unique) - len(selected) if not truncated else len(unique) - 1,
+                'truncated': truncated,
+                'exact_token_count': self.counter.exact
+            }
+        }
@@ -8,10 +8,13 @@ Menggunakan OpenAI API untuk response generation
 import os
 import time
 import logging
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator
 import openai
 from config.config import Config
+from utils.stats import summarize
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,17 @@ class LLMService:
         self.top_p = Config.AI_TOP_P
         self.initialized = False
         
+        # Metrik streaming: time-to-first-token dan total waktu (sampel terakhir)
+        self._stream_lock = threading.Lock()
+        self._ttft_samples = deque(maxlen=500)
+        self._stream_time_samples = deque(maxlen=500)
+        self.stream_stats = {
+            'requests': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0
+        }
+        
     def initialize(self):
         """Initialize OpenAI client"""
         try:
@@ -108,20 +122,11 @@ class LLMService:
             {"role": "system", "content": self._build_system_prompt(context)}
         ]
         
-        # Add context information if available
-        if context and context.get('context_available') and context.get('rag_results'):
-            context_content = "Informasi yang relevan dari knowledge base:\n\n"
-            
-            for i, result in enumerate(context.get('rag_results', [])[:5], 1):  # Limit to top 5
-                content = result.get('content', '')
-                similarity = result.get('similarity', 0.0)
-                source = result.get('source_document', 'Dokumen')
-                
-                context_content += f"{i}. **{source}** (Relevansi: {similarity:.2f})\n{content}\n\n"
-            
+        # Satu blok context hasil RAGContextService (sudah dedup dan dalam budget token)
+        if context and context.get('context_available') and context.get('context_content'):
             messages.append({
                 "role": "system", 
-                "content": context_content
+                "content": "Informasi yang relevan dari knowledge base:\n\n" + context['context_content']
             })
         
         # Add user message
@@ -189,6 +194,112 @@ class LLMService:
                 'processing_time': time.time() - start_time if 'start_time' in locals() else 0
             }
     
+    def generate_response_stream(self, message: str, user_id: int, session_id: str,
+                                 source: str, context: Optional[Dict[str, Any]] = None,
+                                 metadata: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Generate response secara streaming (stream=True).
+        
+        Yield event dict:
+        - {'type': 'delta', 'content': '<potongan teks>'}
+        - {'type': 'done', 'response', 'model_used', 'processing_time', 'ttft_ms', 'tokens_used', ...}
+        - {'type': 'error', 'error', 'model_used', 'processing_time'}
+        """
+        start_time = time.time()
+        first_token_at = None
+        completed = False
+        stream = None
+        with self._stream_lock:
+            self.stream_stats['requests'] += 1
+        try:
+            if not self.initialized:
+                yield {'type': 'error', 'error': 'LLM Service not initialized', 'model_used': self.model, 'processing_time': 0}
+                return
+            
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(message, context),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                top_p=self.top_p,
+                stream=True
+            )
+            
+            chunks = []
+            tokens_used = 0
+            finish_reason = None
+            for chunk in stream:
+                # Sebagian provider mengirim usage di chunk terakhir (tanpa choices)
+                if getattr(chunk, 'usage', None):
+                    tokens_used = chunk.usage.total_tokens
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                content = choice.delta.content if choice.delta else None
+                if not content:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.time()
+                chunks.append(content)
+                yield {'type': 'delta', 'content': content}
+            
+            processing_time = time.time() - start_time
+            ttft = (first_token_at - start_time) if first_token_at else processing_time
+            completed = True
+            with self._stream_lock:
+                self.stream_stats['completed'] += 1
+                self._ttft_samples.append(ttft)
+                self._stream_time_samples.append(processing_time)
+            
+            logger.info(f"Streamed response in {processing_time:.2f}s (TTFT {ttft * 1000:.0f}ms), tokens: {tokens_used}")
+            
+            yield {
+                'type': 'done',
+                'response': ''.join(chunks),
+                'model_used': self.model,
+                'processing_time': round(processing_time, 2),
+                'ttft_ms': round(ttft * 1000.0, 1),
+                'tokens_used': tokens_used,
+                'finish_reason': finish_reason,
+                'context_used': context.get('context_available', False) if context else False,
+                'metadata': {
+                    'user_id': user_id,
+                    'session_id': session_id,
+                    'source': source,
+                    'timestamp': datetime.now().isoformat()
+                }
+            }
+            
+        except GeneratorExit:
+            # Client menutup koneksi SSE di tengah jalan; hentikan juga generate di sisi OpenAI
+            if stream is not None:
+                stream.close()
+            with self._stream_lock:
+                self.stream_stats['cancelled'] += 1
+            completed = True
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            yield {
+                'type': 'error',
+                'error': str(e),
+                'model_used': self.model,
+                'processing_time': round(time.time() - start_time, 2)
+            }
+        finally:
+            if not completed:
+                with self._stream_lock:
+                    self.stream_stats['failed'] += 1
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Statistik streaming: jumlah request, time-to-first-token, dan total waktu"""
+        with self._stream_lock:
+            return {
+                **self.stream_stats,
+                'time_to_first_token': summarize(self._ttft_samples, scale=1000.0, unit='ms'),
+                'total_time': summarize(self._stream_time_samples, scale=1000.0, unit='ms')
+            }
+    
     def check_health(self) -> Dict[str, Any]:
         """Check LLM service health"""
         try:
@@ -235,6 +346,7 @@ class LLMService:
             'max_tokens': self.max_tokens,
             'top_p': self.top_p,
             'api_base_url': Config.OPENAI_BASE_URL,
+            'streaming': self.get_stream_stats(),
             'timestamp': datetime.now().isoformat()
         }
 
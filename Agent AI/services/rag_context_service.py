@@ -7,9 +7,11 @@ Memproses RAG context dari KSM Main
 
 import time
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from config.config import Config
+from services.context_packer import ContextPacker
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +19,22 @@ class RAGContextService:
     """Service untuk memproses RAG context dari KSM Main"""
     
     def __init__(self):
-        self.max_context_length = Config.RAG_MAX_CONTEXT_LENGTH
         self.min_similarity = Config.RAG_MIN_SIMILARITY
         self.max_chunks = Config.RAG_MAX_CHUNKS
+        self.context_token_budget = Config.RAG_CONTEXT_TOKEN_BUDGET
+        self.packer = ContextPacker(Config.DEFAULT_MODEL, self.context_token_budget, Config.RAG_DEDUP_THRESHOLD)
         self.initialized = False
         
+        # Akumulasi statistik packing sejak start
+        self._stats_lock = threading.Lock()
+        self.packing_totals = {
+            'requests': 0,
+            'tokens_before': 0,
+            'tokens_after': 0,
+            'tokens_saved': 0,
+            'duplicates_removed': 0
+        }
+        
     def initialize(self):
         """Initialize RAG context service"""
         try:
@@ -29,7 +42,8 @@ class RAGContextService:
             # Service ini hanya memproses context yang diterima dari KSM Main
             self.initialized = True
             logger.info("✅ RAG Context Service initialized successfully")
-            logger.info(f"   - Max context length: {self.max_context_length}")
+            logger.info(f"   - Context token budget: {self.context_token_budget} "
+                        f"({'tiktoken' if self.packer.counter.exact else 'estimated'})")
             logger.info(f"   - Min similarity: {self.min_similarity}")
             logger.info(f"   - Max chunks: {self.max_chunks}")
             
@@ -109,42 +123,28 @@ class RAGContextService:
             logger.error(f"Error filtering results: {e}")
             return []
     
-    def _build_context_content(self, filtered_results: List[Dict[str, Any]]) -> str:
-        """Build context content dari filtered results"""
+    def _build_context_content(self, filtered_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build satu blok context dari filtered results dalam budget token.
+        
+        Chunk dimasukkan utuh (tidak dipotong di tengah kalimat); duplikat dibuang.
+        Return hasil ContextPacker.pack(): content, results, stats.
+        """
         try:
-            if not filtered_results:
-                return ""
-            
-            context_parts = []
-            
-            for i, result in enumerate(filtered_results, 1):
-                content = result.get('content', '').strip()
-                similarity = result.get('similarity', 0.0)
-                source = result.get('source_document', 'Dokumen')
-                chunk_id = result.get('chunk_id', '')
-                
-                if content:
-                    # Format context entry
-                    context_entry = f"[{i}] {source}"
-                    if chunk_id:
-                        context_entry += f" (Chunk: {chunk_id})"
-                    context_entry += f" [Relevansi: {similarity:.2f}]\n{content}"
-                    
-                    context_parts.append(context_entry)
-            
-            # Join all parts
-            full_context = "\n\n".join(context_parts)
-            
-            # Truncate if too long
-            if len(full_context) > self.max_context_length:
-                full_context = full_context[:self.max_context_length] + "..."
-                logger.warning(f"⚠️ Context truncated to {self.max_context_length} characters")
-            
-            return full_context
+            packed = self.packer.pack(filtered_results)
+            stats = packed['stats']
+            with self._stats_lock:
+                self.packing_totals['requests'] += 1
+                for key in ('tokens_before', 'tokens_after', 'tokens_saved', 'duplicates_removed'):
+                    self.packing_totals[key] += stats[key]
+            
+            logger.info(f"📦 Context packed: {stats['chunks_packed']}/{stats['chunks_in']} chunks, "
+                        f"{stats['tokens_after']}/{stats['token_budget']} tokens, saved {stats['tokens_saved']} "
+                        f"({stats['duplicates_removed']} duplicates, {stats['chunks_over_budget']} over budget)")
+            return packed
             
         except Exception as e:
             logger.error(f"❌ Error building context content: {e}")
-            return ""
+            return {'content': '', 'results': [], 'stats': {}}
     
     def process_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Process RAG context dari KSM Main"""
@@ -192,25 +192,37 @@ class RAGContextService:
                 }
             
             # Build context content
-            context_content = self._build_context_content(filtered_results)
+            packed = self._build_context_content(filtered_results)
+            packed_results = packed['results']
+            if not packed_results:
+                return {
+                    'context_available': False,
+                    'total_chunks': 0,
+                    'avg_similarity': 0.0,
+                    'context_content': '',
+                    'processing_time': time.time() - start_time,
+                    'packing': packed['stats'],
+                    'message': 'No chunk fits the context token budget'
+                }
             
             # Calculate average similarity
-            total_similarity = sum(result.get('similarity', 0.0) for result in filtered_results)
-            avg_similarity = total_similarity / len(filtered_results)
+            total_similarity = sum(result.get('similarity', 0.0) for result in packed_results)
+            avg_similarity = total_similarity / len(packed_results)
             
             processing_time = time.time() - start_time
             
-            logger.info(f"Context processed: {len(filtered_results)} chunks, avg_similarity: {avg_similarity:.3f}")
+            logger.info(f"Context processed: {len(packed_results)} chunks, avg_similarity: {avg_similarity:.3f}")
             
             return {
                 'context_available': True,
-                'total_chunks': len(filtered_results),
+                'total_chunks': len(packed_results),
                 'avg_similarity': round(avg_similarity, 3),
-                'context_content': context_content,
-                'filtered_results': filtered_results,
+                'context_content': packed['content'],
+                'filtered_results': packed_results,
                 'processing_time': round(processing_time, 3),
                 'original_chunks': len(rag_results),
-                'similarity_threshold': self.min_similarity
+                'similarity_threshold': self.min_similarity,
+                'packing': packed['stats']
             }
             
         except Exception as e:
@@ -269,9 +281,11 @@ class RAGContextService:
         return {
             'service': 'RAG Context Service',
             'initialized': self.initialized,
-            'max_context_length': self.max_context_length,
+            'context_token_budget': self.context_token_budget,
+            'exact_token_count': self.packer.counter.exact,
             'min_similarity': self.min_similarity,
             'max_chunks': self.max_chunks,
+            'packing_totals': dict(self.packing_totals),
             'timestamp': datetime.now().isoformat()
         }
 
@@ -107,6 +107,13 @@ if __name__ == '__main__':
         except Exception as e:
             logger.error(f"[ERROR] Error stopping remind exp docs scheduler: {e}")
         
+        try:
+            from domains.knowledge.services.unified_document_processing_service import get_unified_document_processing_service
+            get_unified_document_processing_service().stop_processor()
+            logger.info("[SUCCESS] Document processor stopped")
+        except Exception as e:
+            logger.error(f"[ERROR] Error stopping document processor: {e}")
+        
         sys.exit(0)
     
     signal.signal(signal.SIGINT, signal_handler)
@@ -160,6 +160,11 @@ class Config:
     QDRANT_SIMILARITY_THRESHOLD = float(os.environ.get('QDRANT_SIMILARITY_THRESHOLD', '0.7'))
     QDRANT_DISTANCE_FUNCTION = os.environ.get('QDRANT_DISTANCE_FUNCTION', 'cosine')
     
+    # Qdrant Collection Profiles (quantization, on-disk, HNSW) - lihat config/qdrant_profiles.py
+    QDRANT_DEFAULT_PROFILE = os.environ.get('QDRANT_DEFAULT_PROFILE', 'default')
+    QDRANT_COMPANY_PROFILES = os.environ.get('QDRANT_COMPANY_PROFILES', '{}')
+    QDRANT_PROFILES_FILE = os.environ.get('QDRANT_PROFILES_FILE')
+    
     # =============================================================================
     # VECTOR SEARCH CONFIGURATION
     # =============================================================================
@@ -331,6 +336,8 @@ class Config:
     REPORT_ENABLED = os.environ.get('REPORT_ENABLED', 'true').lower() == 'true'
     REPORT_FREQUENCY = os.environ.get('REPORT_FREQUENCY', 'daily')  # daily, weekly, custom
     REPORT_WEEKDAYS_ONLY = os.environ.get('REPORT_WEEKDAYS_ONLY', 'true').lower() == 'true'
+    # Pemilik Notification yang mencatat status kirim report (default: admin aktif pertama)
+    DAILY_REPORT_NOTIFY_USER_ID = os.environ.get('DAILY_REPORT_NOTIFY_USER_ID')
     
     # Agent AI Integration for Reports - Auto-adjusted based on environment
     AGENT_AI_BASE_URL = os.environ.get('AGENT_AI_BASE_URL') or _ENV_CONFIG['AGENT_AI_BASE_URL']
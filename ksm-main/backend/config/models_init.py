@@ -32,6 +32,7 @@ def init_models():
     
     from domains.integration.models.notion_database import NotionDatabase
     from domains.integration.models.property_mapping import PropertyMapping
+    from domains.integration.models.notion_task_mirror import NotionTaskMirror, NotionSyncState
     from domains.knowledge.models.rag_models import (
         RagDocument, RagDocumentPage, RagDocumentChunk,
         RagChunkEmbedding, RagDocumentPermission
@@ -95,7 +96,8 @@ def init_models():
     
     # Import attendance models dari domain
     from domains.attendance.models.attendance_models import (
-        AttendanceRecord, AttendanceLeave, OvertimeRequest, AttendanceSettings
+        AttendanceRecord, AttendanceLeave, OvertimeRequest, AttendanceSettings,
+        AttendanceDailyRollup
     )
     
     # Import email attachment models
@@ -136,7 +138,9 @@ def init_models():
             'file_tags': file_tags
         },
         'notion': {
-            'NotionDatabase': NotionDatabase
+            'NotionDatabase': NotionDatabase,
+            'NotionTaskMirror': NotionTaskMirror,
+            'NotionSyncState': NotionSyncState
         },
         'property_mapping': {
             'PropertyMapping': PropertyMapping
@@ -211,7 +215,8 @@ def init_models():
             'AttendanceRecord': AttendanceRecord,
             'AttendanceLeave': AttendanceLeave,
             'OvertimeRequest': OvertimeRequest,
-            'AttendanceSettings': AttendanceSettings
+            'AttendanceSettings': AttendanceSettings,
+            'AttendanceDailyRollup': AttendanceDailyRollup
         },
         'budget': {
             'BudgetTracking': BudgetTracking,
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Qdrant Collection Profiles untuk KSM Main
+Profil penyimpanan collection per company: quantization, on-disk storage, dan parameter HNSW.
+
+Profil dipilih per company lewat:
+- QDRANT_COMPANY_PROFILES: JSON {"<company_id>": "<profile>"}
+- QDRANT_PROFILES_FILE: file JSON {"profiles": {...}, "companies": {...}} untuk profil kustom
+- QDRANT_DEFAULT_PROFILE: profil untuk company yang tidak terdaftar (default: "default")
+
+Profil hanya diterapkan saat collection dibuat; collection yang sudah ada dipindah ke profil
+baru dengan scripts/migrate_qdrant_collection_profile.py (re-create + alias swap).
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Nilai yang tidak disebut profil memakai default Qdrant (None)
+PROFILE_FIELDS = {
+    'quantization': None,         # None | 'scalar' (int8) | 'binary'
+    'quantization_always_ram': True,
+    'scalar_quantile': 0.99,
+    'on_disk_vectors': False,
+    'on_disk_payload': False,
+    'hnsw_m': None,
+    'hnsw_ef_construct': None,
+    'hnsw_on_disk': False,
+    'search_ef': None,            # hnsw_ef saat search
+    'rescore': False,             # rescoring dengan vector asli setelah search quantized
+    'oversampling': None          # kandidat quantized = limit * oversampling sebelum rescoring
+}
+
+BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Perilaku lama: float32 di RAM, HNSW default
+    'default': {},
+    # int8 scalar di RAM, vector asli di disk untuk rescoring (~4x lebih hemat RAM)
+    'balanced': {
+        'quantization': 'scalar',
+        'on_disk_vectors': True,
+        'search_ef': 128,
+        'rescore': True,
+        'oversampling': 2.0
+    },
+    # Binary quantization (~32x lebih hemat RAM untuk vector 1536-dim); payload & HNSW di disk
+    'compact': {
+        'quantization': 'binary',
+        'on_disk_vectors': True,
+        'on_disk_payload': True,
+        'hnsw_on_disk': True,
+        'hnsw_m': 16,
+        'hnsw_ef_construct': 100,
+        'search_ef': 128,
+        'rescore': True,
+        'oversampling': 3.0
+    },
+    # Recall tinggi untuk collection besar yang tetap di RAM
+    'high_recall': {
+        'hnsw_m': 32,
+        'hnsw_ef_construct': 256,
+        'search_ef': 256
+    }
+}
+
+
+class QdrantProfileRegistry:
+    """Registry profil collection dan pemetaan company -> profil"""
+
+    def __init__(self):
+        self.profiles: Dict[str, Dict[str, Any]] = {name: dict(values) for name, values in BUILTIN_PROFILES.items()}
+        self.company_profiles: Dict[str, str] = {}
+        self.default_profile = os.getenv('QDRANT_DEFAULT_PROFILE', 'default')
+
+        profiles_file = os.getenv('QDRANT_PROFILES_FILE')
+        if profiles_file:
+            try:
+                with open(profiles_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for name, values in (data.get('profiles') or {}).items():
+                    self.profiles[name] = {**self.profiles.get(name, {}), **values}
+                self.company_profiles.update(data.get('companies') or {})
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Failed to load Qdrant profiles file {profiles_file}: {e}")
+
+        company_profiles = os.getenv('QDRANT_COMPANY_PROFILES')
+        if company_profiles:
+            try:
+                self.company_profiles.update(json.loads(company_profiles))
+            except ValueError as e:
+                logger.error(f"❌ Invalid QDRANT_COMPANY_PROFILES JSON: {e}")
+
+        for company_id, profile_name in list(self.company_profiles.items()):
+            if profile_name not in self.profiles:
+                logger.warning(f"⚠️ Unknown Qdrant profile '{profile_name}' for company {company_id}, using default")
+                self.company_profiles.pop(company_id)
+        if self.default_profile not in self.profiles:
+            logger.warning(f"⚠️ Unknown QDRANT_DEFAULT_PROFILE '{self.default_profile}', using 'default'")
+            self.default_profile = 'default'
+
+    def get_profile(self, name: Optional[str]) -> Dict[str, Any]:
+        """Profil lengkap (field yang tidak diisi memakai PROFILE_FIELDS)"""
+        name = name if name in self.profiles else self.default_profile
+        return {**PROFILE_FIELDS, **self.profiles[name], 'name': name}
+
+    def profile_name_for_company(self, company_id: Optional[str]) -> str:
+        return self.company_profiles.get(str(company_id), self.default_profile) if company_id else self.default_profile
+
+    def profile_name_for_collection(self, collection_name: str, prefix: str) -> str:
+        """Profil dari nama collection '<prefix>_<company_id>_<collection>'"""
+        for company_id, profile_name in self.company_profiles.items():
+            if collection_name.startswith(f"{prefix}_{company_id}_"):
+                return profile_name
+        return self.default_profile
+
+
+# Global instance
+_qdrant_profile_registry = None
+_qdrant_profile_registry_lock = threading.Lock()
+
+
+def get_qdrant_profile_registry() -> QdrantProfileRegistry:
+    """Get global Qdrant profile registry instance"""
+    global _qdrant_profile_registry
+    if _qdrant_profile_registry is None:
+        with _qdrant_profile_registry_lock:
+            if _qdrant_profile_registry is None:
+                _qdrant_profile_registry = QdrantProfileRegistry()
+    return _qdrant_profile_registry
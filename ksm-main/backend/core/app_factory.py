@@ -110,6 +110,7 @@ def create_app():
             
             logger.info("[INIT] Initializing role management services...")
             permission_service.initialize_default_permissions()
+            permission_service.detect_schema_capabilities()
             workflow_service.initialize_default_workflows()
             audit_service.initialize_audit_tables()
             logger.info("[SUCCESS] Role management services initialized successfully")
@@ -5,10 +5,11 @@ Attendance Controller untuk KSM Main Backend
 REST API endpoints untuk sistem absensi karyawan
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, date, timedelta
 from typing import Dict, List
+import os
 import logging
 import io
 from sqlalchemy.orm import joinedload, contains_eager
@@ -16,6 +17,7 @@ import pymysql
 from sqlalchemy.exc import OperationalError
 
 from domains.attendance.services.attendance_service import attendance_service, is_encryption_error
+from domains.attendance.services.attendance_export_service import attendance_export_service, EXPORT_MIMETYPES
 from domains.task.controllers.daily_task_controller import DailyTaskController
 from shared.middlewares.role_auth import require_admin, block_vendor
 from config.database import db
@@ -25,6 +27,90 @@ logger = logging.getLogger(__name__)
 
 attendance_bp = Blueprint('attendance', __name__, url_prefix='/api/attendance')
 
+def _parse_attendance_filters():
+    """Parse filter absensi dari query string. Return (filters, error_response)"""
+    # date_from/date_to diterima sebagai alias start_date/end_date (dipakai halaman laporan)
+    start_date = request.args.get('start_date') or request.args.get('date_from')
+    end_date = request.args.get('end_date') or request.args.get('date_to')
+    user_id = request.args.get('user_id')
+    
+    try:
+        filters = {
+            'start_date': datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+            'end_date': datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None,
+            'user_id': int(user_id) if user_id else None,
+            'status': request.args.get('status'),
+            'search': request.args.get('search')
+        }
+    except ValueError:
+        return None, (jsonify({
+            'success': False,
+            'message': 'Filter tanggal atau User ID tidak valid'
+        }), 400)
+    return filters, None
+
+def _parse_scoped_attendance_filters():
+    """Filter absensi dibatasi ke data yang boleh dilihat user login, sama seperti foto absensi:
+    admin semua user, manager anggota timnya, selain itu hanya data sendiri. Return (filters, error_response)"""
+    filters, error = _parse_attendance_filters()
+    if error:
+        return None, error
+    visible = attendance_service.get_visible_user_ids(get_jwt_identity())
+    if visible is not None:
+        if filters['user_id'] and filters['user_id'] not in visible:
+            return None, (jsonify({
+                'success': False,
+                'message': 'Tidak memiliki akses ke absensi user ini'
+            }), 403)
+        filters['user_ids'] = visible
+    return filters, None
+
+def _attendance_page_response(filters: Dict, extra: Dict = None):
+    """List absensi per halaman keyset (?limit=&cursor=)"""
+    try:
+        limit = request.args.get('limit', type=int)
+        page = attendance_service.get_all_attendance(
+            limit=limit, cursor=request.args.get('cursor'), **filters
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    response = {
+        'success': True,
+        'data': page['items'],
+        'count': len(page['items']),
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more']
+    }
+    response.update(extra or {})
+    return jsonify(response), 200
+
+def _export_response(export_format: str, filters: Dict):
+    """Response file export; CSV di-stream dari cursor, Excel/PDF dari file sementara"""
+    headers = {
+        'Content-Disposition': f'attachment; filename="{attendance_export_service.build_filename(export_format)}"',
+        'X-Accel-Buffering': 'no'
+    }
+    mimetype = EXPORT_MIMETYPES[export_format]
+    
+    if export_format == 'csv':
+        return Response(stream_with_context(attendance_export_service.stream_csv(filters)),
+                        mimetype=mimetype, headers=headers)
+    
+    if export_format == 'excel':
+        path = attendance_export_service.build_excel(filters)
+    else:
+        path = attendance_export_service.build_pdf(filters)
+    try:
+        headers['Content-Length'] = str(os.path.getsize(path))
+        response = Response(attendance_export_service.stream_file(path), mimetype=mimetype, headers=headers)
+    except Exception:
+        attendance_export_service.remove_file(path)
+        raise
+    # Dipanggil WSGI server saat response selesai, termasuk jika client putus sebelum body dibaca
+    response.call_on_close(lambda: attendance_export_service.remove_file(path))
+    return response
+
 @attendance_bp.route('/clock-in', methods=['POST'])
 @jwt_required()
 @block_vendor()
@@ -297,9 +383,9 @@ def get_attendance():
             query = AttendanceRecord.query.options(joinedload(AttendanceRecord.user))
         
         if start_date_obj:
-            query = query.filter(db.func.date(AttendanceRecord.clock_in) >= start_date_obj)
+            query = query.filter(AttendanceRecord.clock_in_from(start_date_obj))
         if end_date_obj:
-            query = query.filter(db.func.date(AttendanceRecord.clock_in) <= end_date_obj)
+            query = query.filter(AttendanceRecord.clock_in_until(end_date_obj))
         if user_id_int:
             query = query.filter(AttendanceRecord.user_id == user_id_int)
         if status:
@@ -323,9 +409,9 @@ def get_attendance():
             count_query = db.session.query(db.func.count(db.distinct(AttendanceRecord.id)))
             # Apply filter yang sama tanpa eager loading
             if start_date_obj:
-                count_query = count_query.filter(db.func.date(AttendanceRecord.clock_in) >= start_date_obj)
+                count_query = count_query.filter(AttendanceRecord.clock_in_from(start_date_obj))
             if end_date_obj:
-                count_query = count_query.filter(db.func.date(AttendanceRecord.clock_in) <= end_date_obj)
+                count_query = count_query.filter(AttendanceRecord.clock_in_until(end_date_obj))
             if user_id_int:
                 count_query = count_query.filter(AttendanceRecord.user_id == user_id_int)
             if status:
@@ -345,9 +431,9 @@ def get_attendance():
             # Untuk query tanpa search, gunakan count yang efisien dengan hanya ID
             count_query = db.session.query(db.func.count(AttendanceRecord.id))
             if start_date_obj:
-                count_query = count_query.filter(db.func.date(AttendanceRecord.clock_in) >= start_date_obj)
+                count_query = count_query.filter(AttendanceRecord.clock_in_from(start_date_obj))
             if end_date_obj:
-                count_query = count_query.filter(db.func.date(AttendanceRecord.clock_in) <= end_date_obj)
+                count_query = count_query.filter(AttendanceRecord.clock_in_until(end_date_obj))
             if user_id_int:
                 count_query = count_query.filter(AttendanceRecord.user_id == user_id_int)
             if status:
@@ -448,53 +534,57 @@ def get_attendance():
 @require_admin()
 def get_all_attendance():
     """
-    GET /api/attendance/all
-    Admin lihat semua absensi dengan filter
+    GET /api/attendance/all?limit=100&cursor=...
+    Admin lihat semua absensi dengan filter, per halaman (next_cursor untuk halaman berikutnya)
     """
     try:
-        # Parse query parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        user_id = request.args.get('user_id')
-        status = request.args.get('status')
-        search = request.args.get('search')  # Parameter pencarian baru
-        
-        # Convert string dates to date objects
-        start_date_obj = None
-        end_date_obj = None
-        
-        if start_date:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+        filters, error = _parse_attendance_filters()
+        if error:
+            return error
         
-        # Convert user_id to int if provided
-        user_id_int = None
-        if user_id:
-            try:
-                user_id_int = int(user_id)
-            except ValueError:
-                return jsonify({
-                    'success': False,
-                    'message': 'User ID tidak valid'
-                }), 400
+        return _attendance_page_response(filters)
         
-        records = attendance_service.get_all_attendance(
-            start_date=start_date_obj,
-            end_date=end_date_obj,
-            user_id=user_id_int,
-            status=status,
-            search=search  # Tambahkan parameter search
+    except Exception as e:
+        logger.error(f"Error get all attendance: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Terjadi kesalahan: {str(e)}'
+        }), 500
+
+@attendance_bp.route('/<int:record_id>/photo/<kind>', methods=['GET'])
+@jwt_required()
+@block_vendor()
+def get_attendance_photo(record_id, kind):
+    """
+    GET /api/attendance/<record_id>/photo/<clock_in|clock_out>?size=thumb
+    Foto absensi dari blob store (thumbnail untuk list, foto penuh saat dibuka)
+    
+    Endpoint ini butuh JWT di header Authorization (JWT_TOKEN_LOCATION=['headers']), jadi URL
+    *_photo_url tidak bisa dipakai langsung sebagai <img src>. Frontend harus fetch dengan header
+    Authorization, ambil body sebagai blob, lalu tampilkan lewat URL.createObjectURL.
+    """
+    try:
+        result = attendance_service.get_attendance_photo(
+            viewer_id=get_jwt_identity(),
+            record_id=record_id,
+            kind=kind,
+            thumbnail=request.args.get('size') == 'thumb'
         )
+        if not result['success']:
+            return jsonify({
+                'success': False,
+                'message': result['message']
+            }), result.get('status_code', 400)
         
-        return jsonify({
-            'success': True,
-            'data': records,
-            'count': len(records)
-        }), 200
+        photo = result['data']
+        response = send_file(photo['path'], mimetype=photo['mimetype'], conditional=True,
+                             etag=photo['key'] + ('-thumb' if request.args.get('size') == 'thumb' else ''))
+        # Isi file tidak pernah berubah untuk key yang sama (key ada di URL sebagai ?v=)
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
         
     except Exception as e:
-        logger.error(f"Error get all attendance: {str(e)}")
+        logger.error(f"Error get attendance photo: {str(e)}")
         return jsonify({
             'success': False,
             'message': f'Terjadi kesalahan: {str(e)}'
@@ -945,52 +1035,24 @@ def approve_overtime_request(overtime_id):
 @block_vendor()
 def generate_attendance_report():
     """
-    GET /api/attendance/report
-    Generate laporan absensi
+    GET /api/attendance/report?format=json|csv|excel|pdf
+    Generate laporan absensi (json per halaman, format lain sebagai file)
     """
     try:
-        # Parse query parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        user_id = request.args.get('user_id')
-        status = request.args.get('status')
+        filters, error = _parse_scoped_attendance_filters()
+        if error:
+            return error
         
-        # Convert string dates to date objects
-        start_date_obj = None
-        end_date_obj = None
-        
-        if start_date:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-        
-        # Convert user_id to int if provided
-        user_id_int = None
-        if user_id:
-            try:
-                user_id_int = int(user_id)
-            except ValueError:
-                return jsonify({
-                    'success': False,
-                    'message': 'User ID tidak valid'
-                }), 400
-        
-        records = attendance_service.get_all_attendance(
-            start_date=start_date_obj,
-            end_date=end_date_obj,
-            user_id=user_id_int,
-            status=status
-        )
+        export_format = request.args.get('format', 'json')
+        if export_format in EXPORT_MIMETYPES:
+            return _export_response(export_format, filters)
         
-        return jsonify({
-            'success': True,
-            'data': records,
-            'count': len(records),
+        return _attendance_page_response(filters, {
             'period': {
-                'start_date': start_date_obj.isoformat() if start_date_obj else None,
-                'end_date': end_date_obj.isoformat() if end_date_obj else None
+                'start_date': filters['start_date'].isoformat() if filters['start_date'] else None,
+                'end_date': filters['end_date'].isoformat() if filters['end_date'] else None
             }
-        }), 200
+        })
         
     except Exception as e:
         logger.error(f"Error generate report: {str(e)}")
@@ -1008,51 +1070,11 @@ def export_excel():
     Export laporan ke Excel
     """
     try:
-        # Parse query parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        user_id = request.args.get('user_id')
-        status = request.args.get('status')
-        
-        # Convert string dates to date objects
-        start_date_obj = None
-        end_date_obj = None
-        
-        if start_date:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+        filters, error = _parse_scoped_attendance_filters()
+        if error:
+            return error
         
-        # Convert user_id to int if provided
-        user_id_int = None
-        if user_id:
-            try:
-                user_id_int = int(user_id)
-            except ValueError:
-                return jsonify({
-                    'success': False,
-                    'message': 'User ID tidak valid'
-                }), 400
-        
-        records = attendance_service.get_all_attendance(
-            start_date=start_date_obj,
-            end_date=end_date_obj,
-            user_id=user_id_int,
-            status=status
-        )
-        
-        # Generate Excel file
-        excel_file = attendance_service.export_to_excel(records)
-        
-        # Generate filename
-        filename = f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        return send_file(
-            excel_file,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        return _export_response('excel', filters)
         
     except Exception as e:
         logger.error(f"Error export Excel: {str(e)}")
@@ -1070,54 +1092,36 @@ def export_pdf():
     Export laporan ke PDF
     """
     try:
-        # Parse query parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        user_id = request.args.get('user_id')
-        status = request.args.get('status')
-        
-        # Convert string dates to date objects
-        start_date_obj = None
-        end_date_obj = None
-        
-        if start_date:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-        
-        # Convert user_id to int if provided
-        user_id_int = None
-        if user_id:
-            try:
-                user_id_int = int(user_id)
-            except ValueError:
-                return jsonify({
-                    'success': False,
-                    'message': 'User ID tidak valid'
-                }), 400
+        filters, error = _parse_scoped_attendance_filters()
+        if error:
+            return error
         
-        records = attendance_service.get_all_attendance(
-            start_date=start_date_obj,
-            end_date=end_date_obj,
-            user_id=user_id_int,
-            status=status
-        )
+        return _export_response('pdf', filters)
         
-        # Generate PDF file
-        pdf_file = attendance_service.export_to_pdf(records)
-        
-        # Generate filename
-        filename = f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    except Exception as e:
+        logger.error(f"Error export PDF: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Terjadi kesalahan: {str(e)}'
+        }), 500
+
+@attendance_bp.route('/export/csv', methods=['GET'])
+@jwt_required()
+@block_vendor()
+def export_csv():
+    """
+    GET /api/attendance/export/csv
+    Export laporan ke CSV (di-stream per chunk)
+    """
+    try:
+        filters, error = _parse_scoped_attendance_filters()
+        if error:
+            return error
         
-        return send_file(
-            pdf_file,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
+        return _export_response('csv', filters)
         
     except Exception as e:
-        logger.error(f"Error export PDF: {str(e)}")
+        logger.error(f"Error export CSV: {str(e)}")
         return jsonify({
             'success': False,
             'message': f'Terjadi kesalahan: {str(e)}'
@@ -6,13 +6,15 @@ from .attendance_models import (
     AttendanceRecord,
     AttendanceLeave,
     OvertimeRequest,
-    AttendanceSettings
+    AttendanceSettings,
+    AttendanceDailyRollup
 )
 
 __all__ = [
     'AttendanceRecord',
     'AttendanceLeave',
     'OvertimeRequest',
-    'AttendanceSettings'
+    'AttendanceSettings',
+    'AttendanceDailyRollup'
 ]
 
@@ -6,8 +6,9 @@ Sistem absensi karyawan dengan lokasi GPS dan foto kamera
 """
 
 from config.database import db
-from datetime import datetime, time, date
+from datetime import datetime, time, date, timedelta
 from sqlalchemy import Index, UniqueConstraint
+from sqlalchemy.orm import deferred, column_property
 import json
 from shared.utils.timezone_utils import get_jakarta_utc_time, utc_to_jakarta
 
@@ -23,14 +24,17 @@ class AttendanceRecord(db.Model):
     clock_in_latitude = db.Column(db.Float)
     clock_in_longitude = db.Column(db.Float)
     clock_in_address = db.Column(db.Text)  # Alamat dari reverse geocoding
-    clock_in_photo = db.Column(db.Text)  # Base64 encoded image
+    # Legacy: base64 foto lama (dipindah ke blob store oleh migrasi), tidak ikut di-SELECT
+    clock_in_photo = deferred(db.Column(db.Text))
+    clock_in_photo_key = db.Column(db.String(64))  # sha256 foto di attendance photo store
     
     # Clock out data
     clock_out = db.Column(db.DateTime)
     clock_out_latitude = db.Column(db.Float)
     clock_out_longitude = db.Column(db.Float)
     clock_out_address = db.Column(db.Text)
-    clock_out_photo = db.Column(db.Text)
+    clock_out_photo = deferred(db.Column(db.Text))
+    clock_out_photo_key = db.Column(db.String(64))
     
     # Work duration calculation
     work_duration_minutes = db.Column(db.Integer)  # Durasi kerja dalam menit
@@ -79,12 +83,14 @@ class AttendanceRecord(db.Model):
                 'clock_in_latitude': self.clock_in_latitude,
                 'clock_in_longitude': self.clock_in_longitude,
                 'clock_in_address': self.clock_in_address,
-                'clock_in_photo': self.clock_in_photo,
+                'clock_in_photo_url': self.photo_url('clock_in'),
+                'clock_in_photo_thumbnail_url': self.photo_url('clock_in', thumbnail=True),
                 'clock_out': self.clock_out.isoformat() if self.clock_out else None,
                 'clock_out_latitude': self.clock_out_latitude,
                 'clock_out_longitude': self.clock_out_longitude,
                 'clock_out_address': self.clock_out_address,
-                'clock_out_photo': self.clock_out_photo,
+                'clock_out_photo_url': self.photo_url('clock_out'),
+                'clock_out_photo_thumbnail_url': self.photo_url('clock_out', thumbnail=True),
                 'work_duration_minutes': self.work_duration_minutes,
                 'work_duration_hours': round(self.work_duration_minutes / 60, 2) if self.work_duration_minutes else 0,
                 'overtime_minutes': self.overtime_minutes or 0,
@@ -112,6 +118,31 @@ class AttendanceRecord(db.Model):
                 'error': 'Error serializing record'
             }
     
+    # Filter tanggal sebagai rentang datetime setengah terbuka [hari 00:00, hari berikutnya 00:00),
+    # bukan DATE(clock_in), agar index (user_id, clock_in) dan (clock_in) tetap terpakai
+    @classmethod
+    def clock_in_from(cls, start_date: date):
+        return cls.clock_in >= datetime.combine(start_date, time.min)
+    
+    @classmethod
+    def clock_in_until(cls, end_date: date):
+        return cls.clock_in < datetime.combine(end_date + timedelta(days=1), time.min)
+    
+    @classmethod
+    def clock_in_on(cls, day: date):
+        return db.and_(cls.clock_in_from(day), cls.clock_in_until(day))
+    
+    def photo_url(self, kind: str, thumbnail: bool = False):
+        """URL foto clock_in/clock_out (None jika tidak ada foto). Key ada di URL agar aman di-cache.
+
+        Endpoint-nya dilindungi JWT header: ambil sebagai blob dengan header Authorization, bukan <img src>.
+        """
+        key = getattr(self, f'{kind}_photo_key')
+        if not key and not getattr(self, f'has_legacy_{kind}_photo', False):
+            return None
+        url = f"/api/attendance/{self.id}/photo/{kind}?v={(key or 'legacy')[:16]}"
+        return url + '&size=thumb' if thumbnail else url
+    
     def calculate_work_duration(self):
         """Hitung durasi kerja jika clock out sudah ada"""
         if self.clock_in and self.clock_out:
@@ -157,6 +188,15 @@ class AttendanceRecord(db.Model):
         else:
             return 'present'
 
+# Flag murah (IS NOT NULL dihitung di MySQL) untuk foto legacy yang belum dipindah ke blob store,
+# tanpa memuat isi kolom TEXT-nya
+AttendanceRecord.has_legacy_clock_in_photo = column_property(
+    AttendanceRecord.__table__.c.clock_in_photo.isnot(None)
+)
+AttendanceRecord.has_legacy_clock_out_photo = column_property(
+    AttendanceRecord.__table__.c.clock_out_photo.isnot(None)
+)
+
 class AttendanceLeave(db.Model):
     """Model untuk izin/sakit/cuti karyawan"""
     __tablename__ = 'attendance_leaves'
@@ -714,3 +754,44 @@ class TaskSettings(db.Model):
     def set_allowed_file_types(self, file_types):
         """Set allowed file types from list"""
         self.allowed_file_types = json.dumps(file_types) if file_types else None
+
+class AttendanceDailyRollup(db.Model):
+    """Ringkasan absensi per user per hari, diperbarui saat clock in/out dan approval overtime.
+
+    Dashboard dan today-status dihitung dari tabel ini dengan GROUP BY,
+    tanpa memuat attendance_records ke Python.
+    """
+    __tablename__ = 'attendance_daily_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    work_date = db.Column(db.Date, nullable=False)
+    attendance_id = db.Column(db.Integer, db.ForeignKey('attendance_records.id'))
+    
+    status = db.Column(db.String(20), nullable=False, default='present')
+    clock_in = db.Column(db.DateTime)
+    clock_out = db.Column(db.DateTime)
+    work_minutes = db.Column(db.Integer, nullable=False, default=0)
+    overtime_minutes = db.Column(db.Integer, nullable=False, default=0)
+    approved_overtime_minutes = db.Column(db.Integer, nullable=False, default=0)
+    
+    updated_at = db.Column(db.DateTime, default=get_jakarta_utc_time, onupdate=get_jakarta_utc_time)
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'work_date', name='unique_rollup_user_date'),
+        Index('idx_rollup_date_status', 'work_date', 'status'),
+    )
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'work_date': self.work_date.isoformat() if self.work_date else None,
+            'attendance_id': self.attendance_id,
+            'status': self.status,
+            'clock_in': self.clock_in.isoformat() if self.clock_in else None,
+            'clock_out': self.clock_out.isoformat() if self.clock_out else None,
+            'work_minutes': self.work_minutes or 0,
+            'overtime_minutes': self.overtime_minutes or 0,
+            'approved_overtime_minutes': self.approved_overtime_minutes or 0,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
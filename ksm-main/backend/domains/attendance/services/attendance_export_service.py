@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Attendance Export Service untuk KSM Main Backend
+Export laporan absensi (CSV, Excel, PDF) tanpa memuat seluruh data ke memory.
+
+- Row dibaca dari server-side cursor (attendance_service.iter_attendance_rows), bukan list to_dict()
+- CSV di-stream langsung ke response per chunk
+- Excel memakai workbook write-only openpyxl, disimpan ke file sementara lalu di-stream
+- Lebar kolom Excel diestimasi dari sampel row pertama, bukan pass kedua atas semua cell
+- PDF digambar per halaman di canvas reportlab (bukan satu Table raksasa) dan dibatasi
+  ATTENDANCE_PDF_MAX_ROWS, karena reportlab menyimpan semua halaman sampai save()
+"""
+
+import os
+import io
+import csv
+import logging
+import tempfile
+from datetime import datetime
+from itertools import chain, islice
+from typing import Dict, Iterator, List
+
+from domains.attendance.services.attendance_service import attendance_service
+
+# Import untuk export
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+    logging.warning("openpyxl not installed, Excel export will not work")
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.lib import colors
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+    logging.warning("reportlab not installed, PDF export will not work")
+
+logger = logging.getLogger(__name__)
+
+EXPORT_HEADERS = [
+    'No', 'Nama Karyawan', 'Tanggal', 'Clock In', 'Clock Out',
+    'Durasi Kerja (Jam)', 'Overtime (Jam)', 'Status', 'Alamat Clock In', 'Alamat Clock Out', 'Catatan'
+]
+# Kolom yang masuk PDF (index ke EXPORT_HEADERS) dan lebarnya dalam point
+PDF_COLUMNS = [(0, 'No', 32), (1, 'Nama', 130), (2, 'Tanggal', 70), (3, 'Clock In', 60),
+               (4, 'Clock Out', 60), (5, 'Durasi', 55), (7, 'Status', 60)]
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf'
+}
+EXPORT_EXTENSIONS = {'csv': 'csv', 'excel': 'xlsx', 'pdf': 'pdf'}
+
+
+class AttendanceExportService:
+    """Service untuk export laporan absensi secara streaming"""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv('ATTENDANCE_EXPORT_BATCH_SIZE', '1000'))
+        self.width_sample_rows = int(os.getenv('ATTENDANCE_EXPORT_WIDTH_SAMPLE', '200'))
+        self.pdf_max_rows = int(os.getenv('ATTENDANCE_PDF_MAX_ROWS', '10000'))
+        self.stream_chunk_bytes = 64 * 1024
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def iter_rows(self, filters: Dict) -> Iterator[List]:
+        """Row export (sesuai EXPORT_HEADERS) dari server-side cursor"""
+        for number, row in enumerate(attendance_service.iter_attendance_rows(
+                batch_size=self.batch_size, **filters), 1):
+            yield [
+                number,
+                row.user_name or '',
+                row.clock_in.strftime('%Y-%m-%d') if row.clock_in else '',
+                row.clock_in.strftime('%H:%M:%S') if row.clock_in else '',
+                row.clock_out.strftime('%H:%M:%S') if row.clock_out else '',
+                round(row.work_duration_minutes / 60, 2) if row.work_duration_minutes else 0,
+                round(row.overtime_minutes / 60, 2) if row.overtime_minutes else 0,
+                row.status or '',
+                row.clock_in_address or '',
+                row.clock_out_address or '',
+                row.notes or ''
+            ]
+
+    @staticmethod
+    def estimate_column_widths(sample_rows: List[List], max_width: int = 50) -> List[int]:
+        """Lebar kolom dari header + sampel row (bukan seluruh data)"""
+        widths = [len(header) for header in EXPORT_HEADERS]
+        for row in sample_rows:
+            for index, value in enumerate(row):
+                widths[index] = max(widths[index], len(str(value)))
+        return [min(width + 2, max_width) for width in widths]
+
+    # ------------------------------------------------------------------
+    # Generators
+    # ------------------------------------------------------------------
+
+    def stream_csv(self, filters: Dict) -> Iterator[bytes]:
+        """CSV per chunk; BOM agar Excel membaca UTF-8 dengan benar"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(EXPORT_HEADERS)
+
+        for row in self.iter_rows(filters):
+            writer.writerow(row)
+            if buffer.tell() >= self.stream_chunk_bytes:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _new_temp_path(self, suffix: str) -> str:
+        fd, path = tempfile.mkstemp(prefix='attendance_export_', suffix=suffix)
+        os.close(fd)
+        return path
+
+    def build_excel(self, filters: Dict) -> str:
+        """Tulis workbook write-only ke file sementara. Return path file"""
+        if not OPENPYXL_AVAILABLE:
+            raise RuntimeError("openpyxl not installed")
+
+        rows = self.iter_rows(filters)
+        sample = list(islice(rows, self.width_sample_rows))
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Attendance Report")
+
+        # Lebar kolom harus diset sebelum row pertama pada mode write-only
+        for index, width in enumerate(self.estimate_column_widths(sample), 1):
+            ws.column_dimensions[get_column_letter(index)].width = width
+
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_alignment = Alignment(horizontal="center", vertical="center")
+        header_cells = []
+        for header in EXPORT_HEADERS:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for row in chain(sample, rows):
+            ws.append(row)
+
+        path = self._new_temp_path('.xlsx')
+        try:
+            wb.save(path)
+        except Exception:
+            os.remove(path)
+            raise
+        return path
+
+    def build_pdf(self, filters: Dict) -> str:
+        """Gambar PDF per halaman ke file sementara. Return path file"""
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError("reportlab not installed")
+
+        page_width, page_height = A4
+        margin = 36
+        row_height = 16
+        title_height = 40
+        column_widths = [width for _, _, width in PDF_COLUMNS]
+        table_x = (page_width - sum(column_widths)) / 2
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        header = [label for _, label, _ in PDF_COLUMNS]
+
+        path = self._new_temp_path('.pdf')
+        pdf = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        pdf.setTitle("Laporan Absensi Karyawan")
+
+        def draw_page(page_rows: List[List], page_number: int):
+            top = page_height - margin
+            if page_number == 1:
+                pdf.setFont('Helvetica-Bold', 16)
+                pdf.drawCentredString(page_width / 2, top - 16, "Laporan Absensi Karyawan")
+                top -= title_height
+            table = Table([header] + page_rows, colWidths=column_widths,
+                          rowHeights=[row_height] * (len(page_rows) + 1))
+            table.setStyle(table_style)
+            _, table_height = table.wrapOn(pdf, page_width, page_height)
+            table.drawOn(pdf, table_x, top - table_height)
+            pdf.setFont('Helvetica', 8)
+            pdf.drawRightString(page_width - margin, margin / 2, f"Halaman {page_number}")
+            pdf.showPage()
+
+        rows_per_page = int((page_height - 2 * margin) // row_height) - 1
+        page_rows, page_number, written, truncated = [], 1, 0, False
+        try:
+            for row in self.iter_rows(filters):
+                if written >= self.pdf_max_rows:
+                    truncated = True
+                    break
+                name = row[1] if len(row[1]) <= 28 else row[1][:27] + '…'
+                duration = f"{row[5]:.1f} jam"
+                values = {1: name, 5: duration}
+                page_rows.append([str(values.get(index, row[index])) for index, _, _ in PDF_COLUMNS])
+                written += 1
+
+                capacity = rows_per_page - (title_height // row_height if page_number == 1 else 0)
+                if len(page_rows) >= capacity:
+                    draw_page(page_rows, page_number)
+                    page_rows, page_number = [], page_number + 1
+
+            if page_rows or written == 0:
+                draw_page(page_rows, page_number)
+            if truncated:
+                logger.warning(f"⚠️ PDF export truncated at {self.pdf_max_rows} rows")
+                pdf.setFont('Helvetica', 10)
+                pdf.drawString(margin, page_height - margin - 12,
+                               f"Laporan dipotong pada {self.pdf_max_rows} baris. "
+                               f"Gunakan export Excel/CSV untuk data lengkap.")
+                pdf.showPage()
+            pdf.save()
+        except Exception:
+            os.remove(path)
+            raise
+        return path
+
+    def stream_file(self, path: str) -> Iterator[bytes]:
+        """Stream file sementara per chunk. File dihapus lewat remove_file (mis. response.call_on_close),
+        karena generator yang tidak pernah diiterasi tidak menjalankan blok finally-nya"""
+        with open(path, 'rb') as handle:
+            while True:
+                chunk = handle.read(self.stream_chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def remove_file(path: str):
+        """Hapus file export sementara; aman dipanggil lebih dari sekali"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def build_filename(export_format: str) -> str:
+        return (f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}."
+                f"{EXPORT_EXTENSIONS[export_format]}")
+
+
+# Singleton instance
+attendance_export_service = AttendanceExportService()
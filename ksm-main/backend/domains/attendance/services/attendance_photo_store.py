@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Attendance Photo Store untuk KSM Main Backend
+Blob store filesystem untuk foto clock in/clock out, dialamatkan dengan hash isi.
+
+- Foto base64 (data URL atau base64 polos) di-decode sekali saat clock in/out
+- Key = sha256 dari byte gambar: foto yang sama (submit ulang, retry) hanya disimpan sekali
+- Thumbnail JPEG kecil dibuat saat simpan, sehingga list absensi cukup memuat thumbnail
+- Layout: <ATTENDANCE_PHOTO_DIR>/<2 char pertama key>/<key> dan <key>.thumb.jpg
+- File ditulis ke file sementara lalu di-rename (atomic); tidak ada file setengah jadi yang terbaca
+"""
+
+import os
+import io
+import re
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional, Tuple, Iterable
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    ImageOps = None
+    PIL_AVAILABLE = False
+    logging.warning("Pillow not installed, attendance photo thumbnails will not be generated")
+
+logger = logging.getLogger(__name__)
+
+_DATA_URL_RE = re.compile(r'^data:(?P<mime>[\w/+.-]+)?(;[\w=-]+)*;base64,', re.IGNORECASE)
+_KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+
+
+def sniff_mimetype(header: bytes) -> str:
+    """Tebak mimetype dari magic bytes (foto dari kamera browser: JPEG/PNG/WEBP)"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return 'application/octet-stream'
+
+
+class AttendancePhotoStore:
+    """Simpan dan ambil foto absensi berdasarkan key hash"""
+
+    def __init__(self, root: Optional[str] = None):
+        default_root = os.path.join(os.getenv('FILE_STORAGE_PATH', './uploads'), 'attendance_photos')
+        self.root = os.path.abspath(root or os.getenv('ATTENDANCE_PHOTO_DIR', default_root))
+        self.thumbnail_size = int(os.getenv('ATTENDANCE_THUMBNAIL_SIZE', '160'))
+        self.thumbnail_quality = int(os.getenv('ATTENDANCE_THUMBNAIL_QUALITY', '70'))
+        os.makedirs(self.root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Paths
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def is_valid_key(key: Optional[str]) -> bool:
+        return bool(key) and bool(_KEY_RE.match(key))
+
+    def path_for(self, key: str, thumbnail: bool = False) -> str:
+        if not self.is_valid_key(key):
+            raise ValueError(f"Invalid photo key: {key!r}")
+        return os.path.join(self.root, key[:2], key + (THUMBNAIL_SUFFIX if thumbnail else ''))
+
+    def exists(self, key: str) -> bool:
+        return self.is_valid_key(key) and os.path.exists(self.path_for(key))
+
+    def _write_atomic(self, path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def decode_base64(photo_base64: str) -> bytes:
+        """Data URL / base64 polos -> bytes. ValueError jika bukan base64 valid"""
+        if not photo_base64 or not isinstance(photo_base64, str):
+            raise ValueError("Foto kosong")
+        payload = _DATA_URL_RE.sub('', photo_base64.strip(), count=1)
+        payload = re.sub(r'\s+', '', payload)
+        try:
+            data = base64.b64decode(payload + '=' * (-len(payload) % 4), validate=True)
+        except ValueError as e:  # binascii.Error turunan ValueError
+            raise ValueError(f"Foto bukan base64 yang valid: {e}")
+        if not data:
+            raise ValueError("Foto kosong")
+        return data
+
+    def _render_thumbnail(self, data: bytes) -> Optional[bytes]:
+        if not PIL_AVAILABLE:
+            return None
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=self.thumbnail_quality, optimize=True)
+            return output.getvalue()
+
+    def save_bytes(self, data: bytes) -> str:
+        """Simpan gambar (dedup per hash) beserta thumbnail. Return key"""
+        if PIL_AVAILABLE:
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    image.verify()
+            except Exception as e:
+                raise ValueError(f"Foto bukan gambar yang valid: {e}")
+
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+        self.ensure_thumbnail(key, data)
+        return key
+
+    def save_base64(self, photo_base64: str) -> str:
+        """Decode foto base64 dan simpan. Return key"""
+        return self.save_bytes(self.decode_base64(photo_base64))
+
+    def ensure_thumbnail(self, key: str, data: Optional[bytes] = None) -> bool:
+        """Buat thumbnail jika belum ada. False jika thumbnail tidak bisa dibuat"""
+        thumbnail_path = self.path_for(key, thumbnail=True)
+        if os.path.exists(thumbnail_path):
+            return True
+        try:
+            if data is None:
+                with open(self.path_for(key), 'rb') as handle:
+                    data = handle.read()
+            thumbnail = self._render_thumbnail(data)
+        except Exception as e:
+            logger.warning(f"⚠️ Cannot render thumbnail for photo {key[:12]}: {e}")
+            return False
+        if thumbnail is None:
+            return False
+        self._write_atomic(thumbnail_path, thumbnail)
+        return True
+
+    # ------------------------------------------------------------------
+    # Read / maintenance
+    # ------------------------------------------------------------------
+
+    def open_photo(self, key: str, thumbnail: bool = False) -> Optional[Tuple[str, str]]:
+        """Return (path, mimetype) untuk dikirim, atau None jika foto tidak ada.
+
+        Thumbnail yang belum ada dibuat saat itu juga; jika gagal, foto penuh yang dikirim.
+        """
+        if not self.exists(key):
+            return None
+        if thumbnail and self.ensure_thumbnail(key):
+            return self.path_for(key, thumbnail=True), 'image/jpeg'
+        path = self.path_for(key)
+        with open(path, 'rb') as handle:
+            mimetype = sniff_mimetype(handle.read(12))
+        return path, mimetype
+
+    def iter_keys(self) -> Iterable[str]:
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if self.is_valid_key(name):
+                    yield name
+
+    def delete(self, key: str):
+        for thumbnail in (False, True):
+            path = self.path_for(key, thumbnail=thumbnail)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Global instance
+_attendance_photo_store = None
+_attendance_photo_store_lock = threading.Lock()
+
+
+def get_attendance_photo_store() -> AttendancePhotoStore:
+    """Get global attendance photo store instance"""
+    global _attendance_photo_store
+    if _attendance_photo_store is None:
+        with _attendance_photo_store_lock:
+            if _attendance_photo_store is None:
+                _attendance_photo_store = AttendancePhotoStore()
+    return _attendance_photo_store
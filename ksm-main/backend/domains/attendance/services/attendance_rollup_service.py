@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Attendance Rollup Service untuk KSM Main Backend
+Memelihara tabel attendance_daily_rollups (satu row per user per hari).
+
+- Diperbarui secara incremental saat clock in, clock out dan approval overtime
+- Upsert idempotent: memanggil refresh berulang untuk record yang sama hasilnya sama
+- Dashboard dan today-status membaca agregat GROUP BY dari tabel ini,
+  bukan memuat semua attendance_records ke Python
+- Refresh bersifat best-effort; repair() dipanggil sebelum membaca agregat untuk memperbaiki
+  row yang hilang/usang (mis. refresh gagal setelah clock in) dari attendance_records
+- rebuild() untuk backfill / perbaikan rentang tanggal tertentu
+"""
+
+import os
+import logging
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from config.database import db
+from domains.attendance.models.attendance_models import (
+    AttendanceRecord, OvertimeRequest, AttendanceDailyRollup
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceRollupService:
+    """Service untuk rollup absensi harian"""
+
+    def __init__(self):
+        # Batas record yang diperbaiki inline per pembacaan; sisanya lewat rebuild()
+        self.repair_limit = int(os.getenv('ATTENDANCE_ROLLUP_REPAIR_LIMIT', '500'))
+
+    def _approved_overtime_minutes(self, attendance_id: int) -> int:
+        hours = db.session.query(
+            db.func.coalesce(db.func.sum(
+                db.func.coalesce(OvertimeRequest.actual_hours, OvertimeRequest.requested_hours)
+            ), 0)
+        ).filter(
+            OvertimeRequest.attendance_id == attendance_id,
+            OvertimeRequest.status == 'approved'
+        ).scalar()
+        return int(round(float(hours or 0) * 60))
+
+    def _apply(self, rollup: AttendanceDailyRollup, record: AttendanceRecord):
+        rollup.attendance_id = record.id
+        rollup.status = record.status or 'present'
+        rollup.clock_in = record.clock_in
+        rollup.clock_out = record.clock_out
+        rollup.work_minutes = record.work_duration_minutes or 0
+        rollup.overtime_minutes = record.overtime_minutes or 0
+        rollup.approved_overtime_minutes = self._approved_overtime_minutes(record.id)
+
+    def _upsert(self, record: AttendanceRecord) -> Optional[AttendanceDailyRollup]:
+        work_date = record.clock_in.date()
+        rollup = AttendanceDailyRollup.query.filter_by(
+            user_id=record.user_id, work_date=work_date
+        ).first()
+
+        if rollup is None:
+            rollup = AttendanceDailyRollup(user_id=record.user_id, work_date=work_date)
+            db.session.add(rollup)
+        elif (rollup.attendance_id not in (None, record.id) and rollup.clock_in
+              and rollup.clock_in < record.clock_in):
+            # Data lama bisa punya >1 record per hari: rollup mengikuti clock in pertama
+            return rollup
+
+        self._apply(rollup, record)
+        return rollup
+
+    def refresh_for_record(self, record: AttendanceRecord) -> Optional[AttendanceDailyRollup]:
+        """Upsert rollup untuk hari record ini lalu commit"""
+        if record is None or record.clock_in is None:
+            return None
+        try:
+            rollup = self._upsert(record)
+            db.session.commit()
+            return rollup
+        except IntegrityError:
+            # Request lain membuat row yang sama lebih dulu: ulangi sebagai update
+            db.session.rollback()
+            rollup = self._upsert(record)
+            db.session.commit()
+            return rollup
+
+    def refresh_for_attendance(self, attendance_id: int) -> Optional[AttendanceDailyRollup]:
+        return self.refresh_for_record(AttendanceRecord.query.get(attendance_id))
+
+    def rebuild(self, start_date: date, end_date: date, user_id: int = None,
+                batch_size: int = 500) -> Dict:
+        """Bangun ulang rollup untuk rentang tanggal (inklusif), per batch keyset"""
+        stats = {'records': 0, 'removed': 0}
+        last_id = 0
+
+        while True:
+            query = AttendanceRecord.query.filter(
+                AttendanceRecord.clock_in_from(start_date),
+                AttendanceRecord.clock_in_until(end_date),
+                AttendanceRecord.id > last_id
+            )
+            if user_id:
+                query = query.filter(AttendanceRecord.user_id == user_id)
+            records = query.order_by(AttendanceRecord.id).limit(batch_size).all()
+            if not records:
+                break
+
+            for record in records:
+                self._upsert(record)
+                db.session.flush()
+            db.session.commit()
+            stats['records'] += len(records)
+            last_id = records[-1].id
+
+        # Row rollup yang record-nya sudah tidak ada
+        orphan_query = AttendanceDailyRollup.query.filter(
+            AttendanceDailyRollup.work_date >= start_date,
+            AttendanceDailyRollup.work_date <= end_date,
+            ~db.session.query(AttendanceRecord.id).filter(
+                AttendanceRecord.id == AttendanceDailyRollup.attendance_id
+            ).exists()
+        )
+        if user_id:
+            orphan_query = orphan_query.filter(AttendanceDailyRollup.user_id == user_id)
+        stats['removed'] = orphan_query.delete(synchronize_session=False)
+        db.session.commit()
+
+        logger.info(f"✅ Attendance rollup rebuilt {start_date}..{end_date}: {stats}")
+        return stats
+
+    def repair(self, start_date: date, end_date: date, user_id: int = None) -> int:
+        """Refresh rollup untuk record yang row rollup-nya belum ada atau berbeda dari record.
+        Return jumlah record yang diperbaiki"""
+        rollup = AttendanceDailyRollup
+        in_sync = db.session.query(rollup.id).filter(
+            rollup.user_id == AttendanceRecord.user_id,
+            rollup.work_date == db.func.date(AttendanceRecord.clock_in),
+            db.or_(
+                # Hari dengan >1 record: rollup mengikuti record lain (clock in pertama)
+                rollup.attendance_id != AttendanceRecord.id,
+                db.and_(
+                    rollup.clock_out.is_not_distinct_from(AttendanceRecord.clock_out),
+                    rollup.status == db.func.coalesce(AttendanceRecord.status, 'present'),
+                    rollup.work_minutes == db.func.coalesce(AttendanceRecord.work_duration_minutes, 0)
+                )
+            )
+        ).exists()
+        query = AttendanceRecord.query.filter(
+            AttendanceRecord.clock_in_from(start_date),
+            AttendanceRecord.clock_in_until(end_date),
+            ~in_sync
+        )
+        if user_id:
+            query = query.filter(AttendanceRecord.user_id == user_id)
+        records = query.order_by(AttendanceRecord.clock_in).limit(self.repair_limit).all()
+
+        for record in records:
+            self.refresh_for_record(record)
+        if records:
+            logger.warning(f"⚠️ Repaired {len(records)} stale attendance rollup rows ({start_date}..{end_date})")
+        return len(records)
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+
+    def get_status_totals(self, start_date: date, end_date: date, user_id: int = None) -> Dict[str, Dict]:
+        """Agregat per status: {status: {days, work_minutes, overtime_minutes, approved_overtime_minutes}}"""
+        query = db.session.query(
+            AttendanceDailyRollup.status,
+            db.func.count(AttendanceDailyRollup.id),
+            db.func.coalesce(db.func.sum(AttendanceDailyRollup.work_minutes), 0),
+            db.func.coalesce(db.func.sum(AttendanceDailyRollup.overtime_minutes), 0),
+            db.func.coalesce(db.func.sum(AttendanceDailyRollup.approved_overtime_minutes), 0)
+        ).filter(
+            AttendanceDailyRollup.work_date >= start_date,
+            AttendanceDailyRollup.work_date <= end_date
+        )
+        if user_id:
+            query = query.filter(AttendanceDailyRollup.user_id == user_id)
+
+        return {
+            status: {
+                'days': int(days),
+                'work_minutes': int(work_minutes),
+                'overtime_minutes': int(overtime_minutes),
+                'approved_overtime_minutes': int(approved_minutes)
+            }
+            for status, days, work_minutes, overtime_minutes, approved_minutes
+            in query.group_by(AttendanceDailyRollup.status).all()
+        }
+
+    def get_day_totals(self, work_date: date) -> Dict:
+        """Jumlah user yang sudah clock in / clock out pada satu hari"""
+        clocked_in, clocked_out = db.session.query(
+            db.func.count(AttendanceDailyRollup.id),
+            db.func.coalesce(db.func.sum(
+                db.case((AttendanceDailyRollup.clock_out.isnot(None), 1), else_=0)
+            ), 0)
+        ).filter(AttendanceDailyRollup.work_date == work_date).one()
+        return {'clocked_in_users': int(clocked_in), 'clocked_out_users': int(clocked_out)}
+
+    def get_user_day(self, user_id: int, work_date: date) -> Optional[AttendanceDailyRollup]:
+        return AttendanceDailyRollup.query.filter_by(user_id=user_id, work_date=work_date).first()
+
+
+# Singleton instance
+attendance_rollup_service = AttendanceRollupService()
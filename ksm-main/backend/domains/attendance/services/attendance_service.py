@@ -5,40 +5,26 @@ Attendance Service untuk KSM Main Backend
 Business logic untuk sistem absensi karyawan
 """
 
+import os
 import logging
 from datetime import datetime, date, time, timedelta
 from typing import List, Dict, Optional, Tuple
 import base64
 import io
 import json
-from io import BytesIO
 import pymysql
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import contains_eager
 
 from config.database import db
 from domains.attendance.models.attendance_models import (
     AttendanceRecord, AttendanceLeave, OvertimeRequest, AttendanceSettings
 )
+from domains.attendance.services.attendance_photo_store import get_attendance_photo_store
+from domains.attendance.services.attendance_rollup_service import attendance_rollup_service
 from domains.auth.models.auth_models import User
 from domains.role.models.role_models import Department, UserRole, Role
 
-# Import untuk export
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-except ImportError:
-    logging.warning("openpyxl not installed, Excel export will not work")
-
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-except ImportError:
-    logging.warning("reportlab not installed, PDF export will not work")
-
 logger = logging.getLogger(__name__)
 
 def is_encryption_error(error: Exception) -> bool:
@@ -56,6 +42,9 @@ class AttendanceService:
     
     def __init__(self):
         self.settings = None
+        # Ukuran halaman list absensi (keyset pagination)
+        self.list_default_limit = int(os.getenv('ATTENDANCE_LIST_DEFAULT_LIMIT', '100'))
+        self.list_max_limit = int(os.getenv('ATTENDANCE_LIST_MAX_LIMIT', '1000'))
     
     def get_attendance_settings(self) -> AttendanceSettings:
         """Ambil atau buat default attendance settings"""
@@ -76,7 +65,7 @@ class AttendanceService:
             today = date.today()
             existing_record = AttendanceRecord.query.filter(
                 AttendanceRecord.user_id == user_id,
-                db.func.date(AttendanceRecord.clock_in) == today
+                AttendanceRecord.clock_in_on(today)
             ).first()
             
             if existing_record:
@@ -105,6 +94,17 @@ class AttendanceService:
                         'message': f'Ukuran foto terlalu besar. Maksimal {settings.max_photo_size_mb}MB'
                     }
             
+            # Simpan foto ke blob store; row hanya menyimpan key
+            photo_key = None
+            if photo_base64:
+                try:
+                    photo_key = get_attendance_photo_store().save_base64(photo_base64)
+                except ValueError as e:
+                    return {
+                        'success': False,
+                        'message': f'Foto tidak valid: {str(e)}'
+                    }
+            
             # Buat record baru
             now = datetime.now()
             record = AttendanceRecord(
@@ -113,7 +113,7 @@ class AttendanceService:
                 clock_in_latitude=latitude,
                 clock_in_longitude=longitude,
                 clock_in_address=address,
-                clock_in_photo=photo_base64,
+                clock_in_photo_key=photo_key,
                 notes=notes,
                 status='present'
             )
@@ -124,6 +124,7 @@ class AttendanceService:
             
             db.session.add(record)
             db.session.commit()
+            self._refresh_rollup(record)
             
             logger.info(f"User {user_id} clock in berhasil pada {now}")
             
@@ -155,7 +156,7 @@ class AttendanceService:
             today = date.today()
             record = AttendanceRecord.query.filter(
                 AttendanceRecord.user_id == user_id,
-                db.func.date(AttendanceRecord.clock_in) == today,
+                AttendanceRecord.clock_in_on(today),
                 AttendanceRecord.clock_out.is_(None)
             ).first()
             
@@ -174,6 +175,23 @@ class AttendanceService:
                     'message': 'Foto wajib diambil saat clock out'
                 }
             
+            # Validasi ukuran foto dan simpan ke blob store
+            photo_key = None
+            if photo_base64:
+                photo_size_mb = len(photo_base64.encode('utf-8')) / (1024 * 1024)
+                if photo_size_mb > settings.max_photo_size_mb:
+                    return {
+                        'success': False,
+                        'message': f'Ukuran foto terlalu besar. Maksimal {settings.max_photo_size_mb}MB'
+                    }
+                try:
+                    photo_key = get_attendance_photo_store().save_base64(photo_base64)
+                except ValueError as e:
+                    return {
+                        'success': False,
+                        'message': f'Foto tidak valid: {str(e)}'
+                    }
+            
             # Validasi task sebelum clock-out
             try:
                 from domains.task.services.daily_task_service import DailyTaskService
@@ -203,7 +221,7 @@ class AttendanceService:
             record.clock_out_latitude = latitude
             record.clock_out_longitude = longitude
             record.clock_out_address = address
-            record.clock_out_photo = photo_base64
+            record.clock_out_photo_key = photo_key
             
             if notes:
                 record.notes = f"{record.notes}\n{notes}" if record.notes else notes
@@ -215,6 +233,7 @@ class AttendanceService:
             record.status = record.get_status()
             
             db.session.commit()
+            self._refresh_rollup(record)
             
             # Update attendance_id di daily tasks
             try:
@@ -245,6 +264,23 @@ class AttendanceService:
                 'message': f'Terjadi kesalahan: {str(e)}'
             }
     
+    def _refresh_rollup(self, record: Optional[AttendanceRecord]):
+        """Perbarui rollup harian; kegagalan rollup tidak menggagalkan absensi
+        (row yang terlewat diperbaiki _repair_rollup saat dibaca)"""
+        try:
+            attendance_rollup_service.refresh_for_record(record)
+        except Exception as e:
+            logger.error(f"Error updating attendance rollup: {e}")
+            db.session.rollback()
+    
+    def _repair_rollup(self, start_date: date, end_date: date, user_id: int = None):
+        """Samakan rollup dengan attendance_records sebelum agregat dibaca"""
+        try:
+            attendance_rollup_service.repair(start_date, end_date, user_id)
+        except Exception as e:
+            logger.error(f"Error repairing attendance rollup: {e}")
+            db.session.rollback()
+    
     def get_user_attendance(self, user_id: int, start_date: date = None, 
                            end_date: date = None, limit: int = 30) -> List[Dict]:
         """Ambil history absensi user"""
@@ -252,9 +288,9 @@ class AttendanceService:
             query = AttendanceRecord.query.filter(AttendanceRecord.user_id == user_id)
             
             if start_date:
-                query = query.filter(db.func.date(AttendanceRecord.clock_in) >= start_date)
+                query = query.filter(AttendanceRecord.clock_in_from(start_date))
             if end_date:
-                query = query.filter(db.func.date(AttendanceRecord.clock_in) <= end_date)
+                query = query.filter(AttendanceRecord.clock_in_until(end_date))
             
             records = query.order_by(AttendanceRecord.clock_in.desc()).limit(limit).all()
             
@@ -268,30 +304,17 @@ class AttendanceService:
                            end_date: date = None) -> List[Dict]:
         """Manager lihat absensi tim berdasarkan department"""
         try:
-            # Cari department manager
-            user_role = UserRole.query.filter(
-                UserRole.user_id == manager_user_id,
-                UserRole.is_active == True
-            ).join(Role).filter(Role.is_management == True).first()
-            
-            if not user_role:
+            user_ids = self._get_team_user_ids(manager_user_id)
+            if not user_ids:
                 return []
             
-            # Cari semua user di department yang sama
-            team_users = UserRole.query.filter(
-                UserRole.role_id == user_role.role_id,
-                UserRole.is_active == True
-            ).all()
-            
-            user_ids = [ur.user_id for ur in team_users]
-            
             # Ambil attendance records
             query = AttendanceRecord.query.filter(AttendanceRecord.user_id.in_(user_ids))
             
             if start_date:
-                query = query.filter(db.func.date(AttendanceRecord.clock_in) >= start_date)
+                query = query.filter(AttendanceRecord.clock_in_from(start_date))
             if end_date:
-                query = query.filter(db.func.date(AttendanceRecord.clock_in) <= end_date)
+                query = query.filter(AttendanceRecord.clock_in_until(end_date))
             
             records = query.order_by(AttendanceRecord.clock_in.desc()).all()
             
@@ -301,41 +324,197 @@ class AttendanceService:
             logger.error(f"Error get team attendance: {str(e)}")
             return []
     
-    def get_all_attendance(self, start_date: date = None, end_date: date = None, 
-                          user_id: int = None, status: str = None, search: str = None) -> List[Dict]:
-        """Admin lihat semua absensi dengan filter"""
+    def _get_team_user_ids(self, manager_user_id: int) -> List[int]:
+        """User ID anggota tim manager (role yang sama); kosong jika bukan manager"""
+        # Cari department manager
+        user_role = UserRole.query.filter(
+            UserRole.user_id == manager_user_id,
+            UserRole.is_active == True
+        ).join(Role).filter(Role.is_management == True).first()
+        
+        if not user_role:
+            return []
+        
+        # Cari semua user di department yang sama
+        team_users = UserRole.query.filter(
+            UserRole.role_id == user_role.role_id,
+            UserRole.is_active == True
+        ).all()
+        
+        return [ur.user_id for ur in team_users]
+    
+    def get_visible_user_ids(self, viewer_id: int) -> Optional[List[int]]:
+        """User ID yang absensinya boleh dilihat viewer: None untuk admin (semua user),
+        selain itu viewer sendiri ditambah anggota tim jika viewer manager"""
+        viewer = User.query.get(viewer_id)
+        if viewer and viewer.role == 'admin':
+            return None
+        return sorted({int(viewer_id), *self._get_team_user_ids(viewer_id)})
+    
+    def _can_view_record(self, viewer_id: int, record: AttendanceRecord) -> bool:
+        """Pemilik record, admin, atau manager tim pemilik record"""
+        if int(viewer_id) == record.user_id:
+            return True
+        visible = self.get_visible_user_ids(viewer_id)
+        return visible is None or record.user_id in visible
+    
+    def migrate_legacy_photo(self, record: AttendanceRecord, kind: str) -> Optional[str]:
+        """Pindahkan foto base64 lama satu record ke blob store. Return key (None jika tidak ada/invalid)"""
+        legacy = getattr(record, f'{kind}_photo')
+        if not legacy:
+            return getattr(record, f'{kind}_photo_key')
+        try:
+            key = get_attendance_photo_store().save_base64(legacy)
+        except ValueError as e:
+            logger.warning(f"Legacy {kind} photo of attendance {record.id} is not a valid image: {e}")
+            return None
+        setattr(record, f'{kind}_photo_key', key)
+        setattr(record, f'{kind}_photo', None)
+        return key
+    
+    def get_attendance_photo(self, viewer_id: int, record_id: int, kind: str,
+                             thumbnail: bool = False) -> Dict:
+        """Foto clock_in/clock_out satu record untuk dikirim: data = {'path', 'mimetype', 'key'}"""
         try:
-            query = AttendanceRecord.query
+            if kind not in ('clock_in', 'clock_out'):
+                return {'success': False, 'message': 'Jenis foto tidak valid', 'status_code': 400}
             
-            if start_date:
-                query = query.filter(db.func.date(AttendanceRecord.clock_in) >= start_date)
-            if end_date:
-                query = query.filter(db.func.date(AttendanceRecord.clock_in) <= end_date)
-            if user_id:
-                query = query.filter(AttendanceRecord.user_id == user_id)
-            if status:
-                query = query.filter(AttendanceRecord.status == status)
-            
-            # Tambahkan filter pencarian berdasarkan nama user dan alamat
-            if search:
-                # Join dengan tabel User untuk pencarian berdasarkan nama
-                query = query.join(User, AttendanceRecord.user_id == User.id)
-                search_term = f"%{search}%"
-                query = query.filter(
-                    db.or_(
-                        User.username.ilike(search_term),
-                        AttendanceRecord.clock_in_address.ilike(search_term),
-                        AttendanceRecord.clock_out_address.ilike(search_term)
-                    )
-                )
+            record = AttendanceRecord.query.get(record_id)
+            if not record:
+                return {'success': False, 'message': 'Record absensi tidak ditemukan', 'status_code': 404}
+            if not self._can_view_record(viewer_id, record):
+                return {'success': False, 'message': 'Tidak memiliki akses ke foto ini', 'status_code': 403}
+            
+            key = getattr(record, f'{kind}_photo_key')
+            if not key and getattr(record, f'has_legacy_{kind}_photo', False):
+                # Row belum tersentuh migrasi: pindahkan sekarang agar request berikutnya langsung dari file
+                key = self.migrate_legacy_photo(record, kind)
+                db.session.commit()
             
-            records = query.order_by(AttendanceRecord.clock_in.desc()).all()
+            photo = get_attendance_photo_store().open_photo(key, thumbnail=thumbnail) if key else None
+            if not photo:
+                return {'success': False, 'message': 'Foto tidak ditemukan', 'status_code': 404}
             
-            return [record.to_dict() for record in records]
+            path, mimetype = photo
+            return {
+                'success': True,
+                'message': 'Foto ditemukan',
+                'data': {'path': path, 'mimetype': mimetype, 'key': key}
+            }
             
+        except Exception as e:
+            logger.error(f"Error get attendance photo: {str(e)}")
+            db.session.rollback()
+            return {'success': False, 'message': f'Terjadi kesalahan: {str(e)}', 'status_code': 500}
+    
+    def _attendance_filters(self, start_date: date = None, end_date: date = None,
+                            user_id: int = None, status: str = None, search: str = None,
+                            user_ids: List[int] = None) -> list:
+        """Kriteria filter absensi (query harus join ke User untuk pencarian nama)"""
+        criteria = []
+        if user_ids is not None:
+            criteria.append(AttendanceRecord.user_id.in_(user_ids))
+        if start_date:
+            criteria.append(AttendanceRecord.clock_in_from(start_date))
+        if end_date:
+            criteria.append(AttendanceRecord.clock_in_until(end_date))
+        if user_id:
+            criteria.append(AttendanceRecord.user_id == user_id)
+        if status:
+            criteria.append(AttendanceRecord.status == status)
+        if search:
+            # Pencarian berdasarkan nama user dan alamat
+            search_term = f"%{search}%"
+            criteria.append(db.or_(
+                User.username.ilike(search_term),
+                AttendanceRecord.clock_in_address.ilike(search_term),
+                AttendanceRecord.clock_out_address.ilike(search_term)
+            ))
+        return criteria
+    
+    @staticmethod
+    def encode_cursor(record_clock_in: datetime, record_id: int) -> str:
+        raw = f"{record_clock_in.isoformat()}|{record_id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """Cursor keyset -> (clock_in, id). ValueError jika cursor tidak valid"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            clock_in_value, record_id = raw.rsplit('|', 1)
+            return datetime.fromisoformat(clock_in_value), int(record_id)
+        except Exception:
+            raise ValueError('Cursor tidak valid')
+    
+    def get_all_attendance(self, start_date: date = None, end_date: date = None, 
+                          user_id: int = None, status: str = None, search: str = None,
+                          limit: int = None, cursor: str = None, user_ids: List[int] = None) -> Dict:
+        """Admin lihat semua absensi dengan filter, per halaman keyset (clock_in desc, id desc)
+        
+        `user_ids` membatasi hasil ke user tersebut (scope viewer, lihat get_visible_user_ids).
+        Return {'items', 'next_cursor', 'has_more'}; next_cursor dikirim balik sebagai
+        ?cursor= untuk halaman berikutnya. ValueError jika cursor tidak valid.
+        """
+        limit = max(1, min(limit or self.list_default_limit, self.list_max_limit))
+        
+        query = AttendanceRecord.query.join(User, AttendanceRecord.user_id == User.id).options(
+            contains_eager(AttendanceRecord.user)
+        ).filter(*self._attendance_filters(start_date, end_date, user_id, status, search, user_ids))
+        
+        if cursor:
+            cursor_clock_in, cursor_id = self.decode_cursor(cursor)
+            query = query.filter(db.or_(
+                AttendanceRecord.clock_in < cursor_clock_in,
+                db.and_(AttendanceRecord.clock_in == cursor_clock_in, AttendanceRecord.id < cursor_id)
+            ))
+        
+        try:
+            records = query.order_by(
+                AttendanceRecord.clock_in.desc(), AttendanceRecord.id.desc()
+            ).limit(limit + 1).all()
         except Exception as e:
             logger.error(f"Error get all attendance: {str(e)}")
-            return []
+            return {'items': [], 'next_cursor': None, 'has_more': False}
+        
+        has_more = len(records) > limit
+        records = records[:limit]
+        return {
+            'items': [record.to_dict() for record in records],
+            'next_cursor': self.encode_cursor(records[-1].clock_in, records[-1].id) if has_more else None,
+            'has_more': has_more
+        }
+    
+    def iter_attendance_rows(self, start_date: date = None, end_date: date = None,
+                             user_id: int = None, status: str = None, search: str = None,
+                             batch_size: int = 1000, user_ids: List[int] = None):
+        """Stream kolom export absensi dari server-side cursor, tanpa membuat objek ORM
+        
+        Harus dikonsumsi di dalam app context (mis. lewat stream_with_context).
+        """
+        stmt = db.select(
+            AttendanceRecord.id,
+            User.username.label('user_name'),
+            AttendanceRecord.clock_in,
+            AttendanceRecord.clock_out,
+            AttendanceRecord.work_duration_minutes,
+            AttendanceRecord.overtime_minutes,
+            AttendanceRecord.status,
+            AttendanceRecord.clock_in_address,
+            AttendanceRecord.clock_out_address,
+            AttendanceRecord.notes
+        ).join(User, AttendanceRecord.user_id == User.id).where(
+            *self._attendance_filters(start_date, end_date, user_id, status, search, user_ids)
+        ).order_by(
+            AttendanceRecord.clock_in.desc(), AttendanceRecord.id.desc()
+        ).execution_options(yield_per=batch_size)
+        
+        result = db.session.execute(stmt)
+        try:
+            for row in result:
+                yield row
+        finally:
+            result.close()
     
     def get_today_status(self, user_id: int = None) -> Dict:
         """Status absensi hari ini"""
@@ -345,17 +524,31 @@ class AttendanceService:
             if user_id:
                 # Status untuk user tertentu
                 try:
+                    self._repair_rollup(today, today, user_id)
+                    rollup = attendance_rollup_service.get_user_day(user_id, today)
+                    
+                    if rollup:
+                        return {
+                            'user_id': user_id,
+                            'has_clocked_in': True,
+                            'has_clocked_out': rollup.clock_out is not None,
+                            'clock_in_time': rollup.clock_in.isoformat() if rollup.clock_in else None,
+                            'clock_out_time': rollup.clock_out.isoformat() if rollup.clock_out else None,
+                            'status': rollup.status or 'present',
+                            'work_duration_hours': round(rollup.work_minutes / 60, 2) if rollup.work_minutes else 0
+                        }
+                    
+                    # Rollup belum bisa diperbaiki (mis. database read-only): baca record langsung
                     record = AttendanceRecord.query.filter(
                         AttendanceRecord.user_id == user_id,
-                        db.func.date(AttendanceRecord.clock_in) == today
-                    ).first()
-                    
+                        AttendanceRecord.clock_in_on(today)
+                    ).order_by(AttendanceRecord.clock_in).first()
                     if record:
                         return {
                             'user_id': user_id,
                             'has_clocked_in': True,
                             'has_clocked_out': record.clock_out is not None,
-                            'clock_in_time': record.clock_in.isoformat() if record.clock_in else None,
+                            'clock_in_time': record.clock_in.isoformat(),
                             'clock_out_time': record.clock_out.isoformat() if record.clock_out else None,
                             'status': record.status or 'present',
                             'work_duration_hours': round(record.work_duration_minutes / 60, 2) if record.work_duration_minutes else 0
@@ -385,13 +578,10 @@ class AttendanceService:
                 # Status untuk semua user (admin view)
                 try:
                     total_users = User.query.filter(User.is_active == True).count()
-                    clocked_in_users = AttendanceRecord.query.filter(
-                        db.func.date(AttendanceRecord.clock_in) == today
-                    ).count()
-                    clocked_out_users = AttendanceRecord.query.filter(
-                        db.func.date(AttendanceRecord.clock_in) == today,
-                        AttendanceRecord.clock_out.isnot(None)
-                    ).count()
+                    self._repair_rollup(today, today)
+                    day_totals = attendance_rollup_service.get_day_totals(today)
+                    clocked_in_users = day_totals['clocked_in_users']
+                    clocked_out_users = day_totals['clocked_out_users']
                     
                     return {
                         'total_users': total_users,
@@ -591,6 +781,7 @@ class AttendanceService:
             
             if action == 'approve':
                 overtime_request.approve(approver_id, actual_hours)
+                self._refresh_rollup(AttendanceRecord.query.get(overtime_request.attendance_id))
                 message = 'Pengajuan overtime berhasil disetujui'
             elif action == 'reject':
                 if not rejection_reason:
@@ -631,32 +822,28 @@ class AttendanceService:
             if not end_date:
                 end_date = date.today()  # Hari ini
             
-            # Query base dengan error handling
+            # Agregat GROUP BY status dari rollup harian
             try:
-                query = AttendanceRecord.query.filter(
-                    db.func.date(AttendanceRecord.clock_in) >= start_date,
-                    db.func.date(AttendanceRecord.clock_in) <= end_date
-                )
-                
-                if user_id:
-                    query = query.filter(AttendanceRecord.user_id == user_id)
-                
-                records = query.all()
+                self._repair_rollup(start_date, end_date, user_id)
+                totals = attendance_rollup_service.get_status_totals(start_date, end_date, user_id)
             except Exception as e:
                 logger.error(f"Error querying dashboard stats: {str(e)}", exc_info=True)
-                records = []
+                totals = {}
             
             # Hitung stats dengan error handling
             try:
-                total_days = len(records)
-                present_days = len([r for r in records if r.status == 'present'])
-                late_days = len([r for r in records if r.status == 'late'])
-                absent_days = len([r for r in records if r.status == 'absent'])
-                half_day_days = len([r for r in records if r.status == 'half_day'])
+                def status_days(status):
+                    return totals.get(status, {}).get('days', 0)
+                
+                total_days = sum(t['days'] for t in totals.values())
+                present_days = status_days('present')
+                late_days = status_days('late')
+                absent_days = status_days('absent')
+                half_day_days = status_days('half_day')
                 
-                # Hitung total jam kerja dengan safe access
-                total_work_hours = sum([(r.work_duration_minutes or 0) for r in records]) / 60
-                total_overtime_hours = sum([(r.overtime_minutes or 0) for r in records]) / 60
+                total_work_hours = sum(t['work_minutes'] for t in totals.values()) / 60
+                total_overtime_hours = sum(t['overtime_minutes'] for t in totals.values()) / 60
+                approved_overtime_hours = sum(t['approved_overtime_minutes'] for t in totals.values()) / 60
                 
                 # Hitung attendance rate
                 working_days = (end_date - start_date).days + 1
@@ -679,6 +866,7 @@ class AttendanceService:
                     'work_hours': {
                         'total_work_hours': round(total_work_hours, 2),
                         'total_overtime_hours': round(total_overtime_hours, 2),
+                        'approved_overtime_hours': round(approved_overtime_hours, 2),
                         'average_daily_hours': round(total_work_hours / total_days, 2) if total_days > 0 else 0
                     }
                 }
@@ -703,6 +891,7 @@ class AttendanceService:
                     'work_hours': {
                         'total_work_hours': 0,
                         'total_overtime_hours': 0,
+                        'approved_overtime_hours': 0,
                         'average_daily_hours': 0
                     }
                 }
@@ -716,137 +905,6 @@ class AttendanceService:
         except Exception as e:
             logger.error(f"Error get dashboard stats: {str(e)}", exc_info=True)
             return {}
-    
-    def export_to_excel(self, records: List[Dict], filename: str = None) -> BytesIO:
-        """Export attendance data ke Excel"""
-        try:
-            if not filename:
-                filename = f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Attendance Report"
-            
-            # Header
-            headers = [
-                'No', 'Nama Karyawan', 'Tanggal', 'Clock In', 'Clock Out',
-                'Durasi Kerja (Jam)', 'Overtime (Jam)', 'Status', 'Alamat Clock In', 'Alamat Clock Out', 'Catatan'
-            ]
-            
-            # Style untuk header
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            
-            # Set header
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-            
-            # Data
-            for row, record in enumerate(records, 2):
-                ws.cell(row=row, column=1, value=row-1)
-                ws.cell(row=row, column=2, value=record.get('user_name', ''))
-                ws.cell(row=row, column=3, value=record.get('clock_in', '').split('T')[0] if record.get('clock_in') else '')
-                ws.cell(row=row, column=4, value=record.get('clock_in', '').split('T')[1][:8] if record.get('clock_in') else '')
-                ws.cell(row=row, column=5, value=record.get('clock_out', '').split('T')[1][:8] if record.get('clock_out') else '')
-                ws.cell(row=row, column=6, value=record.get('work_duration_hours', 0))
-                ws.cell(row=row, column=7, value=record.get('overtime_hours', 0))
-                ws.cell(row=row, column=8, value=record.get('status', ''))
-                ws.cell(row=row, column=9, value=record.get('clock_in_address', ''))
-                ws.cell(row=row, column=10, value=record.get('clock_out_address', ''))
-                ws.cell(row=row, column=11, value=record.get('notes', ''))
-            
-            # Auto adjust column width
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Save to BytesIO
-            output = BytesIO()
-            wb.save(output)
-            output.seek(0)
-            
-            return output
-            
-        except Exception as e:
-            logger.error(f"Error export to Excel: {str(e)}")
-            raise e
-    
-    def export_to_pdf(self, records: List[Dict], filename: str = None) -> BytesIO:
-        """Export attendance data ke PDF"""
-        try:
-            if not filename:
-                filename = f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            
-            output = BytesIO()
-            doc = SimpleDocTemplate(output, pagesize=A4)
-            
-            # Styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=30,
-                alignment=1  # Center
-            )
-            
-            # Title
-            title = Paragraph("Laporan Absensi Karyawan", title_style)
-            
-            # Table data
-            table_data = [['No', 'Nama', 'Tanggal', 'Clock In', 'Clock Out', 'Durasi', 'Status']]
-            
-            for i, record in enumerate(records, 1):
-                clock_in_date = record.get('clock_in', '').split('T')[0] if record.get('clock_in') else ''
-                clock_in_time = record.get('clock_in', '').split('T')[1][:8] if record.get('clock_in') else ''
-                clock_out_time = record.get('clock_out', '').split('T')[1][:8] if record.get('clock_out') else ''
-                duration = f"{record.get('work_duration_hours', 0):.1f} jam"
-                
-                table_data.append([
-                    str(i),
-                    record.get('user_name', ''),
-                    clock_in_date,
-                    clock_in_time,
-                    clock_out_time,
-                    duration,
-                    record.get('status', '')
-                ])
-            
-            # Create table
-            table = Table(table_data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            # Build PDF
-            elements = [title, Spacer(1, 12), table]
-            doc.build(elements)
-            
-            output.seek(0)
-            return output
-            
-        except Exception as e:
-            logger.error(f"Error export to PDF: {str(e)}")
-            raise e
 
 # Singleton instance
 attendance_service = AttendanceService()
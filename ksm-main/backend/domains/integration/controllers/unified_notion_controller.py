@@ -8,6 +8,7 @@ Menggabungkan database_discovery_controller, enhanced_database_controller, dan e
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from domains.integration.services.unified_notion_service import get_unified_notion_service
+from domains.integration.services.notion_task_mirror_service import get_notion_task_mirror_service
 from domains.integration.models.notion_database import NotionDatabase
 from domains.integration.models.property_mapping import PropertyMapping as PropertyMappingModel
 from config.database import db
@@ -1110,28 +1111,39 @@ def get_enhanced_employees():
 @unified_notion_bp.route('/enhanced-sync', methods=['POST'])
 @jwt_required()
 def sync_enhanced_tasks():
-    """Sync tasks with Notion API (Enhanced endpoint)"""
+    """Sync mirror task lokal dengan Notion API (delta; {"full": true} untuk full resync)"""
     try:
         from datetime import datetime
         
-        # Mock sync process - bisa diimplementasikan lebih lanjut
+        data = request.get_json(silent=True) or {}
+        mirror_service = get_notion_task_mirror_service()
+        result = mirror_service.sync_all(
+            full=bool(data.get('full', False)),
+            employee_filter=data.get('employee') or None
+        )
+        
         sync_result = {
             "sync_id": f"sync_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "status": "completed",
-            "tasks_synced": 0,
-            "new_tasks": 0,
-            "updated_tasks": 0,
+            "status": "failed" if result['failed'] else "completed",
+            "tasks_synced": result['tasks_synced'],
+            "new_tasks": result['new_tasks'],
+            "updated_tasks": result['updated_tasks'],
+            "removed_tasks": result['removed_tasks'],
+            "pages_fetched": result['pages_fetched'],
+            "duration_ms": result['duration_ms'],
+            "databases": result['databases'],
             "sync_time": datetime.now().isoformat(),
-            "message": "Tasks synchronized successfully"
+            "message": "Tasks synchronized successfully" if not result['failed']
+                       else f"{result['failed']} database gagal di-sync"
         }
         
-        logger.info(f"Task sync completed: {sync_result['sync_id']}")
+        logger.info(f"Task sync completed: {sync_result['sync_id']} ({result['pages_fetched']} page(s))")
         
         return jsonify({
-            'success': True,
+            'success': not result['failed'],
             'data': sync_result,
-            'message': 'Tasks synchronized successfully'
-        })
+            'message': sync_result['message']
+        }), 200 if not result['failed'] else 502
         
     except Exception as e:
         logger.error(f"Error syncing tasks: {e}")
@@ -1142,6 +1154,25 @@ def sync_enhanced_tasks():
         }), 500
 
 
+@unified_notion_bp.route('/mirror/status', methods=['GET'])
+@jwt_required()
+def get_task_mirror_status():
+    """Status mirror task Notion: backfill, watermark, sync lag, dan page per run"""
+    try:
+        status = get_notion_task_mirror_service().get_sync_status()
+        return jsonify({
+            'success': True,
+            'data': status
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting task mirror status: {e}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get task mirror status',
+            'error': str(e)
+        }), 500
+
+
 @unified_notion_bp.route('/enhanced-health', methods=['GET'])
 @jwt_required()
 def enhanced_health_check():
@@ -4,9 +4,11 @@ Integration Models Package
 
 from .notion_database import NotionDatabase
 from .property_mapping import PropertyMapping
+from .notion_task_mirror import NotionTaskMirror, NotionSyncState
 
 __all__ = [
     'NotionDatabase',
-    'PropertyMapping'
+    'PropertyMapping',
+    'NotionTaskMirror',
+    'NotionSyncState'
 ]
-
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notion Task Mirror Model - Salinan lokal task Notion karyawan
+- NotionTaskMirror: satu baris per page Notion yang sudah di-parse (bentuk sama dengan _parse_task_page)
+- NotionSyncState: watermark last_edited_time dan hasil sync terakhir per database
+"""
+
+from datetime import datetime
+from config.database import db
+
+
+class NotionTaskMirror(db.Model):
+    """Model untuk task Notion yang di-mirror ke database lokal"""
+
+    __tablename__ = 'notion_task_mirror'
+
+    id = db.Column(db.Integer, primary_key=True)
+    page_id = db.Column(db.String(64), unique=True, nullable=False)
+    database_id = db.Column(db.String(64), nullable=False, index=True)
+    employee_name = db.Column(db.String(255), nullable=False, index=True)
+    title = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(100), nullable=True, index=True)
+    priority = db.Column(db.String(100), nullable=True)
+    date = db.Column(db.String(64), nullable=True)  # Nilai mentah property Tanggal (start)
+    task_date = db.Column(db.Date, nullable=True, index=True)  # Untuk filter date_from/date_to
+    description = db.Column(db.Text, nullable=True)
+    url = db.Column(db.String(500), nullable=True)
+    created_time = db.Column(db.String(64), nullable=True)
+    last_edited_time = db.Column(db.String(64), nullable=True)
+    notion_last_edited_at = db.Column(db.DateTime, nullable=True, index=True)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_notion_task_mirror_employee_date', 'employee_name', 'task_date'),
+    )
+
+    def __repr__(self):
+        return f'<NotionTaskMirror {self.page_id} ({self.employee_name})>'
+
+    def to_dict(self):
+        """Convert model ke dictionary task (format sama dengan response Notion live)"""
+        return {
+            'id': self.page_id,
+            'employee_name': self.employee_name,
+            'title': self.title or '',
+            'status': self.status or '',
+            'priority': self.priority or '',
+            'date': self.date or '',
+            'description': self.description or '',
+            'url': self.url or '',
+            'created_time': self.created_time or '',
+            'last_edited_time': self.last_edited_time or ''
+        }
+
+
+class NotionSyncState(db.Model):
+    """Model untuk status sinkronisasi mirror per database Notion"""
+
+    __tablename__ = 'notion_sync_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    database_id = db.Column(db.String(64), unique=True, nullable=False)
+    employee_name = db.Column(db.String(255), nullable=False)
+    watermark = db.Column(db.DateTime, nullable=True)  # last_edited_time terbesar yang sudah tersimpan (UTC)
+    backfill_completed = db.Column(db.Boolean, nullable=False, default=False)
+    last_full_sync_at = db.Column(db.DateTime, nullable=True)
+    last_success_at = db.Column(db.DateTime, nullable=True)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_run_mode = db.Column(db.String(20), nullable=True)  # full | delta
+    last_pages_fetched = db.Column(db.Integer, nullable=False, default=0)
+    last_tasks_upserted = db.Column(db.Integer, nullable=False, default=0)
+    last_tasks_removed = db.Column(db.Integer, nullable=False, default=0)
+    last_duration_ms = db.Column(db.Float, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    total_runs = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NotionSyncState {self.database_id} ({self.employee_name})>'
+
+    def to_dict(self):
+        """Convert model ke dictionary"""
+        now = datetime.utcnow()
+        return {
+            'database_id': self.database_id,
+            'employee_name': self.employee_name,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'backfill_completed': self.backfill_completed,
+            'last_full_sync_at': self.last_full_sync_at.isoformat() if self.last_full_sync_at else None,
+            'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+            'sync_lag_seconds': round((now - self.last_success_at).total_seconds(), 1) if self.last_success_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_run_mode': self.last_run_mode,
+            'last_pages_fetched': self.last_pages_fetched,
+            'last_tasks_upserted': self.last_tasks_upserted,
+            'last_tasks_removed': self.last_tasks_removed,
+            'last_duration_ms': self.last_duration_ms,
+            'last_error': self.last_error,
+            'total_runs': self.total_runs
+        }
+
+    @classmethod
+    def get_or_create(cls, database_id: str, employee_name: str):
+        """Ambil state database, buat baru (belum backfill) jika belum ada"""
+        state = cls.query.filter_by(database_id=database_id).first()
+        if state is None:
+            state = cls(database_id=database_id, employee_name=employee_name,
+                        backfill_completed=False, last_pages_fetched=0, last_tasks_upserted=0,
+                        last_tasks_removed=0, total_runs=0)
+            db.session.add(state)
+            db.session.commit()
+        elif state.employee_name != employee_name:
+            # Mapping karyawan berubah: delta sync tidak menyentuh page lama, jadi perbarui di sini
+            state.employee_name = employee_name
+            NotionTaskMirror.query.filter_by(database_id=database_id).update(
+                {'employee_name': employee_name}, synchronize_session=False
+            )
+            db.session.commit()
+        return state
@@ -7,10 +7,13 @@ Agent AI Sync Service - Sinkronisasi dengan Agent AI
 import requests
 import json
 import logging
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Iterator
 import time
 import os
+from shared.utils.stats import summarize
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,16 @@ class AgentAISyncService:
             'error_count': 0,
             'success_count': 0
         }
+        # Streaming: read timeout berlaku per potongan data, bukan untuk seluruh jawaban
+        self.stream_connect_timeout = float(os.getenv('AGENT_AI_STREAM_CONNECT_TIMEOUT', '10'))
+        self.stream_read_timeout = float(os.getenv('AGENT_AI_STREAM_READ_TIMEOUT', '30'))
+        self._stream_lock = threading.Lock()
+        self._ttft_samples = deque(maxlen=500)
+        self.stream_stats = {
+            'requests': 0,
+            'completed': 0,
+            'failed': 0
+        }
     
     def check_agent_ai_health(self) -> Dict[str, Any]:
         """Check kesehatan Agent AI"""
@@ -239,6 +252,7 @@ class AgentAISyncService:
             'sync_status': self.sync_status,
             'agent_ai_url': self.agent_ai_url,
             'last_sync': self.last_sync.isoformat() if self.last_sync else None,
+            'streaming': self.get_stream_stats(),
             'timestamp': datetime.now().isoformat()
         }
     
@@ -316,31 +330,107 @@ class AgentAISyncService:
                 'timestamp': datetime.now().isoformat()
             }
     
+    def _build_rag_payload(self, user_id: int, message: str, context: Dict[str, Any],
+                           session_id: str = None, company_id: str = None) -> Dict[str, Any]:
+        """Payload untuk endpoint RAG Agent AI (/api/rag/chat dan /api/rag/chat/stream)"""
+        # Use default company_id if not provided
+        if company_id is None:
+            from config.config import Config
+            company_id = Config.DEFAULT_COMPANY_ID
+        
+        return {
+            'user_id': user_id,
+            'message': message,
+            'session_id': session_id or f'telegram_{user_id}',
+            'source': 'KSM_main_telegram_rag',
+            'context': context,
+            'metadata': {
+                'company_id': company_id,
+                'timestamp': datetime.now().isoformat(),
+                'rag_enabled': True,
+                'telegram_bot': True,
+                'context_chunks': context.get('total_chunks', 0),
+                'avg_similarity': context.get('avg_similarity', 0.0)
+            }
+        }
+    
+    def stream_rag_enhanced_message(self, user_id: int, message: str, context: Dict[str, Any],
+                                    session_id: str = None, company_id: str = None) -> Iterator[Dict[str, Any]]:
+        """Stream jawaban Agent AI dari /api/rag/chat/stream (Server-Sent Events).
+        
+        Yield event dari Agent AI (`meta`, `delta`, `done`, `error`). Event `done` ditambah
+        `ttft_ms` end-to-end (request dikirim sampai delta pertama diterima di backend).
+        Kegagalan koneksi/HTTP dilaporkan sebagai event `error`, tidak di-raise.
+        """
+        rag_data = self._build_rag_payload(user_id, message, context, session_id, company_id)
+        start_time = time.time()
+        first_delta_at = None
+        finished = False
+        with self._stream_lock:
+            self.stream_stats['requests'] += 1
+        try:
+            with requests.post(
+                f"{self.agent_ai_url}/api/rag/chat/stream",
+                json=rag_data,
+                headers={'Accept': 'text/event-stream'},
+                stream=True,
+                timeout=(self.stream_connect_timeout, self.stream_read_timeout)
+            ) as response:
+                if response.status_code != 200:
+                    yield {
+                        'type': 'error',
+                        'error': f'Agent AI error: {response.status_code}',
+                        'error_code': response.status_code
+                    }
+                    return
+                
+                # chunk_size=None: teruskan data segera setelah diterima, tanpa menunggu buffer penuh
+                response.encoding = 'utf-8'
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    try:
+                        event = json.loads(line[5:].strip())
+                    except ValueError:
+                        logger.warning(f"⚠️ Invalid SSE event from Agent AI: {line[:100]}")
+                        continue
+                    
+                    if event.get('type') == 'delta' and first_delta_at is None:
+                        first_delta_at = time.time()
+                    elif event.get('type') == 'done':
+                        first_delta_at = first_delta_at or time.time()
+                        event['agent_ttft_ms'] = event.get('ttft_ms')
+                        event['ttft_ms'] = round((first_delta_at - start_time) * 1000.0, 1)
+                        event['response_time'] = round(time.time() - start_time, 3)
+                        finished = True
+                        with self._stream_lock:
+                            self.stream_stats['completed'] += 1
+                            self._ttft_samples.append(first_delta_at - start_time)
+                    yield event
+                    if event.get('type') in ('done', 'error'):
+                        return
+                
+                yield {'type': 'error', 'error': 'Agent AI stream ended without completion'}
+                
+        except requests.exceptions.RequestException as e:
+            yield {'type': 'error', 'error': f'Agent AI stream error: {str(e)}'}
+        finally:
+            if not finished:
+                with self._stream_lock:
+                    self.stream_stats['failed'] += 1
+    
     def send_rag_enhanced_message(self, user_id: int, message: str, context: Dict[str, Any], 
-                                 session_id: str = None, company_id: str = None) -> Dict[str, Any]:
-        """Send message ke Agent AI dengan RAG context"""
+                                 session_id: str = None, company_id: str = None,
+                                 on_delta: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Send message ke Agent AI dengan RAG context
+        
+        Jika `on_delta` diberikan, jawaban di-stream dan `on_delta(delta, text_so_far)` dipanggil
+        untuk setiap potongan; hasil akhir tetap berbentuk sama dengan mode non-streaming.
+        """
+        if on_delta is not None:
+            return self._send_rag_enhanced_message_streaming(user_id, message, context, session_id, company_id, on_delta)
         try:
-            # Use default company_id if not provided
-            if company_id is None:
-                from config.config import Config
-                company_id = Config.DEFAULT_COMPANY_ID
-            
-            # Prepare data untuk Agent AI RAG endpoint
-            rag_data = {
-                'user_id': user_id,
-                'message': message,
-                'session_id': session_id or f'telegram_{user_id}',
-                'source': 'KSM_main_telegram_rag',
-                'context': context,
-                'metadata': {
-                    'company_id': company_id,
-                    'timestamp': datetime.now().isoformat(),
-                    'rag_enabled': True,
-                    'telegram_bot': True,
-                    'context_chunks': context.get('total_chunks', 0),
-                    'avg_similarity': context.get('avg_similarity', 0.0)
-                }
-            }
+            rag_data = self._build_rag_payload(user_id, message, context, session_id, company_id)
             
             # Send ke Agent AI RAG endpoint
             start_time = time.time()
@@ -378,6 +468,75 @@ class AgentAISyncService:
                 'timestamp': datetime.now().isoformat()
             }
     
+    def _send_rag_enhanced_message_streaming(self, user_id: int, message: str, context: Dict[str, Any],
+                                             session_id: str, company_id: str,
+                                             on_delta: Callable[[str, str], None]) -> Dict[str, Any]:
+        start_time = time.time()
+        chunks = []
+        try:
+            for event in self.stream_rag_enhanced_message(user_id, message, context, session_id, company_id):
+                if event.get('type') == 'delta':
+                    chunks.append(event.get('content', ''))
+                    on_delta(event.get('content', ''), ''.join(chunks))
+                elif event.get('type') == 'done':
+                    return {
+                        'success': True,
+                        'status': 'rag_enhanced_success',
+                        'streamed': True,
+                        'response_time': event.get('response_time'),
+                        'ttft_ms': event.get('ttft_ms'),
+                        'data': {
+                            'success': True,
+                            'data': {
+                                'response': event.get('response') or ''.join(chunks),
+                                'model_used': event.get('model_used'),
+                                'processing_time': event.get('processing_time'),
+                                'tokens_used': event.get('tokens_used'),
+                                'ttft_ms': event.get('ttft_ms'),
+                                'agent_ttft_ms': event.get('agent_ttft_ms'),
+                                'rag_metadata': event.get('rag_metadata', {})
+                            }
+                        },
+                        'timestamp': datetime.now().isoformat()
+                    }
+                elif event.get('type') == 'error':
+                    return {
+                        'success': False,
+                        'status': 'rag_enhanced_error',
+                        'streamed': True,
+                        'error': event.get('error'),
+                        'error_code': event.get('error_code'),
+                        'partial_response': ''.join(chunks),
+                        'response_time': round(time.time() - start_time, 3),
+                        'timestamp': datetime.now().isoformat()
+                    }
+            # Generator selalu diakhiri done/error; baris ini hanya pengaman
+            return {
+                'success': False,
+                'status': 'rag_enhanced_error',
+                'streamed': True,
+                'error': 'Agent AI stream ended without completion',
+                'partial_response': ''.join(chunks),
+                'timestamp': datetime.now().isoformat()
+            }
+        except Exception as e:
+            # Termasuk exception dari on_delta
+            return {
+                'success': False,
+                'status': 'rag_enhanced_exception',
+                'streamed': True,
+                'error': str(e),
+                'partial_response': ''.join(chunks),
+                'timestamp': datetime.now().isoformat()
+            }
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Statistik streaming Agent AI, termasuk time-to-first-token end-to-end"""
+        with self._stream_lock:
+            samples = list(self._ttft_samples)
+            stats = dict(self.stream_stats)
+        return {**stats, 'time_to_first_token': summarize(samples, scale=1000.0, unit='ms')}
+    
     def test_rag_integration(self) -> Dict[str, Any]:
         """Test integrasi RAG dengan Agent AI"""
         try:
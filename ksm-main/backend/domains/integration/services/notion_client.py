@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notion Client untuk KSM Main Backend
+Satu transport HTTP untuk semua panggilan Notion API (sync dan async).
+
+- Koneksi keep-alive: requests.Session dengan pool (sync) dan httpx.AsyncClient per operasi async
+- Token bucket global (NOTION_RATE_LIMIT req/detik, burst NOTION_RATE_BURST) dipakai bersama oleh
+  semua thread dan event loop, karena limit Notion berlaku per integration, bukan per koneksi
+- 429: Retry-After dihormati dan seluruh client berhenti sampai waktu tersebut; 5xx/koneksi putus
+  di-retry dengan exponential backoff (maks NOTION_MAX_RETRIES)
+- Request baca yang identik (GET, POST query/search dengan body sama) yang sedang berjalan bersamaan
+  digabung: hanya satu yang dikirim, hasilnya dibagi ke semua pemanggil. Penggabungan hanya terjadi antar
+  pemanggil dengan transport yang sama, karena sync mendapat requests.Response dan async httpx.Response
+- httpx opsional; tanpa httpx varian async menjalankan transport sync di thread pool
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import Future
+from functools import partial
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+NOTION_BASE_URL = "https://api.notion.com/v1"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# AsyncClient aktif untuk operasi async saat ini (diwarisi task yang dibuat asyncio.gather)
+_current_async_session: contextvars.ContextVar = contextvars.ContextVar('notion_async_session', default=None)
+
+
+class _TokenBucket:
+    """Token bucket thread-safe; reserve() mengembalikan lama tunggu sehingga bisa dipakai sync maupun async"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Ambil satu slot; return detik yang harus ditunggu sebelum mengirim request"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            # Token boleh negatif: pemanggil berikutnya antre di slot setelahnya
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def pause(self, seconds: float):
+        """Hentikan semua request sampai `seconds` dari sekarang (Retry-After dari Notion)"""
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated_at = now
+
+
+class NotionClient:
+    """Transport Notion API bersama dengan rate limit, retry, dan penggabungan request"""
+
+    def __init__(self):
+        self.base_url = NOTION_BASE_URL
+        self.notion_token = os.getenv('NOTION_TOKEN')
+        self.headers = {
+            "Authorization": f"Bearer {self.notion_token}" if self.notion_token else "Bearer invalid_token",
+            "Notion-Version": os.getenv('NOTION_VERSION', '2022-06-28'),
+            "Content-Type": "application/json"
+        }
+        self.timeout = float(os.getenv('NOTION_TIMEOUT', '30'))
+        self.max_retries = int(os.getenv('NOTION_MAX_RETRIES', '4'))
+        self.pool_size = int(os.getenv('NOTION_POOL_SIZE', '10'))
+        self.bucket = _TokenBucket(float(os.getenv('NOTION_RATE_LIMIT', '3')), int(os.getenv('NOTION_RATE_BURST', '3')))
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('https://', adapter)
+
+        self._inflight: Dict[Tuple[str, str, str, str], Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'throttle_wait_ms': 0.0
+        }
+
+        if not HTTPX_AVAILABLE:
+            logger.warning("⚠️ httpx not installed, async Notion calls run on the sync transport in threads")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _count(self, key: str, value: float = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith('http') else f"{self.base_url}/{path.lstrip('/')}"
+
+    @staticmethod
+    def _is_read(method: str, path: str) -> bool:
+        # Query database dan search memakai POST tetapi tidak mengubah data
+        return method == 'GET' or path.rstrip('/').endswith(('query', 'search'))
+
+    def _coalesce_key(self, transport: str, method: str, path: str, body: Optional[Dict]) -> Tuple[str, str, str, str]:
+        # transport ('sync'/'async') ikut dalam key: tipe response kedua jalur berbeda
+        return (transport, method, self._url(path),
+                json.dumps(body, sort_keys=True, default=str) if body is not None else '')
+
+    def _join_inflight(self, key) -> Tuple[bool, Future]:
+        """Return (leader, future): leader mengirim request, lainnya menunggu future yang sama"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return False, future
+            future = Future()
+            self._inflight[key] = future
+            return True, future
+
+    def _leave_inflight(self, key):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _retry_delay(response, attempt: int) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return min(30.0, 0.5 * (2 ** attempt)) + random.uniform(0, 0.25)
+
+    def _throttle_delay(self) -> float:
+        wait = self.bucket.reserve()
+        if wait > 0:
+            self._count('throttle_wait_ms', wait * 1000.0)
+        return wait
+
+    def _should_retry(self, response, attempt: int) -> Optional[float]:
+        """Delay sebelum retry, atau None jika response dikembalikan apa adanya"""
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+            return None
+        delay = self._retry_delay(response, attempt)
+        self._count('retries')
+        if response.status_code == 429:
+            self._count('rate_limited')
+            logger.warning(f"⚠️ Notion rate limited, pausing all requests for {delay:.1f}s")
+            # Pause berlaku global; request berikutnya menunggu lewat token bucket
+            self.bucket.pause(delay)
+            return 0.0
+        return delay
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _send(self, method: str, path: str, body: Optional[Dict], timeout: Optional[float]):
+        for attempt in range(self.max_retries + 1):
+            wait = self._throttle_delay()
+            if wait > 0:
+                time.sleep(wait)
+            self._count('requests')
+            try:
+                response = self.session.request(method, self._url(path), json=body, timeout=timeout or self.timeout)
+            except requests.RequestException:
+                if attempt >= self.max_retries:
+                    self._count('errors')
+                    raise
+                self._count('retries')
+                time.sleep(self._retry_delay(None, attempt))
+                continue
+            delay = self._should_retry(response, attempt)
+            if delay is None:
+                if response.status_code >= 400:
+                    self._count('errors')
+                return response
+            if delay:
+                time.sleep(delay)
+        return response
+
+    def request(self, method: str, path: str, json_body: Optional[Dict] = None,
+                timeout: Optional[float] = None, coalesce: Optional[bool] = None):
+        """Kirim request ke Notion API. `path` relatif terhadap /v1 (mis. "databases/<id>/query")"""
+        method = method.upper()
+        if coalesce is None:
+            coalesce = self._is_read(method, path)
+        if not coalesce:
+            return self._send(method, path, json_body, timeout)
+
+        key = self._coalesce_key('sync', method, path, json_body)
+        leader, future = self._join_inflight(key)
+        if not leader:
+            self._count('coalesced')
+            return future.result()
+        try:
+            response = self._send(method, path, json_body, timeout)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._leave_inflight(key)
+
+    def get(self, path: str, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, json_body: Optional[Dict] = None, **kwargs):
+        return self.request('POST', path, json_body, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Async
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def async_session(self):
+        """Scope koneksi keep-alive untuk satu operasi async (mis. fan-out semua database karyawan)"""
+        if not HTTPX_AVAILABLE or _current_async_session.get() is not None:
+            yield _current_async_session.get()
+            return
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        async with httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=limits) as session:
+            token = _current_async_session.set(session)
+            try:
+                yield session
+            finally:
+                _current_async_session.reset(token)
+
+    async def _asend(self, method: str, path: str, body: Optional[Dict], timeout: Optional[float]):
+        session = _current_async_session.get()
+        if session is None:
+            async with self.async_session():
+                return await self._asend(method, path, body, timeout)
+
+        for attempt in range(self.max_retries + 1):
+            wait = self._throttle_delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._count('requests')
+            try:
+                response = await session.request(method, self._url(path), json=body, timeout=timeout or self.timeout)
+            except httpx.HTTPError:
+                if attempt >= self.max_retries:
+                    self._count('errors')
+                    raise
+                self._count('retries')
+                await asyncio.sleep(self._retry_delay(None, attempt))
+                continue
+            delay = self._should_retry(response, attempt)
+            if delay is None:
+                if response.status_code >= 400:
+                    self._count('errors')
+                return response
+            if delay:
+                await asyncio.sleep(delay)
+        return response
+
+    async def arequest(self, method: str, path: str, json_body: Optional[Dict] = None,
+                       timeout: Optional[float] = None, coalesce: Optional[bool] = None):
+        """Versi async request(); berbagi rate limit dengan pemanggil sync, request digabung antar pemanggil async"""
+        if not HTTPX_AVAILABLE:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, partial(self.request, method, path, json_body, timeout, coalesce)
+            )
+
+        method = method.upper()
+        if coalesce is None:
+            coalesce = self._is_read(method, path)
+        if not coalesce:
+            return await self._asend(method, path, json_body, timeout)
+
+        key = self._coalesce_key('async', method, path, json_body)
+        leader, future = self._join_inflight(key)
+        if not leader:
+            self._count('coalesced')
+            return await asyncio.wrap_future(future)
+        try:
+            response = await self._asend(method, path, json_body, timeout)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._leave_inflight(key)
+
+    async def aget(self, path: str, **kwargs):
+        return await self.arequest('GET', path, **kwargs)
+
+    async def apost(self, path: str, json_body: Optional[Dict] = None, **kwargs):
+        return await self.arequest('POST', path, json_body, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['throttle_wait_ms'] = round(stats['throttle_wait_ms'], 1)
+        with self._inflight_lock:
+            stats['inflight'] = len(self._inflight)
+        stats.update({
+            'rate_limit_per_second': self.bucket.rate,
+            'burst': self.bucket.burst,
+            'max_retries': self.max_retries,
+            'async_transport': 'httpx' if HTTPX_AVAILABLE else 'thread'
+        })
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+# Global instance
+_notion_client = None
+_notion_client_lock = threading.Lock()
+
+
+def get_notion_client() -> NotionClient:
+    """Get global Notion client instance"""
+    global _notion_client
+    if _notion_client is None:
+        with _notion_client_lock:
+            if _notion_client is None:
+                _notion_client = NotionClient()
+    return _notion_client
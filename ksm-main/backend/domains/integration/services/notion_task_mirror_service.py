@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notion Task Mirror Service untuk KSM Main Backend
+Menyimpan salinan lokal task Notion karyawan agar pembacaan task tidak menunggu Notion API.
+
+- Backfill pertama membaca seluruh database dengan mengikuti next_cursor (bukan hanya 100 page pertama)
+- Setelah itu delta sync hanya meminta page dengan last_edited_time >= watermark, diurutkan ascending,
+  sehingga watermark bisa maju per batch dan sync yang terputus dapat dilanjutkan
+- Full resync berkala (NOTION_MIRROR_FULL_RESYNC_HOURS) membuang page yang sudah dihapus di Notion,
+  karena query delta tidak pernah mengembalikan page yang dihapus
+- Pembacaan dari mirror memicu delta sync di background jika data lebih tua dari NOTION_MIRROR_MAX_LAG detik
+- Statistik per run: mode, page API yang diambil, task yang disimpan/dihapus, durasi, dan sync lag
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from flask import has_app_context
+
+from config.database import db
+from domains.integration.models.notion_task_mirror import NotionTaskMirror, NotionSyncState
+from shared.utils.stats import summarize
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_notion_time(value: Optional[str]) -> Optional[datetime]:
+    """Timestamp ISO Notion ("2024-01-15T10:00:00.000Z") -> datetime UTC naive"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_date(value: Optional[str]):
+    """Tanggal task ("2024-01-15" atau datetime) -> date"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+class NotionTaskMirrorService:
+    """Sinkronisasi dan pembacaan mirror task Notion"""
+
+    def __init__(self, notion_service):
+        self.notion_service = notion_service
+        self.enabled = os.getenv('NOTION_MIRROR_ENABLED', 'true').lower() == 'true'
+        self.max_lag = float(os.getenv('NOTION_MIRROR_MAX_LAG', '60'))
+        self.full_resync_interval = timedelta(hours=float(os.getenv('NOTION_MIRROR_FULL_RESYNC_HOURS', '24')))
+
+        self._database_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Satu worker: refresh background tidak pernah berjalan paralel dengan dirinya sendiri
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notion-mirror")
+        self._refresh_pending = False
+        self._refresh_guard = threading.Lock()
+        self.recent_runs = deque(maxlen=100)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _database_lock(self, database_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._database_locks.setdefault(database_id, threading.Lock())
+
+    @staticmethod
+    def _in_app_context(func, *args, **kwargs):
+        if has_app_context():
+            return func(*args, **kwargs)
+        from app import app
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    def _target_databases(self, employee_filter: Optional[str] = None) -> Dict[str, str]:
+        """Database karyawan yang di-mirror (filter nama karyawan seperti pembacaan live)"""
+        targets = self.notion_service.employee_databases
+        if employee_filter:
+            targets = {name: database_id for name, database_id in targets.items()
+                       if employee_filter.lower() in name.lower()}
+        return targets
+
+    def _choose_mode(self, state: NotionSyncState, full: bool) -> str:
+        if full or (state.watermark is None and not state.backfill_completed):
+            return 'full'
+        if not state.backfill_completed:
+            # Backfill yang terputus: page diurutkan ascending, jadi lanjut dari watermark
+            return 'delta'
+        # last_full_sync_at kosong = backfill diselesaikan lewat delta (setelah terputus) dan belum pernah
+        # ada full sync yang membuang page terhapus, jadi full resync dianggap sudah jatuh tempo
+        if state.last_full_sync_at is None or \
+                datetime.utcnow() - state.last_full_sync_at >= self.full_resync_interval:
+            return 'full'
+        return 'delta'
+
+    def _apply_batch(self, database_id: str, employee_name: str, pages: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert satu batch page Notion ke mirror. Return jumlah inserted/updated/removed"""
+        counts = {'inserted': 0, 'updated': 0, 'removed': 0}
+        page_ids = [page.get('id') for page in pages if page.get('id')]
+        existing = {row.page_id: row for row in NotionTaskMirror.query.filter(NotionTaskMirror.page_id.in_(page_ids)).all()} \
+            if page_ids else {}
+
+        for page in pages:
+            page_id = page.get('id')
+            if not page_id:
+                continue
+            row = existing.get(page_id)
+            if page.get('archived') or page.get('in_trash'):
+                if row is not None:
+                    db.session.delete(row)
+                    counts['removed'] += 1
+                continue
+
+            task = self.notion_service._parse_task_page(page, employee_name)
+            if not task:
+                continue
+            if row is None:
+                row = NotionTaskMirror(page_id=page_id)
+                db.session.add(row)
+                existing[page_id] = row
+                counts['inserted'] += 1
+            else:
+                counts['updated'] += 1
+            row.database_id = database_id
+            row.employee_name = employee_name
+            row.title = task['title']
+            row.status = task['status']
+            row.priority = task['priority']
+            row.date = task['date']
+            row.task_date = _parse_date(task['date'])
+            row.description = task['description']
+            row.url = task['url']
+            row.created_time = task['created_time']
+            row.last_edited_time = task['last_edited_time']
+            row.notion_last_edited_at = _parse_notion_time(task['last_edited_time'])
+        return counts
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync_database(self, employee_name: str, database_id: str, full: bool = False) -> Dict[str, Any]:
+        """Sync satu database (full backfill atau delta). Dilewati jika sync database ini sedang berjalan"""
+        lock = self._database_lock(database_id)
+        if not lock.acquire(blocking=False):
+            return {'database_id': database_id, 'employee_name': employee_name, 'status': 'skipped',
+                    'message': 'Sync database ini sedang berjalan'}
+        try:
+            return self._in_app_context(self._sync_database, employee_name, database_id, full)
+        finally:
+            lock.release()
+
+    def _sync_database(self, employee_name: str, database_id: str, full: bool) -> Dict[str, Any]:
+        state = NotionSyncState.get_or_create(database_id, employee_name)
+        mode = self._choose_mode(state, full)
+        started = time.perf_counter()
+        run = {
+            'database_id': database_id,
+            'employee_name': employee_name,
+            'mode': mode,
+            'status': 'completed',
+            'pages_fetched': 0,
+            'tasks_seen': 0,
+            'inserted': 0,
+            'updated': 0,
+            'removed': 0,
+            'started_at': datetime.utcnow().isoformat()
+        }
+
+        payload = {"sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+        if mode == 'delta' and state.watermark is not None:
+            # last_edited_time Notion dibulatkan ke menit: on_or_after mengambil ulang menit watermark
+            # (upsert idempoten) agar edit lain di menit yang sama tidak terlewat
+            payload["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": state.watermark.strftime('%Y-%m-%dT%H:%M:%S.000Z')}
+            }
+
+        seen_page_ids = set()
+        error = None
+        try:
+            for pages in self.notion_service._iter_database_query(database_id, payload):
+                run['pages_fetched'] += 1
+                run['tasks_seen'] += len(pages)
+                counts = self._apply_batch(database_id, employee_name, pages)
+                for key, value in counts.items():
+                    run[key] += value
+                seen_page_ids.update(page.get('id') for page in pages
+                                     if page.get('id') and not (page.get('archived') or page.get('in_trash')))
+                # Watermark maju per batch: sync yang gagal di tengah tidak mengulang dari awal
+                edited = [_parse_notion_time(page.get('last_edited_time')) for page in pages]
+                edited = [value for value in edited if value is not None]
+                if edited and (state.watermark is None or max(edited) > state.watermark):
+                    state.watermark = max(edited)
+                db.session.commit()
+
+            if mode == 'full':
+                # Page yang tidak lagi dikembalikan Notion sudah dihapus/di-archive
+                stale_query = NotionTaskMirror.query.filter(NotionTaskMirror.database_id == database_id)
+                if seen_page_ids:
+                    stale_query = stale_query.filter(~NotionTaskMirror.page_id.in_(seen_page_ids))
+                run['removed'] += stale_query.delete(synchronize_session=False)
+                state.last_full_sync_at = datetime.utcnow()
+            state.backfill_completed = True
+            state.last_success_at = datetime.utcnow()
+        except Exception as e:
+            db.session.rollback()
+            error = str(e)
+            run['status'] = 'failed'
+            run['error'] = error
+            logger.error(f"❌ Notion mirror {mode} sync failed for {employee_name} ({database_id}): {error}")
+
+        duration_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        run['duration_ms'] = duration_ms
+        try:
+            state = NotionSyncState.get_or_create(database_id, employee_name)
+            state.last_run_at = datetime.utcnow()
+            state.last_run_mode = mode
+            state.last_pages_fetched = run['pages_fetched']
+            state.last_tasks_upserted = run['inserted'] + run['updated']
+            state.last_tasks_removed = run['removed']
+            state.last_duration_ms = duration_ms
+            state.last_error = error
+            state.total_runs = (state.total_runs or 0) + 1
+            db.session.commit()
+            run['sync_lag_seconds'] = state.to_dict()['sync_lag_seconds']
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error saving Notion sync state for {database_id}: {str(e)}")
+
+        self.recent_runs.append(run)
+        if not error:
+            logger.info(f"✅ Notion mirror {mode} sync {employee_name}: {run['pages_fetched']} page(s), "
+                        f"{run['inserted']} new, {run['updated']} updated, {run['removed']} removed, {duration_ms}ms")
+        return run
+
+    def sync_all(self, full: bool = False, employee_filter: Optional[str] = None) -> Dict[str, Any]:
+        """Sync semua database karyawan secara berurutan"""
+        started = time.perf_counter()
+        runs = [self.sync_database(employee_name, database_id, full)
+                for employee_name, database_id in self._target_databases(employee_filter).items()]
+        return {
+            'databases': runs,
+            'pages_fetched': sum(run.get('pages_fetched', 0) for run in runs),
+            'tasks_synced': sum(run.get('inserted', 0) + run.get('updated', 0) for run in runs),
+            'new_tasks': sum(run.get('inserted', 0) for run in runs),
+            'updated_tasks': sum(run.get('updated', 0) for run in runs),
+            'removed_tasks': sum(run.get('removed', 0) for run in runs),
+            'failed': sum(1 for run in runs if run.get('status') == 'failed'),
+            'duration_ms': round((time.perf_counter() - started) * 1000.0, 1)
+        }
+
+    def _refresh_in_background(self):
+        with self._refresh_guard:
+            if self._refresh_pending:
+                return
+            self._refresh_pending = True
+
+        def run():
+            try:
+                self.sync_all()
+            except Exception as e:
+                logger.error(f"❌ Background Notion mirror refresh failed: {str(e)}")
+            finally:
+                with self._refresh_guard:
+                    self._refresh_pending = False
+
+        self._executor.submit(run)
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def get_tasks(self,
+                  employee_filter: Optional[str] = None,
+                  status_filter: Optional[str] = None,
+                  priority_filter: Optional[str] = None,
+                  date_from: Optional[str] = None,
+                  date_to: Optional[str] = None) -> Optional[List[Dict]]:
+        """Task dari mirror, atau None jika ada database target yang belum selesai backfill.
+
+        Data yang lebih tua dari max_lag tetap dikembalikan, refresh berjalan di background.
+        """
+        if not self.enabled:
+            return None
+        return self._in_app_context(self._get_tasks, employee_filter, status_filter,
+                                    priority_filter, date_from, date_to)
+
+    def _get_tasks(self, employee_filter, status_filter, priority_filter, date_from, date_to):
+        targets = self._target_databases(employee_filter)
+        if not targets:
+            return []
+        states = NotionSyncState.query.filter(NotionSyncState.database_id.in_(list(targets.values()))).all()
+        ready = {state.database_id: state for state in states if state.backfill_completed}
+        now = datetime.utcnow()
+        if len(ready) < len(targets) or any(
+                state.last_success_at is None or (now - state.last_success_at).total_seconds() > self.max_lag
+                for state in ready.values()):
+            self._refresh_in_background()
+        if len(ready) < len(targets):
+            return None
+
+        query = NotionTaskMirror.query.filter(NotionTaskMirror.database_id.in_(list(targets.values())))
+        if status_filter:
+            query = query.filter(NotionTaskMirror.status == status_filter)
+        if priority_filter:
+            query = query.filter(NotionTaskMirror.priority == priority_filter)
+        if _parse_date(date_from):
+            query = query.filter(NotionTaskMirror.task_date >= _parse_date(date_from))
+        if _parse_date(date_to):
+            query = query.filter(NotionTaskMirror.task_date <= _parse_date(date_to))
+        rows = query.order_by(NotionTaskMirror.task_date.desc(), NotionTaskMirror.id.desc()).all()
+        return [row.to_dict() for row in rows]
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def get_sync_status(self) -> Dict[str, Any]:
+        """Status mirror per database, sync lag, dan statistik page per run"""
+        return self._in_app_context(self._get_sync_status)
+
+    def _get_sync_status(self) -> Dict[str, Any]:
+        targets = self._target_databases()
+        states = {state.database_id: state.to_dict() for state in
+                  NotionSyncState.query.filter(NotionSyncState.database_id.in_(list(targets.values()))).all()} \
+            if targets else {}
+        task_counts = dict(
+            db.session.query(NotionTaskMirror.database_id, db.func.count(NotionTaskMirror.id))
+            .group_by(NotionTaskMirror.database_id).all()
+        )
+        databases = []
+        for employee_name, database_id in targets.items():
+            entry = states.get(database_id) or {'database_id': database_id, 'employee_name': employee_name,
+                                                'backfill_completed': False, 'sync_lag_seconds': None}
+            entry['mirrored_tasks'] = task_counts.get(database_id, 0)
+            databases.append(entry)
+
+        lags = [entry['sync_lag_seconds'] for entry in databases if entry.get('sync_lag_seconds') is not None]
+        runs = list(self.recent_runs)
+        return {
+            'enabled': self.enabled,
+            'ready': bool(databases) and all(entry['backfill_completed'] for entry in databases),
+            'max_lag_seconds': self.max_lag,
+            'full_resync_hours': self.full_resync_interval.total_seconds() / 3600.0,
+            'sync_lag_seconds': max(lags) if lags else None,
+            'refresh_pending': self._refresh_pending,
+            'databases': databases,
+            'recent_runs': runs[-10:],
+            'pages_per_run': {
+                'full': summarize([run['pages_fetched'] for run in runs if run['mode'] == 'full']),
+                'delta': summarize([run['pages_fetched'] for run in runs if run['mode'] == 'delta'])
+            },
+            'run_duration_ms': summarize([run['duration_ms'] for run in runs if 'duration_ms' in run])
+        }
+
+    def cleanup(self):
+        self._executor.shutdown(wait=True)
+
+
+# Global instance
+_notion_task_mirror_service = None
+_notion_task_mirror_service_lock = threading.Lock()
+
+
+def get_notion_task_mirror_service() -> NotionTaskMirrorService:
+    """Get global Notion task mirror service instance"""
+    global _notion_task_mirror_service
+    if _notion_task_mirror_service is None:
+        with _notion_task_mirror_service_lock:
+            if _notion_task_mirror_service is None:
+                from domains.integration.services.unified_notion_service import get_unified_notion_service
+                _notion_task_mirror_service = NotionTaskMirrorService(get_unified_notion_service())
+    return _notion_task_mirror_service
@@ -7,22 +7,24 @@ EnhancedDatabaseService, dan EnhancedNotionService
 """
 
 import os
-import requests
+import time
 import logging
 import json
 import re
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterator
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 # Import dependencies
 from shared.services.database_naming_service import DatabaseNamingConvention
 from domains.integration.models.notion_database import NotionDatabase
 from domains.integration.models.property_mapping import PropertyMapping as PropertyMappingModel
+from domains.integration.services.notion_client import get_notion_client
 from config.database import db
 
 # Load environment variables
@@ -79,6 +81,9 @@ class UnifiedNotionService:
             "Content-Type": "application/json"
         }
         
+        # Transport bersama: keep-alive, rate limit global, retry 429/5xx
+        self.client = get_notion_client()
+        
         # Initialize sub-services
         self.naming_convention = DatabaseNamingConvention()
         
@@ -90,6 +95,9 @@ class UnifiedNotionService:
         # Employee database mapping (dari EnhancedNotionService)
         self.employee_databases = self._load_employee_databases()
         
+        self.token_check_ttl = int(os.getenv('NOTION_TOKEN_CHECK_TTL', '300'))
+        self._token_check = (0.0, False)
+        
         # Thread pool untuk async operations
         self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="notion-worker")
         
@@ -673,8 +681,6 @@ class UnifiedNotionService:
         
         try:
             while True:
-                url = f"{self.base_url}/search"
-                
                 payload = {
                     "filter": {
                         "value": "database",
@@ -689,7 +695,7 @@ class UnifiedNotionService:
                 if start_cursor:
                     payload["start_cursor"] = start_cursor
                 
-                response = requests.post(url, headers=self.headers, json=payload)
+                response = self.client.post("search", payload)
                 
                 if response.status_code != 200:
                     logger.error(f"Error API Notion: {response.status_code} - {response.text}")
@@ -717,8 +723,7 @@ class UnifiedNotionService:
     def _get_database_info(self, database_id: str) -> Optional[Dict]:
         """Mendapatkan informasi database berdasarkan ID dari Notion API"""
         try:
-            url = f"{self.base_url}/databases/{database_id}"
-            response = requests.get(url, headers=self.headers)
+            response = self.client.get(f"databases/{database_id}")
             
             if response.status_code == 200:
                 return response.json()
@@ -887,8 +892,7 @@ class UnifiedNotionService:
     def validate_notion_token(self) -> bool:
         """Validasi token Notion"""
         try:
-            url = f"{self.base_url}/users/me"
-            response = requests.get(url, headers=self.headers)
+            response = self.client.get("users/me")
             
             if response.status_code == 200:
                 logger.info("Token Notion valid")
@@ -975,11 +979,7 @@ class UnifiedNotionService:
     def _get_database_properties(self, database_id: str) -> Optional[Dict[str, Any]]:
         """Get database properties dari Notion API"""
         try:
-            response = requests.get(
-                f"{self.base_url}/databases/{database_id}",
-                headers=self.headers,
-                timeout=30
-            )
+            response = self.client.get(f"databases/{database_id}")
             
             if response.status_code == 200:
                 data = response.json()
@@ -1103,11 +1103,27 @@ class UnifiedNotionService:
         reverse_mapping = {v: k for k, v in self.field_mappings.items()}
         return reverse_mapping.get(mapped_field)
     
+    def _iter_database_query(self, database_id: str, payload: Optional[Dict] = None) -> Iterator[List[Dict]]:
+        """Query Notion database dan yield hasil per page API, mengikuti next_cursor sampai habis.
+
+        Raise RuntimeError jika Notion mengembalikan status selain 200.
+        """
+        body = dict(payload or {})
+        body["page_size"] = 100
+        while True:
+            response = self.client.post(f"databases/{database_id}/query", body)
+            if response.status_code != 200:
+                raise RuntimeError(f"Notion query {database_id} returned {response.status_code}")
+            data = response.json()
+            yield data.get('results', [])
+            if not data.get('has_more') or not data.get('next_cursor'):
+                break
+            body["start_cursor"] = data["next_cursor"]
+    
     def _query_notion_database(self, database_id: str, filters: Optional[Dict] = None) -> List[Dict]:
-        """Query Notion database"""
+        """Query Notion database (semua page, mengikuti pagination)"""
         try:
             payload = {
-                "page_size": 100,
                 "sorts": [
                     {
                         "property": "created_time",
@@ -1119,19 +1135,10 @@ class UnifiedNotionService:
             if filters:
                 payload["filter"] = filters
             
-            response = requests.post(
-                f"{self.base_url}/databases/{database_id}/query",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('results', [])
-            else:
-                logger.error(f"❌ Error querying Notion database: {response.status_code}")
-                return []
+            results = []
+            for pages in self._iter_database_query(database_id, payload):
+                results.extend(pages)
+            return results
                 
         except Exception as e:
             logger.error(f"❌ Exception querying Notion database: {str(e)}")
@@ -1146,18 +1153,15 @@ class UnifiedNotionService:
                 # Get all employee databases
                 employee_databases = NotionDatabase.get_employee_databases()
                 
+                targets = [(database.employee_name, database.database_id) for database in employee_databases
+                           if not employee_filter or database.employee_name == employee_filter]
+                
+                # Database di-query bersamaan; laju request tetap dibatasi token bucket client
+                results = self.executor.map(lambda target: self.get_tasks_from_database(target[1]), targets)
+                
                 all_tasks = {}
                 
-                for database in employee_databases:
-                    employee_name = database.employee_name
-                    
-                    # Apply employee filter if specified
-                    if employee_filter and employee_name != employee_filter:
-                        continue
-                    
-                    # Get tasks from this database
-                    tasks = self.get_tasks_from_database(database.database_id)
-                    
+                for (employee_name, _), tasks in zip(targets, results):
                     if tasks:
                         if employee_name not in all_tasks:
                             all_tasks[employee_name] = []
@@ -1295,8 +1299,19 @@ class UnifiedNotionService:
                                    priority_filter: Optional[str] = None,
                                    date_from: Optional[str] = None,
                                    date_to: Optional[str] = None) -> List[Dict]:
-        """Mengambil task dari semua database karyawan secara parallel"""
+        """Mengambil task dari semua database karyawan (dari mirror lokal, live parallel jika belum siap)"""
         try:
+            # Mirror lokal: dijaga tetap baru oleh delta sync, tidak menunggu Notion API
+            try:
+                from domains.integration.services.notion_task_mirror_service import get_notion_task_mirror_service
+                mirrored = get_notion_task_mirror_service().get_tasks(
+                    employee_filter, status_filter, priority_filter, date_from, date_to
+                )
+                if mirrored is not None:
+                    return mirrored
+            except Exception as e:
+                logger.warning(f"⚠️ Notion task mirror unavailable, querying Notion directly: {str(e)}")
+            
             logger.info("🔍 Mengambil data task dari semua database karyawan...")
             
             # Filter karyawan yang akan diambil datanya
@@ -1347,6 +1362,42 @@ class UnifiedNotionService:
             logger.error(f"❌ Error getting employees: {str(e)}")
             return []
     
+    @staticmethod
+    def _build_task_query(status_filter: Optional[str] = None,
+                          priority_filter: Optional[str] = None,
+                          date_from: Optional[str] = None,
+                          date_to: Optional[str] = None) -> Dict:
+        """Payload query task karyawan (filter status/prioritas/tanggal, urut Tanggal desc)"""
+        filters = []
+        
+        if status_filter:
+            filters.append({
+                "property": "Status Pekerjaan",
+                "select": {"equals": status_filter}
+            })
+            
+        if priority_filter:
+            filters.append({
+                "property": "Prioritas",
+                "select": {"equals": priority_filter}
+            })
+            
+        if date_from or date_to:
+            date_filter = {"property": "Tanggal", "date": {}}
+            if date_from:
+                date_filter["date"]["on_or_after"] = date_from
+            if date_to:
+                date_filter["date"]["on_or_before"] = date_to
+            filters.append(date_filter)
+        
+        payload = {
+            "sorts": [{"property": "Tanggal", "direction": "descending"}]
+        }
+        
+        if filters:
+            payload["filter"] = {"and": filters}
+        return payload
+    
     def _fetch_employee_tasks_sync(self, 
                                   employee_name: str,
                                   database_id: str,
@@ -1354,61 +1405,50 @@ class UnifiedNotionService:
                                   priority_filter: Optional[str] = None,
                                   date_from: Optional[str] = None,
                                   date_to: Optional[str] = None) -> List[Dict]:
-        """Fetch tasks untuk satu karyawan secara async"""
+        """Fetch tasks untuk satu karyawan"""
         try:
-            # Build filter
-            filters = []
+            payload = self._build_task_query(status_filter, priority_filter, date_from, date_to)
             
-            if status_filter:
-                filters.append({
-                    "property": "Status Pekerjaan",
-                    "select": {"equals": status_filter}
-                })
-                
-            if priority_filter:
-                filters.append({
-                    "property": "Prioritas",
-                    "select": {"equals": priority_filter}
-                })
-                
-            if date_from or date_to:
-                date_filter = {"property": "Tanggal", "date": {}}
-                if date_from:
-                    date_filter["date"]["on_or_after"] = date_from
-                if date_to:
-                    date_filter["date"]["on_or_before"] = date_to
-                filters.append(date_filter)
-            
-            # Build payload
-            payload = {
-                "page_size": 100,
-                "sorts": [{"property": "Tanggal", "direction": "descending"}]
-            }
+            tasks = []
+            for pages in self._iter_database_query(database_id, payload):
+                for page in pages:
+                    task = self._parse_task_page(page, employee_name)
+                    if task:
+                        tasks.append(task)
             
-            if filters:
-                payload["filter"] = {"and": filters}
-            
-            # Make sync request
-            response = requests.post(
-                f"{self.base_url}/databases/{database_id}/query",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            return tasks
+                    
+        except Exception as e:
+            logger.error(f"Error fetching tasks for {employee_name}: {str(e)}")
+            return []
+    
+    async def _fetch_employee_tasks_async(self, 
+                                         employee_name: str,
+                                         database_id: str,
+                                         status_filter: Optional[str] = None,
+                                         priority_filter: Optional[str] = None,
+                                         date_from: Optional[str] = None,
+                                         date_to: Optional[str] = None) -> List[Dict]:
+        """Fetch tasks untuk satu karyawan (async, semua page)"""
+        try:
+            body = self._build_task_query(status_filter, priority_filter, date_from, date_to)
+            body["page_size"] = 100
             
-            if response.status_code == 200:
+            tasks = []
+            while True:
+                response = await self.client.apost(f"databases/{database_id}/query", body)
+                if response.status_code != 200:
+                    raise RuntimeError(f"Notion query {database_id} returned {response.status_code}")
                 data = response.json()
-                tasks = []
-                
                 for page in data.get("results", []):
                     task = self._parse_task_page(page, employee_name)
                     if task:
                         tasks.append(task)
-                
-                return tasks
-            else:
-                logger.error(f"Error fetching tasks for {employee_name}: {response.status_code}")
-                return []
+                if not data.get('has_more') or not data.get('next_cursor'):
+                    break
+                body = {**body, "start_cursor": data["next_cursor"]}
+            
+            return tasks
                     
         except Exception as e:
             logger.error(f"Error fetching tasks for {employee_name}: {str(e)}")
@@ -1486,15 +1526,10 @@ class UnifiedNotionService:
         """Discover semua database karyawan dalam workspace"""
         try:
             # Search semua database dalam workspace
-            response = requests.post(
-                f"{self.base_url}/search",
-                headers=self.headers,
-                json={
-                    "filter": {"property": "object", "value": "database"},
-                    "page_size": 100
-                },
-                timeout=30
-            )
+            response = self.client.post("search", {
+                "filter": {"property": "object", "value": "database"},
+                "page_size": 100
+            })
             
             if response.status_code == 200:
                 data = response.json()
@@ -1543,15 +1578,18 @@ class UnifiedNotionService:
         if not self.notion_token or self.notion_token == 'your_notion_integration_token_here':
             return False
         
+        # Hasil dicache agar endpoint yang membaca dari mirror tidak menunggu round-trip ke Notion
+        checked_at, valid = self._token_check
+        if checked_at and time.time() - checked_at < self.token_check_ttl:
+            return valid
+        
         try:
-            response = requests.get(
-                "https://api.notion.com/v1/users/me",
-                headers=self.headers,
-                timeout=10
-            )
-            return response.status_code == 200
+            response = self.client.get("users/me", timeout=10)
+            valid = response.status_code == 200
         except:
-            return False
+            valid = False
+        self._token_check = (time.time(), valid)
+        return valid
     
     # =============================================================================
     # UTILITY METHODS
@@ -1566,9 +1604,20 @@ class UnifiedNotionService:
             'employee_databases_count': len(self.employee_databases),
             'employee_list': list(self.employee_databases.keys()),
             'base_url': self.base_url,
+            'notion_client': self.client.get_stats(),
+            'task_mirror': self._get_task_mirror_status(),
             'last_updated': datetime.now().isoformat()
         }
     
+    def _get_task_mirror_status(self) -> Dict[str, Any]:
+        """Ringkasan mirror task (ready, sync lag) untuk status service"""
+        try:
+            from domains.integration.services.notion_task_mirror_service import get_notion_task_mirror_service
+            status = get_notion_task_mirror_service().get_sync_status()
+            return {key: status[key] for key in ('enabled', 'ready', 'sync_lag_seconds', 'pages_per_run')}
+        except Exception as e:
+            return {'error': str(e)}
+    
     def cleanup(self):
         """Cleanup resources"""
         if hasattr(self, 'executor'):
@@ -1585,36 +1634,47 @@ class UnifiedNotionService:
                                          priority_filter: Optional[str] = None,
                                          date_from: Optional[str] = None,
                                          date_to: Optional[str] = None) -> List[Dict]:
-        """Async wrapper untuk get_all_employee_tasks_sync"""
+        """Versi async get_all_employee_tasks_sync: mirror lokal, atau query semua database secara concurrent"""
         try:
-            # Run sync method in thread pool untuk async compatibility
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.executor,
-                self.get_all_employee_tasks_sync,
-                employee_filter,
-                status_filter,
-                priority_filter,
-                date_from,
-                date_to
-            )
-            return result
+            loop = asyncio.get_running_loop()
+            try:
+                from domains.integration.services.notion_task_mirror_service import get_notion_task_mirror_service
+                # Baca mirror (SQLAlchemy, blocking) di thread pool agar event loop tidak tertahan
+                mirrored = await loop.run_in_executor(
+                    self.executor,
+                    partial(get_notion_task_mirror_service().get_tasks,
+                            employee_filter, status_filter, priority_filter, date_from, date_to)
+                )
+                if mirrored is not None:
+                    return mirrored
+            except Exception as e:
+                logger.warning(f"⚠️ Notion task mirror unavailable, querying Notion directly: {str(e)}")
+            
+            target_employees = self.employee_databases
+            if employee_filter:
+                target_employees = {k: v for k, v in target_employees.items() 
+                                  if employee_filter.lower() in k.lower()}
+            
+            # Satu scope koneksi keep-alive untuk semua database; laju tetap dibatasi token bucket client
+            async with self.client.async_session():
+                results = await asyncio.gather(*[
+                    self._fetch_employee_tasks_async(
+                        employee_name, database_id,
+                        status_filter, priority_filter, date_from, date_to
+                    )
+                    for employee_name, database_id in target_employees.items()
+                ])
+            
+            all_tasks = [task for tasks in results for task in tasks]
+            logger.info(f"✅ Berhasil mengambil {len(all_tasks)} task dari {len(target_employees)} karyawan")
+            return all_tasks
         except Exception as e:
             logger.error(f"❌ Error in get_all_employee_tasks_async: {str(e)}")
             return self._get_fallback_tasks()
     
     async def get_all_employees_async(self) -> List[Dict]:
-        """Async wrapper untuk get_all_employees_sync"""
-        try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.executor,
-                self.get_all_employees_sync
-            )
-            return result
-        except Exception as e:
-            logger.error(f"❌ Error in get_all_employees_async: {str(e)}")
-            return []
+        """Async wrapper untuk get_all_employees_sync (tanpa I/O, tidak perlu thread pool)"""
+        return self.get_all_employees_sync()
 
 
 # Global instance untuk singleton pattern
@@ -5,7 +5,9 @@ Knowledge AI Controller untuk KSM Main Backend
 Controller untuk menangani endpoint API knowledge AI
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+import json
 import logging
 import time
 import traceback
@@ -13,6 +15,7 @@ from datetime import datetime
 from sqlalchemy import text
 # unified_ai_service removed - using Agent AI directly
 from domains.integration.services.agent_ai_sync_service import agent_ai_sync
+from shared.middlewares.api_auth import jwt_required_custom
 
 # Initialize blueprint
 knowledge_ai_bp = Blueprint('knowledge_ai', __name__)
@@ -309,3 +312,52 @@ def chat_with_knowledge():
             'error': str(e),
             'timestamp': datetime.utcnow().isoformat()
         }), 500
+
+@knowledge_ai_bp.route('/api/knowledge-ai/chat/stream', methods=['POST'])
+@jwt_required_custom
+def chat_with_knowledge_stream():
+    """
+    Endpoint chat knowledge base AI dengan jawaban streaming (Server-Sent Events)
+    
+    Event `data: {...}` dengan field `type`: meta, delta (potongan jawaban), done
+    (jawaban lengkap, ttft_ms, tokens_used), atau error.
+    """
+    data = request.get_json() or {}
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({
+            'success': False,
+            'message': 'Pesan wajib diisi',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 400
+    
+    user_id = int(get_jwt_identity())
+    company_id = data.get('company_id')
+    
+    try:
+        from config.config import Config
+        from domains.knowledge.services.rag_enhanced_telegram_service import rag_enhanced_telegram
+        company_id = company_id or Config.DEFAULT_COMPANY_ID
+        context = rag_enhanced_telegram._build_rag_context(company_id, message)
+    except Exception as e:
+        logger.warning(f"⚠️ RAG context unavailable for streaming chat: {e}")
+        context = {}
+    
+    def generate_events():
+        for event in agent_ai_sync.stream_rag_enhanced_message(
+            user_id=user_id,
+            message=message,
+            context=context,
+            session_id=f'web_{user_id}',
+            company_id=company_id
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
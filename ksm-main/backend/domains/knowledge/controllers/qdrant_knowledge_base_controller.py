@@ -165,10 +165,10 @@ def upload_document():
                     import PyPDF2
                     import io
                     import uuid
-                    from domains.knowledge.services.openai_embedding_service import OpenAIEmbeddingService
+                    from domains.knowledge.services.openai_embedding_service import get_openai_embedding_service
                     
                     # Initialize services
-                    embedding_service = OpenAIEmbeddingService()
+                    embedding_service = get_openai_embedding_service()
                     
                     # Extract text from PDF
                     pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
@@ -555,7 +555,8 @@ def create_collection():
     {
         "collection_name": "PT. Kian Santang Muliatama_documents",
         "vector_size": 1536,
-        "distance": "Cosine"
+        "distance": "Cosine",
+        "profile": "balanced"   // opsional, default profil company dari config
     }
     
     Response:
@@ -581,12 +582,13 @@ def create_collection():
         
         vector_size = data.get('vector_size', 1536)
         distance = data.get('distance', 'Cosine')
+        profile = data.get('profile')
         
         # Get service
         qdrant_service = get_qdrant_service()
         
         # Create collection
-        result = qdrant_service.create_collection(collection_name, vector_size, distance)
+        result = qdrant_service.create_collection(collection_name, vector_size, distance, profile=profile)
         
         if result['success']:
             return jsonify(result), 201
@@ -608,16 +610,18 @@ def create_collection_by_name(collection_name):
     Request Body opsional:
     {
         "vector_size": 1536,
-        "distance": "Cosine"
+        "distance": "Cosine",
+        "profile": "balanced"
     }
     """
     try:
         data = request.get_json() or {}
         vector_size = data.get('vector_size')
         distance = data.get('distance', 'Cosine')
+        profile = data.get('profile')
 
         qdrant_service = get_qdrant_service()
-        result = qdrant_service.create_collection(collection_name, vector_size, distance)
+        result = qdrant_service.create_collection(collection_name, vector_size, distance, profile=profile)
         status_code = 200 if result.get('success') else 400
         return jsonify(result), status_code
     except Exception as e:
@@ -948,11 +952,10 @@ def search_similar():
         
         # Get services
         qdrant_service = get_qdrant_service()
-        from domains.knowledge.services.openai_embedding_service import OpenAIEmbeddingService
-        embedding_service = OpenAIEmbeddingService()
+        from domains.knowledge.services.query_embedding_service import get_query_embedding_service
         
         # Generate query embedding
-        query_embedding = embedding_service.embed_text(query)
+        query_embedding = get_query_embedding_service().embed_query(query)
         if not query_embedding:
             return jsonify({
                 'success': False,
@@ -1087,11 +1090,11 @@ def process_local_document(document_id):
                 import PyPDF2
                 import io
                 import uuid
-                from domains.knowledge.services.openai_embedding_service import OpenAIEmbeddingService
+                from domains.knowledge.services.openai_embedding_service import get_openai_embedding_service
                 from domains.knowledge.services.qdrant_service import get_qdrant_service
                 
                 # Initialize services
-                embedding_service = OpenAIEmbeddingService()
+                embedding_service = get_openai_embedding_service()
                 qdrant_service = get_qdrant_service()
                 
                 # Read file from storage
@@ -1547,7 +1550,8 @@ def rag_query():
         "query": "cara menggunakan sistem",
         "company_id": "PT. Kian Santang Muliatama",
         "top_k": 5,
-        "collection": "default"
+        "collection": "default",
+        "search_mode": "hybrid"  // opsional: "dense" | "hybrid" (default QDRANT_SEARCH_MODE)
     }
     
     Response:
@@ -1567,6 +1571,7 @@ def rag_query():
         company_id = data.get('company_id', 'PT. Kian Santang Muliatama')
         top_k = data.get('top_k', 5)
         collection = data.get('collection', 'default')
+        search_mode = data.get('search_mode')
         
         if not query:
             return jsonify({
@@ -1577,12 +1582,11 @@ def rag_query():
         # Use qdrant service for RAG query
         try:
             qdrant_service = get_qdrant_service()
-            from domains.knowledge.services.openai_embedding_service import OpenAIEmbeddingService
-            embedding_service = OpenAIEmbeddingService()
+            from domains.knowledge.services.query_embedding_service import get_query_embedding_service
             
             if qdrant_service:
                 # Generate query embedding
-                query_embedding = embedding_service.embed_text(query)
+                query_embedding = get_query_embedding_service().embed_query(query)
                 if not query_embedding:
                     return jsonify({
                         'success': False,
@@ -1595,7 +1599,8 @@ def rag_query():
                     query=query,
                     top_k=top_k,
                     collection=collection,
-                    query_embedding=query_embedding
+                    query_embedding=query_embedding,
+                    search_mode=search_mode
                 )
                 
                 if search_result.get('success'):
@@ -1640,7 +1645,8 @@ def rag_query_batch():
         "company_id": "PT. Kian Santang Muliatama",
         "top_k": 5,
         "collection": "default",
-        "filters": [ {"metadata.department": "support"}, null ]  // opsional per-query
+        "filters": [ {"metadata.department": "support"}, null ],  // opsional per-query
+        "search_mode": "hybrid"  // opsional: "dense" | "hybrid" (default QDRANT_SEARCH_MODE)
     }
 
     Response:
@@ -1661,6 +1667,7 @@ def rag_query_batch():
         top_k = int(data.get('top_k', 5))
         collection = data.get('collection', 'default')
         filters = data.get('filters')  # opsional: list sama panjang dengan queries
+        search_mode = data.get('search_mode')
 
         if not isinstance(queries, list) or len(queries) == 0:
             return jsonify({
@@ -1671,8 +1678,8 @@ def rag_query_batch():
         # Layanan
         qdrant_service = get_qdrant_service()
         try:
-            from domains.knowledge.services.openai_embedding_service import OpenAIEmbeddingService
-            embedding_service = OpenAIEmbeddingService()
+            from domains.knowledge.services.query_embedding_service import get_query_embedding_service
+            query_embedding_service = get_query_embedding_service()
         except Exception as e:
             logger.error(f"Embedding service unavailable: {e}")
             return jsonify({
@@ -1680,16 +1687,11 @@ def rag_query_batch():
                 'message': 'Embedding service unavailable'
             }), 503
 
-        # Generate embeddings per query
+        # Generate embeddings: query identik di-dedupe, miss di-embed dalam satu panggilan.
+        # Query kosong/gagal menghasilkan [] agar indeks tetap terjaga; hasilnya akan kosong
         import time
         start_time = time.time()
-        embeddings = []
-        for q in queries:
-            emb = embedding_service.embed_text(str(q) if q is not None else '')
-            if not emb:
-                embeddings.append([])  # tetap jaga indeks; hasil akan kosong
-            else:
-                embeddings.append(emb)
+        embeddings = query_embedding_service.embed_queries(queries)
 
         # Panggil batch search; untuk query tanpa embedding valid, filter-kan vektor kosong agar hasilnya []
         valid_indices = [i for i, v in enumerate(embeddings) if isinstance(v, list) and len(v) > 0]
@@ -1706,7 +1708,9 @@ def rag_query_batch():
                 embeddings=valid_embeddings,
                 top_k=top_k,
                 collection=collection,
-                filters=valid_filters
+                filters=valid_filters,
+                queries=[str(queries[i]) for i in valid_indices],
+                search_mode=search_mode
             ) or []
 
             # Re-map ke posisi semula
@@ -7,7 +7,8 @@ Memotong teks menjadi potongan yang dioptimalkan untuk Bahasa Indonesia dan sema
 Menggunakan strategi chunking yang lebih cerdas untuk hasil Gemini Embeddings yang lebih baik.
 """
 
-from typing import List, Dict, Any, Optional
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 import hashlib
 import re
 import logging
@@ -20,6 +21,18 @@ DEFAULT_OVERLAP_CHARS = 300  # Naik dari 200 ke 300 untuk overlap yang lebih bai
 MIN_CHUNK_CHARS = 20  # Minimal 20 karakter untuk chunk yang meaningful
 MAX_CHUNK_CHARS = 2000  # Maksimal 2000 karakter
 
+# Rata-rata karakter per token (lihat approximate_token_count)
+CHARS_PER_TOKEN = 3
+
+# Budget token untuk streaming chunker (setara DEFAULT_CHUNK_CHARS/DEFAULT_OVERLAP_CHARS)
+DEFAULT_CHUNK_TOKENS = DEFAULT_CHUNK_CHARS // CHARS_PER_TOKEN
+DEFAULT_OVERLAP_TOKENS = DEFAULT_OVERLAP_CHARS // CHARS_PER_TOKEN
+
+# Potongan kalimat/baris untuk streaming chunker: teks sampai tanda akhir kalimat + spasi,
+# atau sampai baris baru
+PIECE_PATTERN = re.compile(r'[^.!?\n]*(?:[.!?]+[ \t]*|\n+|$)')
+WORD_PATTERN = re.compile(r'\S+\s*|\s+')
+
 # Stopwords Bahasa Indonesia untuk keyword extraction
 INDONESIAN_STOPWORDS = [
     'yang', 'dan', 'di', 'ke', 'dari', 'dengan', 'untuk', 'pada', 'adalah', 'atau',
@@ -28,6 +41,12 @@ INDONESIAN_STOPWORDS = [
     'hingga', 'selama', 'ketika', 'sementara', 'meskipun', 'walaupun', 'agar', 'supaya',
     'maka', 'jadi', 'sebab', 'karena', 'sehingga', 'maka', 'jadi', 'sebab', 'karena'
 ]
+STOPWORD_SET = frozenset(INDONESIAN_STOPWORDS)
+
+# Token leksikal untuk keyword dan sparse (BM25) vector: kata, angka, dan kode gabungan
+# seperti "sop-012", "kbli 46100", "01.234.567.8-901.000" tetap utuh
+LEXICAL_TOKEN_PATTERN = re.compile(r'[0-9a-z]+(?:[-/.][0-9a-z]+)*')
+LEXICAL_SPLIT_PATTERN = re.compile(r'[-/.]')
 
 # Pola untuk istilah legal dan bisnis yang penting
 LEGAL_PATTERNS = [
@@ -60,7 +79,7 @@ ADDRESS_PATTERNS = [
 def approximate_token_count(text: str) -> int:
     """Estimasi token count yang lebih akurat untuk Bahasa Indonesia"""
     # Bahasa Indonesia cenderung memiliki token yang lebih pendek
-    return max(1, len(text) // 3)  # Ubah dari 4 ke 3 untuk estimasi yang lebih akurat
+    return max(1, len(text) // CHARS_PER_TOKEN)  # Ubah dari 4 ke 3 untuk estimasi yang lebih akurat
 
 
 def preprocess_text(text: str) -> str:
@@ -107,6 +126,27 @@ def extract_entities(text: str) -> List[str]:
         return []
 
 
+def tokenize_lexical(text: str) -> List[str]:
+    """Tokenisasi leksikal (huruf kecil, tanpa stopword) untuk pencocokan kata/kode persis.
+
+    Kode gabungan menghasilkan token utuh sekaligus bagian-bagiannya ("sop-012" -> "sop-012",
+    "sop", "012") sehingga query "SOP 012" tetap cocok dengan dokumen yang menulis "SOP-012".
+    """
+    tokens = []
+    for token in LEXICAL_TOKEN_PATTERN.findall((text or '').lower()):
+        if LEXICAL_SPLIT_PATTERN.search(token):
+            tokens.append(token)
+            parts = LEXICAL_SPLIT_PATTERN.split(token)
+        else:
+            parts = (token,)
+        for part in parts:
+            # Huruf tunggal tidak informatif; angka tunggal tetap dipakai (mis. "pasal 5")
+            if part in STOPWORD_SET or (len(part) == 1 and not part.isdigit()):
+                continue
+            tokens.append(part)
+    return tokens
+
+
 def extract_keywords(text: str) -> List[str]:
     """Extract keywords dari text"""
     try:
@@ -114,7 +154,7 @@ def extract_keywords(text: str) -> List[str]:
         words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
         
         # Filter stopwords
-        keywords = [word for word in words if word not in INDONESIAN_STOPWORDS]
+        keywords = [word for word in words if word not in STOPWORD_SET]
         
         # Count frequency
         word_freq = {}
@@ -199,6 +239,114 @@ def find_best_split_position(text: str, max_chars: int) -> int:
         return max_chars
 
 
+def _iter_pieces(text: str, max_chars: int) -> Iterator[str]:
+    """Potong text menjadi potongan kalimat/baris (satu pass maju).
+
+    Potongan yang lebih panjang dari max_chars dipecah lagi di spasi, atau dipotong paksa
+    jika tidak ada spasi, sehingga setiap potongan muat di satu chunk.
+    """
+    for match in PIECE_PATTERN.finditer(text):
+        piece = match.group(0)
+        if not piece:
+            continue
+        if len(piece) <= max_chars:
+            yield piece
+            continue
+        
+        current = []
+        current_len = 0
+        for word in WORD_PATTERN.findall(piece):
+            while len(word) > max_chars:
+                if current:
+                    yield ''.join(current)
+                    current, current_len = [], 0
+                yield word[:max_chars]
+                word = word[max_chars:]
+            if current_len + len(word) > max_chars and current:
+                yield ''.join(current)
+                current, current_len = [], 0
+            current.append(word)
+            current_len += len(word)
+        if current:
+            yield ''.join(current)
+
+
+def iter_chunks(pages: Iterable[Dict[str, Any]],
+                max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                enrich: bool = False) -> Iterator[Dict[str, Any]]:
+    """Streaming chunker: satu pass maju atas text halaman dengan budget token.
+    
+    Args:
+        pages: Iterable halaman dengan text (boleh generator); nomor halaman mengikuti urutan
+        max_tokens: Budget token per chunk (approximate_token_count)
+        overlap_tokens: Budget token overlap antar chunk, dipotong di batas kalimat
+        enrich: Jika True, tambahkan entities/keywords/importance via enrich_chunk
+    
+    Yields:
+        Chunk dict {text, page_from, page_to, chunk_index, tokens, text_hash}
+    """
+    # Budget dihitung dalam karakter agar approximate_token_count(chunk) <= max_tokens
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens - 1))
+    max_chars = max_tokens * CHARS_PER_TOKEN + CHARS_PER_TOKEN - 1
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    
+    # Window berisi (piece, page); setiap piece masuk dan keluar window tepat sekali
+    window = deque()
+    window_chars = 0
+    chunk_index = 0
+    
+    def emit():
+        text = ''.join(piece for piece, _ in window).strip()
+        if not text:
+            return None
+        chunk = {
+            'text': text,
+            'page_from': window[0][1],
+            'page_to': window[-1][1],
+            'chunk_index': chunk_index,
+            'tokens': approximate_token_count(text),
+            'text_hash': hashlib.sha256(text.encode('utf-8')).hexdigest()
+        }
+        return enrich_chunk(chunk) if enrich else chunk
+    
+    for page_number, page in enumerate(pages, start=1):
+        text = page.get('text') or ''
+        if not text.strip():
+            continue
+        
+        for piece in _iter_pieces(text + '\n', max_chars):
+            if window and window_chars + len(piece) > max_chars:
+                chunk = emit()
+                if chunk:
+                    yield chunk
+                    chunk_index += 1
+                # Sisakan ekor window sebagai overlap, lalu pastikan piece baru muat
+                while window and (window_chars > overlap_chars or window_chars + len(piece) > max_chars):
+                    window_chars -= len(window.popleft()[0])
+            window.append((piece, page_number))
+            window_chars += len(piece)
+    
+    if window:
+        chunk = emit()
+        if chunk:
+            yield chunk
+
+
+def enrich_chunk(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Tambahkan metadata semantic search (entities, keywords, importance, dll.) ke chunk.
+
+    Dipisah dari chunking karena regex-nya mahal; panggil hanya untuk chunk yang membutuhkannya.
+    """
+    enriched = create_enriched_chunk(
+        chunk['text'], chunk['page_from'], chunk['page_to'],
+        chunk['chunk_index'], chunk['page_to']
+    )
+    chunk.update(enriched)
+    return chunk
+
+
 def chunk_text(pages: List[Dict[str, Any]],
                chunk_chars: int = DEFAULT_CHUNK_CHARS,
                overlap_chars: int = DEFAULT_OVERLAP_CHARS) -> List[Dict[str, Any]]:
@@ -212,73 +360,18 @@ def chunk_text(pages: List[Dict[str, Any]],
     Returns:
         List chunk dict dengan metadata lengkap untuk semantic search
     """
-    chunks: List[Dict[str, Any]] = []
-
-    # Gabungkan semua halaman dengan penanda halaman
-    segments: List[Dict[str, Any]] = []
-    for idx, p in enumerate(pages, start=1):
-        t = p.get('text', '')
-        if not t:
-            continue
-        
-        # Preprocess text untuk Bahasa Indonesia
-        processed_text = preprocess_text(t)
-        segments.append({'page': idx, 'text': processed_text})
-
-    if not segments:
-        return chunks
-
-    # Enhanced chunking dengan strategi yang lebih cerdas
-    buffer_text = ''
-    buffer_start_page = segments[0]['page']
-    buffer_end_page = segments[0]['page']
-    chunk_index = 0
-
-    for seg in segments:
-        page = seg['page']
-        text = seg['text']
-        start = 0
-        
-        while start < len(text):
-            remaining = text[start:]
-            space_left = max(0, chunk_chars - len(buffer_text))
-            
-            # Ambil teks yang tersisa
-            to_take = remaining[:space_left]
-            buffer_text += to_take
-            buffer_end_page = page
-            start += len(to_take)
-
-            # Jika buffer sudah cukup besar, buat chunk
-            if len(buffer_text) >= chunk_chars:
-                # Cari posisi terbaik untuk memotong
-                best_split_pos = find_best_split_position(buffer_text, chunk_chars)
-                
-                # Ambil chunk dengan posisi terbaik
-                chunk_text = buffer_text[:best_split_pos]
-                
-                # Validasi chunk minimal
-                if len(chunk_text.strip()) >= MIN_CHUNK_CHARS:
-                    # Enrich chunk dengan metadata
-                    enriched_chunk = create_enriched_chunk(
-                        chunk_text, buffer_start_page, buffer_end_page, 
-                        chunk_index, page
-                    )
-                    chunks.append(enriched_chunk)
-                    chunk_index += 1
-
-                # Overlap dengan strategi yang lebih baik
-                overlap_text = get_smart_overlap(buffer_text, overlap_chars)
-                buffer_text = overlap_text
-                buffer_start_page = buffer_end_page
-
-    # Sisa buffer
-    if buffer_text.strip() and len(buffer_text.strip()) >= MIN_CHUNK_CHARS:
-        enriched_chunk = create_enriched_chunk(
-            buffer_text, buffer_start_page, buffer_end_page, 
-            chunk_index, buffer_end_page
+    # Preprocess text untuk Bahasa Indonesia; nomor halaman tetap mengikuti posisi asli
+    processed_pages = ({'text': preprocess_text(p.get('text', '')) if p.get('text') else ''} for p in pages)
+    
+    chunks = [
+        chunk for chunk in iter_chunks(
+            processed_pages,
+            max_tokens=approximate_token_count('x' * chunk_chars),
+            overlap_tokens=approximate_token_count('x' * overlap_chars) if overlap_chars > 0 else 0,
+            enrich=True
         )
-        chunks.append(enriched_chunk)
+        if len(chunk['text']) >= MIN_CHUNK_CHARS
+    ]
 
     # Sort chunks berdasarkan importance score
     chunks.sort(key=lambda x: x.get('importance_score', 0), reverse=True)
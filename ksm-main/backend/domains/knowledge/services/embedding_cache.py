@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Embedding Cache untuk KSM Main Backend
+Cache dua tingkat untuk vektor embedding:
+- L1: LRU in-process (OrderedDict, eviction O(1))
+- L2: store persisten yang dibagi antar worker gunicorn (Redis atau SQLite on-disk)
+
+Key: (model_name, sha256(text)); vektor disimpan sebagai packed float32 bytes.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Pack vektor ke bytes float32"""
+    return array('f', vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    """Unpack bytes float32 ke list float"""
+    values = array('f')
+    values.frombytes(data)
+    return values.tolist()
+
+
+class RedisEmbeddingStore:
+    """Store persisten berbasis Redis (ukuran dibatasi oleh TTL + maxmemory policy server)"""
+
+    backend_name = 'redis'
+
+    def __init__(self, url: str, ttl: int, password: Optional[str] = None):
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url, password=password, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+        self.bytes_written = 0
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return self.client.mget(keys)
+
+    def set_many(self, items: List[Tuple[str, bytes]]):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items:
+            pipe.setex(key, self.ttl, value)
+            self.bytes_written += len(value)
+        pipe.execute()
+
+    def clear(self, prefix: str):
+        for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+            self.client.delete(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.backend_name,
+            'ttl': self.ttl,
+            'bytes_written': self.bytes_written
+        }
+
+
+class DiskEmbeddingStore:
+    """Store persisten SQLite (WAL) yang aman dipakai bersama beberapa proses di satu host"""
+
+    backend_name = 'disk'
+
+    # Eviction dicek setiap N insert agar biaya COUNT tidak dibayar di setiap set
+    EVICTION_CHECK_INTERVAL = 256
+
+    def __init__(self, path: str, ttl: int, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._inserts_since_check = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Koneksi per proses (dibuka ulang setelah fork)"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_created ON embedding_cache(created_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        min_created = time.time() - self.ttl
+        with self._lock:
+            conn = self._connection()
+            found: Dict[str, bytes] = {}
+            # SQLite membatasi jumlah parameter per statement
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                placeholders = ','.join('?' * len(part))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*part, min_created)
+                ).fetchall()
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def set_many(self, items: List[Tuple[str, bytes]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, vector, created_at) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items]
+            )
+            conn.commit()
+            self._inserts_since_check += len(items)
+            if self._inserts_since_check >= self.EVICTION_CHECK_INTERVAL:
+                self._inserts_since_check = 0
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Hapus entry kedaluwarsa lalu entry tertua di atas max_entries"""
+        conn.execute("DELETE FROM embedding_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        count = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM embedding_cache WHERE key IN "
+                "(SELECT key FROM embedding_cache ORDER BY created_at ASC LIMIT ?)",
+                (excess,)
+            )
+        conn.commit()
+
+    def clear(self, prefix: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM embedding_cache WHERE key LIKE ?", (f"{prefix}%",))
+            conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache"
+            ).fetchone()
+        return {
+            'backend': self.backend_name,
+            'path': self.path,
+            'ttl': self.ttl,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'bytes': size
+        }
+
+
+class EmbeddingCache:
+    """Cache embedding dua tingkat: LRU in-process di depan store persisten bersama"""
+
+    KEY_PREFIX = 'emb:'
+
+    def __init__(self):
+        self.enabled = os.getenv('ENABLE_EMBEDDINGS_CACHE', 'true').lower() == 'true'
+        self.max_entries = int(os.getenv('EMBEDDING_CACHE_MAX_SIZE', '1000'))
+        self.ttl = int(os.getenv('EMBEDDING_CACHE_TTL', '3600'))
+
+        # L1: key -> (packed float32 bytes, expires_at)
+        self._memory: 'OrderedDict[str, Tuple[bytes, float]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'persistent_errors': 0
+        }
+
+        self.store = self._init_persistent_store() if self.enabled else None
+        logger.info(f"[INIT] Embedding cache initialized (memory max={self.max_entries}, "
+                    f"persistent={self.store.backend_name if self.store else 'none'})")
+
+    def _init_persistent_store(self):
+        """Pilih backend L2: EMBEDDING_CACHE_BACKEND = redis | disk | memory (default: redis jika aktif, selain itu disk)"""
+        persistent_ttl = int(os.getenv('EMBEDDING_CACHE_PERSISTENT_TTL', str(30 * 24 * 3600)))
+        backend = os.getenv('EMBEDDING_CACHE_BACKEND', '').strip().lower()
+        if not backend:
+            backend = 'redis' if os.getenv('REDIS_ENABLED', 'false').lower() == 'true' else 'disk'
+
+        if backend == 'redis':
+            if REDIS_AVAILABLE:
+                try:
+                    return RedisEmbeddingStore(
+                        url=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                        password=os.getenv('REDIS_PASSWORD') or None,
+                        ttl=persistent_ttl
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis embedding cache not available, falling back to disk: {e}")
+            else:
+                logger.warning("⚠️ redis library not installed, falling back to disk embedding cache")
+            backend = 'disk'
+
+        if backend == 'disk':
+            try:
+                return DiskEmbeddingStore(
+                    path=os.getenv('EMBEDDING_CACHE_PATH', os.path.join('cache', 'embeddings.sqlite3')),
+                    ttl=persistent_ttl,
+                    max_entries=int(os.getenv('EMBEDDING_CACHE_DISK_MAX_ENTRIES', '200000'))
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Disk embedding cache not available, using memory only: {e}")
+        return None
+
+    def make_key(self, model_name: str, text: str) -> str:
+        """Key cache untuk (model_name, sha256(text))"""
+        return f"{self.KEY_PREFIX}{model_name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        data, expires_at = entry
+        if expires_at < time.time():
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return data
+
+    def _memory_put(self, key: str, data: bytes):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[0])
+        self._memory[key] = (data, time.time() + self.ttl)
+        self._memory_bytes += len(data)
+        while len(self._memory) > self.max_entries:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def _memory_pop(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        """Ambil satu embedding dari cache"""
+        return self.get_many(model_name, [text]).get(0)
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[int, List[float]]:
+        """Ambil embedding untuk banyak text sekaligus. Return: {index: vector} untuk yang ditemukan"""
+        if not self.enabled or not texts:
+            return {}
+
+        keys = [self.make_key(model_name, text) for text in texts]
+        found: Dict[int, List[float]] = {}
+        missing: List[int] = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                data = self._memory_get(key)
+                if data is not None:
+                    found[i] = unpack_vector(data)
+                    self.stats['memory_hits'] += 1
+                else:
+                    missing.append(i)
+
+        if missing and self.store is not None:
+            try:
+                values = self.store.get_many([keys[i] for i in missing])
+            except Exception as e:
+                logger.warning(f"⚠️ Persistent embedding cache read failed: {e}")
+                self.stats['persistent_errors'] += 1
+                values = [None] * len(missing)
+            with self._lock:
+                still_missing = []
+                for i, data in zip(missing, values):
+                    if data:
+                        found[i] = unpack_vector(data)
+                        self._memory_put(keys[i], data)
+                        self.stats['persistent_hits'] += 1
+                    else:
+                        still_missing.append(i)
+                missing = still_missing
+
+        with self._lock:
+            self.stats['misses'] += len(missing)
+        return found
+
+    def set(self, model_name: str, text: str, vector: List[float]):
+        """Simpan satu embedding"""
+        self.set_many(model_name, [text], [vector])
+
+    def set_many(self, model_name: str, texts: List[str], vectors: List[List[float]]):
+        """Simpan banyak embedding; entry yang sudah ada di L1 tidak ditulis ulang ke L2"""
+        if not self.enabled or not texts:
+            return
+
+        pending: List[Tuple[str, bytes]] = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if not vector:
+                    continue
+                key = self.make_key(model_name, text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    continue
+                data = pack_vector(vector)
+                self._memory_put(key, data)
+                pending.append((key, data))
+                self.stats['sets'] += 1
+
+        if pending and self.store is not None:
+            try:
+                self.store.set_many(pending)
+            except Exception as e:
+                logger.warning(f"⚠️ Persistent embedding cache write failed: {e}")
+                self.stats['persistent_errors'] += 1
+
+    def clear(self):
+        """Kosongkan kedua tingkat cache"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.store is not None:
+            try:
+                self.store.clear(self.KEY_PREFIX)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to clear persistent embedding cache: {e}")
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistik hit-rate dan ukuran byte per tingkat cache"""
+        with self._lock:
+            stats = dict(self.stats)
+            memory_entries = len(self._memory)
+            memory_bytes = self._memory_bytes
+        hits = stats['memory_hits'] + stats['persistent_hits']
+        lookups = hits + stats['misses']
+
+        persistent = None
+        if self.store is not None:
+            try:
+                persistent = self.store.get_stats()
+            except Exception as e:
+                persistent = {'backend': self.store.backend_name, 'error': str(e)}
+
+        return {
+            **stats,
+            'enabled': self.enabled,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0,
+            'memory_hit_rate': round(stats['memory_hits'] / lookups, 3) if lookups else 0,
+            'memory_entries': memory_entries,
+            'memory_max_entries': self.max_entries,
+            'memory_bytes': memory_bytes,
+            'persistent': persistent
+        }
+
+
+# Global cache instance (dibagi oleh UnifiedEmbeddingService dan OpenAIEmbeddingService)
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get global embedding cache instance"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
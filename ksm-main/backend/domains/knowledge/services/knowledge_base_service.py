@@ -5,9 +5,8 @@ Knowledge Base Service untuk KSM Main Backend
 """
 
 import os
-import io
 import base64
-import PyPDF2
+import hashlib
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from config.database import db
@@ -57,33 +56,16 @@ class KnowledgeBaseService:
             
             extracted_text = ""
             
-            # Method 1: Try pdfplumber (most reliable for complex PDFs)
+            # Method 1: pdfplumber per halaman lewat page extractor bersama
+            # (paralel per range halaman, text per halaman di-cache dengan key sha256 konten)
             try:
-                import pdfplumber
-                with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                    text = ""
-                    total_pages = len(pdf.pages)
-                    logger.info(f"pdfplumber: Processing {total_pages} pages")
-                    
-                    for page_num, page in enumerate(pdf.pages, 1):
-                        try:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += f"\n--- HALAMAN {page_num} ---\n"
-                                text += page_text + "\n"
-                                logger.info(f"pdfplumber: Page {page_num} extracted {len(page_text)} characters")
-                            else:
-                                logger.warning(f"pdfplumber: Page {page_num} extracted empty text")
-                        except Exception as e:
-                            logger.error(f"pdfplumber: Error extracting page {page_num}: {e}")
+                extracted_text = KnowledgeBaseService._extract_pdf_text_paged(pdf_content, 'pdfplumber')
+                if extracted_text:
+                    logger.info(f"pdfplumber: Successfully extracted {len(extracted_text)} total characters")
+                    return extracted_text
+                else:
+                    logger.warning("pdfplumber: Extracted empty text from all pages")
                     
-                    if text.strip():
-                        extracted_text = text.strip()
-                        logger.info(f"pdfplumber: Successfully extracted {len(extracted_text)} total characters from {total_pages} pages")
-                        return extracted_text
-                    else:
-                        logger.warning("pdfplumber: Extracted empty text from all pages")
-                        
             except ImportError:
                 logger.warning("pdfplumber not installed, trying next method")
             except Exception as e:
@@ -126,25 +108,8 @@ class KnowledgeBaseService:
             
             # Method 3: Try PyPDF2 (fallback)
             try:
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-                text = ""
-                total_pages = len(pdf_reader.pages)
-                logger.info(f"PyPDF2: Processing {total_pages} pages")
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += f"\n--- HALAMAN {page_num} ---\n"
-                            text += page_text + "\n"
-                            logger.info(f"PyPDF2: Page {page_num} extracted {len(page_text)} characters")
-                        else:
-                            logger.warning(f"PyPDF2: Page {page_num} extracted empty text")
-                    except Exception as e:
-                        logger.error(f"PyPDF2: Error extracting page {page_num}: {e}")
-                
-                extracted_text = text.strip()
-                logger.info(f"PyPDF2: Successfully extracted {len(extracted_text)} total characters from {total_pages} pages")
+                extracted_text = KnowledgeBaseService._extract_pdf_text_paged(pdf_content, 'pypdf2')
+                logger.info(f"PyPDF2: Successfully extracted {len(extracted_text)} total characters")
                 
                 if extracted_text:
                     return extracted_text
@@ -162,6 +127,22 @@ class KnowledgeBaseService:
             logger.error(f"Error extracting text from base64: {e}")
             return f"Error extracting text: {str(e)}"
     
+    @staticmethod
+    def _extract_pdf_text_paged(pdf_content, extractor):
+        """Ekstrak text PDF per halaman dengan format '--- HALAMAN n ---' via PdfPageExtractor.
+
+        Konten yang sudah pernah diekstrak dibaca dari cache halaman tanpa mem-parse PDF;
+        selain itu extractor menulis konten ke file sementara agar worker process bisa membukanya.
+        """
+        from domains.knowledge.services.pdf_page_extractor import get_pdf_page_extractor
+        
+        sha256 = hashlib.sha256(pdf_content).hexdigest()
+        parts = []
+        for page in get_pdf_page_extractor().iter_pages(None, sha256, extractor=extractor, content=pdf_content):
+            if page['text']:
+                parts.append(f"\n--- HALAMAN {page['page_number']} ---\n{page['text']}\n")
+        return ''.join(parts).strip()
+    
     @staticmethod
     def create_category(name, description=None, parent_id=None):
         """Membuat kategori baru"""
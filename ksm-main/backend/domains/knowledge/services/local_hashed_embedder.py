@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local Hashed Embedder untuk KSM Main Backend
+Embedding hashed bag-of-words berbasis NumPy (tanpa API eksternal).
+
+- Setiap token unik di-hash sekali (blake2b 64-bit, stabil antar proses) lalu di-memo
+- Satu batch text diakumulasi ke satu matriks float32 via np.bincount
+- Baris di-L2-normalize sehingga cosine similarity bermakna
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from typing import List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[\w]+", flags=re.UNICODE)
+
+
+class LocalHashedEmbedder:
+    """Hashed bag-of-words embedder yang di-vectorize dengan NumPy"""
+
+    # Batas memo token -> (index, sign); dikosongkan penuh saat terlampaui
+    MAX_TOKEN_MEMO = 200000
+
+    def __init__(self, embedding_dim: int):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for LocalHashedEmbedder")
+        self.embedding_dim = int(embedding_dim)
+        self.model_name = f"local-hashed-bow-{self.embedding_dim}"
+        self._token_memo = {}
+        self._memo_lock = threading.Lock()
+
+    def tokenize(self, text: str) -> List[str]:
+        """Tokenisasi sederhana: huruf kecil, ambil kata alfanumerik."""
+        return TOKEN_PATTERN.findall((text or '').lower())
+
+    def _hash_token(self, token: str) -> Tuple[int, float]:
+        """Peta token -> (index [0, dim), tanda +1/-1) dengan satu hash 64-bit"""
+        h = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+        return h % self.embedding_dim, (1.0 if (h >> 63) == 0 else -1.0)
+
+    def _lookup_tokens(self, tokens: List[str]) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Index dan sign untuk setiap token; hanya token baru yang di-hash"""
+        memo = self._token_memo
+        resolved = {tok: memo.get(tok) for tok in set(tokens)}
+        missing = {tok: self._hash_token(tok) for tok, value in resolved.items() if value is None}
+        if missing:
+            resolved.update(missing)
+            with self._memo_lock:
+                if len(memo) + len(missing) > self.MAX_TOKEN_MEMO:
+                    memo.clear()
+                memo.update(missing)
+
+        pairs = [resolved[tok] for tok in tokens]
+        indices = np.fromiter((p[0] for p in pairs), dtype=np.int64, count=len(pairs))
+        signs = np.fromiter((p[1] for p in pairs), dtype=np.float32, count=len(pairs))
+        return indices, signs
+
+    def embed_matrix(self, texts: List[str]) -> 'np.ndarray':
+        """Embed banyak text sekaligus. Return: matriks float32 (len(texts), embedding_dim), baris L2-normalized"""
+        n = len(texts)
+        if n == 0:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+
+        token_lists = [self.tokenize(text) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=n)
+        all_tokens = [tok for tokens in token_lists for tok in tokens]
+        if not all_tokens:
+            return np.zeros((n, self.embedding_dim), dtype=np.float32)
+
+        indices, signs = self._lookup_tokens(all_tokens)
+        rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        flat = rows * self.embedding_dim + indices
+        matrix = np.bincount(flat, weights=signs, minlength=n * self.embedding_dim)
+        matrix = matrix.reshape(n, self.embedding_dim).astype(np.float32, copy=False)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def embed_text(self, text: str) -> 'np.ndarray':
+        """Embed satu text. Return: vektor float32 (embedding_dim,)"""
+        return self.embed_matrix([text])[0]
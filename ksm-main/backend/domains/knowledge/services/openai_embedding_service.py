@@ -10,7 +10,8 @@ import time
 import logging
 import threading
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+
+from .embedding_cache import get_embedding_cache
 
 # Try to import OpenAI
 try:
@@ -29,10 +30,10 @@ class OpenAIEmbeddingService:
         # Configuration
         self._init_configuration()
         
-        # Cache management
-        self.embedding_cache = {}
-        self.cache_max_size = int(os.getenv('EMBEDDING_CACHE_MAX_SIZE', '1000'))
-        self.cache_ttl = int(os.getenv('EMBEDDING_CACHE_TTL', '3600'))
+        # Cache management (LRU in-process + store persisten bersama antar worker)
+        self.embedding_cache = get_embedding_cache()
+        self.cache_max_size = self.embedding_cache.max_entries
+        self.cache_ttl = self.embedding_cache.ttl
         
         # Rate limiting
         self.rate_limit_lock = threading.Lock()
@@ -92,48 +93,22 @@ class OpenAIEmbeddingService:
     
     def _get_cache_key(self, text: str) -> str:
         """Generate cache key for text"""
-        import hashlib
-        return hashlib.md5(f"{text}_{self.model_name}".encode()).hexdigest()
+        return self.embedding_cache.make_key(self.model_name, text)
     
     def _get_from_cache(self, text: str) -> Optional[List[float]]:
         """Get embedding from cache if available and not expired"""
-        cache_key = self._get_cache_key(text)
-        
-        if cache_key in self.embedding_cache:
-            cached_data = self.embedding_cache[cache_key]
-            cache_time = cached_data['timestamp']
-            
-            # Check if cache is still valid
-            if datetime.now() - cache_time < timedelta(seconds=self.cache_ttl):
-                self.stats['cache_hits'] += 1
-                logger.debug(f"📋 Cache hit for text: {text[:50]}...")
-                return cached_data['embedding']
-            else:
-                # Remove expired cache entry
-                del self.embedding_cache[cache_key]
+        cached = self.embedding_cache.get(self.model_name, text)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            logger.debug(f"📋 Cache hit for text: {text[:50]}...")
+            return cached
         
         self.stats['cache_misses'] += 1
         return None
     
     def _save_to_cache(self, text: str, embedding: List[float]):
         """Save embedding to cache"""
-        cache_key = self._get_cache_key(text)
-        
-        # Clean cache if it's too large
-        if len(self.embedding_cache) >= self.cache_max_size:
-            # Remove oldest entries
-            oldest_keys = sorted(
-                self.embedding_cache.keys(),
-                key=lambda k: self.embedding_cache[k]['timestamp']
-            )[:len(self.embedding_cache) // 2]
-            
-            for key in oldest_keys:
-                del self.embedding_cache[key]
-        
-        self.embedding_cache[cache_key] = {
-            'embedding': embedding,
-            'timestamp': datetime.now()
-        }
+        self.embedding_cache.set(self.model_name, text, embedding)
     
     def _rate_limit(self):
         """Implement rate limiting"""
@@ -222,11 +197,11 @@ class OpenAIEmbeddingService:
         texts_to_process = []
         result_indices = []
         
+        cached_embeddings = self.embedding_cache.get_many(self.model_name, valid_texts)
+        self.stats['cache_hits'] += len(cached_embeddings)
+        self.stats['cache_misses'] += len(valid_texts) - len(cached_embeddings)
         for i, text in enumerate(valid_texts):
-            cached_embedding = self._get_from_cache(text)
-            if cached_embedding:
-                cached_embeddings[i] = cached_embedding
-            else:
+            if i not in cached_embeddings:
                 texts_to_process.append(text)
                 result_indices.append(i)
         
@@ -243,9 +218,7 @@ class OpenAIEmbeddingService:
                     batch_embeddings.extend(batch_result)
                 
                 # Save to cache
-                for i, embedding in enumerate(batch_embeddings):
-                    text = texts_to_process[i]
-                    self._save_to_cache(text, embedding)
+                self.embedding_cache.set_many(self.model_name, texts_to_process, batch_embeddings)
                 
                 # Update stats
                 embedding_time = time.time() - start_time
@@ -278,6 +251,7 @@ class OpenAIEmbeddingService:
             **self.stats,
             'cache_size': len(self.embedding_cache),
             'cache_max_size': self.cache_max_size,
+            'cache': self.embedding_cache.get_stats(),
             'model_name': self.model_name,
             'embedding_dim': self.embedding_dim,
             'client_available': self.client is not None
@@ -299,11 +273,14 @@ class OpenAIEmbeddingService:
 
 # Global instance
 _openai_embedding_service = None
+_openai_embedding_service_lock = threading.Lock()
 
 
 def get_openai_embedding_service() -> OpenAIEmbeddingService:
     """Get global OpenAI embedding service instance"""
     global _openai_embedding_service
     if _openai_embedding_service is None:
-        _openai_embedding_service = OpenAIEmbeddingService()
+        with _openai_embedding_service_lock:
+            if _openai_embedding_service is None:
+                _openai_embedding_service = OpenAIEmbeddingService()
     return _openai_embedding_service
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Page Extractor untuk KSM Main Backend
+Ekstraksi text PDF per halaman secara streaming dan paralel dengan cache per halaman.
+
+- Range halaman dibagi ke process pool; setiap worker membuka file sendiri
+- Halaman di-yield berurutan begitu range-nya selesai, sehingga chunker bisa mulai lebih awal
+- Text setiap halaman di-cache di disk dengan key (extractor, sha256, page_number);
+  file yang sudah pernah diekstrak tidak di-parse ulang
+- Cache dibatasi PDF_PAGE_CACHE_MAX_BYTES / PDF_PAGE_CACHE_MAX_AGE_DAYS; dokumen yang paling
+  lama tidak dipakai dihapus lebih dulu
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAGE_EXTRACTORS = ('pypdf2', 'pdfplumber')
+
+
+def _extract_page_range(file_path: str, start: int, end: int, extractor: str) -> List[Tuple[int, str, Optional[str]]]:
+    """Ekstrak halaman [start, end) (0-based). Dijalankan di worker process.
+
+    Return: list (page_number, text, error) dengan page_number 1-based.
+    """
+    results = []
+    if extractor == 'pdfplumber':
+        import pdfplumber
+        with pdfplumber.open(file_path) as pdf:
+            for page_index in range(start, end):
+                try:
+                    results.append((page_index + 1, pdf.pages[page_index].extract_text() or '', None))
+                except Exception as e:
+                    results.append((page_index + 1, '', str(e)))
+    else:
+        import PyPDF2
+        with open(file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            for page_index in range(start, end):
+                try:
+                    results.append((page_index + 1, reader.pages[page_index].extract_text() or '', None))
+                except Exception as e:
+                    results.append((page_index + 1, '', str(e)))
+    return results
+
+
+def _count_pages(file_path: str, extractor: str) -> int:
+    """Jumlah halaman PDF tanpa mengekstrak text"""
+    if extractor == 'pdfplumber':
+        import pdfplumber
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def sha256_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 file secara streaming (tanpa membaca seluruh file ke memory)"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def build_page(text: str, page_number: int, from_cache: bool = False) -> Dict[str, Any]:
+    """Bentuk dict halaman yang dipakai pipeline ingestion"""
+    return {
+        'page_number': page_number,
+        'text': text,
+        'has_text': bool(text.strip()),
+        'ocr_used': False,
+        'text_len': len(text),
+        'bbox_available': False,
+        'from_cache': from_cache
+    }
+
+
+class PageTextCache:
+    """Cache text per halaman di disk: <base>/<extractor>/<sha[:2]>/<sha>/<page>.txt
+
+    `meta.json` ditulis setelah semua halaman tersimpan; keberadaannya menandai
+    bahwa file sudah lengkap sehingga page count tidak perlu dibaca dari PDF.
+    mtime `meta.json` diperbarui setiap cache hit dan dipakai sebagai waktu akses untuk sweep.
+    """
+
+    def __init__(self, base_dir: str, max_bytes: int = 0, max_age_seconds: float = 0,
+                 sweep_interval: float = 3600):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def _document_dir(self, extractor: str, sha256: str) -> str:
+        return os.path.join(self.base_dir, extractor, sha256[:2], sha256)
+
+    def _page_path(self, extractor: str, sha256: str, page_number: int) -> str:
+        return os.path.join(self._document_dir(extractor, sha256), f"{page_number:05d}.txt")
+
+    @staticmethod
+    def _atomic_write(path: str, content: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+    def has_page(self, extractor: str, sha256: str, page_number: int) -> bool:
+        return os.path.exists(self._page_path(extractor, sha256, page_number))
+
+    def get_page(self, extractor: str, sha256: str, page_number: int) -> Optional[str]:
+        try:
+            with open(self._page_path(extractor, sha256, page_number), 'r', encoding='utf-8') as file:
+                return file.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def put_page(self, extractor: str, sha256: str, page_number: int, text: str):
+        try:
+            self._atomic_write(self._page_path(extractor, sha256, page_number), text)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to cache page {page_number} of {sha256[:12]}: {e}")
+
+    def get_total_pages(self, extractor: str, sha256: str) -> Optional[int]:
+        meta_path = os.path.join(self._document_dir(extractor, sha256), 'meta.json')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                total_pages = int(json.load(file)['total_pages'])
+            os.utime(meta_path)
+            return total_pages
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def forget(self, extractor: str, sha256: str):
+        """Hapus entry dokumen (mis. sebagian halamannya hilang)"""
+        shutil.rmtree(self._document_dir(extractor, sha256), ignore_errors=True)
+
+    def mark_complete(self, extractor: str, sha256: str, total_pages: int):
+        try:
+            self._atomic_write(
+                os.path.join(self._document_dir(extractor, sha256), 'meta.json'),
+                json.dumps({'total_pages': total_pages, 'extractor': extractor})
+            )
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to write page cache manifest for {sha256[:12]}: {e}")
+        self.maybe_sweep()
+
+    def _document_entries(self) -> List[Tuple[float, int, str]]:
+        """(waktu akses, ukuran byte, path) untuk setiap dokumen di cache"""
+        entries = []
+        for extractor in PAGE_EXTRACTORS:
+            extractor_dir = os.path.join(self.base_dir, extractor)
+            if not os.path.isdir(extractor_dir):
+                continue
+            for prefix in os.listdir(extractor_dir):
+                prefix_dir = os.path.join(extractor_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for sha256 in os.listdir(prefix_dir):
+                    document_dir = os.path.join(prefix_dir, sha256)
+                    try:
+                        files = [os.stat(os.path.join(document_dir, name)) for name in os.listdir(document_dir)]
+                    except OSError:
+                        continue
+                    meta_path = os.path.join(document_dir, 'meta.json')
+                    accessed = (os.path.getmtime(meta_path) if os.path.exists(meta_path)
+                                else max((f.st_mtime for f in files), default=0))
+                    entries.append((accessed, sum(f.st_size for f in files), document_dir))
+        return entries
+
+    def sweep(self) -> Dict[str, int]:
+        """Hapus dokumen yang lebih tua dari max_age lalu yang paling lama tidak dipakai
+        sampai total ukuran <= max_bytes"""
+        stats = {'documents_removed': 0, 'bytes_removed': 0}
+        entries = sorted(self._document_entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age_seconds if self.max_age_seconds else None
+        for accessed, size, document_dir in entries:
+            expired = cutoff is not None and accessed < cutoff
+            if not expired and (not self.max_bytes or total_bytes <= self.max_bytes):
+                break
+            shutil.rmtree(document_dir, ignore_errors=True)
+            total_bytes -= size
+            stats['documents_removed'] += 1
+            stats['bytes_removed'] += size
+        if stats['documents_removed']:
+            logger.info(f"🧹 PDF page cache sweep: {stats}")
+        return stats
+
+    def maybe_sweep(self):
+        """Sweep paling sering sekali per sweep_interval per proses"""
+        if not self.max_bytes and not self.max_age_seconds:
+            return
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            self.sweep()
+        except OSError as e:
+            logger.warning(f"⚠️ PDF page cache sweep failed: {e}")
+        finally:
+            self._sweep_lock.release()
+
+
+class PdfPageExtractor:
+    """Page generator untuk PDF: process pool + cache per halaman"""
+
+    def __init__(self):
+        self.default_extractor = os.getenv('PDF_EXTRACTOR', 'pypdf2').lower()
+        if self.default_extractor not in PAGE_EXTRACTORS:
+            self.default_extractor = 'pypdf2'
+        self.max_workers = max(1, int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1)))))
+        self.pages_per_task = max(1, int(os.getenv('PDF_EXTRACT_PAGES_PER_TASK', '8')))
+        self.cache = PageTextCache(
+            os.getenv('PDF_PAGE_CACHE_DIR', os.path.join('cache', 'pdf_pages')),
+            max_bytes=int(os.getenv('PDF_PAGE_CACHE_MAX_BYTES', str(2 * 1024 ** 3))),
+            max_age_seconds=float(os.getenv('PDF_PAGE_CACHE_MAX_AGE_DAYS', '30')) * 86400,
+            sweep_interval=float(os.getenv('PDF_PAGE_CACHE_SWEEP_INTERVAL', '3600'))
+        )
+        # forkserver/spawn: worker tidak mewarisi lock dan thread dari worker web yang multithread
+        start_methods = multiprocessing.get_all_start_methods()
+        self.start_method = os.getenv('PDF_EXTRACT_START_METHOD',
+                                      'forkserver' if 'forkserver' in start_methods else 'spawn')
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.stats = {'pages_extracted': 0, 'pages_from_cache': 0, 'documents_from_cache': 0}
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool dibuat sekali per proses dengan start method forkserver/spawn
+        (fork dari proses multithread bisa mewarisi lock yang sedang dipegang thread lain)"""
+        if self.max_workers <= 1:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return self._pool
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """Matikan process pool (dipanggil saat processor berhenti)"""
+        self._reset_pool()
+
+    def iter_pages(self, file_path: Optional[str], sha256: Optional[str] = None,
+                   extractor: Optional[str] = None, content: Optional[bytes] = None) -> Iterator[Dict[str, Any]]:
+        """Yield dict halaman berurutan (lihat build_page).
+
+        Jika semua halaman file ini sudah ada di cache, PDF tidak dibuka sama sekali.
+        Tanpa file_path, `content` (bytes PDF) baru ditulis ke file sementara saat ada
+        halaman yang harus diekstrak (mis. halaman cache hilang karena sweep).
+        """
+        extractor = extractor or self.default_extractor
+        if file_path is None and (content is None or sha256 is None):
+            raise ValueError("file_path atau content + sha256 diperlukan")
+        sha256 = sha256 or sha256_file(file_path)
+        temp_path = None
+
+        def source_path() -> str:
+            nonlocal temp_path
+            if file_path is not None:
+                return file_path
+            if temp_path is None:
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+                    temp_file.write(content)
+                    temp_path = temp_file.name
+            return temp_path
+
+        try:
+            yield from self._iter_pages(source_path, sha256, extractor)
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _iter_pages(self, source_path, sha256: str, extractor: str) -> Iterator[Dict[str, Any]]:
+        total_pages = self.cache.get_total_pages(extractor, sha256)
+        if total_pages is not None and all(self.cache.has_page(extractor, sha256, n)
+                                           for n in range(1, total_pages + 1)):
+            self.stats['documents_from_cache'] += 1
+            for page_number in range(1, total_pages + 1):
+                text = self.cache.get_page(extractor, sha256, page_number)
+                if text is None:
+                    # Dihapus sweep proses lain setelah dicek: ekstrak ulang halaman ini saja
+                    _, text, _ = _extract_page_range(source_path(), page_number - 1, page_number, extractor)[0]
+                    self.cache.put_page(extractor, sha256, page_number, text)
+                else:
+                    self.stats['pages_from_cache'] += 1
+                yield build_page(text, page_number, from_cache=True)
+            return
+        if total_pages is not None:
+            # Manifest ada tetapi halaman hilang: perlakukan seluruh entry sebagai cache miss
+            self.cache.forget(extractor, sha256)
+
+        file_path = source_path()
+        total_pages = _count_pages(file_path, extractor)
+        logger.info(f"📄 Extracting {total_pages} pages from {os.path.basename(file_path)} ({extractor})")
+
+        failed_pages = 0
+        for page_number, text, error, from_cache in self._iter_extracted(file_path, sha256, extractor, total_pages):
+            if error:
+                failed_pages += 1
+                logger.warning(f"⚠️ Failed to extract page {page_number}: {error}")
+            elif not from_cache:
+                self.cache.put_page(extractor, sha256, page_number, text)
+            yield build_page(text, page_number, from_cache=from_cache)
+
+        # Halaman gagal tidak di-cache agar dicoba lagi pada proses berikutnya
+        if not failed_pages:
+            self.cache.mark_complete(extractor, sha256, total_pages)
+
+    def _iter_extracted(self, file_path: str, sha256: str, extractor: str,
+                        total_pages: int) -> Iterator[Tuple[int, str, Optional[str], bool]]:
+        """Yield (page_number, text, error, from_cache) berurutan.
+
+        Range yang seluruh halamannya sudah di-cache (mis. dari run sebelumnya yang terputus)
+        dibaca dari cache; sisanya dikirim ke process pool dengan jumlah task in-flight terbatas.
+        """
+        ranges = [(start, min(start + self.pages_per_task, total_pages))
+                  for start in range(0, total_pages, self.pages_per_task)]
+        pool = self._get_pool() if len(ranges) > 1 else None
+        max_in_flight = self.max_workers * 2
+        in_flight = deque()
+        next_range = 0
+
+        while next_range < len(ranges) or in_flight:
+            while next_range < len(ranges) and len(in_flight) < max_in_flight:
+                start, end = ranges[next_range]
+                next_range += 1
+                if all(self.cache.has_page(extractor, sha256, n) for n in range(start + 1, end + 1)):
+                    in_flight.append((start, end, 'cache'))
+                elif pool is not None:
+                    in_flight.append((start, end, pool.submit(_extract_page_range, file_path, start, end, extractor)))
+                else:
+                    in_flight.append((start, end, None))
+                    break  # Tanpa pool: ekstrak satu range pada satu waktu
+
+            start, end, task = in_flight.popleft()
+            if task == 'cache':
+                for page_number in range(start + 1, end + 1):
+                    text = self.cache.get_page(extractor, sha256, page_number)
+                    if text is not None:
+                        self.stats['pages_from_cache'] += 1
+                        yield page_number, text, None, True
+                    else:
+                        yield _extract_page_range(file_path, page_number - 1, page_number, extractor)[0] + (False,)
+                continue
+
+            if task is None:
+                results = _extract_page_range(file_path, start, end, extractor)
+            else:
+                try:
+                    results = task.result()
+                except Exception as e:
+                    # Worker mati (BrokenProcessPool dsb.): ulangi range ini di proses pemanggil
+                    logger.warning(f"⚠️ PDF extraction worker failed ({e}), extracting pages {start + 1}-{end} inline")
+                    self._reset_pool()
+                    results = _extract_page_range(file_path, start, end, extractor)
+
+            self.stats['pages_extracted'] += len(results)
+            for page_number, text, error in results:
+                yield page_number, text, error, False
+
+
+# Global instance
+_pdf_page_extractor = None
+_pdf_page_extractor_lock = threading.Lock()
+
+
+def get_pdf_page_extractor() -> PdfPageExtractor:
+    """Get global PDF page extractor instance"""
+    global _pdf_page_extractor
+    if _pdf_page_extractor is None:
+        with _pdf_page_extractor_lock:
+            if _pdf_page_extractor is None:
+                _pdf_page_extractor = PdfPageExtractor()
+    return _pdf_page_extractor
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Qdrant HTTP Client untuk KSM Main Backend
+Transport HTTP persisten untuk panggilan REST Qdrant yang tidak lewat qdrant-client SDK.
+
+- Satu httpx.Client per proses dengan connection pool + keep-alive (tidak ada TCP/TLS handshake per call)
+- HTTP/2 dipakai jika paket h2 terpasang dan server diakses lewat TLS
+- Timeout per jenis operasi (info, search, batch, write) menggantikan timeout 60s yang seragam
+- Jumlah request bersamaan dibatasi semaphore agar pool tidak kehabisan koneksi saat lonjakan
+- Konfigurasi pool yang sama dipakai untuk QdrantClient (lihat sdk_client_kwargs)
+"""
+
+import os
+import logging
+import importlib.util
+import threading
+from typing import Dict, Any, Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# httpx butuh paket h2 untuk http2=True; cukup dicek keberadaannya, tidak perlu di-import
+H2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+logger = logging.getLogger(__name__)
+
+# Timeout baca default per jenis operasi (detik); override via QDRANT_TIMEOUT_<OPERATION>
+OPERATION_TIMEOUTS = {
+    'info': 10.0,
+    'search': 15.0,
+    'batch': 30.0,
+    'write': 30.0
+}
+
+
+class QdrantHttpClient:
+    """Pooled HTTP client untuk REST API Qdrant"""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None):
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx is required for QdrantHttpClient")
+
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_connections = int(os.getenv('QDRANT_HTTP_MAX_CONNECTIONS', '20'))
+        self.max_keepalive = int(os.getenv('QDRANT_HTTP_MAX_KEEPALIVE', str(self.max_connections)))
+        self.keepalive_expiry = float(os.getenv('QDRANT_HTTP_KEEPALIVE_EXPIRY', '60'))
+        self.connect_timeout = float(os.getenv('QDRANT_HTTP_CONNECT_TIMEOUT', '3'))
+        self.pool_timeout = float(os.getenv('QDRANT_HTTP_POOL_TIMEOUT', '5'))
+        # Tanpa TLS httpx tidak pernah bernegosiasi h2 (tidak ada ALPN), jadi http:// tetap HTTP/1.1
+        self.http2 = (H2_AVAILABLE and self.base_url.startswith('https://')
+                      and os.getenv('QDRANT_HTTP2', 'true').lower() == 'true')
+        self.timeouts = {
+            operation: float(os.getenv(f'QDRANT_TIMEOUT_{operation.upper()}', str(default)))
+            for operation, default in OPERATION_TIMEOUTS.items()
+        }
+
+        # Batas request bersamaan; request yang menunggu lebih lama dari pool_timeout gagal cepat
+        self._concurrency = threading.BoundedSemaphore(int(os.getenv('QDRANT_HTTP_MAX_CONCURRENCY', str(self.max_connections))))
+        self._client = None
+        self._client_pid = None
+        self._client_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    @property
+    def limits(self) -> 'httpx.Limits':
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _timeout(self, operation: str) -> 'httpx.Timeout':
+        read_timeout = self.timeouts.get(operation, self.timeouts['search'])
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout, pool=self.pool_timeout)
+
+    def _get_client(self) -> 'httpx.Client':
+        # Client dibuat ulang setelah fork (mis. gunicorn preload) agar socket tidak dibagi antar proses
+        pid = os.getpid()
+        if self._client is not None and self._client_pid == pid:
+            return self._client
+        with self._client_lock:
+            if self._client is None or self._client_pid != pid:
+                self._client = httpx.Client(
+                    base_url=self.base_url,
+                    headers=self.headers,
+                    limits=self.limits,
+                    http2=self.http2,
+                    timeout=self._timeout('search')
+                )
+                self._client_pid = pid
+            return self._client
+
+    def request(self, method: str, path: str, *, operation: str = 'search',
+                json: Optional[Any] = None) -> 'httpx.Response':
+        """Kirim request ke Qdrant lewat pool. `path` relatif terhadap base_url (mis. /collections/x)"""
+        if not self._concurrency.acquire(timeout=self.pool_timeout):
+            self.stats['throttled'] += 1
+            raise TimeoutError(f"Qdrant HTTP concurrency limit reached ({method} {path})")
+        try:
+            self.stats['requests'] += 1
+            return self._get_client().request(method, path, json=json, timeout=self._timeout(operation))
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self._concurrency.release()
+
+    def get(self, path: str, *, operation: str = 'info') -> 'httpx.Response':
+        return self.request('GET', path, operation=operation)
+
+    def post(self, path: str, *, json: Optional[Any] = None, operation: str = 'search') -> 'httpx.Response':
+        return self.request('POST', path, operation=operation, json=json)
+
+    def put(self, path: str, *, json: Optional[Any] = None, operation: str = 'write') -> 'httpx.Response':
+        return self.request('PUT', path, operation=operation, json=json)
+
+    def sdk_client_kwargs(self) -> Dict[str, Any]:
+        """Argumen pool untuk QdrantClient agar transport REST SDK memakai konfigurasi yang sama.
+
+        Tanpa `limits` eksplisit, qdrant-client mematikan keep-alive untuk host localhost.
+        """
+        return {
+            'limits': self.limits,
+            'http2': self.http2,
+            'timeout': int(max(self.timeouts.values()))
+        }
+
+    def close(self):
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'http2': self.http2,
+            'max_connections': self.max_connections,
+            'timeouts': dict(self.timeouts)
+        }
@@ -6,21 +6,43 @@ Service untuk mengelola vector database menggunakan Qdrant.io
 """
 
 import os
+import time
 import logging
 import hashlib
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import uuid
 
 try:
     from qdrant_client import QdrantClient
-    from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+    from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, Range
+    from qdrant_client.models import SparseVectorParams, SparseVector, Modifier, SparseIndexParams
+    from qdrant_client.models import (
+        HnswConfigDiff, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+        BinaryQuantization, BinaryQuantizationConfig, SearchParams, QuantizationSearchParams
+    )
+    from qdrant_client.models import CreateAliasOperation, CreateAlias, DeleteAliasOperation, DeleteAlias
     QDRANT_AVAILABLE = True
 except ImportError as e:
     QDRANT_AVAILABLE = False
     logger = logging.getLogger(__name__)
     logger.warning(f"⚠️ Qdrant dependencies not available: {e}")
 
+from .qdrant_http_client import QdrantHttpClient, HTTPX_AVAILABLE
+from .sparse_encoder import get_sparse_encoder, SPARSE_VECTOR_NAME
+from .semantic_response_cache import get_semantic_response_cache
+from config.qdrant_profiles import get_qdrant_profile_registry
+
+# Mode retrieval yang didukung search_documents / search_documents_batch
+SEARCH_MODES = ('dense', 'hybrid')
+
+# Payload epoch (detik) yang dicap setiap write; migrasi profil menyalin ulang points yang berubah
+# setelah snapshot berdasarkan field ini
+UPDATED_AT_FIELD = 'updated_at'
+# Alias sementara ke collection baru selama collection fisik lama dipindah ke alias
+CUTOVER_ALIAS_SUFFIX = '__cutover'
+
 logger = logging.getLogger(__name__)
 
 class QdrantService:
@@ -33,7 +55,9 @@ class QdrantService:
         if not QDRANT_AVAILABLE:
             logger.warning("⚠️ Qdrant dependencies not available, service will be disabled")
             self.client = None
-            self.collections = {}
+            self.http = None
+            self._schema_registry = {}
+            self._schema_lock = threading.Lock()
             return
             
         # Konfigurasi Qdrant
@@ -47,12 +71,34 @@ class QdrantService:
         self.vector_size = int(os.environ.get('QDRANT_VECTOR_SIZE', '1536'))  # OpenAI embeddings
         self.batch_size = int(os.environ.get('QDRANT_BATCH_SIZE', '100'))
         
+        # Hybrid retrieval (dense + sparse BM25, digabung dengan reciprocal rank fusion)
+        # - Collection baru dibuat dengan sparse vector jika QDRANT_HYBRID_ENABLED
+        # - Mode default per call dari QDRANT_SEARCH_MODE; pemanggil bisa override per request
+        self.hybrid_enabled = os.environ.get('QDRANT_HYBRID_ENABLED', 'true').lower() == 'true'
+        self.search_mode = os.environ.get('QDRANT_SEARCH_MODE', 'dense').lower()
+        self.hybrid_rrf_k = int(os.environ.get('QDRANT_HYBRID_RRF_K', '60'))
+        self.hybrid_prefetch_factor = int(os.environ.get('QDRANT_HYBRID_PREFETCH_FACTOR', '4'))
+        
         # OpenAI configuration
         self.openai_api_key = os.environ.get('OPENAI_API_KEY', None)
         
         # Initialize Qdrant client
         self.client = None
-        self.collections = {}
+        
+        # Schema registry: collection -> {vector_size, distance, payload_indexes, sparse_vectors, quantization}.
+        # Diperbarui oleh create/delete collection dan payload index; dibaca ulang setelah QDRANT_SCHEMA_TTL
+        # detik agar alias swap dari proses lain (migrasi profil) ikut terlihat
+        self._schema_registry: Dict[str, Dict[str, Any]] = {}
+        self._schema_lock = threading.Lock()
+        self.schema_ttl = int(os.environ.get('QDRANT_SCHEMA_TTL', '300'))
+        # Toleransi beda jam antar worker saat catch-up migrasi memfilter updated_at
+        self.migration_clock_skew = float(os.environ.get('QDRANT_MIGRATION_CLOCK_SKEW', '30'))
+        
+        # Profil collection per company (quantization, on-disk, HNSW); diterapkan saat create
+        self.profiles = get_qdrant_profile_registry()
+        
+        # Pooled HTTP transport untuk panggilan REST raw (dan konfigurasi pool untuk SDK)
+        self.http = QdrantHttpClient(self.url, self.api_key) if HTTPX_AVAILABLE else None
         
         # Initialize services
         self._init_qdrant()
@@ -71,15 +117,18 @@ class QdrantService:
             return
             
         try:
+            pool_kwargs = self.http.sdk_client_kwargs() if self.http else {}
             # Only use API key if it's provided and URL is not localhost
             if self.api_key and not self.url.startswith('http://localhost'):
                 self.client = QdrantClient(
                     url=self.url,
-                    api_key=self.api_key
+                    api_key=self.api_key,
+                    **pool_kwargs
                 )
             else:
                 self.client = QdrantClient(
-                    url=self.url
+                    url=self.url,
+                    **pool_kwargs
                 )
             
             # Test connection
@@ -98,51 +147,232 @@ class QdrantService:
         return f"{self.collection_prefix}_{company_id}_{normalized}"
     
     def _get_or_create_collection(self, company_id: str, collection: str = 'default'):
-        """Get atau create collection untuk company"""
+        """Get atau create collection untuk company (collection baru langsung diberi index company_id)"""
         collection_name = self._get_collection_name(company_id, collection or 'default')
-        
-        if collection_name not in self.collections:
+        self._ensure_collection(collection_name, default_indexes=True)
+        return collection_name
+    
+    # ===== SCHEMA REGISTRY =====
+    
+    def _fetch_collection_schema(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Baca vector config dan payload index collection dari Qdrant. None jika collection tidak ada"""
+        if self.http is not None:
+            # Raw REST untuk menghindari masalah validasi Pydantic pada model SDK
+            response = self.http.get(f"/collections/{collection_name}")
+            if response.status_code == 404:
+                return None
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
+            result = (response.json() or {}).get('result') or {}
+            vectors = ((result.get('config') or {}).get('params') or {}).get('vectors') or {}
+            payload_schema = result.get('payload_schema') or {}
+            sparse_vectors = ((result.get('config') or {}).get('params') or {}).get('sparse_vectors') or {}
+            quantization = next(iter((result.get('config') or {}).get('quantization_config') or {}), None)
+        else:
             try:
-                # Coba get existing collection
-                collection_info = self.client.get_collection(collection_name)
+                info = self.client.get_collection(collection_name)
+            except Exception as e:
+                if 'not found' in str(e).lower() or "doesn't exist" in str(e).lower():
+                    return None
+                raise
+            params_vectors = info.config.params.vectors
+            if isinstance(params_vectors, dict):
+                vectors = {name: (params.dict() if hasattr(params, 'dict') else params)
+                           for name, params in params_vectors.items()}
+            else:
+                vectors = params_vectors.dict() if hasattr(params_vectors, 'dict') else {}
+            payload_schema = getattr(info, 'payload_schema', None) or {}
+            sparse_vectors = getattr(info.config.params, 'sparse_vectors', None) or {}
+            quantization_config = getattr(info.config, 'quantization_config', None)
+            quantization = next((kind for kind in ('scalar', 'binary', 'product')
+                                 if getattr(quantization_config, kind, None) is not None), None)
+        
+        # Named vectors: {name: {size, distance}} -> ambil vector pertama untuk size/distance
+        if 'size' not in vectors and vectors:
+            first = next(iter(vectors.values()))
+            vectors = first if isinstance(first, dict) else {}
+        distance = vectors.get('distance')
+        return {
+            'vector_size': vectors.get('size'),
+            'distance': getattr(distance, 'value', distance),
+            'payload_indexes': set(payload_schema.keys()),
+            'sparse_vectors': set(sparse_vectors.keys()),
+            'quantization': quantization
+        }
+    
+    def _register_collection(self, collection_name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        schema['checked_at'] = time.time()
+        with self._schema_lock:
+            self._schema_registry[collection_name] = schema
+        return schema
+    
+    def _forget_collection(self, collection_name: str):
+        with self._schema_lock:
+            self._schema_registry.pop(collection_name, None)
+    
+    def _ensure_collection(self, collection_name: str, default_indexes: bool = False) -> Dict[str, Any]:
+        """Schema collection dari registry; hanya menyentuh Qdrant saat collection belum dikenal
+        atau entry registry lebih tua dari schema_ttl"""
+        schema = self._schema_registry.get(collection_name)
+        if schema is not None and time.time() - schema.get('checked_at', 0) < self.schema_ttl:
+            return schema
+        
+        fetched = self._fetch_collection_schema(collection_name)
+        if fetched is not None:
+            if schema is None:
                 logger.info(f"📋 Retrieved existing collection: {collection_name}")
-                self.collections[collection_name] = collection_info
-            except Exception:
-                # Create new collection jika belum ada
-                try:
-                    self.client.create_collection(
-                        collection_name=collection_name,
-                        vectors_config=VectorParams(
-                            size=self.vector_size,
-                            distance=Distance.COSINE
-                        )
-                    )
-                    logger.info(f"🆕 Created new collection: {collection_name}")
-                    self.collections[collection_name] = collection_name
-                    
-                    # Create index for company_id to avoid filter errors
-                    try:
-                        from qdrant_client.models import CreateFieldIndex
-                        self.client.create_payload_index(
-                            collection_name=collection_name,
-                            field_name="metadata.company_id",
-                            field_schema="keyword"
-                        )
-                        logger.info(f"✅ Created index for metadata.company_id in {collection_name}")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to create index for metadata.company_id: {e}")
-                        
-                except Exception as e:
-                    if "already exists" in str(e):
-                        # Collection already exists, just retrieve it
-                        logger.info(f"📋 Collection {collection_name} already exists, retrieving...")
-                        collection_info = self.client.get_collection(collection_name)
-                        self.collections[collection_name] = collection_info
-                    else:
-                        logger.error(f"❌ Failed to create collection {collection_name}: {e}")
-                        raise
+            return self._register_collection(collection_name, fetched)
         
-        return collection_name
+        if self._resolve_alias(collection_name + CUTOVER_ALIAS_SUFFIX) is not None:
+            # Collection fisik lama sedang diganti alias (migrasi profil): jangan buat collection kosong
+            # dengan nama yang sama, write akan masuk ke collection baru setelah alias dibuat
+            raise Exception(f"Collection {collection_name} sedang dipindah ke alias baru, coba lagi")
+        
+        profile = self.get_collection_profile(collection_name)
+        try:
+            self.client.create_collection(
+                collection_name=collection_name,
+                **self._collection_create_kwargs(self.vector_size, Distance.COSINE, profile)
+            )
+            logger.info(f"🆕 Created new collection: {collection_name} (profile: {profile['name']})")
+            schema = self._register_collection(collection_name, {
+                'vector_size': self.vector_size,
+                'distance': 'Cosine',
+                'payload_indexes': set(),
+                'sparse_vectors': {SPARSE_VECTOR_NAME} if self.hybrid_enabled else set(),
+                'quantization': profile['quantization']
+            })
+        except Exception as e:
+            if "already exists" not in str(e):
+                logger.error(f"❌ Failed to create collection {collection_name}: {e}")
+                raise
+            # Dibuat proses lain di antara fetch dan create
+            logger.info(f"📋 Collection {collection_name} already exists, retrieving...")
+            return self._register_collection(collection_name, self._fetch_collection_schema(collection_name) or {
+                'vector_size': self.vector_size,
+                'distance': 'Cosine',
+                'payload_indexes': set(),
+                'sparse_vectors': set(),
+                'quantization': None
+            })
+        
+        if default_indexes:
+            # Create index for company_id to avoid filter errors
+            self._ensure_payload_index(collection_name, "metadata.company_id", "keyword")
+        return schema
+    
+    def _sparse_vectors_config(self, on_disk: bool = False) -> Optional[Dict[str, Any]]:
+        """Sparse vector BM25 untuk collection baru; IDF dihitung Qdrant (modifier idf)"""
+        if not self.hybrid_enabled:
+            return None
+        index = SparseIndexParams(on_disk=True) if on_disk else None
+        return {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF, index=index)}
+    
+    # ===== COLLECTION PROFILES =====
+    
+    def get_collection_profile(self, collection_name: str, profile_name: Optional[str] = None) -> Dict[str, Any]:
+        """Profil collection: profile_name eksplisit, atau dari pemetaan company di config"""
+        if profile_name is None:
+            profile_name = self.profiles.profile_name_for_collection(collection_name, self.collection_prefix)
+        return self.profiles.get_profile(profile_name)
+    
+    def _collection_create_kwargs(self, vector_size: int, distance: Any, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Argumen create_collection untuk sebuah profil (vector, HNSW, quantization, on-disk)"""
+        kwargs: Dict[str, Any] = {
+            'vectors_config': VectorParams(size=int(vector_size), distance=distance,
+                                           on_disk=True if profile['on_disk_vectors'] else None),
+            'sparse_vectors_config': self._sparse_vectors_config(on_disk=profile['on_disk_vectors'])
+        }
+        if profile['hnsw_m'] or profile['hnsw_ef_construct'] or profile['hnsw_on_disk']:
+            kwargs['hnsw_config'] = HnswConfigDiff(
+                m=profile['hnsw_m'],
+                ef_construct=profile['hnsw_ef_construct'],
+                on_disk=True if profile['hnsw_on_disk'] else None
+            )
+        if profile['quantization'] == 'scalar':
+            kwargs['quantization_config'] = ScalarQuantization(scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=profile['scalar_quantile'],
+                always_ram=profile['quantization_always_ram']
+            ))
+        elif profile['quantization'] == 'binary':
+            kwargs['quantization_config'] = BinaryQuantization(binary=BinaryQuantizationConfig(
+                always_ram=profile['quantization_always_ram']
+            ))
+        if profile['on_disk_payload']:
+            kwargs['on_disk_payload'] = True
+        return kwargs
+    
+    def _search_params_json(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Parameter search dense (hnsw_ef, rescoring quantization) dalam bentuk JSON REST"""
+        profile = self.get_collection_profile(collection_name)
+        params: Dict[str, Any] = {}
+        if profile['search_ef']:
+            params['hnsw_ef'] = int(profile['search_ef'])
+        # Rescoring hanya berarti jika collection benar-benar ter-quantize (collection lama belum dimigrasi)
+        if self._ensure_collection(collection_name).get('quantization') and (profile['rescore'] or profile['oversampling']):
+            quantization: Dict[str, Any] = {'rescore': bool(profile['rescore'])}
+            if profile['oversampling']:
+                quantization['oversampling'] = float(profile['oversampling'])
+            params['quantization'] = quantization
+        return params or None
+    
+    def _search_params(self, collection_name: str) -> Optional['SearchParams']:
+        params = self._search_params_json(collection_name)
+        if params is None:
+            return None
+        quantization = params.get('quantization')
+        return SearchParams(
+            hnsw_ef=params.get('hnsw_ef'),
+            quantization=QuantizationSearchParams(**quantization) if quantization else None
+        )
+    
+    @staticmethod
+    def _with_sparse_vector(vector: Any, text: Optional[str]) -> Any:
+        """Dense vector polos + text -> {'' : dense, bm25: sparse}; vector bernama dibiarkan apa adanya"""
+        if not isinstance(vector, list) or not text:
+            return vector
+        sparse = get_sparse_encoder().encode_document(text)
+        if not sparse['indices']:
+            return vector
+        return {'': vector, SPARSE_VECTOR_NAME: SparseVector(**sparse)}
+    
+    def supports_hybrid(self, collection_name: str) -> bool:
+        """True jika collection punya sparse vector BM25 (collection lama perlu dimigrasi dulu)"""
+        return SPARSE_VECTOR_NAME in self._ensure_collection(collection_name).get('sparse_vectors', ())
+    
+    def _ensure_payload_index(self, collection_name: str, field_name: str, field_schema: str = 'keyword'):
+        """Buat payload index hanya jika registry belum mencatatnya"""
+        schema = self._ensure_collection(collection_name)
+        if field_name in schema['payload_indexes']:
+            return
+        try:
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
+            logger.info(f"✅ Created index for {field_name} in {collection_name}")
+        except Exception as e:
+            if 'already exists' not in str(e).lower():
+                logger.warning(f"⚠️ Failed to create index for {field_name} in {collection_name}: {e}")
+                return
+        with self._schema_lock:
+            schema['payload_indexes'].add(field_name)
+    
+    def _forget_if_collection_missing(self, error: Exception):
+        """Collection dihapus di luar service ini: kosongkan registry agar dibaca ulang pada call berikutnya"""
+        message = str(error).lower()
+        if 'not found' in message or "doesn't exist" in message or 'http 404' in message:
+            with self._schema_lock:
+                self._schema_registry.clear()
+    
+    def get_collection_schema(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Schema collection yang tercatat di registry (tanpa network call)"""
+        schema = self._schema_registry.get(collection_name)
+        if schema is None:
+            return None
+        return {**schema, 'payload_indexes': sorted(schema['payload_indexes'])}
     
     def add_documents(self, company_id: str = None, documents: List[Dict[str, Any]] = None, 
                      collection: str = 'default', **kwargs) -> List[str]:
@@ -174,17 +404,19 @@ class QdrantService:
                 
                 # Ensure collection exists
                 self._get_or_create_collection_by_name(collection_name)
+                with_sparse = self.supports_hybrid(collection_name)
                 
                 # Prepare points
                 points = []
                 for i, (doc_id, text, metadata, embedding) in enumerate(zip(ids, texts, metadatas, embeddings)):
                     point = PointStruct(
                         id=doc_id,
-                        vector=embedding,
+                        vector=self._with_sparse_vector(embedding, text) if with_sparse else embedding,
                         payload={
                             'text': text,
                             'metadata': metadata,
-                            'created_at': datetime.now().isoformat()
+                            'created_at': datetime.now().isoformat(),
+                            UPDATED_AT_FIELD: time.time()
                         }
                     )
                     points.append(point)
@@ -200,6 +432,7 @@ class QdrantService:
                     )
                     all_ids.extend([p.id for p in batch_points])
                 
+                self._invalidate_response_cache(collection_name, self._document_ids_of([p.payload for p in points]))
                 logger.info(f"✅ Added {len(all_ids)} documents to collection: {collection_name}")
                 return all_ids
 
@@ -210,6 +443,7 @@ class QdrantService:
             
             # Get or create collection
             collection_name = self._get_or_create_collection(company_id, collection)
+            with_sparse = self.supports_hybrid(collection_name)
             
             # Prepare data
             points = []
@@ -247,10 +481,11 @@ class QdrantService:
                 
                 point = PointStruct(
                     id=doc_id,
-                    vector=embedding,
+                    vector=self._with_sparse_vector(embedding, doc.get('text')) if with_sparse else embedding,
                     payload={
                         'text': doc.get('text', ''),
-                        'metadata': metadata
+                        'metadata': metadata,
+                        UPDATED_AT_FIELD: time.time()
                     }
                 )
                 points.append(point)
@@ -271,6 +506,7 @@ class QdrantService:
                 all_ids.extend([p.id for p in batch_points])
                 logger.info(f"📄 Added batch {i//batch_size + 1}: {len(batch_points)} documents")
             
+            self._invalidate_response_cache(collection_name, self._document_ids_of([p.payload for p in points]))
             logger.info(f"✅ Added {len(all_ids)} documents to collection: {collection_name}")
             return all_ids
             
@@ -278,13 +514,34 @@ class QdrantService:
             logger.error(f"❌ Error adding documents: {e}")
             return []
     
+    @staticmethod
+    def _document_ids_of(payloads: List[Any]) -> Optional[set]:
+        """document_id dari payload points; None jika ada point tanpa document_id (invalidasi satu collection)"""
+        document_ids = set()
+        for payload in payloads:
+            metadata = payload.get('metadata') if isinstance(payload, dict) else None
+            document_id = (metadata or {}).get('document_id') if isinstance(metadata, dict) else None
+            if document_id is None:
+                return None
+            document_ids.add(str(document_id))
+        return document_ids
+
+    def _invalidate_response_cache(self, collection_name: str, document_ids: Optional[set] = None):
+        """Jawaban semantic cache yang memakai dokumen yang berubah tidak valid lagi"""
+        try:
+            get_semantic_response_cache().invalidate(collection_name, document_ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to invalidate semantic response cache for {collection_name}: {e}")
+
     def upsert_points(self, *, collection_name: Optional[str] = None, company_id: Optional[str] = None,
-                      collection: str = 'default', points: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+                      collection: str = 'default', points: List[Dict[str, Any]] = None,
+                      stamp_updated_at: bool = True) -> Dict[str, Any]:
         """Upsert points ke Qdrant secara modular.
         
         - Jika `collection_name` diberikan, gunakan langsung.
         - Jika tidak, gunakan `company_id` + `collection` untuk membentuk nama koleksi.
         - `points` berupa list dict: {id, vector, payload}
+        - Payload dicap `updated_at` kecuali stamp_updated_at=False (penyalinan migrasi)
         
         Return: dict standar { success, message, data }
         """
@@ -303,9 +560,11 @@ class QdrantService:
             # Pastikan koleksi ada
             self._get_or_create_collection_by_name(target_collection)
             self._ensure_collection_indexes(target_collection)
+            with_sparse = self.supports_hybrid(target_collection)
             
             # Normalisasi points ke PointStruct
             qdrant_points: List[PointStruct] = []
+            stamped_at = time.time()
             for p in points:
                 pid = p.get('id') or str(uuid.uuid4())
                 vector = p.get('vector')
@@ -313,6 +572,10 @@ class QdrantService:
                 if vector is None:
                     # Skip jika tidak ada vektor
                     continue
+                if stamp_updated_at and isinstance(payload, dict):
+                    payload = {**payload, UPDATED_AT_FIELD: stamped_at}
+                if with_sparse and isinstance(payload, dict):
+                    vector = self._with_sparse_vector(vector, payload.get('text'))
                 qdrant_points.append(
                     PointStruct(
                         id=pid,
@@ -341,6 +604,7 @@ class QdrantService:
                     pass
                 total += len(batch)
             
+            self._invalidate_response_cache(target_collection, self._document_ids_of([p.payload for p in qdrant_points]))
             return {
                 'success': True,
                 'message': f'Upsert {total} points ke {target_collection} berhasil',
@@ -352,6 +616,7 @@ class QdrantService:
             }
         except Exception as e:
             logger.error(f"❌ Error upserting points: {e}")
+            self._forget_if_collection_missing(e)
             return { 'success': False, 'message': str(e), 'data': {} }
 
     def _build_filter(self, filter_input: Any) -> Optional[Filter]:
@@ -359,6 +624,7 @@ class QdrantService:
         Mendukung dua bentuk:
         - dict mapping sederhana: { "metadata.company_id": "abc", "chunk_index": 1 }
         - bentuk Qdrant-like: { "must": [ {"key": "metadata.company_id", "value": "abc"}, ... ] }
+          kondisi range: {"key": "updated_at", "range": {"gte": 1700000000}}
         """
         try:
             if not filter_input:
@@ -366,13 +632,23 @@ class QdrantService:
             conditions = []
             # Bentuk Qdrant-like
             if isinstance(filter_input, dict) and any(k in filter_input for k in ('must', 'should', 'must_not')):
-                for cond in filter_input.get('must', []) or []:
-                    key = cond.get('key')
-                    value = cond.get('value', cond.get('match', {}).get('value') if isinstance(cond.get('match'), dict) else None)
-                    if key is not None and value is not None:
-                        conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
-                # Catatan: untuk kesederhanaan, only 'must' didukung saat ini
-                return Filter(must=conditions) if conditions else None
+                def to_conditions(items):
+                    result = []
+                    for cond in items or []:
+                        key = cond.get('key')
+                        if key is not None and isinstance(cond.get('range'), dict):
+                            result.append(FieldCondition(key=key, range=Range(**cond['range'])))
+                            continue
+                        value = cond.get('value', cond.get('match', {}).get('value') if isinstance(cond.get('match'), dict) else None)
+                        if key is not None and value is not None:
+                            result.append(FieldCondition(key=key, match=MatchValue(value=value)))
+                    return result
+                conditions = to_conditions(filter_input.get('must'))
+                exclusions = to_conditions(filter_input.get('must_not'))
+                # Catatan: untuk kesederhanaan, hanya 'must' dan 'must_not' yang didukung saat ini
+                if not conditions and not exclusions:
+                    return None
+                return Filter(must=conditions or None, must_not=exclusions or None)
             # Bentuk mapping sederhana
             if isinstance(filter_input, dict):
                 for key, value in filter_input.items():
@@ -383,6 +659,20 @@ class QdrantService:
             logger.warning(f"Gagal membangun filter: {e}")
             return None
 
+    @staticmethod
+    def _document_ids_in_filter(filter_input: Any) -> Optional[set]:
+        """document_id dari kondisi must filter delete (bentuk yang didukung _build_filter)"""
+        if not isinstance(filter_input, dict):
+            return None
+        if 'must' in filter_input:
+            conditions = [(cond.get('key'), cond.get('value')) for cond in filter_input.get('must') or []
+                          if isinstance(cond, dict)]
+        else:
+            conditions = list(filter_input.items())
+        document_ids = {str(value) for key, value in conditions
+                        if key in ('metadata.document_id', 'document_id') and value is not None}
+        return document_ids or None
+
     def delete_points(self, *, collection_name: Optional[str] = None, company_id: Optional[str] = None,
                       collection: str = 'default', ids: Optional[List[Any]] = None, 
                       filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -430,6 +720,7 @@ class QdrantService:
                     pass
             else:
                 return { 'success': False, 'message': 'ids atau filter diperlukan', 'data': {} }
+            self._invalidate_response_cache(target_collection, self._document_ids_in_filter(filter) if not ids else None)
             return {
                 'success': True,
                 'message': f'Delete points dari {target_collection} diproses',
@@ -585,6 +876,7 @@ class QdrantService:
                 return { 'success': False, 'message': 'collection_name atau company_id diperlukan', 'data': {} }
             # pastikan koleksi ada
             self._get_or_create_collection_by_name(target_collection)
+            payload = {**payload, UPDATED_AT_FIELD: time.time()}
             # ids vs filter
             if ids and isinstance(ids, list) and len(ids) > 0:
                 op = self.client.set_payload(collection_name=target_collection, payload=payload, points=ids)
@@ -629,10 +921,6 @@ class QdrantService:
             if not target_collection:
                 return { 'success': False, 'message': 'collection_name atau company_id diperlukan', 'data': {} }
             # Gunakan raw HTTP untuk endpoint update vectors agar tidak mengubah payload
-            import httpx
-            headers = {}
-            if self.api_key:
-                headers["Authorization"] = f"Bearer {self.api_key}"
             operation_ids: List[int] = []
             total = 0
             for i in range(0, len(vectors), self.batch_size):
@@ -642,8 +930,7 @@ class QdrantService:
                 body['points'] = [p for p in body['points'] if p.get('id') is not None and p.get('vector') is not None]
                 if not body['points']:
                     continue
-                url = f"{self.url}/collections/{target_collection}/points/vectors"
-                resp = httpx.put(url, json=body, headers=headers, timeout=30.0)
+                resp = self.http.put(f"/collections/{target_collection}/points/vectors", json=body)
                 if resp.status_code >= 200 and resp.status_code < 300:
                     try:
                         j = resp.json()
@@ -655,6 +942,13 @@ class QdrantService:
                     total += len(body['points'])
                 else:
                     raise Exception(f"HTTP {resp.status_code}: {resp.text}")
+                # Cap updated_at agar vector yang diganti ikut tersalin oleh catch-up migrasi profil
+                stamp = self.http.post(f"/collections/{target_collection}/points/payload", json={
+                    'payload': {UPDATED_AT_FIELD: time.time()},
+                    'points': [p['id'] for p in body['points']]
+                }, operation='write')
+                if stamp.status_code >= 300:
+                    raise Exception(f"HTTP {stamp.status_code}: {stamp.text}")
             return {
                 'success': True,
                 'message': f'Update {total} vectors ke {target_collection} berhasil',
@@ -693,6 +987,10 @@ class QdrantService:
                 field_name=field_name,
                 field_schema=field_schema
             )
+            with self._schema_lock:
+                schema = self._schema_registry.get(target_collection)
+                if schema is not None:
+                    schema['payload_indexes'].add(field_name)
             operation_id = None
             try:
                 operation_id = getattr(op, 'operation_id', None)
@@ -737,6 +1035,10 @@ class QdrantService:
                 collection_name=target_collection,
                 field_name=field_name
             )
+            with self._schema_lock:
+                schema = self._schema_registry.get(target_collection)
+                if schema is not None:
+                    schema['payload_indexes'].discard(field_name)
             operation_id = None
             try:
                 operation_id = getattr(op, 'operation_id', None)
@@ -759,36 +1061,117 @@ class QdrantService:
 
     def _get_or_create_collection_by_name(self, collection_name: str):
         """Get atau create collection by direct name"""
-        try:
-            self.client.get_collection(collection_name)
-        except Exception:
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=self.vector_size,
-                    distance=Distance.COSINE
-                )
-            )
-            logger.info(f"🆕 Created new collection: {collection_name}")
+        self._ensure_collection(collection_name)
     
     def _ensure_collection_indexes(self, collection_name: str):
         """Ensure required indexes exist for collection"""
-        try:
-            # Create index for company_id if it doesn't exist
-            self.client.create_payload_index(
-                collection_name=collection_name,
-                field_name="metadata.company_id",
-                field_schema="keyword"
-            )
-            logger.info(f"✅ Ensured index for metadata.company_id in {collection_name}")
-        except Exception as e:
-            # Index might already exist, which is fine
-            logger.debug(f"Index creation result for {collection_name}: {e}")
+        self._ensure_payload_index(collection_name, "metadata.company_id", "keyword")
 
+    # ===== HYBRID RETRIEVAL =====
+    
+    @staticmethod
+    def _filter_to_json(search_filter: Any) -> Optional[Dict[str, Any]]:
+        """Filter SDK -> JSON body REST"""
+        if search_filter is None:
+            return None
+        if hasattr(search_filter, 'model_dump'):
+            return search_filter.model_dump(exclude_none=True)
+        if hasattr(search_filter, 'dict'):
+            return search_filter.dict(exclude_none=True)
+        return search_filter
+    
+    def _resolve_search_mode(self, search_mode: Optional[str], collection_name: str) -> str:
+        """Mode efektif: hybrid turun ke dense jika collection belum punya sparse vector"""
+        mode = (search_mode or self.search_mode or 'dense').lower()
+        if mode not in SEARCH_MODES:
+            logger.warning(f"⚠️ Unknown search mode '{mode}', using dense")
+            return 'dense'
+        if mode == 'hybrid' and not self.supports_hybrid(collection_name):
+            logger.info(f"ℹ️ Collection {collection_name} has no '{SPARSE_VECTOR_NAME}' sparse vector, using dense search")
+            return 'dense'
+        return mode
+    
+    def _fuse_rrf(self, ranked_lists: List[Tuple[str, List[Dict[str, Any]]]], top_k: int) -> List[Dict[str, Any]]:
+        """Reciprocal rank fusion: skor = sum 1/(k + rank) dari setiap daftar kandidat.
+        
+        similarity_score adalah skor fusion yang dinormalisasi ke [0, 1] (1 = peringkat pertama
+        di semua daftar); skor asli tersedia di dense_score/sparse_score.
+        """
+        k = self.hybrid_rrf_k
+        fused: Dict[Any, Dict[str, Any]] = {}
+        for source, items in ranked_lists:
+            for rank, item in enumerate(items, start=1):
+                point_id = item.get('id')
+                entry = fused.get(point_id)
+                if entry is None:
+                    payload = item.get('payload') or {}
+                    entry = fused[point_id] = {
+                        'id': point_id,
+                        'text': payload.get('text', ''),
+                        'metadata': payload.get('metadata', {}),
+                        'dense_score': None,
+                        'sparse_score': None,
+                        'fusion_score': 0.0
+                    }
+                entry[f'{source}_score'] = item.get('score')
+                entry['fusion_score'] += 1.0 / (k + rank)
+        
+        max_score = max(len(ranked_lists), 1) / (k + 1.0)
+        ranked = sorted(fused.values(), key=lambda entry: entry['fusion_score'], reverse=True)[:int(top_k)]
+        for entry in ranked:
+            entry['distance'] = entry['dense_score']
+            entry['similarity_score'] = round(entry['fusion_score'] / max_score, 6)
+            entry['retrieval_mode'] = 'hybrid'
+        return ranked
+    
+    def _hybrid_search_many(self, collection_name: str, embeddings: List[List[float]], queries: List[str],
+                            filters: List[Optional[Dict[str, Any]]], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Dense + sparse untuk banyak query dalam SATU request /points/query/batch, lalu RRF per query"""
+        candidates = max(int(top_k) * self.hybrid_prefetch_factor, int(top_k))
+        encoder = get_sparse_encoder()
+        dense_params = self._search_params_json(collection_name)
+        requests_body: List[Dict[str, Any]] = []
+        layout: List[List[Tuple[str, int]]] = []
+        for vector, query, query_filter in zip(embeddings, queries, filters):
+            sources = []
+            dense_request = {'query': vector, 'limit': candidates, 'with_payload': True}
+            if dense_params:
+                dense_request['params'] = dense_params
+            sparse = encoder.encode_query(query or '')
+            sparse_request = {'query': sparse, 'using': SPARSE_VECTOR_NAME, 'limit': candidates, 'with_payload': True}
+            for source, request_body in (('dense', dense_request), ('sparse', sparse_request)):
+                if source == 'sparse' and not sparse['indices']:
+                    continue
+                if query_filter:
+                    request_body['filter'] = query_filter
+                sources.append((source, len(requests_body)))
+                requests_body.append(request_body)
+            layout.append(sources)
+        
+        resp = self.http.post(f"/collections/{collection_name}/points/query/batch",
+                              json={'requests': requests_body}, operation='batch')
+        if resp.status_code < 200 or resp.status_code >= 300:
+            raise Exception(f"HTTP {resp.status_code}: {resp.text}")
+        groups = (resp.json() or {}).get('result') or []
+        
+        results: List[List[Dict[str, Any]]] = []
+        for sources in layout:
+            ranked_lists = []
+            for source, position in sources:
+                group = groups[position] if position < len(groups) else []
+                points = group.get('points', []) if isinstance(group, dict) else (group or [])
+                ranked_lists.append((source, points))
+            results.append(self._fuse_rrf(ranked_lists, top_k))
+        return results
+    
     def search_documents(self, company_id: str, query: str, top_k: int = 10, 
                         collection: str = 'default', filters: Optional[Dict] = None, 
-                        query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
-        """Search documents di Qdrant collection dengan fallback"""
+                        query_embedding: Optional[List[float]] = None,
+                        search_mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search documents di Qdrant collection dengan fallback.
+        
+        search_mode: 'dense' (default QDRANT_SEARCH_MODE) atau 'hybrid' (dense + BM25 dengan RRF).
+        """
         if not self.qdrant_available:
             logger.warning("Qdrant tidak tersedia, return empty search results")
             return []
@@ -829,32 +1212,28 @@ class QdrantService:
                         )
                 search_filter = Filter(must=conditions)
             
-            # Gunakan SDK resmi agar format body selalu sesuai versi Qdrant
+            if self._resolve_search_mode(search_mode, collection_name) == 'hybrid':
+                search_results = self._hybrid_search_many(
+                    collection_name, [query_embedding], [query], [self._filter_to_json(search_filter)], top_k
+                )[0]
+                logger.info(f"🔍 Hybrid search completed: {len(search_results)} results for query: '{query[:50]}...'")
+                return search_results
+            
+            # Gunakan SDK resmi agar format body selalu sesuai versi Qdrant.
+            # Hasil kosong dikembalikan apa adanya: mengulang tanpa filter bisa membocorkan
+            # dokumen company lain
             response = self.client.query_points(
                 collection_name=collection_name,
                 query=query_embedding,
                 limit=int(top_k),
                 with_payload=True,
-                query_filter=search_filter
+                query_filter=search_filter,
+                search_params=self._search_params(collection_name)
             )
 
             # Extract hits dari QueryResponse object
             hits = getattr(response, 'points', []) if hasattr(response, 'points') else []
 
-            # Auto-retry tanpa filter jika hasil kosong (untuk kasus metadata/company_id tidak match)
-            if (not hits or len(hits) == 0) and search_filter is not None:
-                try:
-                    logger.info("ℹ️ No hits with filter; retrying without filter for diagnostics")
-                    response_no_filter = self.client.query_points(
-                        collection_name=collection_name,
-                        query=query_embedding,
-                        limit=int(top_k),
-                        with_payload=True
-                    )
-                    hits = getattr(response_no_filter, 'points', []) if hasattr(response_no_filter, 'points') else []
-                except Exception:
-                    pass
-
             # Normalisasi hasil ke format lama agar non-redundant untuk pemanggil eksisting
             search_results: List[Dict[str, Any]] = []
             for h in hits or []:
@@ -872,15 +1251,19 @@ class QdrantService:
             
         except Exception as e:
             logger.error(f"❌ Error searching documents: {e}")
+            self._forget_if_collection_missing(e)
             return []
 
     def search_documents_batch(self, *, company_id: str, embeddings: List[List[float]], top_k: int = 10,
-                               collection: str = 'default', filters: Optional[List[Optional[Dict]]] = None
+                               collection: str = 'default', filters: Optional[List[Optional[Dict]]] = None,
+                               queries: Optional[List[str]] = None, search_mode: Optional[str] = None
                                ) -> List[List[Dict[str, Any]]]:
         """Batch similarity search menggunakan endpoint POST /collections/:collection_name/points/query/batch.
 
         - embeddings: daftar vektor query.
         - filters: opsional daftar filter per-query (panjang sama dengan embeddings) atau None untuk tanpa filter.
+        - queries + search_mode='hybrid': text query untuk sparse BM25; dense dan sparse semua query
+          dikirim dalam satu request batch lalu digabung dengan RRF.
         - Keluaran: list per-query dari list hasil yang sudah ternormalisasi: [{id, text, metadata, distance, similarity_score}]
         """
         if not self.qdrant_available or not QDRANT_AVAILABLE or not self.client:
@@ -892,15 +1275,29 @@ class QdrantService:
             collection_name = self._get_or_create_collection(company_id, collection or 'default')
             self._ensure_collection_indexes(collection_name)
 
+            has_per_query_filters = isinstance(filters, list) and len(filters) == len(embeddings)
+            
+            if (isinstance(queries, list) and len(queries) == len(embeddings)
+                    and self._resolve_search_mode(search_mode, collection_name) == 'hybrid'):
+                query_filters = [
+                    self._filter_to_json(self._build_filter(filters[idx])) if has_per_query_filters and filters[idx] else None
+                    for idx in range(len(embeddings))
+                ]
+                normalized = self._hybrid_search_many(collection_name, embeddings, queries, query_filters, top_k)
+                logger.info(f"🔍 Hybrid batch search completed: {sum(len(g) for g in normalized)} total results across {len(normalized)} queries")
+                return normalized
+
             # Siapkan body batch
+            search_params = self._search_params_json(collection_name)
             requests_body: List[Dict[str, Any]] = []
-            has_per_query_filters = isinstance(filters, list) and len(filters) == len(embeddings)
             for idx, vec in enumerate(embeddings):
                 req: Dict[str, Any] = {
                     'query': { 'vector': vec },
                     'limit': int(top_k),
                     'with_payload': True
                 }
+                if search_params:
+                    req['params'] = search_params
                 # Tambahkan filter per-query jika diberikan
                 if has_per_query_filters and filters[idx]:
                     qdr_filter = self._build_filter(filters[idx])
@@ -911,10 +1308,8 @@ class QdrantService:
                             pass
                 requests_body.append(req)
 
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            url = f"{self.url}/collections/{collection_name}/points/query/batch"
-            resp = httpx.post(url, json={'requests': requests_body}, headers=headers, timeout=60.0)
+            resp = self.http.post(f"/collections/{collection_name}/points/query/batch",
+                                  json={'requests': requests_body}, operation='batch')
             if resp.status_code < 200 or resp.status_code >= 300:
                 raise Exception(f"HTTP {resp.status_code}: {resp.text}")
 
@@ -939,6 +1334,7 @@ class QdrantService:
             return normalized
         except Exception as e:
             logger.error(f"❌ Error batch searching documents: {e}")
+            self._forget_if_collection_missing(e)
             return []
     
     def delete_documents(self, company_id: str, document_ids: List[str], 
@@ -961,6 +1357,7 @@ class QdrantService:
                 points_selector=document_ids
             )
             
+            self._invalidate_response_cache(collection_name)
             logger.info(f"🗑️ Deleted {len(document_ids)} documents from collection: {collection_name}")
             return True
             
@@ -1006,6 +1403,7 @@ class QdrantService:
                         points_selector=[document_id]
                     )
                     deleted_from_collections.append(collection_name)
+                    self._invalidate_response_cache(collection_name, {str(document_id)})
                     logger.info(f"🗑️ Deleted document {document_id} from collection: {collection_name}")
                 except Exception as e:
                     # Document mungkin tidak ada di collection ini, lanjutkan
@@ -1058,14 +1456,7 @@ class QdrantService:
             collection_name = self._get_or_create_collection(company_id, collection)
             
             # Gunakan raw API call untuk menghindari masalah validasi Pydantic
-            import httpx
-            
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = httpx.get(
-                f"{self.url}/collections/{collection_name}",
-                headers=headers,
-                timeout=10.0
-            )
+            response = self.http.get(f"/collections/{collection_name}")
             
             if response.status_code == 200:
                 detail_data = response.json()
@@ -1127,16 +1518,7 @@ class QdrantService:
                     # Tambahkan points_count dan config jika bisa diambil
                     try:
                         # Gunakan raw API call untuk menghindari masalah validasi Pydantic
-                        import httpx
-                        import json
-                        
-                        # Ambil detail collection dengan raw HTTP request
-                        headers = {"Authorization": f"Bearer {self.api_key}"}
-                        response = httpx.get(
-                            f"{self.url}/collections/{collection_name}",
-                            headers=headers,
-                            timeout=10.0
-                        )
+                        response = self.http.get(f"/collections/{collection_name}")
                         
                         if response.status_code == 200:
                             detail_data = response.json()
@@ -1217,11 +1599,8 @@ class QdrantService:
                 'message': 'Qdrant tidak tersedia'
             }
         try:
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            url = f"{self.url}/collections/{collection_name}/points/query"
             # Kirim body persis seperti diterima agar fleksibel (prefetch, fusion, recommend, dsb.)
-            resp = httpx.post(url, json=body or {}, headers=headers, timeout=30.0)
+            resp = self.http.post(f"/collections/{collection_name}/points/query", json=body or {})
             data = resp.json() if resp.content else {}
             if 200 <= resp.status_code < 300:
                 return {
@@ -1252,10 +1631,7 @@ class QdrantService:
                 'message': 'Qdrant tidak tersedia'
             }
         try:
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            url = f"{self.url}/collections/{collection_name}/points/query/batch"
-            resp = httpx.post(url, json=body or {}, headers=headers, timeout=60.0)
+            resp = self.http.post(f"/collections/{collection_name}/points/query/batch", json=body or {}, operation='batch')
             data = resp.json() if resp.content else {}
             if 200 <= resp.status_code < 300:
                 return {
@@ -1286,10 +1662,7 @@ class QdrantService:
                 'message': 'Qdrant tidak tersedia'
             }
         try:
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            url = f"{self.url}/collections/{collection_name}/points/query/groups"
-            resp = httpx.post(url, json=body or {}, headers=headers, timeout=60.0)
+            resp = self.http.post(f"/collections/{collection_name}/points/query/groups", json=body or {})
             data = resp.json() if resp.content else {}
             if 200 <= resp.status_code < 300:
                 return {
@@ -1320,10 +1693,7 @@ class QdrantService:
                 'message': 'Qdrant tidak tersedia'
             }
         try:
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            url = f"{self.url}/collections/{collection_name}/points/search/matrix/pairs"
-            resp = httpx.post(url, json=body or {}, headers=headers, timeout=60.0)
+            resp = self.http.post(f"/collections/{collection_name}/points/search/matrix/pairs", json=body or {}, operation='batch')
             data = resp.json() if resp.content else {}
             if 200 <= resp.status_code < 300:
                 return {
@@ -1354,10 +1724,7 @@ class QdrantService:
                 'message': 'Qdrant tidak tersedia'
             }
         try:
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            url = f"{self.url}/collections/{collection_name}/points/search/matrix/offsets"
-            resp = httpx.post(url, json=body or {}, headers=headers, timeout=60.0)
+            resp = self.http.post(f"/collections/{collection_name}/points/search/matrix/offsets", json=body or {}, operation='batch')
             data = resp.json() if resp.content else {}
             if 200 <= resp.status_code < 300:
                 return {
@@ -1385,14 +1752,7 @@ class QdrantService:
             }
         try:
             # Gunakan raw API call untuk menghindari masalah validasi Pydantic
-            import httpx
-            
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = httpx.get(
-                f"{self.url}/collections/{collection_name}",
-                headers=headers,
-                timeout=10.0
-            )
+            response = self.http.get(f"/collections/{collection_name}")
             
             if response.status_code == 200:
                 detail_data = response.json()
@@ -1446,13 +1806,7 @@ class QdrantService:
                 'message': 'Qdrant tidak tersedia'
             }
         try:
-            import httpx
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            response = httpx.get(
-                f"{self.url}/collections/{collection_name}",
-                headers=headers,
-                timeout=10.0
-            )
+            response = self.http.get(f"/collections/{collection_name}")
             # Kembalikan persis struktur dari Qdrant (JSON)
             data = response.json() if response.content else {}
             if 200 <= response.status_code < 300:
@@ -1472,10 +1826,12 @@ class QdrantService:
                 'message': str(e)
             }
 
-    def create_collection(self, collection_name: str, vector_size: int = None, distance: str = 'Cosine') -> Dict[str, Any]:
+    def create_collection(self, collection_name: str, vector_size: int = None, distance: str = 'Cosine',
+                          profile: Optional[str] = None) -> Dict[str, Any]:
         """Buat collection secara eksplisit (by name) mengikuti Qdrant REST semantics.
         - distance: 'Cosine' | 'Dot' | 'Euclid'
-        Return: { success, message, data: { collection_name, vector_size, distance } }
+        - profile: nama profil collection (default: profil company dari config)
+        Return: { success, message, data: { collection_name, vector_size, distance, profile } }
         """
         if not self.qdrant_available or not QDRANT_AVAILABLE or not self.client:
             return { 'success': False, 'message': 'Qdrant tidak tersedia', 'data': {} }
@@ -1493,20 +1849,21 @@ class QdrantService:
             else:
                 dist_enum = Distance.COSINE
 
+            collection_profile = self.get_collection_profile(collection_name, profile)
             op = self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=size, distance=dist_enum)
+                **self._collection_create_kwargs(size, dist_enum, collection_profile)
             )
+            self._register_collection(collection_name, {
+                'vector_size': size,
+                'distance': getattr(dist_enum, 'value', 'Cosine'),
+                'payload_indexes': set(),
+                'sparse_vectors': {SPARSE_VECTOR_NAME} if self.hybrid_enabled else set(),
+                'quantization': collection_profile['quantization']
+            })
 
             # Optional: buat index penting untuk RAG
-            try:
-                self.client.create_payload_index(
-                    collection_name=collection_name,
-                    field_name="metadata.company_id",
-                    field_schema="keyword"
-                )
-            except Exception:
-                pass
+            self._ensure_payload_index(collection_name, "metadata.company_id", "keyword")
 
             # Normalisasi response
             result_true = True
@@ -1523,12 +1880,15 @@ class QdrantService:
                     'collection_name': collection_name,
                     'vector_size': size,
                     'distance': 'Cosine' if dist_enum == Distance.COSINE else ('Dot' if dist_enum == Distance.DOT else 'Euclid'),
+                    'profile': collection_profile['name'],
                     'result': result_true
                 }
             }
         except Exception as e:
             # Jika already exists, anggap sukses idempotent
             if 'already exists' in str(e).lower():
+                # Schema asli bisa berbeda dari argumen; baca ulang saat dipakai
+                self._forget_collection(collection_name)
                 return {
                     'success': True,
                     'message': 'Collection already exists',
@@ -1558,12 +1918,9 @@ class QdrantService:
                     pass
             except Exception:
                 pass
-            # bersihkan cache koleksi lokal jika ada
-            try:
-                if collection_name in self.collections:
-                    del self.collections[collection_name]
-            except Exception:
-                pass
+            # bersihkan schema registry dan jawaban ter-cache untuk koleksi ini
+            self._forget_collection(collection_name)
+            self._invalidate_response_cache(collection_name)
             return {
                 'success': True,
                 'message': 'Collection deleted successfully',
@@ -1575,6 +1932,7 @@ class QdrantService:
         except Exception as e:
             # Jika not found, anggap idempotent sukses
             if 'not found' in str(e).lower() or 'does not exist' in str(e).lower():
+                self._forget_collection(collection_name)
                 return {
                     'success': True,
                     'message': 'Collection not found, treated as deleted',
@@ -1586,6 +1944,240 @@ class QdrantService:
             logger.error(f"❌ Error deleting collection '{collection_name}': {e}")
             return { 'success': False, 'message': str(e), 'data': {} }
 
+    # ===== PROFILE MIGRATION (ALIAS SWAP) =====
+
+    def _resolve_alias(self, name: str) -> Optional[str]:
+        """Collection fisik di balik alias `name`; None jika `name` bukan alias"""
+        for alias in getattr(self.client.get_aliases(), 'aliases', None) or []:
+            if alias.alias_name == name:
+                return alias.collection_name
+        return None
+
+    def _copy_points(self, source: str, target: str, batch_size: int, *, since: Optional[float] = None,
+                     keep_newer: bool = False) -> int:
+        """Salin points (payload + vector) source -> target per halaman scroll.
+
+        - since: hanya points dengan updated_at >= since (catch-up setelah snapshot)
+        - keep_newer: lewati point yang versi di target lebih baru (catch-up setelah alias dipindah)
+        Cap updated_at dari source dipertahankan agar catch-up berikutnya tetap akurat.
+        """
+        with_sparse = self.supports_hybrid(target)
+        scroll_filter = {'must': [{'key': UPDATED_AT_FIELD, 'range': {'gte': since}}]} if since is not None else None
+        copied = 0
+        offset = None
+        while True:
+            page = self.scroll_points(collection_name=source, filter=scroll_filter, limit=batch_size,
+                                      offset=offset, with_vectors=True)
+            if not page.get('success'):
+                raise Exception(page.get('message'))
+            points = []
+            for point in page['data']['points']:
+                vector = point.get('vector')
+                # Sparse vector source dibuang jika target tanpa sparse; dense polos diberi BM25 oleh upsert_points
+                if isinstance(vector, dict) and not with_sparse:
+                    vector = vector.get('')
+                if vector is not None:
+                    points.append({'id': point['id'], 'vector': vector, 'payload': point.get('payload') or {}})
+            if points and keep_newer:
+                points = self._without_newer_in_target(target, points)
+            if points:
+                result = self.upsert_points(collection_name=target, points=points, stamp_updated_at=False)
+                if not result.get('success'):
+                    raise Exception(result.get('message'))
+                copied += result['data']['points_upserted']
+            offset = page['data'].get('next_page_offset')
+            if offset is None:
+                return copied
+
+    def _without_newer_in_target(self, target: str, points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Buang points yang di target sudah punya updated_at lebih baru (ditulis setelah alias dipindah)"""
+        existing = self.retrieve_points(collection_name=target, ids=[p['id'] for p in points])
+        if not existing.get('success'):
+            raise Exception(existing.get('message'))
+        target_stamps = {p['id']: (p.get('payload') or {}).get(UPDATED_AT_FIELD) or 0 for p in existing['data']}
+        return [p for p in points
+                if (p['payload'].get(UPDATED_AT_FIELD) or 0) > target_stamps.get(p['id'], -1)]
+
+    def _point_ids(self, collection_name: str, batch_size: int = 1000) -> set:
+        """Semua id point di collection (scroll tanpa payload/vector)"""
+        ids = set()
+        offset = None
+        while True:
+            page = self.scroll_points(collection_name=collection_name, limit=batch_size, offset=offset,
+                                      with_payload=False)
+            if not page.get('success'):
+                raise Exception(page.get('message'))
+            ids.update(point['id'] for point in page['data']['points'])
+            offset = page['data'].get('next_page_offset')
+            if offset is None:
+                return ids
+
+    def _sync_points(self, source: str, target: str, since: float, batch_size: int) -> Dict[str, int]:
+        """Catch-up satu pass: salin points yang berubah sejak `since`, lalu samakan himpunan id
+        (point yang dihapus di source dihapus dari target, point tanpa cap updated_at yang belum ada disalin)"""
+        copied = self._copy_points(source, target, batch_size, since=max(0.0, since - self.migration_clock_skew))
+        source_ids, target_ids = self._point_ids(source), self._point_ids(target)
+        removed = list(target_ids - source_ids)
+        if removed:
+            result = self.delete_points(collection_name=target, ids=removed)
+            if not result.get('success'):
+                raise Exception(result.get('message'))
+        missing = list(source_ids - target_ids)
+        for i in range(0, len(missing), batch_size):
+            page = self.retrieve_points(collection_name=source, ids=missing[i:i + batch_size], with_vectors=True)
+            if not page.get('success'):
+                raise Exception(page.get('message'))
+            points = [{'id': p['id'], 'vector': p['vector'], 'payload': p.get('payload') or {}}
+                      for p in page['data'] if p.get('vector') is not None]
+            if points:
+                result = self.upsert_points(collection_name=target, points=points, stamp_updated_at=False)
+                if not result.get('success'):
+                    raise Exception(result.get('message'))
+                copied += result['data']['points_upserted']
+        counts = [self.count_points(collection_name=name) for name in (source, target)]
+        if not all(result.get('success') for result in counts):
+            raise Exception(f"Gagal menghitung points: {[result.get('message') for result in counts]}")
+        source_count, target_count = (result['data']['count'] for result in counts)
+        return {'copied': copied, 'removed': len(removed), 'source_count': source_count,
+                'target_count': target_count}
+
+    def _update_aliases(self, *operations):
+        self.client.update_collection_aliases(change_aliases_operations=list(operations))
+
+    def migrate_collection_profile(self, collection_name: str, profile: str, *, batch_size: int = 256,
+                                   drop_old: bool = False, max_sync_passes: int = 3) -> Dict[str, Any]:
+        """Pindahkan collection ke profil lain tanpa downtime: buat collection fisik baru dengan profil
+        tersebut, salin semua points, lalu arahkan alias `collection_name` ke collection baru.
+
+        - Setelah salinan penuh, pass catch-up menyalin points dengan updated_at sejak awal pass
+          sebelumnya dan menyamakan himpunan id (delete), sampai satu pass tidak menemukan perubahan.
+        - Jika `collection_name` sudah alias, swap dilakukan atomik lalu satu catch-up lagi dari
+          collection lama (write yang masuk sebelum swap); collection lama disimpan kecuali drop_old.
+        - Migrasi pertama collection fisik (belum alias): alias sementara `<nama>__cutover` ke collection
+          baru dibuat lebih dulu (selama alias ini ada, _ensure_collection tidak akan membuat collection
+          kosong bernama sama), lalu catch-up terakhir. Qdrant tidak bisa membuat alias dengan nama
+          collection yang masih ada, jadi collection lama baru dihapus setelah salinan lengkap dapat
+          diakses lewat alias sementara; write ke nama lama di antara catch-up terakhir dan pembuatan
+          alias gagal (tidak membuat collection baru). Jalankan saat ingestion sepi.
+
+        Return: { success, message, data: { collection_name, previous_collection, new_collection, profile, ... } }
+        """
+        if not self.qdrant_available or not QDRANT_AVAILABLE or not self.client:
+            return { 'success': False, 'message': 'Qdrant tidak tersedia', 'data': {} }
+        if profile not in self.profiles.profiles:
+            return { 'success': False, 'message': f"Profil tidak dikenal: {profile}", 'data': {} }
+        cutover_alias = collection_name + CUTOVER_ALIAS_SUFFIX
+        # True selama alias sementara ada dan collection lama belum dihapus (boleh dilepas saat gagal)
+        release_cutover = False
+        try:
+            alias_target = self._resolve_alias(collection_name)
+            source = alias_target or collection_name
+            source_schema = self._fetch_collection_schema(source)
+            if source_schema is None:
+                return { 'success': False, 'message': f"Collection {collection_name} tidak ditemukan", 'data': {} }
+
+            details = self.get_collection_details_raw(source)
+            payload_schema = (((details.get('data') or {}).get('result') or {}).get('payload_schema')) or {}
+
+            # Collection fisik baru dengan profil target
+            target = f"{collection_name}__{profile}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            distance = source_schema.get('distance') or 'Cosine'
+            created = self.create_collection(target, source_schema.get('vector_size') or self.vector_size,
+                                             distance, profile=profile)
+            if not created.get('success') or created.get('message') == 'Collection already exists':
+                return { 'success': False, 'message': f"Gagal membuat {target}: {created.get('message')}", 'data': {} }
+            # Payload index dibuat sebelum penyalinan agar terbangun bersama data
+            for field_name, field_info in payload_schema.items():
+                self._ensure_payload_index(target, field_name, (field_info or {}).get('data_type', 'keyword'))
+            # Filter range catch-up di source dan di collection baru (untuk migrasi berikutnya)
+            self._ensure_payload_index(source, UPDATED_AT_FIELD, 'float')
+            self._ensure_payload_index(target, UPDATED_AT_FIELD, 'float')
+            logger.info(f"🔄 Migrating {source} -> {target} (profile: {profile})")
+
+            since = time.time()
+            copied = self._copy_points(source, target, batch_size)
+            synced: Dict[str, int] = {}
+            for _ in range(max_sync_passes):
+                pass_started = time.time()
+                synced = self._sync_points(source, target, since, batch_size)
+                copied += synced['copied']
+                since = pass_started
+                if not synced['copied'] and not synced['removed']:
+                    break
+                logger.info(f"🔄 Catch-up {source} -> {target}: {synced}")
+
+            create_alias = CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=collection_name))
+            if alias_target is not None:
+                self._update_aliases(
+                    DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=collection_name)),
+                    create_alias
+                )
+                swap = 'atomic'
+                # Write yang masih masuk ke collection lama sebelum swap; versi yang lebih baru di target dipertahankan
+                copied += self._copy_points(source, target, batch_size,
+                                            since=since - self.migration_clock_skew, keep_newer=True)
+            else:
+                self._update_aliases(CreateAliasOperation(create_alias=CreateAlias(collection_name=target,
+                                                                                   alias_name=cutover_alias)))
+                release_cutover = True
+                synced = self._sync_points(source, target, since, batch_size)
+                copied += synced['copied']
+                if synced['source_count'] != synced['target_count']:
+                    raise Exception(f"Jumlah points tidak sama setelah catch-up terakhir: {synced}")
+                self.client.delete_collection(collection_name=collection_name)
+                # Mulai sini alias sementara adalah satu-satunya jalan ke data: jangan dilepas sebelum alias utama ada
+                release_cutover = False
+                self._forget_collection(collection_name)
+                for attempt in range(3):
+                    try:
+                        self._update_aliases(create_alias)
+                        break
+                    except Exception as e:
+                        if attempt == 2:
+                            # Data aman di collection baru dan tetap terjangkau lewat alias sementara
+                            logger.error(f"❌ Alias {collection_name} -> {target} gagal dibuat: {e}")
+                            return {
+                                'success': False,
+                                'message': f"Collection lama sudah dihapus tetapi alias {collection_name} gagal dibuat: {e}. "
+                                           f"Data ada di {target} (alias {cutover_alias}); jalankan ulang pembuatan alias",
+                                'data': {'new_collection': target, 'cutover_alias': cutover_alias}
+                            }
+                        time.sleep(0.5 * (attempt + 1))
+                self._update_aliases(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=cutover_alias)))
+                swap = 'initial'
+            self._forget_collection(collection_name)
+            self._forget_collection(source)
+            target_count = self.count_points(collection_name=target).get('data', {}).get('count')
+            logger.info(f"✅ Alias {collection_name} -> {target} ({swap} swap, {target_count} points)")
+
+            dropped = False
+            if drop_old and alias_target is not None:
+                dropped = self.delete_collection(alias_target).get('success', False)
+
+            return {
+                'success': True,
+                'message': f"Collection {collection_name} dimigrasi ke profil {profile}",
+                'data': {
+                    'collection_name': collection_name,
+                    'previous_collection': source,
+                    'previous_collection_kept': alias_target is not None and not dropped,
+                    'new_collection': target,
+                    'profile': profile,
+                    'points_copied': copied,
+                    'points_count': target_count,
+                    'swap': swap
+                }
+            }
+        except Exception as e:
+            logger.error(f"❌ Error migrating collection '{collection_name}' to profile '{profile}': {e}")
+            if release_cutover:
+                # Collection lama belum dihapus: lepas alias sementara agar _ensure_collection normal kembali
+                try:
+                    self._update_aliases(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=cutover_alias)))
+                except Exception as cleanup_error:
+                    logger.warning(f"⚠️ Failed to remove alias {cutover_alias}: {cleanup_error}")
+            return { 'success': False, 'message': str(e), 'data': {} }
+
     def get_documents(self, company_id: str, limit: int = 10, offset: int = 0, status: str = '') -> Dict[str, Any]:
         """Ambil daftar dokumen RAG dari database untuk tampilan di UI.
         Diselaraskan dengan kebutuhan controller qdrant_knowledge_base_controller.
@@ -1700,6 +2292,7 @@ class QdrantService:
                 'url': self.url,
                 'collections_count': len(collections.collections),
                 'vector_size': self.vector_size,
+                'http_transport': self.http.get_stats() if self.http else None,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query Embedding Service untuk KSM Main Backend
+Layer embedding query bersama untuk semua entry point RAG (/query, /query/batch, Telegram).
+
+- Memakai UnifiedEmbeddingService bersama, jadi embedding query mengikuti EMBEDDING_PROVIDER yang sama
+  dengan embedding dokumen (client dan cache tidak dibuat ulang per request)
+- Query dinormalisasi (unicode NFKC, whitespace, huruf kecil) sebelum di-cache dan di-embed
+- Query identik dalam satu batch di-dedupe; semua miss di-embed dengan satu panggilan embed_texts
+- Thread yang meminta query yang sedang di-embed thread lain menunggu hasilnya, bukan memanggil API lagi
+"""
+
+import os
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from .unified_embedding_service import get_unified_embedding_service
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: Any) -> str:
+    """Bentuk kanonik query untuk cache key dan input embedding"""
+    text = unicodedata.normalize('NFKC', str(query) if query is not None else '')
+    return ' '.join(text.split()).casefold()
+
+
+class QueryEmbeddingService:
+    """Embedding query dengan LRU in-process, dedupe per batch, dan coalescing antar thread"""
+
+    def __init__(self, embedding_service=None):
+        self.embedding_service = embedding_service or get_unified_embedding_service()
+        self.max_entries = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '2000'))
+        self.ttl = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL', '3600'))
+        # Batas waktu menunggu embedding yang sedang dikerjakan thread lain (detik)
+        self.wait_timeout = float(os.getenv('QUERY_EMBEDDING_WAIT_TIMEOUT', '30'))
+
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'queries': 0,
+            'cache_hits': 0,
+            'deduplicated': 0,
+            'coalesced': 0,
+            'embedded': 0,
+            'api_calls': 0,
+            'failures': 0
+        }
+
+    def _cache_get(self, key: str) -> Optional[List[float]]:
+        # Dipanggil dengan self._lock dipegang
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        vector, expires_at = entry
+        if expires_at <= time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return vector
+
+    def _cache_put(self, key: str, vector: List[float]):
+        # Dipanggil dengan self._lock dipegang
+        self._cache[key] = (vector, time.time() + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def embed_queries(self, queries: List[Any]) -> List[List[float]]:
+        """Embedding untuk setiap query, urutan sama dengan input.
+
+        Query kosong atau yang gagal di-embed menghasilkan [] (bukan zero vector),
+        sehingga pemanggil bisa melewati pencarian untuk query tersebut.
+        """
+        keys = [normalize_query(query) for query in queries]
+        unique_keys = list(dict.fromkeys(key for key in keys if key))
+        resolved: Dict[str, List[float]] = {}
+        owned: List[str] = []
+        waiting: Dict[str, threading.Event] = {}
+
+        with self._lock:
+            self.stats['queries'] += len(queries)
+            self.stats['deduplicated'] += sum(1 for key in keys if key) - len(unique_keys)
+            for key in unique_keys:
+                vector = self._cache_get(key)
+                if vector is not None:
+                    resolved[key] = vector
+                    self.stats['cache_hits'] += 1
+                elif key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                    self.stats['coalesced'] += 1
+                else:
+                    self._in_flight[key] = threading.Event()
+                    owned.append(key)
+
+        if owned:
+            resolved.update(self._embed_owned(owned))
+
+        for key, event in waiting.items():
+            event.wait(self.wait_timeout)
+            with self._lock:
+                vector = self._cache_get(key)
+            if vector is None:
+                # Thread pemilik gagal atau timeout: embed sendiri
+                vector = self._embed_direct(key)
+            resolved[key] = vector
+
+        return [resolved.get(key, []) if key else [] for key in keys]
+
+    def _embed_owned(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Embed query yang di-claim thread ini (satu panggilan embed_texts), lalu lepaskan penunggu"""
+        results: Dict[str, List[float]] = {}
+        try:
+            # Tanpa fallback: vektor pengganti (hash/local) tidak cocok dengan collection dan tidak boleh di-cache
+            vectors = self.embedding_service.embed_texts(keys, fallback=False)
+            with self._lock:
+                self.stats['api_calls'] += 1
+                for key, vector in zip(keys, vectors):
+                    # embed_texts mengembalikan zero vector saat gagal; jangan di-cache
+                    if vector and any(vector):
+                        self._cache_put(key, vector)
+                        results[key] = vector
+                        self.stats['embedded'] += 1
+                    else:
+                        self.stats['failures'] += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to embed {len(keys)} queries: {e}")
+            with self._lock:
+                self.stats['failures'] += len(keys)
+        finally:
+            with self._lock:
+                for key in keys:
+                    event = self._in_flight.pop(key, None)
+                    if event is not None:
+                        event.set()
+        return results
+
+    def _embed_direct(self, key: str) -> List[float]:
+        with self._lock:
+            self.stats['api_calls'] += 1
+        try:
+            vector = self.embedding_service.embed_texts([key], fallback=False)[0]
+        except Exception as e:
+            logger.error(f"❌ Failed to embed query: {e}")
+            vector = None
+        with self._lock:
+            if not vector or not any(vector):
+                self.stats['failures'] += 1
+                return []
+            self.stats['embedded'] += 1
+            self._cache_put(key, vector)
+        return vector
+
+    def embed_query(self, query: Any) -> List[float]:
+        """Embedding satu query; [] jika query kosong atau embedding gagal"""
+        return self.embed_queries([query])[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'cache_size': len(self._cache),
+                'cache_max_size': self.max_entries,
+                'in_flight': len(self._in_flight),
+                'model_name': self.embedding_service.model_name
+            }
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Global instance
+_query_embedding_service = None
+_query_embedding_service_lock = threading.Lock()
+
+
+def get_query_embedding_service() -> QueryEmbeddingService:
+    """Get global query embedding service instance"""
+    global _query_embedding_service
+    if _query_embedding_service is None:
+        with _query_embedding_service_lock:
+            if _query_embedding_service is None:
+                _query_embedding_service = QueryEmbeddingService()
+    return _query_embedding_service
@@ -10,14 +10,15 @@ import time
 import logging
 import hashlib
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable
 import threading
 
 # Import existing services (tanpa unified_rag_service; gunakan qdrant_service langsung)
 from domains.integration.services.agent_ai_sync_service import agent_ai_sync
-from .telegram_integration_service import telegram_integration
+from domains.notification.services.telegram_integration_service import telegram_integration
 from .qdrant_service import get_qdrant_service
-from .openai_embedding_service import OpenAIEmbeddingService
+from .query_embedding_service import get_query_embedding_service
+from .semantic_response_cache import get_semantic_response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,8 @@ class RAGEnhancedTelegramService:
     def __init__(self):
         # Initialize services
         self.qdrant_service = get_qdrant_service()
-        self.embedding_service = OpenAIEmbeddingService()
+        self.query_embedding_service = get_query_embedding_service()
+        self.semantic_cache = get_semantic_response_cache()
         self.agent_ai_sync = agent_ai_sync
         self.telegram_integration = telegram_integration
         
@@ -46,6 +48,8 @@ class RAGEnhancedTelegramService:
         # Telegram-specific RAG settings
         self.telegram_top_k = int(os.getenv('TELEGRAM_RAG_TOP_K', '5'))
         self.telegram_similarity_threshold = float(os.getenv('TELEGRAM_RAG_SIMILARITY_THRESHOLD', '0.3'))
+        # 'dense' | 'hybrid' (kosong = default QDRANT_SEARCH_MODE)
+        self.telegram_search_mode = os.getenv('TELEGRAM_RAG_SEARCH_MODE') or None
         self.telegram_max_context = int(os.getenv('TELEGRAM_RAG_MAX_CONTEXT', '8000'))
         
         # Cache settings
@@ -83,11 +87,12 @@ class RAGEnhancedTelegramService:
                 'timestamp': time.time()
             }
     
-    def _search_similar(self, company_id: str, query: str, top_k: int) -> List[Dict[str, Any]]:
+    def _search_similar(self, company_id: str, query: str, top_k: int,
+                        search_mode: Optional[str] = None) -> List[Dict[str, Any]]:
         """Cari chunk serupa menggunakan Qdrant secara langsung dan normalisasi hasil."""
         try:
             # Generate embedding
-            query_embedding = self.embedding_service.embed_text(query)
+            query_embedding = self.query_embedding_service.embed_query(query)
             if not query_embedding:
                 return []
             # Search via qdrant_service
@@ -96,7 +101,8 @@ class RAGEnhancedTelegramService:
                 query=query,
                 top_k=top_k,
                 collection='default',
-                query_embedding=query_embedding
+                query_embedding=query_embedding,
+                search_mode=search_mode or self.telegram_search_mode
             ) or []
             # Normalisasi ke struktur yang dipakai Telegram RAG enhanced
             normalized: List[Dict[str, Any]] = []
@@ -297,14 +303,77 @@ class RAGEnhancedTelegramService:
                 }
             }
     
+    def _semantic_cache_key(self, company_id: str, message: str, context: Dict[str, Any]) -> Tuple[str, List[float], List[str]]:
+        """(collection, embedding query, versi chunk hasil retrieval) untuk semantic response cache
+        
+        Versi chunk = chunk_id + hash isi chunk. chunk_id tetap sama saat dokumen di-ingest ulang,
+        jadi hash isi yang membuat jawaban lama tidak cocok lagi di semua worker, bukan hanya di
+        worker yang menjalankan ingest (invalidasi dari QdrantService hanya berlaku per proses).
+        """
+        scope = self.qdrant_service._get_collection_name(str(company_id), 'default')
+        # Embedding sudah dihitung saat retrieval; ini hit LRU QueryEmbeddingService
+        embedding = self.query_embedding_service.embed_query(message)
+        chunk_versions = [
+            f"{result.get('chunk_id')}@{hashlib.sha1((result.get('content') or '').encode('utf-8')).hexdigest()[:16]}"
+            for result in context.get('rag_results', []) if result.get('chunk_id')
+        ]
+        return scope, embedding, chunk_versions
+    
+    def _lookup_cached_response(self, company_id: str, message: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            scope, embedding, chunk_ids = self._semantic_cache_key(company_id, message, context)
+            cached = self.semantic_cache.lookup(scope, embedding, chunk_ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
+        if not cached:
+            return None
+        logger.info(f"📦 Semantic cache hit (similarity={cached['similarity']:.3f}) for query: {message[:50]}...")
+        return {
+            'success': True,
+            'data': dict(cached['response']),
+            'cached': True,
+            'method': 'semantic_cache',
+            'semantic_cache': {
+                'similarity': cached['similarity'],
+                'cached_query': cached['cached_query'],
+                'tokens_saved': cached['tokens_saved'],
+                'age_seconds': cached['age_seconds']
+            }
+        }
+    
+    def _store_cached_response(self, company_id: str, message: str, context: Dict[str, Any], data: Dict[str, Any]):
+        response_text = data.get('response') or ''
+        if not response_text:
+            return
+        try:
+            scope, embedding, chunk_ids = self._semantic_cache_key(company_id, message, context)
+            rag_results = context.get('rag_results', [])
+            document_ids = [
+                (result.get('metadata') or {}).get('document_id') or result.get('source_document')
+                for result in rag_results
+            ]
+            # Stream tidak selalu melaporkan usage; perkirakan ~4 karakter per token
+            tokens = data.get('tokens_used') or (
+                len(message) + sum(len(result.get('content', '')) for result in rag_results) + len(response_text)
+            ) // 4
+            self.semantic_cache.store(
+                scope, message, embedding, chunk_ids, document_ids,
+                {key: data.get(key) for key in ('response', 'model_used', 'tokens_used') if key in data},
+                tokens
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache store failed: {e}")
+    
     def process_telegram_message(self, user_id: int, message: str, session_id: str = None, 
-                               company_id: str = None) -> Dict[str, Any]:
+                               company_id: str = None,
+                               on_delta: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
         """
         Main method untuk memproses pesan Telegram dengan RAG + Agent AI
         
         Flow:
         1. Build RAG context
-        2. Send ke Agent AI dengan context
+        2. Send ke Agent AI dengan context (streaming jika `on_delta` diberikan)
         3. Handle response atau fallback
         """
         try:
@@ -319,6 +388,13 @@ class RAGEnhancedTelegramService:
             # Step 1: Build RAG context
             context = self._build_rag_context(company_id, message)
             
+            # Query serupa dengan chunk yang sama sudah pernah dijawab: lewati Agent AI
+            cached_response = self._lookup_cached_response(company_id, message, context)
+            if cached_response:
+                enhanced_response = self._handle_agent_ai_response(cached_response, context)
+                enhanced_response['processing_time'] = round(time.time() - start_time, 2)
+                return enhanced_response
+            
             # Step 2: Check Agent AI availability
             if not self.agent_ai_sync:
                 logger.warning("⚠️ Agent AI sync service not available, using RAG fallback")
@@ -337,16 +413,51 @@ class RAGEnhancedTelegramService:
             # Step 4: Send ke Agent AI
             logger.info(f"🤖 Sending message to Agent AI with {context.get('total_chunks', 0)} context chunks")
             
-            # Use existing telegram integration but with enhanced data
-            agent_response = self.telegram_integration.send_message_to_agent(
-                user_id=user_id,
-                message=message,
-                session_id=session_id,
-                company_id=company_id
-            )
+            agent_response = None
+            if on_delta is not None:
+                # Streaming ke endpoint RAG Agent AI dengan context yang sudah dibangun
+                stream_result = self.agent_ai_sync.send_rag_enhanced_message(
+                    user_id=user_id,
+                    message=message,
+                    context=context,
+                    session_id=formatted_message['session_id'],
+                    company_id=company_id,
+                    on_delta=on_delta
+                )
+                if stream_result.get('success'):
+                    agent_response = {
+                        'success': True,
+                        'data': stream_result['data'].get('data', {}),
+                        'streamed': True,
+                        'ttft_ms': stream_result.get('ttft_ms'),
+                        'response_time': stream_result.get('response_time'),
+                        'method': 'agent_ai_stream'
+                    }
+                elif stream_result.get('partial_response'):
+                    # Stream putus di tengah jawaban: jangan mengulang generate, pakai jawaban parsial
+                    logger.warning(f"⚠️ Agent AI stream interrupted: {stream_result.get('error')}")
+                    agent_response = {
+                        'success': True,
+                        'data': {'response': stream_result['partial_response'] + '\n\n(jawaban terpotong)'},
+                        'streamed': True,
+                        'method': 'agent_ai_stream_partial'
+                    }
+                else:
+                    logger.warning(f"⚠️ Agent AI stream failed before first token: {stream_result.get('error')}, using non-streaming request")
+            
+            if agent_response is None:
+                # Use existing telegram integration but with enhanced data
+                agent_response = self.telegram_integration.send_message_to_agent(
+                    user_id=user_id,
+                    message=message,
+                    session_id=session_id,
+                    company_id=company_id
+                )
             
             # Step 5: Handle response
             if agent_response.get('success'):
+                if agent_response.get('method') != 'agent_ai_stream_partial':
+                    self._store_cached_response(company_id, message, context, agent_response.get('data', {}))
                 enhanced_response = self._handle_agent_ai_response(agent_response, context)
                 processing_time = time.time() - start_time
                 enhanced_response['processing_time'] = round(processing_time, 2)
@@ -402,6 +513,7 @@ class RAGEnhancedTelegramService:
                 'cached_items': len(self._rag_cache),
                 'cache_ttl': self.rag_cache_ttl
             },
+            'semantic_cache': self.semantic_cache.get_stats(),
             'dependencies': {
                 'rag_service': 'available' if self.rag_service else 'unavailable',
                 'agent_ai_sync': 'available' if self.agent_ai_sync else 'unavailable',
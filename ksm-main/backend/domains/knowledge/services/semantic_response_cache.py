@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Semantic Response Cache untuk KSM Main Backend
+Cache jawaban Agent AI berdasarkan kemiripan embedding query, bukan teks persis.
+
+- Query baru dibandingkan (cosine) dengan query ter-cache terbaru di collection yang sama
+- Hit hanya valid jika himpunan chunk_id hasil retrieval saat ini sama dengan saat jawaban di-cache,
+  sehingga parafrase ("cara reset password" / "bagaimana reset kata sandi") dapat jawaban yang sama
+  selama context-nya sama
+- Entry dibuang saat dokumen sumbernya di-ingest ulang atau dihapus (dipanggil dari QdrantService)
+- Cache dan invalidasinya per proses: worker gunicorn lain tidak menerima invalidasi tersebut.
+  Karena itu pemanggil memakai chunk_id + hash isi chunk sebagai fingerprint (isi berubah atau
+  dokumen dihapus = himpunan chunk berbeda = miss di semua worker); TTL default pendek (600s)
+  sebagai batas tambahan
+- Statistik: hit rate, stale miss (query mirip tetapi chunk berubah), dan token LLM yang dihemat
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheScope:
+    """Entry cache satu collection beserta matriks embedding untuk pencarian cepat"""
+
+    def __init__(self):
+        self.entries: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._matrix = None
+        self._matrix_ids: List[int] = []
+
+    def invalidate_matrix(self):
+        self._matrix = None
+
+    def matrix(self):
+        if self._matrix is None and self.entries:
+            self._matrix_ids = list(self.entries.keys())
+            self._matrix = np.vstack([self.entries[entry_id]['embedding'] for entry_id in self._matrix_ids])
+        return self._matrix, self._matrix_ids
+
+
+class SemanticResponseCache:
+    """Cache jawaban per collection dengan lookup berbasis embedding"""
+
+    def __init__(self):
+        self.enabled = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+        self.similarity_threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+        self.ttl = int(os.getenv('SEMANTIC_CACHE_TTL', '600'))
+        self.max_entries = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '500'))  # per collection
+
+        self._scopes: Dict[str, _CacheScope] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'misses': 0,
+            'stale_misses': 0,
+            'stores': 0,
+            'invalidated': 0,
+            'tokens_saved': 0
+        }
+
+    @staticmethod
+    def _unit(embedding: Iterable[float]):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    @staticmethod
+    def _fingerprint(chunk_ids: Iterable[Any]) -> frozenset:
+        return frozenset(str(chunk_id) for chunk_id in chunk_ids if chunk_id not in (None, ''))
+
+    def _drop(self, scope: _CacheScope, entry_id: int):
+        # Dipanggil dengan self._lock dipegang
+        scope.entries.pop(entry_id, None)
+        scope.invalidate_matrix()
+
+    def lookup(self, scope_name: str, embedding: List[float], chunk_ids: Iterable[Any]) -> Optional[Dict[str, Any]]:
+        """Jawaban ter-cache untuk query yang mirip dengan chunk yang sama, atau None"""
+        if not self.enabled or embedding is None or len(embedding) == 0:
+            return None
+        query = self._unit(embedding)
+        if query is None:
+            return None
+        fingerprint = self._fingerprint(chunk_ids)
+
+        with self._lock:
+            self.stats['lookups'] += 1
+            scope = self._scopes.get(scope_name)
+            matrix, entry_ids = scope.matrix() if scope else (None, [])
+            if matrix is None or matrix.shape[1] != query.shape[0]:
+                self.stats['misses'] += 1
+                return None
+
+            similarities = matrix @ query
+            now = time.time()
+            stale = False
+            for index in np.argsort(-similarities):
+                similarity = float(similarities[index])
+                if similarity < self.similarity_threshold:
+                    break
+                entry = scope.entries.get(entry_ids[index])
+                if entry is None:
+                    continue
+                if entry['expires_at'] <= now:
+                    self._drop(scope, entry_ids[index])
+                    continue
+                if entry['chunk_ids'] != fingerprint:
+                    stale = True
+                    continue
+                entry['hits'] += 1
+                scope.entries.move_to_end(entry_ids[index])
+                self.stats['hits'] += 1
+                self.stats['tokens_saved'] += entry['tokens']
+                return {
+                    'response': entry['response'],
+                    'similarity': round(similarity, 4),
+                    'cached_query': entry['query'],
+                    'tokens_saved': entry['tokens'],
+                    'age_seconds': round(now - entry['created_at'], 1)
+                }
+
+            self.stats['misses'] += 1
+            if stale:
+                self.stats['stale_misses'] += 1
+            return None
+
+    def store(self, scope_name: str, query: str, embedding: List[float], chunk_ids: Iterable[Any],
+              document_ids: Iterable[Any], response: Dict[str, Any], tokens: int = 0):
+        """Simpan jawaban. `tokens`: token LLM yang dipakai (dihitung sebagai hemat saat hit)"""
+        if not self.enabled or embedding is None or len(embedding) == 0:
+            return
+        vector = self._unit(embedding)
+        if vector is None:
+            return
+        fingerprint = self._fingerprint(chunk_ids)
+
+        with self._lock:
+            scope = self._scopes.setdefault(scope_name, _CacheScope())
+            # Query (hampir) identik dengan context sama menggantikan entry lama, bukan menambah duplikat
+            matrix, entry_ids = scope.matrix()
+            if matrix is not None and matrix.shape[1] == vector.shape[0]:
+                for index in np.nonzero(matrix @ vector >= 0.99)[0]:
+                    entry = scope.entries.get(entry_ids[index])
+                    if entry is not None and entry['chunk_ids'] == fingerprint:
+                        self._drop(scope, entry_ids[index])
+            elif matrix is not None:
+                # Dimensi embedding berubah (model diganti): entry lama tidak bisa dibandingkan
+                scope.entries.clear()
+                scope.invalidate_matrix()
+
+            self._next_id += 1
+            now = time.time()
+            scope.entries[self._next_id] = {
+                'query': query,
+                'embedding': vector,
+                'chunk_ids': fingerprint,
+                'document_ids': frozenset(str(document_id) for document_id in document_ids if document_id),
+                'response': response,
+                'tokens': int(tokens or 0),
+                'created_at': now,
+                'expires_at': now + self.ttl,
+                'hits': 0
+            }
+            while len(scope.entries) > self.max_entries:
+                scope.entries.popitem(last=False)
+            scope.invalidate_matrix()
+            self.stats['stores'] += 1
+
+    def invalidate(self, scope_name: Optional[str] = None, document_ids: Optional[Iterable[Any]] = None) -> int:
+        """Buang entry yang memakai dokumen tertentu; tanpa document_ids seluruh collection (atau semua).
+
+        Return: jumlah entry yang dibuang.
+        """
+        with self._lock:
+            scopes = [scope_name] if scope_name else list(self._scopes.keys())
+            removed = 0
+            targets = None if document_ids is None else {str(document_id) for document_id in document_ids}
+            for name in scopes:
+                scope = self._scopes.get(name)
+                if not scope:
+                    continue
+                if targets is None:
+                    removed += len(scope.entries)
+                    del self._scopes[name]
+                    continue
+                for entry_id, entry in list(scope.entries.items()):
+                    if entry['document_ids'] & targets:
+                        self._drop(scope, entry_id)
+                        removed += 1
+            self.stats['invalidated'] += removed
+        if removed:
+            logger.info(f"🧹 Semantic cache: invalidated {removed} entries for {scope_name or 'all collections'}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, lookups = self.stats['hits'], self.stats['lookups']
+            return {
+                **self.stats,
+                'enabled': self.enabled,
+                'hit_rate': round(hits / lookups * 100.0, 2) if lookups else 0.0,
+                'entries': sum(len(scope.entries) for scope in self._scopes.values()),
+                'collections': len(self._scopes),
+                'similarity_threshold': self.similarity_threshold,
+                'ttl': self.ttl,
+                'max_entries_per_collection': self.max_entries
+            }
+
+
+# Global instance
+_semantic_response_cache = None
+_semantic_response_cache_lock = threading.Lock()
+
+
+def get_semantic_response_cache() -> SemanticResponseCache:
+    """Get global semantic response cache instance"""
+    global _semantic_response_cache
+    if _semantic_response_cache is None:
+        with _semantic_response_cache_lock:
+            if _semantic_response_cache is None:
+                _semantic_response_cache = SemanticResponseCache()
+    return _semantic_response_cache
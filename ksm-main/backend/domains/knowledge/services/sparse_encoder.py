@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sparse Encoder (BM25) untuk KSM Main Backend
+Sparse vector leksikal untuk hybrid retrieval di Qdrant.
+
+- Token dari chunking_service.tokenize_lexical (kata, angka, kode seperti "SOP-012")
+- Dokumen: bobot term frequency BM25 (saturasi k1, normalisasi panjang b)
+- Query: bobot 1 per token unik; IDF dihitung Qdrant lewat modifier "idf" pada sparse vector
+- Index token = hash blake2b 32-bit (stabil antar proses, tanpa vocabulary bersama)
+"""
+
+import os
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from .chunking_service import tokenize_lexical
+
+# Nama sparse vector di collection Qdrant
+SPARSE_VECTOR_NAME = 'bm25'
+
+
+class Bm25SparseEncoder:
+    """Encoder BM25 ke format sparse vector Qdrant {indices, values}"""
+
+    # Batas memo token -> index; dikosongkan penuh saat terlampaui
+    MAX_TOKEN_MEMO = 200000
+
+    def __init__(self):
+        self.k1 = float(os.getenv('BM25_K1', '1.2'))
+        self.b = float(os.getenv('BM25_B', '0.75'))
+        # Rata-rata panjang chunk dalam token leksikal (chunk default ~1200 karakter)
+        self.avg_doc_tokens = float(os.getenv('BM25_AVG_DOC_TOKENS', '150'))
+        self._token_memo: Dict[str, int] = {}
+        self._memo_lock = threading.Lock()
+
+    def _token_index(self, token: str) -> int:
+        index = self._token_memo.get(token)
+        if index is None:
+            index = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little')
+            with self._memo_lock:
+                if len(self._token_memo) >= self.MAX_TOKEN_MEMO:
+                    self._token_memo.clear()
+                self._token_memo[token] = index
+        return index
+
+    def _to_sparse(self, weights: Dict[int, float]) -> Dict[str, List]:
+        items: List[Tuple[int, float]] = sorted(weights.items())
+        return {
+            'indices': [index for index, _ in items],
+            'values': [round(value, 6) for _, value in items]
+        }
+
+    def encode_document(self, text: str) -> Dict[str, List]:
+        """Sparse vector dokumen/chunk dengan bobot TF BM25"""
+        counts = Counter(tokenize_lexical(text))
+        if not counts:
+            return {'indices': [], 'values': []}
+        doc_len = sum(counts.values())
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / self.avg_doc_tokens)
+        weights: Dict[int, float] = {}
+        for token, tf in counts.items():
+            index = self._token_index(token)
+            # Tabrakan hash digabung agar indices tetap unik
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1.0) / (tf + norm)
+        return self._to_sparse(weights)
+
+    def encode_query(self, text: str) -> Dict[str, List]:
+        """Sparse vector query: setiap token unik berbobot 1 (IDF ditambahkan Qdrant)"""
+        weights: Dict[int, float] = {}
+        for token in set(tokenize_lexical(text)):
+            weights[self._token_index(token)] = 1.0
+        return self._to_sparse(weights)
+
+
+# Global instance
+_sparse_encoder = None
+_sparse_encoder_lock = threading.Lock()
+
+
+def get_sparse_encoder() -> Bm25SparseEncoder:
+    """Get global BM25 sparse encoder instance"""
+    global _sparse_encoder
+    if _sparse_encoder is None:
+        with _sparse_encoder_lock:
+            if _sparse_encoder is None:
+                _sparse_encoder = Bm25SparseEncoder()
+    return _sparse_encoder
@@ -13,13 +13,19 @@ import hashlib
 import logging
 import time
 import json
+import socket
 import threading
+import uuid
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from datetime import datetime, timedelta
 
+from sqlalchemy import and_
+
 from config.database import db
 from domains.knowledge.models.rag_models import RagDocument, RagDocumentPage, RagDocumentChunk, RagChunkEmbedding
+from domains.knowledge.services.chunking_service import iter_chunks, approximate_token_count
 
 # Import services with error handling
 try:
@@ -36,14 +42,28 @@ except ImportError:
     QDRANT_AVAILABLE = False
     QdrantService = None
 
+try:
+    from .pdf_page_extractor import get_pdf_page_extractor
+    PDF_PAGE_EXTRACTOR_AVAILABLE = True
+except ImportError:
+    PDF_PAGE_EXTRACTOR_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
 class JobQueue:
-    """Database-based job queue untuk document processing"""
+    """Database-based job queue untuk document processing.
+
+    Job di-claim secara atomik dengan lease (token + waktu kedaluwarsa) sehingga beberapa worker
+    thread maupun beberapa proses gunicorn aman memakai satu tabel queue MySQL yang sama.
+    """
+    
+    CLAIMABLE_STATUSES = "('pending', 'retry')"
     
     def __init__(self):
         self.table_name = 'document_processing_queue'
+        # None = belum dicek; False = server tidak mendukung FOR UPDATE SKIP LOCKED (MySQL < 8.0)
+        self._skip_locked_supported: Optional[bool] = None
         self._create_queue_table()
     
     def _create_queue_table(self):
@@ -60,6 +80,7 @@ class JobQueue:
             with db.engine.connect() as conn:
                 result = conn.execute(db.text("SHOW TABLES LIKE 'document_processing_queue'"))
                 if result.fetchone():
+                    self._ensure_lease_columns()
                     return
             
             # Create table
@@ -74,12 +95,17 @@ class JobQueue:
                 retry_count INT DEFAULT 0,
                 max_retries INT DEFAULT 3,
                 error_message TEXT,
+                lease_token VARCHAR(64) NULL,
+                lease_expires_at TIMESTAMP NULL,
+                worker_id VARCHAR(150) NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 started_at TIMESTAMP NULL,
                 completed_at TIMESTAMP NULL,
                 INDEX idx_status (status),
                 INDEX idx_priority (priority),
                 INDEX idx_created_at (created_at),
+                INDEX idx_claim (status, priority, created_at),
+                INDEX idx_lease (status, lease_expires_at),
                 FOREIGN KEY (document_id) REFERENCES rag_documents(id) ON DELETE CASCADE
             )
             """
@@ -91,6 +117,32 @@ class JobQueue:
         except Exception as e:
             logger.error(f"❌ Failed to create queue table: {e}")
     
+    def _ensure_lease_columns(self):
+        """Tambahkan kolom/index lease pada tabel queue lama"""
+        try:
+            with db.engine.connect() as conn:
+                columns = {row[0] for row in conn.execute(db.text("SHOW COLUMNS FROM document_processing_queue"))}
+                indexes = {row[2] for row in conn.execute(db.text("SHOW INDEX FROM document_processing_queue"))}
+                
+                alterations = []
+                if 'lease_token' not in columns:
+                    alterations.append("ADD COLUMN lease_token VARCHAR(64) NULL")
+                if 'lease_expires_at' not in columns:
+                    alterations.append("ADD COLUMN lease_expires_at TIMESTAMP NULL")
+                if 'worker_id' not in columns:
+                    alterations.append("ADD COLUMN worker_id VARCHAR(150) NULL")
+                if 'idx_claim' not in indexes:
+                    alterations.append("ADD INDEX idx_claim (status, priority, created_at)")
+                if 'idx_lease' not in indexes:
+                    alterations.append("ADD INDEX idx_lease (status, lease_expires_at)")
+                
+                if alterations:
+                    conn.execute(db.text(f"ALTER TABLE document_processing_queue {', '.join(alterations)}"))
+                    conn.commit()
+                    logger.info(f"✅ Document processing queue upgraded: {len(alterations)} change(s)")
+        except Exception as e:
+            logger.error(f"❌ Failed to upgrade queue table: {e}")
+    
     def add_job(self, document_id: int, company_id: str, collection: str = '', priority: int = 0) -> int:
         """Add job ke queue"""
         try:
@@ -116,11 +168,11 @@ class JobQueue:
             return 0
     
     def get_next_job(self) -> Optional[Dict[str, Any]]:
-        """Get next pending job dari queue"""
+        """Lihat job berikutnya yang siap diproses tanpa meng-claim (gunakan claim_next_job untuk worker)"""
         try:
-            sql = """
+            sql = f"""
             SELECT * FROM document_processing_queue 
-            WHERE status = 'pending' 
+            WHERE status IN {self.CLAIMABLE_STATUSES} 
             ORDER BY priority DESC, created_at ASC 
             LIMIT 1
             """
@@ -135,6 +187,165 @@ class JobQueue:
             logger.error(f"❌ Failed to get next job: {e}")
             return None
     
+    def claim_next_job(self, worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Claim satu job pending/retry secara atomik dan pasang lease.
+
+        Menggunakan `SELECT ... FOR UPDATE SKIP LOCKED` (MySQL 8+) sehingga worker paralel tidak saling
+        menunggu; pada server lama otomatis turun ke conditional `UPDATE ... ORDER BY ... LIMIT 1`.
+        Return: row job yang sudah di-claim (termasuk `lease_token`) atau None jika queue kosong.
+        """
+        lease_token = uuid.uuid4().hex
+        params = {'lease_token': lease_token, 'worker_id': worker_id[:150], 'lease_seconds': int(lease_seconds)}
+        try:
+            job_id = None
+            if self._skip_locked_supported is not False:
+                try:
+                    job_id = self._claim_with_skip_locked(params)
+                    self._skip_locked_supported = True
+                except Exception as e:
+                    if self._skip_locked_supported is None and ('syntax' in str(e).lower() or 'skip' in str(e).lower()):
+                        logger.warning(f"⚠️ SKIP LOCKED not supported, using conditional UPDATE claim: {e}")
+                        self._skip_locked_supported = False
+                    else:
+                        raise
+            if self._skip_locked_supported is False:
+                job_id = self._claim_with_conditional_update(params)
+            
+            if not job_id:
+                return None
+            
+            with db.engine.connect() as conn:
+                row = conn.execute(db.text("""
+                SELECT * FROM document_processing_queue 
+                WHERE id = :job_id AND lease_token = :lease_token
+                """), {'job_id': job_id, 'lease_token': lease_token}).fetchone()
+            return dict(row._mapping) if row else None
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to claim next job: {e}")
+            return None
+    
+    def _claim_with_skip_locked(self, params: Dict[str, Any]) -> Optional[int]:
+        """Claim via row lock yang dilewati worker lain"""
+        with db.engine.connect() as conn:
+            row = conn.execute(db.text(f"""
+            SELECT id FROM document_processing_queue 
+            WHERE status IN {self.CLAIMABLE_STATUSES} 
+            ORDER BY priority DESC, created_at ASC 
+            LIMIT 1 
+            FOR UPDATE SKIP LOCKED
+            """)).fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            conn.execute(db.text("""
+            UPDATE document_processing_queue 
+            SET status = 'processing', started_at = NOW(), lease_token = :lease_token, worker_id = :worker_id,
+                lease_expires_at = DATE_ADD(NOW(), INTERVAL :lease_seconds SECOND)
+            WHERE id = :job_id
+            """), {**params, 'job_id': row.id})
+            conn.commit()
+            return row.id
+    
+    def _claim_with_conditional_update(self, params: Dict[str, Any]) -> Optional[int]:
+        """Claim via satu UPDATE atomik; token lease menandai pemenang"""
+        with db.engine.connect() as conn:
+            result = conn.execute(db.text(f"""
+            UPDATE document_processing_queue 
+            SET status = 'processing', started_at = NOW(), lease_token = :lease_token, worker_id = :worker_id,
+                lease_expires_at = DATE_ADD(NOW(), INTERVAL :lease_seconds SECOND)
+            WHERE status IN {self.CLAIMABLE_STATUSES} 
+            ORDER BY priority DESC, created_at ASC 
+            LIMIT 1
+            """), params)
+            conn.commit()
+            if not result.rowcount:
+                return None
+            row = conn.execute(db.text("""
+            SELECT id FROM document_processing_queue WHERE lease_token = :lease_token
+            """), {'lease_token': params['lease_token']}).fetchone()
+            return row.id if row else None
+    
+    def extend_lease(self, job_id: int, lease_token: str, lease_seconds: int) -> bool:
+        """Perpanjang lease job yang sedang diproses; False jika lease sudah diambil alih worker lain"""
+        try:
+            with db.engine.connect() as conn:
+                result = conn.execute(db.text("""
+                UPDATE document_processing_queue 
+                SET lease_expires_at = DATE_ADD(NOW(), INTERVAL :lease_seconds SECOND)
+                WHERE id = :job_id AND lease_token = :lease_token AND status = 'processing'
+                """), {'job_id': job_id, 'lease_token': lease_token, 'lease_seconds': int(lease_seconds)})
+                conn.commit()
+                return result.rowcount == 1
+        except Exception as e:
+            logger.error(f"❌ Failed to extend lease for job {job_id}: {e}")
+            return False
+    
+    def complete_job(self, job_id: int, lease_token: str) -> bool:
+        """Tandai job selesai, hanya jika lease masih dimiliki pemanggil"""
+        try:
+            with db.engine.connect() as conn:
+                result = conn.execute(db.text("""
+                UPDATE document_processing_queue 
+                SET status = 'completed', completed_at = NOW(), error_message = NULL,
+                    lease_token = NULL, lease_expires_at = NULL
+                WHERE id = :job_id AND lease_token = :lease_token
+                """), {'job_id': job_id, 'lease_token': lease_token})
+                conn.commit()
+                return result.rowcount == 1
+        except Exception as e:
+            logger.error(f"❌ Failed to complete job {job_id}: {e}")
+            return False
+    
+    def fail_job(self, job_id: int, lease_token: str, error_message: str = None) -> Optional[str]:
+        """Lepas lease job yang gagal: status 'retry' jika masih ada jatah retry, selain itu 'failed'.
+        Return: status baru, atau None jika lease sudah tidak dimiliki pemanggil.
+        """
+        try:
+            with db.engine.connect() as conn:
+                # Catatan: MySQL mengevaluasi SET dari kiri ke kanan, retry_count di-increment paling akhir
+                result = conn.execute(db.text("""
+                UPDATE document_processing_queue 
+                SET status = CASE WHEN retry_count < max_retries THEN 'retry' ELSE 'failed' END,
+                    completed_at = CASE WHEN retry_count < max_retries THEN NULL ELSE NOW() END,
+                    retry_count = CASE WHEN retry_count < max_retries THEN retry_count + 1 ELSE retry_count END,
+                    error_message = :error_message, lease_token = NULL, lease_expires_at = NULL
+                WHERE id = :job_id AND lease_token = :lease_token
+                """), {'job_id': job_id, 'lease_token': lease_token, 'error_message': error_message})
+                conn.commit()
+                if result.rowcount != 1:
+                    return None
+                row = conn.execute(db.text("SELECT status FROM document_processing_queue WHERE id = :job_id"),
+                                   {'job_id': job_id}).fetchone()
+                return row.status if row else None
+        except Exception as e:
+            logger.error(f"❌ Failed to fail job {job_id}: {e}")
+            return None
+    
+    def recover_expired_leases(self, lease_seconds: int) -> int:
+        """Kembalikan job 'processing' yang lease-nya kedaluwarsa (worker mati) ke 'retry' atau 'failed'"""
+        try:
+            with db.engine.connect() as conn:
+                result = conn.execute(db.text("""
+                UPDATE document_processing_queue 
+                SET status = CASE WHEN retry_count < max_retries THEN 'retry' ELSE 'failed' END,
+                    completed_at = CASE WHEN retry_count < max_retries THEN NULL ELSE NOW() END,
+                    retry_count = CASE WHEN retry_count < max_retries THEN retry_count + 1 ELSE retry_count END,
+                    error_message = 'Lease expired: worker stopped before finishing the job',
+                    lease_token = NULL, lease_expires_at = NULL
+                WHERE status = 'processing' 
+                  AND (lease_expires_at < NOW() 
+                       OR (lease_expires_at IS NULL AND started_at < DATE_SUB(NOW(), INTERVAL :lease_seconds SECOND)))
+                """), {'lease_seconds': int(lease_seconds)})
+                conn.commit()
+                recovered = result.rowcount or 0
+                if recovered:
+                    logger.warning(f"⚠️ Recovered {recovered} job(s) with expired lease")
+                return recovered
+        except Exception as e:
+            logger.error(f"❌ Failed to recover expired leases: {e}")
+            return 0
+    
     def update_job_status(self, job_id: int, status: str, error_message: str = None):
         """Update job status"""
         try:
@@ -203,6 +414,7 @@ class JobQueue:
                     'by_status': stats,
                     'pending': stats.get('pending', 0),
                     'processing': stats.get('processing', 0),
+                    'retry': stats.get('retry', 0),
                     'completed': stats.get('completed', 0),
                     'failed': stats.get('failed', 0)
                 }
@@ -216,9 +428,26 @@ class UnifiedDocumentProcessingService:
     """Unified service untuk document processing dan ingestion dengan async queue"""
     
     def __init__(self, max_workers: int = 2):
-        # Thread pool executor untuk background processing
-        self._executor: Optional[ThreadPoolExecutor] = None
-        self.max_workers = max_workers
+        # Polling worker threads untuk background processing
+        self.max_workers = int(os.getenv('DOC_PROCESSOR_WORKERS', str(max_workers)))
+        self._workers: List[threading.Thread] = []
+        self._app = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        
+        # Konfigurasi queue (lease dan polling)
+        self.lease_seconds = int(os.getenv('DOC_QUEUE_LEASE_SECONDS', '600'))
+        self.poll_interval = float(os.getenv('DOC_QUEUE_POLL_INTERVAL', '2'))
+        self.recovery_interval = int(os.getenv('DOC_QUEUE_RECOVERY_INTERVAL', '60'))
+        self._last_recovery = 0.0
+        self._recovery_lock = threading.Lock()
+        
+        # Ukuran batch embedding untuk pipelined ingestion
+        self.embedding_batch_size = max(1, int(os.getenv('DOC_EMBEDDING_BATCH_SIZE', '64')))
+        
+        # Budget token chunker (approximate_token_count)
+        self.chunk_max_tokens = max(1, int(os.getenv('DOC_CHUNK_MAX_TOKENS', '333')))
+        self.chunk_overlap_tokens = max(0, int(os.getenv('DOC_CHUNK_OVERLAP_TOKENS', '66')))
         
         # Job queue
         self.job_queue = JobQueue()
@@ -245,17 +474,18 @@ class UnifiedDocumentProcessingService:
             'total_processed': 0,
             'total_failed': 0,
             'total_retries': 0,
+            'total_chunks_reused': 0,
+            'total_chunks_embedded': 0,
             'start_time': None
         }
         
+        # Timing per stage ingestion (extract, chunk, embed, db_write, qdrant_write)
+        self.stage_timings: Dict[str, Dict[str, Any]] = {}
+        self._stats_lock = threading.Lock()
+        self._timing_local = threading.local()
+        
         logger.info("[INIT] Unified Document Processing Service initialized")
     
-    def _get_executor(self) -> ThreadPoolExecutor:
-        """Get thread pool executor"""
-        if self._executor is None:
-            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="doc-process-worker")
-        return self._executor
-    
     # ===== PDF INGESTION METHODS =====
     
     def compute_sha256(self, file_bytes: bytes) -> str:
@@ -308,118 +538,67 @@ class UnifiedDocumentProcessingService:
     def extract_text_pages(self, file_path: str) -> List[Dict[str, Any]]:
         """Extract text from document file"""
         try:
-            if file_path.endswith('.txt'):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                return [{
-                    'text': content,
-                    'has_text': bool(content.strip()),
-                    'ocr_used': False,
-                    'text_len': len(content),
-                    'bbox_available': False
-                }]
-            elif file_path.endswith('.pdf'):
-                # Extract text from PDF using PyPDF2
-                try:
-                    import PyPDF2
-                    
-                    pages = []
-                    with open(file_path, 'rb') as file:
-                        pdf_reader = PyPDF2.PdfReader(file)
-                        total_pages = len(pdf_reader.pages)
-                        
-                        logger.info(f"📄 Extracting text from PDF with {total_pages} pages")
-                        
-                        for page_num in range(total_pages):
-                            try:
-                                page = pdf_reader.pages[page_num]
-                                text = page.extract_text()
-                                
-                                pages.append({
-                                    'text': text,
-                                    'has_text': bool(text.strip()),
-                                    'ocr_used': False,
-                                    'text_len': len(text),
-                                    'bbox_available': False
-                                })
-                                
-                                logger.debug(f"   Page {page_num + 1}: {len(text)} chars")
-                                
-                            except Exception as page_error:
-                                logger.warning(f"⚠️ Failed to extract page {page_num + 1}: {page_error}")
-                                pages.append({
-                                    'text': '',
-                                    'has_text': False,
-                                    'ocr_used': False,
-                                    'text_len': 0,
-                                    'bbox_available': False
-                                })
-                        
-                        logger.info(f"✅ Extracted {len(pages)} pages from PDF")
-                        return pages
-                        
-                except ImportError:
-                    logger.error("❌ PyPDF2 not available for PDF extraction")
-                    return [{
-                        'text': '',
-                        'has_text': False,
-                        'ocr_used': False,
-                        'text_len': 0,
-                        'bbox_available': False
-                    }]
-                except Exception as pdf_error:
-                    logger.error(f"❌ PDF extraction failed: {pdf_error}")
-                    return [{
-                        'text': '',
-                        'has_text': False,
-                        'ocr_used': False,
-                        'text_len': 0,
-                        'bbox_available': False
-                    }]
-            else:
-                # For other file types, return empty for now
-                logger.warning(f"⚠️ Unsupported file type: {file_path}")
-                return [{
-                    'text': '',
-                    'has_text': False,
-                    'ocr_used': False,
-                    'text_len': 0,
-                    'bbox_available': False
-                }]
+            return list(self.iter_text_pages(file_path))
         except Exception as e:
             logger.error(f"❌ Failed to extract text from {file_path}: {e}")
             return []
     
-    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """Split text into chunks"""
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
+    def iter_text_pages(self, file_path: str, sha256: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield halaman dokumen satu per satu.
+
+        PDF diekstrak paralel per range halaman dan text per halaman di-cache dengan key
+        (sha256, page_number), sehingga re-processing file yang sama tidak mem-parse ulang PDF.
+        """
+        empty_page = {
+            'text': '',
+            'has_text': False,
+            'ocr_used': False,
+            'text_len': 0,
+            'bbox_available': False
+        }
         
-        while start < len(text):
-            end = start + chunk_size
-            
-            # Find good break point
-            if end < len(text):
-                break_point = text.rfind(' ', start, end)
-                if break_point == -1:
-                    break_point = text.rfind('\n', start, end)
-                if break_point == -1:
-                    break_point = end
-            else:
-                break_point = len(text)
+        if file_path.endswith('.txt'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            yield {
+                'text': content,
+                'has_text': bool(content.strip()),
+                'ocr_used': False,
+                'text_len': len(content),
+                'bbox_available': False
+            }
+        elif file_path.endswith('.pdf'):
+            if not PDF_PAGE_EXTRACTOR_AVAILABLE:
+                logger.error("❌ PDF page extractor not available for PDF extraction")
+                yield empty_page
+                return
             
-            chunk = text[start:break_point].strip()
-            if chunk:
-                chunks.append(chunk)
+            pages_yielded = 0
+            try:
+                for page in get_pdf_page_extractor().iter_pages(file_path, sha256):
+                    pages_yielded += 1
+                    yield page
+            except ImportError:
+                logger.error("❌ PyPDF2 not available for PDF extraction")
+            except Exception as pdf_error:
+                logger.error(f"❌ PDF extraction failed: {pdf_error}")
             
-            start = break_point - overlap
-            if start >= len(text):
-                break
-        
-        return chunks
+            if pages_yielded:
+                logger.info(f"✅ Extracted {pages_yielded} pages from PDF")
+            else:
+                yield empty_page
+        else:
+            # For other file types, return empty for now
+            logger.warning(f"⚠️ Unsupported file type: {file_path}")
+            yield empty_page
+    
+    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+        """Split text into chunks (ukuran dalam karakter, dikonversi ke budget token)"""
+        return [chunk['text'] for chunk in iter_chunks(
+            [{'text': text}],
+            max_tokens=approximate_token_count('x' * chunk_size),
+            overlap_tokens=approximate_token_count('x' * overlap) if overlap > 0 else 0
+        )]
     
     # ===== ASYNC PROCESSING METHODS =====
     
@@ -428,9 +607,10 @@ class UnifiedDocumentProcessingService:
         try:
             job_id = self.job_queue.add_job(document_id, company_id, collection, priority)
             if job_id:
-                # Submit untuk background processing
-                executor = self._get_executor()
-                executor.submit(self._process_document_job, job_id)
+                # Bangunkan worker; start worker jika processor belum berjalan di proses ini
+                if not self.is_processor_running():
+                    self.start_processor()
+                self._wake_event.set()
                 logger.info(f"📄 Document {document_id} submitted for async processing (job {job_id})")
             return job_id
             
@@ -446,158 +626,586 @@ class UnifiedDocumentProcessingService:
         except Exception as e:
             logger.error(f"❌ Failed to process document synchronously: {e}")
     
-    def _process_document_job(self, job_id: int):
-        """Process document ingestion job dari queue"""
-        try:
-            # Get job details
-            job = self.job_queue.get_next_job()
-            if not job or job['id'] != job_id:
-                logger.warning(f"⚠️ Job {job_id} not found or not pending")
+    def _worker_loop(self):
+        """Loop polling worker: recover lease kedaluwarsa, claim job, proses, ulangi"""
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        with self._app.app_context():
+            while not self._stop_event.is_set():
+                job = None
+                try:
+                    self._maybe_recover_expired_leases()
+                    job = self.job_queue.claim_next_job(worker_id, self.lease_seconds)
+                    if job:
+                        self._process_document_job(job)
+                except Exception as e:
+                    logger.error(f"❌ Document worker {worker_id} error: {e}")
+                finally:
+                    db.session.remove()
+                
+                if job:
+                    # Queue masih berisi kemungkinan job lain, langsung claim lagi
+                    continue
+                self._wake_event.wait(self.poll_interval)
+                self._wake_event.clear()
+    
+    def _maybe_recover_expired_leases(self):
+        """Jalankan recovery lease paling banyak sekali per recovery_interval per proses"""
+        with self._recovery_lock:
+            if time.time() - self._last_recovery < self.recovery_interval:
                 return
-            
-            # Update job status
-            self.job_queue.update_job_status(job_id, 'processing')
-            
-            # Process document
-            self._process_document_job_direct(
+            self._last_recovery = time.time()
+        recovered = self.job_queue.recover_expired_leases(self.lease_seconds)
+        if recovered:
+            self.stats['total_retries'] += recovered
+    
+    def _lease_heartbeat(self, job_id: int, lease_token: str, done: threading.Event):
+        """Perpanjang lease secara berkala selama job masih diproses"""
+        interval = max(1.0, self.lease_seconds / 3)
+        with self._app.app_context():
+            while not done.wait(interval):
+                if not self.job_queue.extend_lease(job_id, lease_token, self.lease_seconds):
+                    logger.warning(f"⚠️ Lost lease for job {job_id}")
+                    return
+    
+    def _process_document_job(self, job: Dict[str, Any]):
+        """Process document ingestion job yang sudah di-claim dari queue"""
+        job_id = job['id']
+        lease_token = job['lease_token']
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._lease_heartbeat, args=(job_id, lease_token, done),
+            name=f"doc-lease-{job_id}", daemon=True
+        )
+        heartbeat.start()
+        
+        try:
+            success = self._process_document_job_direct(
                 job['document_id'], 
                 job['company_id'], 
                 job['collection']
             )
-            
-            # Mark as completed
-            self.job_queue.update_job_status(job_id, 'completed')
-            self.stats['total_processed'] += 1
-            
-            logger.info(f"✅ Job {job_id} completed successfully")
-            
+            error_message = None if success else 'Document processing failed'
         except Exception as e:
-            logger.error(f"❌ Job {job_id} failed: {e}")
-            
-            # Update job status
-            self.job_queue.update_job_status(job_id, 'failed', str(e))
-            self.stats['total_failed'] += 1
-            
-            # Check if we should retry
-            if job and job['retry_count'] < job['max_retries']:
-                self.job_queue.increment_retry(job_id)
-                self.stats['total_retries'] += 1
-                logger.info(f"🔄 Job {job_id} scheduled for retry")
+            success = False
+            error_message = str(e)
+        finally:
+            done.set()
+            heartbeat.join(timeout=5)
+        
+        if success:
+            if self.job_queue.complete_job(job_id, lease_token):
+                self.stats['total_processed'] += 1
+                logger.info(f"✅ Job {job_id} completed successfully")
+            else:
+                logger.warning(f"⚠️ Job {job_id} finished after its lease was taken over")
+            return
+        
+        logger.error(f"❌ Job {job_id} failed: {error_message}")
+        self.stats['total_failed'] += 1
+        new_status = self.job_queue.fail_job(job_id, lease_token, error_message)
+        if new_status == 'retry':
+            self.stats['total_retries'] += 1
+            logger.info(f"🔄 Job {job_id} scheduled for retry")
     
-    def _process_document_job_direct(self, document_id: int, company_id: str, collection: str = ''):
-        """Process document ingestion job directly"""
+    def _process_document_job_direct(self, document_id: int, company_id: str, collection: str = '') -> bool:
+        """Process document ingestion job directly. Return True jika berhasil."""
         try:
             doc = RagDocument.query.get(document_id)
             if not doc:
                 logger.error(f"Document {document_id} not found")
-                return
+                return False
             
             # Update status
             doc.status = 'processing'
             db.session.commit()
             
-            # Extract text from document
-            pages = self.extract_text_pages(doc.storage_path)
-            
-            # Clean old pages/chunks
+            # Halaman diganti penuh; chunk lama dipertahankan untuk diff berdasarkan text_hash
             db.session.query(RagDocumentPage).filter_by(document_id=doc.id).delete()
-            db.session.query(RagDocumentChunk).filter_by(document_id=doc.id).delete()
+            run = {
+                'run_id': uuid.uuid4().hex,
+                'reusable': self._load_reusable_chunks(doc, company_id, collection),
+                'qdrant_ok': True,
+                'reused': 0,
+                'embedded': 0
+            }
             db.session.commit()
             
-            # Save pages
-            for i, page in enumerate(pages, start=1):
-                db.session.add(RagDocumentPage(
-                    document_id=doc.id,
-                    page_number=i,
-                    has_text=page['has_text'],
-                    ocr_used=page['ocr_used'],
-                    text_len=page['text_len'],
-                    bbox_available=page['bbox_available']
-                ))
-            db.session.commit()
+            # Stream: extract page -> chunk -> embed batch -> bulk write.
+            # Halaman dicatat saat lewat dan disimpan sekaligus setelah stream habis.
+            page_rows = []
+            page_stream = self._timed_stream(self.iter_text_pages(doc.storage_path, doc.sha256), 'extract')
+            chunk_stream = self._timed_stream(
+                self._iter_chunk_stream(self._collect_page_rows(doc, page_stream, page_rows)), 'chunk'
+            )
+            total_chunks = self._ingest_chunk_stream(doc, chunk_stream, company_id, collection, run)
+            removed_chunks = self._remove_stale_chunks(doc, company_id, collection, run)
             
-            # Create chunks and embeddings
-            all_text = '\n'.join([page.get('text', '') for page in pages if page.get('text')])
-            if all_text:
-                chunks = self.chunk_text(all_text)
-                
-                for i, chunk_text in enumerate(chunks):
-                    chunk = RagDocumentChunk(
-                        document_id=doc.id,
-                        chunk_index=i,
-                        text=chunk_text,
-                        page_from=1,  # Simplified
-                        page_to=1
-                    )
-                    db.session.add(chunk)
-                    db.session.flush()
-                    
-                    # Generate embedding
-                    if self.embedding_service and self.embedding_service.is_available():
-                        embedding = self.embedding_service.embed_text(chunk_text)
-                        if embedding:
-                            chunk_embedding = RagChunkEmbedding(
-                                chunk_id=chunk.id,
-                                model_name='unified',
-                                qdrant_vector_id=None,
-                                qdrant_collection=None,
-                                embedding_status='completed'
-                            )
-                            db.session.add(chunk_embedding)
-                
-                db.session.commit()
-                
-                # Store in Qdrant if available
-                if self.qdrant_service and self.qdrant_service.is_available():
-                    self._store_chunks_in_qdrant(doc, chunks, company_id, collection)
+            db.session.bulk_insert_mappings(RagDocumentPage, page_rows)
+            db.session.commit()
             
             # Update document with final stats
             doc.status = 'ready'
-            doc.total_pages = len(pages)
-            doc.vector_count = len(chunks) if all_text else 0
+            doc.total_pages = len(page_rows)
+            doc.vector_count = total_chunks
             db.session.commit()
             
-            logger.info(f"✅ Document {document_id} processed successfully: {len(pages)} pages, {len(chunks) if all_text else 0} vectors")
+            logger.info(
+                f"✅ Document {document_id} processed successfully: {len(page_rows)} pages, {total_chunks} vectors "
+                f"({run['reused']} reused, {run['embedded']} embedded, {removed_chunks} removed)"
+            )
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to process document {document_id}: {e}")
             # Update status to failed
             try:
+                db.session.rollback()
                 doc = RagDocument.query.get(document_id)
                 if doc:
                     doc.status = 'failed'
                     db.session.commit()
             except Exception:
                 pass
+            return False
+    
+    # ===== PIPELINED INGESTION METHODS =====
+    
+    @staticmethod
+    def _collect_page_rows(doc: RagDocument, pages: Iterable[Dict[str, Any]],
+                           page_rows: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Teruskan halaman dari stream sambil mengumpulkan mapping RagDocumentPage"""
+        for page_number, page in enumerate(pages, start=1):
+            page_rows.append({
+                'document_id': doc.id,
+                'page_number': page_number,
+                'has_text': page['has_text'],
+                'ocr_used': page['ocr_used'],
+                'text_len': page['text_len'],
+                'bbox_available': page['bbox_available']
+            })
+            yield page
+    
+    def _iter_chunk_stream(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield chunk dicts {text, page_from, page_to, tokens, text_hash} dari stream halaman"""
+        return iter_chunks(pages, max_tokens=self.chunk_max_tokens, overlap_tokens=self.chunk_overlap_tokens)
+    
+    def _timed_stream(self, stream: Iterable[Any], stage: str) -> Iterator[Any]:
+        """Bungkus generator dan catat waktu yang dihabiskan untuk menghasilkan item.
+
+        Stream bisa bertingkat (extract di dalam chunk); waktu yang sudah dicatat stream
+        di dalamnya dikurangkan agar setiap stage hanya menghitung waktunya sendiri.
+        """
+        iterator = iter(stream)
+        local = self._timing_local
+        while True:
+            nested_before = getattr(local, 'nested', 0.0)
+            start = time.time()
+            try:
+                item = next(iterator)
+                done = False
+            except StopIteration:
+                done = True
+            elapsed = time.time() - start
+            nested = getattr(local, 'nested', 0.0) - nested_before
+            self._record_stage(stage, max(0.0, elapsed - nested), 0 if done else 1)
+            local.nested = nested_before + elapsed
+            if done:
+                return
+            yield item
+    
+    @staticmethod
+    def _iter_batches(stream: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+        """Kelompokkan stream menjadi list berukuran batch_size"""
+        batch = []
+        for item in stream:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _ingest_chunk_stream(self, doc: RagDocument, chunk_stream: Iterable[Dict[str, Any]],
+                             company_id: str, collection: str, run: Dict[str, Any]) -> int:
+        """Konsumsi chunk stream secara batch.
+
+        Chunk yang text_hash-nya cocok dengan chunk lama (lihat _load_reusable_chunks) memakai ulang
+        row, vektor, dan point Qdrant-nya; hanya chunk baru/berubah yang di-embed.
+        Embedding batch berikutnya berjalan di thread terpisah selama batch sebelumnya
+        ditulis ke database dan Qdrant, sehingga round-trip embedding dan I/O saling tumpang tindih.
+        Return: jumlah chunk yang tersimpan.
+        """
+        can_embed = self.embedding_service is not None and self.embedding_service.is_available()
+        reusable = run['reusable']
+        total_chunks = 0
+        next_index = 0
+        pending = None
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-embed-worker") as embed_pool:
+            for batch in self._iter_batches(chunk_stream, self.embedding_batch_size):
+                fresh_texts = []
+                for chunk in batch:
+                    chunk['chunk_index'] = next_index
+                    next_index += 1
+                    candidates = reusable.get(chunk['text_hash'])
+                    if candidates:
+                        chunk['reuse'] = candidates.popleft()
+                    else:
+                        fresh_texts.append(chunk['text'])
+                future = None
+                if can_embed and fresh_texts:
+                    future = embed_pool.submit(self._embed_batch, fresh_texts)
+                if pending:
+                    total_chunks += self._persist_chunk_batch(doc, pending[0], pending[1], company_id, collection, run)
+                pending = (batch, future)
+            
+            if pending:
+                total_chunks += self._persist_chunk_batch(doc, pending[0], pending[1], company_id, collection, run)
+        
+        return total_chunks
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed satu batch chunk dengan satu panggilan embed_texts"""
+        start = time.time()
+        embeddings = self.embedding_service.embed_texts(texts)
+        self._record_stage('embed', time.time() - start, len(texts))
+        return embeddings
+    
+    def _persist_chunk_batch(self, doc: RagDocument, batch: List[Dict[str, Any]], embed_future,
+                             company_id: str, collection: str, run: Dict[str, Any]) -> int:
+        """Tulis satu batch: update chunk yang dipakai ulang, bulk insert chunk baru beserta
+        RagChunkEmbedding-nya, lalu sinkronkan point Qdrant"""
+        reused = [chunk for chunk in batch if chunk.get('reuse')]
+        fresh = [chunk for chunk in batch if not chunk.get('reuse')]
+        
+        embeddings = []
+        if embed_future is not None:
+            try:
+                embeddings = embed_future.result() or []
+            except Exception as e:
+                logger.warning(f"⚠️ Batch embedding failed for document {doc.id}: {e}")
+                embeddings = []
+        
+        db_start = time.time()
+        if reused:
+            db.session.bulk_update_mappings(RagDocumentChunk, [{
+                'id': chunk['reuse']['chunk_id'],
+                'chunk_index': chunk['chunk_index'],
+                'page_from': chunk.get('page_from'),
+                'page_to': chunk.get('page_to')
+            } for chunk in reused])
+        
+        chunk_ids = {}
+        if fresh:
+            db.session.bulk_insert_mappings(RagDocumentChunk, [{
+                'document_id': doc.id,
+                'chunk_index': chunk['chunk_index'],
+                'text': chunk['text'],
+                'page_from': chunk.get('page_from'),
+                'page_to': chunk.get('page_to'),
+                'tokens': chunk.get('tokens') or approximate_token_count(chunk['text']),
+                'text_hash': chunk.get('text_hash') or hashlib.sha256(chunk['text'].encode('utf-8')).hexdigest()
+            } for chunk in fresh])
+            
+            # Ambil id chunk yang baru dibuat dalam satu query
+            chunk_ids = dict(
+                db.session.query(RagDocumentChunk.chunk_index, RagDocumentChunk.id)
+                .filter(
+                    RagDocumentChunk.document_id == doc.id,
+                    RagDocumentChunk.chunk_index.in_([chunk['chunk_index'] for chunk in fresh])
+                ).all()
+            )
+        
+        db_elapsed = time.time() - db_start
+        
+        embedded = []
+        for chunk, embedding in zip(fresh, embeddings):
+            # Zero vector = embedding gagal/ditolak: chunk tersimpan tanpa point, di-embed ulang nanti
+            if embedding and any(embedding):
+                chunk['chunk_id'] = chunk_ids.get(chunk['chunk_index'])
+                chunk['embedding'] = embedding
+                embedded.append(chunk)
+        
+        # Vektor yang sudah dihitung langsung dikirim ke Qdrant (tanpa embed ulang);
+        # point chunk yang dipakai ulang hanya diperbarui payload-nya
+        qdrant_collection = None
+        if self.qdrant_service and self.qdrant_service.is_available():
+            qdrant_start = time.time()
+            if embedded:
+                qdrant_collection = self._store_chunks_in_qdrant(doc, embedded, company_id, collection, run['run_id'])
+                if not qdrant_collection:
+                    run['qdrant_ok'] = False
+            if reused and not self._refresh_reused_points(doc, reused, company_id, collection, run['run_id']):
+                run['qdrant_ok'] = False
+            self._record_stage('qdrant_write', time.time() - qdrant_start, len(embedded) + len(reused))
+        else:
+            run['qdrant_ok'] = False
+        
+        db_start = time.time()
+        if embedded:
+            db.session.bulk_insert_mappings(RagChunkEmbedding, [{
+                'chunk_id': chunk['chunk_id'],
+                'model_name': 'unified',
+                'qdrant_vector_id': chunk['point_id'] if qdrant_collection else None,
+                'qdrant_point_id': chunk['point_id'] if qdrant_collection else None,
+                'qdrant_collection': qdrant_collection,
+                'embedding_status': 'completed'
+            } for chunk in embedded])
+        db.session.commit()
+        self._record_stage('db_write', db_elapsed + (time.time() - db_start), len(batch))
+        
+        run['reused'] += len(reused)
+        run['embedded'] += len(embedded)
+        with self._stats_lock:
+            self.stats['total_chunks_reused'] += len(reused)
+            self.stats['total_chunks_embedded'] += len(embedded)
+        
+        return len(batch)
+    
+    # ===== INCREMENTAL RE-INGESTION METHODS =====
+    
+    def _load_reusable_chunks(self, doc: RagDocument, company_id: str, collection: str) -> Dict[str, deque]:
+        """Siapkan chunk lama untuk diff berdasarkan text_hash.
+
+        Semua chunk_index lama digeser ke nilai negatif agar index baru bebas dari unique
+        constraint (document_id, chunk_index). Chunk yang sudah punya point Qdrant di collection
+        target dikembalikan sebagai kandidat reuse: {text_hash: deque([{chunk_id, point_id, ...}])}.
+        Chunk yang tidak terpakai ulang tetap negatif dan dihapus oleh _remove_stale_chunks.
+        """
+        target_collection = None
+        if self.qdrant_service and self.qdrant_service.is_available():
+            target_collection = self.qdrant_service._get_collection_name(str(company_id), collection or 'default')
+        
+        rows = (
+            db.session.query(
+                RagDocumentChunk.id, RagDocumentChunk.chunk_index, RagDocumentChunk.text_hash,
+                RagDocumentChunk.page_from, RagDocumentChunk.page_to,
+                RagChunkEmbedding.qdrant_point_id, RagChunkEmbedding.qdrant_collection,
+                RagChunkEmbedding.embedding_status
+            )
+            .outerjoin(RagChunkEmbedding, and_(
+                RagChunkEmbedding.chunk_id == RagDocumentChunk.id,
+                RagChunkEmbedding.model_name == 'unified'
+            ))
+            .filter(RagDocumentChunk.document_id == doc.id)
+            .order_by(RagDocumentChunk.chunk_index)
+            .all()
+        )
+        if not rows:
+            return {}
+        
+        # Run sebelumnya yang gagal bisa meninggalkan index negatif; geser di bawah nilai terkecil
+        floor = min(0, min(row.chunk_index for row in rows))
+        db.session.query(RagDocumentChunk).filter(
+            RagDocumentChunk.document_id == doc.id,
+            RagDocumentChunk.chunk_index >= 0
+        ).update(
+            {RagDocumentChunk.chunk_index: floor - 1 - RagDocumentChunk.chunk_index},
+            synchronize_session=False
+        )
+        
+        reusable: Dict[str, deque] = {}
+        for row in rows:
+            if (
+                row.text_hash and row.qdrant_point_id and row.embedding_status == 'completed'
+                and target_collection and row.qdrant_collection == target_collection
+            ):
+                reusable.setdefault(row.text_hash, deque()).append({
+                    'chunk_id': row.id,
+                    'point_id': row.qdrant_point_id,
+                    'chunk_index': row.chunk_index,
+                    'page_from': row.page_from,
+                    'page_to': row.page_to
+                })
+        return reusable
+    
+    def _refresh_reused_points(self, document: RagDocument, chunks: List[Dict[str, Any]],
+                               company_id: str, collection: str, run_id: str) -> bool:
+        """Tandai point chunk yang dipakai ulang dengan ingest_run saat ini.
+
+        Point yang posisinya (chunk_index/halaman) tidak berubah cukup di-set_payload; point yang
+        bergeser di-retrieve beserta vektornya lalu di-upsert ulang dengan payload baru.
+        """
+        moved = [
+            chunk for chunk in chunks
+            if (chunk['reuse']['chunk_index'], chunk['reuse']['page_from'], chunk['reuse']['page_to'])
+            != (chunk['chunk_index'], chunk.get('page_from'), chunk.get('page_to'))
+        ]
+        moved_ids = {chunk['reuse']['point_id'] for chunk in moved}
+        unchanged_ids = [chunk['reuse']['point_id'] for chunk in chunks if chunk['reuse']['point_id'] not in moved_ids]
+        
+        try:
+            if unchanged_ids:
+                result = self.qdrant_service.set_payload(
+                    company_id=str(company_id), collection=collection or 'default',
+                    payload={'ingest_run': run_id}, ids=unchanged_ids
+                )
+                if not result.get('success'):
+                    logger.error(f"❌ Failed to mark reused points for document {document.id}: {result.get('message')}")
+                    return False
+            
+            if not moved:
+                return True
+            
+            result = self.qdrant_service.retrieve_points(
+                company_id=str(company_id), collection=collection or 'default',
+                ids=list(moved_ids), with_payload=True, with_vectors=True
+            )
+            if not result.get('success'):
+                logger.error(f"❌ Failed to retrieve reused points for document {document.id}: {result.get('message')}")
+                return False
+            stored = {str(point['id']): point for point in result.get('data') or []}
+            
+            points = []
+            for chunk in moved:
+                point = stored.get(str(chunk['reuse']['point_id']))
+                if not point or point.get('vector') is None:
+                    logger.warning(f"⚠️ Qdrant point {chunk['reuse']['point_id']} missing for document {document.id}")
+                    continue
+                created_at = ((point.get('payload') or {}).get('metadata') or {}).get('created_at')
+                points.append({
+                    'id': chunk['reuse']['point_id'],
+                    'vector': point['vector'],
+                    'payload': self._build_chunk_payload(
+                        document, chunk, company_id, collection, created_at or datetime.now().isoformat(), run_id
+                    )
+                })
+            if points:
+                result = self.qdrant_service.upsert_points(
+                    company_id=str(company_id), collection=collection or 'default', points=points
+                )
+                if not result.get('success'):
+                    logger.error(f"❌ Failed to update moved points for document {document.id}: {result.get('message')}")
+                    return False
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh reused points: {e}")
+            return False
+    
+    def _remove_stale_chunks(self, doc: RagDocument, company_id: str, collection: str, run: Dict[str, Any]) -> int:
+        """Hapus chunk lama yang tidak terpakai ulang beserta point Qdrant-nya. Return: jumlah chunk dihapus.
+
+        Point di collection target dihapus via delete_points dengan filter: milik dokumen ini tetapi
+        tidak ditandai ingest_run saat ini (termasuk point yatim dari run yang gagal). Sweep dilewati
+        jika ada operasi Qdrant yang gagal pada run ini agar point yang masih dipakai tidak ikut terhapus.
+        """
+        stale = (
+            db.session.query(RagDocumentChunk.id, RagChunkEmbedding.qdrant_point_id, RagChunkEmbedding.qdrant_collection)
+            .outerjoin(RagChunkEmbedding, RagChunkEmbedding.chunk_id == RagDocumentChunk.id)
+            .filter(RagDocumentChunk.document_id == doc.id, RagDocumentChunk.chunk_index < 0)
+            .all()
+        )
+        stale_ids = list({row.id for row in stale})
+        
+        if self.qdrant_service and self.qdrant_service.is_available():
+            target_collection = self.qdrant_service._get_collection_name(str(company_id), collection or 'default')
+            
+            # Point di collection lain (dokumen pindah collection) tidak tercakup sweep; hapus by id
+            elsewhere: Dict[str, List[str]] = {}
+            for row in stale:
+                if row.qdrant_point_id and row.qdrant_collection and row.qdrant_collection != target_collection:
+                    elsewhere.setdefault(row.qdrant_collection, []).append(row.qdrant_point_id)
+            for collection_name, point_ids in elsewhere.items():
+                self.qdrant_service.delete_points(collection_name=collection_name, ids=point_ids)
+            
+            if run['qdrant_ok']:
+                result = self.qdrant_service.delete_points(
+                    company_id=str(company_id), collection=collection or 'default',
+                    filter={
+                        'must': [{'key': 'metadata.document_id', 'value': str(doc.id)}],
+                        'must_not': [{'key': 'ingest_run', 'value': run['run_id']}]
+                    }
+                )
+                if not result.get('success'):
+                    logger.warning(f"⚠️ Failed to delete stale points for document {doc.id}: {result.get('message')}")
+            else:
+                logger.warning(f"⚠️ Skipping stale point sweep for document {doc.id}: Qdrant sync incomplete")
+        
+        if stale_ids:
+            db.session.query(RagChunkEmbedding).filter(
+                RagChunkEmbedding.chunk_id.in_(stale_ids)
+            ).delete(synchronize_session=False)
+            db.session.query(RagDocumentChunk).filter(
+                RagDocumentChunk.id.in_(stale_ids)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        
+        return len(stale_ids)
+    
+    def _record_stage(self, stage: str, elapsed: float, items: int = 0):
+        """Akumulasi timing per stage ingestion untuk get_processor_stats"""
+        with self._stats_lock:
+            timing = self.stage_timings.setdefault(stage, {'total_seconds': 0.0, 'calls': 0, 'items': 0})
+            timing['total_seconds'] += elapsed
+            timing['calls'] += 1
+            timing['items'] += items
     
-    def _store_chunks_in_qdrant(self, document: RagDocument, chunks: List[str], company_id: str, collection: str):
-        """Store document chunks in Qdrant"""
+    @staticmethod
+    def _chunk_point_id(document_id: int, run_id: str, chunk_index: int) -> str:
+        """Point ID Qdrant yang deterministik per (document, ingest run, chunk_index).
+
+        Unik per run sehingga tidak pernah menimpa point chunk lama yang dipakai ulang.
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"rag-document/{document_id}/run/{run_id}/chunk/{chunk_index}"))
+    
+    @staticmethod
+    def _build_chunk_payload(document: RagDocument, chunk: Dict[str, Any], company_id: str,
+                             collection: str, created_at: str, run_id: str) -> Dict[str, Any]:
+        """Payload point Qdrant untuk satu chunk"""
+        metadata = {
+            'company_id': str(company_id),
+            'collection': str(collection or 'default'),
+            'created_at': created_at,
+            'chunk_id': f"{document.id}_chunk_{chunk['chunk_index']}",
+            'document_id': str(document.id),
+            'chunk_index': int(chunk['chunk_index'])
+        }
+        if chunk.get('page_from') is not None:
+            metadata['page_from'] = int(chunk['page_from'])
+        if chunk.get('page_to') is not None:
+            metadata['page_to'] = int(chunk['page_to'])
+        return {
+            'text': chunk['text'],
+            'metadata': metadata,
+            'ingest_run': run_id
+        }
+    
+    def _store_chunks_in_qdrant(self, document: RagDocument, chunks: List[Dict[str, Any]],
+                                company_id: str, collection: str, run_id: str) -> Optional[str]:
+        """Upsert embedding chunk yang sudah dihitung ke Qdrant via upsert_points.
+
+        Setiap chunk diberi `point_id`; return nama collection Qdrant jika berhasil, None jika gagal.
+        """
         try:
             if not self.qdrant_service or not self.qdrant_service.is_available():
-                return
+                return None
             
-            # Prepare documents for Qdrant
-            documents = []
-            for i, chunk_text in enumerate(chunks):
-                documents.append({
-                    'text': chunk_text,
-                    'chunk_id': f"{document.id}_chunk_{i}",
-                    'document_id': document.id,
-                    'chunk_index': i,
-                    'section_title': None
+            created_at = datetime.now().isoformat()
+            points = []
+            for chunk in chunks:
+                chunk['point_id'] = self._chunk_point_id(document.id, run_id, chunk['chunk_index'])
+                points.append({
+                    'id': chunk['point_id'],
+                    'vector': chunk['embedding'],
+                    'payload': self._build_chunk_payload(document, chunk, company_id, collection, created_at, run_id)
                 })
             
-            # Store in Qdrant
-            self.qdrant_service.add_documents(
-                company_id=company_id,
-                documents=documents,
-                collection=collection
+            result = self.qdrant_service.upsert_points(
+                company_id=str(company_id),
+                collection=collection or 'default',
+                points=points
             )
+            if not result.get('success'):
+                logger.error(f"❌ Failed to upsert chunks in Qdrant for document {document.id}: {result.get('message')}")
+                return None
             
-            logger.info(f"✅ Stored {len(chunks)} chunks in Qdrant for document {document.id}")
+            logger.info(f"✅ Stored {len(points)} chunks in Qdrant for document {document.id}")
+            return result.get('data', {}).get('collection_name')
             
         except Exception as e:
             logger.error(f"❌ Failed to store chunks in Qdrant: {e}")
+            return None
     
     # ===== QUEUE MANAGEMENT METHODS =====
     
@@ -640,8 +1248,21 @@ class UnifiedDocumentProcessingService:
         try:
             queue_stats = self.job_queue.get_queue_stats()
             
+            with self._stats_lock:
+                stage_timings = {
+                    stage: {
+                        'total_seconds': round(timing['total_seconds'], 3),
+                        'calls': timing['calls'],
+                        'items': timing['items'],
+                        'avg_seconds': round(timing['total_seconds'] / timing['calls'], 4) if timing['calls'] else 0
+                    }
+                    for stage, timing in self.stage_timings.items()
+                }
+            
             return {
                 'processor_stats': self.stats,
+                'stage_timings': stage_timings,
+                'pdf_extraction': dict(get_pdf_page_extractor().stats) if PDF_PAGE_EXTRACTOR_AVAILABLE else None,
                 'queue_stats': queue_stats,
                 'services': {
                     'embedding_service_available': self.embedding_service is not None and self.embedding_service.is_available(),
@@ -649,7 +1270,12 @@ class UnifiedDocumentProcessingService:
                 },
                 'configuration': {
                     'max_workers': self.max_workers,
-                    'executor_active': self._executor is not None
+                    'embedding_batch_size': self.embedding_batch_size,
+                    'chunk_max_tokens': self.chunk_max_tokens,
+                    'chunk_overlap_tokens': self.chunk_overlap_tokens,
+                    'lease_seconds': self.lease_seconds,
+                    'poll_interval': self.poll_interval,
+                    'workers_active': sum(1 for worker in self._workers if worker.is_alive())
                 }
             }
             
@@ -657,27 +1283,45 @@ class UnifiedDocumentProcessingService:
             logger.error(f"❌ Failed to get processor stats: {e}")
             return {'error': str(e)}
     
+    def is_processor_running(self) -> bool:
+        """Check apakah worker thread processor sedang berjalan di proses ini"""
+        return any(worker.is_alive() for worker in self._workers)
+    
     def start_processor(self):
-        """Start background processor"""
+        """Start background processor (polling worker threads)"""
         try:
-            if self._executor is None:
-                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="doc-process-worker")
-                self.stats['start_time'] = datetime.now()
-                logger.info(f"[SUCCESS] Started document processor with {self.max_workers} workers")
-            else:
+            if self.is_processor_running():
                 logger.warning("⚠️ Processor already running")
+                return
+            
+            from flask import current_app
+            self._app = current_app._get_current_object()
+            self._stop_event.clear()
+            self._workers = []
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"doc-process-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self.stats['start_time'] = datetime.now()
+            logger.info(f"[SUCCESS] Started document processor with {self.max_workers} workers")
         except Exception as e:
             logger.error(f"❌ Failed to start processor: {e}")
     
-    def stop_processor(self):
-        """Stop background processor"""
+    def stop_processor(self, timeout: float = 30.0):
+        """Stop background processor; worker menyelesaikan job yang sedang berjalan lebih dulu"""
         try:
-            if self._executor:
-                self._executor.shutdown(wait=True)
-                self._executor = None
-                logger.info("✅ Document processor stopped")
-            else:
+            if not self.is_processor_running():
                 logger.warning("⚠️ Processor not running")
+                return
+            
+            self._stop_event.set()
+            self._wake_event.set()
+            for worker in self._workers:
+                worker.join(timeout=timeout)
+            self._workers = []
+            if PDF_PAGE_EXTRACTOR_AVAILABLE:
+                get_pdf_page_extractor().shutdown()
+            logger.info("✅ Document processor stopped")
         except Exception as e:
             logger.error(f"❌ Failed to stop processor: {e}")
 
@@ -4,6 +4,11 @@
 Unified Embedding Service untuk KSM Main Backend
 Konsolidasi dari embedding_service.py dan local_embedding_service.py
 Menggabungkan fitur terbaik dari kedua implementasi dengan fallback yang robust
+
+- EMBEDDING_PROVIDER=local: seluruh index dan query memakai local hashed embedder
+- EMBEDDING_PROVIDER=hybrid: OpenAI, tetapi text yang gagal di-embed ditolak (zero vector) alih-alih
+  diganti vektor local; vektor local tidak berada di ruang yang sama dengan collection OpenAI.
+  Chunk yang ditolak tersimpan tanpa embedding dan di-embed ulang pada ingestion berikutnya
 """
 
 import os
@@ -12,11 +17,12 @@ import math
 import hashlib
 import logging
 import threading
-import time
 import struct
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from .embedding_cache import get_embedding_cache
+
 # Sentence transformers removed - using OpenAI embeddings only
 SENTENCE_TRANSFORMERS_AVAILABLE = False
 
@@ -27,6 +33,14 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+# Local hashed embedder (NumPy)
+try:
+    import numpy as np
+    from .local_hashed_embedder import LocalHashedEmbedder
+    LOCAL_EMBEDDER_AVAILABLE = True
+except ImportError:
+    LOCAL_EMBEDDER_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,11 +59,12 @@ class UnifiedEmbeddingService:
         # Service management
         self.openai_service = None
         self.sentence_transformer_service = None
+        self.local_embedder = None
         
-        # Cache management
-        self.embedding_cache = {}
-        self.cache_max_size = int(os.getenv('EMBEDDING_CACHE_MAX_SIZE', '1000'))
-        self.cache_ttl = int(os.getenv('EMBEDDING_CACHE_TTL', '3600'))
+        # Cache management (LRU in-process + store persisten bersama antar worker)
+        self.embedding_cache = get_embedding_cache()
+        self.cache_max_size = self.embedding_cache.max_entries
+        self.cache_ttl = self.embedding_cache.ttl
         
         # Performance tracking
         self.stats = {
@@ -60,6 +75,8 @@ class UnifiedEmbeddingService:
             'avg_embedding_time': 0,
             'fallback_usage': 0,
             'openai_usage': 0,
+            'local_usage': 0,
+            'rejected': 0,
             'sentence_transformer_usage': 0
         }
         
@@ -75,9 +92,13 @@ class UnifiedEmbeddingService:
         self.provider = os.getenv('EMBEDDING_PROVIDER', 'openai')
         
         # Model configuration based on provider
-        if self.provider == 'openai':
+        if self.provider in ['openai', 'hybrid']:
             self.model_name = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
             self.embedding_dim = int(os.getenv('EMBEDDING_DIMENSIONS', '1536'))
+        elif self.provider == 'local':
+            # Dimensi mengikuti ukuran vektor collection Qdrant
+            self.embedding_dim = int(os.getenv('EMBEDDING_DIMENSIONS', '1536'))
+            self.model_name = f"local-hashed-bow-{self.embedding_dim}"
         else:
             self.model_name = os.getenv('EMBEDDING_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
             self.embedding_dim = int(os.getenv('EMBEDDING_DIMENSION', '384'))
@@ -95,8 +116,10 @@ class UnifiedEmbeddingService:
         elif self.provider == 'sentence-transformers':
             logger.warning("⚠️ sentence-transformers provider not available, falling back to OpenAI")
             self._init_openai_service()
+        elif self.provider == 'local':
+            self._init_local_embedder()
         elif self.provider == 'hybrid':
-            logger.warning("⚠️ hybrid provider not available, using OpenAI only")
+            # OpenAI saja; kegagalan ditolak, bukan diganti vektor local (lihat docstring modul)
             self._init_openai_service()
         else:
             logger.warning(f"⚠️ Unknown provider: {self.provider}, falling back to OpenAI")
@@ -116,6 +139,14 @@ class UnifiedEmbeddingService:
             logger.warning(f"⚠️ Failed to initialize OpenAI service: {e}")
             self.openai_service = None
     
+    def _init_local_embedder(self):
+        """Initialize NumPy local hashed bag-of-words embedder"""
+        if not LOCAL_EMBEDDER_AVAILABLE:
+            logger.warning("⚠️ numpy not available, local embeddings use the pure-Python fallback")
+            return
+        self.local_embedder = LocalHashedEmbedder(self.embedding_dim)
+        logger.info(f"[SUCCESS] Local hashed embedder initialized (dim={self.embedding_dim})")
+    
     def _init_sentence_transformer_service(self):
         """Initialize Sentence Transformer service - DEPRECATED"""
         logger.warning("⚠️ Sentence Transformer service is deprecated, using OpenAI embeddings only")
@@ -137,44 +168,28 @@ class UnifiedEmbeddingService:
     
     def _get_cache_key(self, text: str) -> str:
         """Generate cache key untuk text"""
-        return hashlib.sha256(f"{self.model_name}::{text}".encode('utf-8')).hexdigest()
+        return self.embedding_cache.make_key(self.model_name, text)
     
     def _get_from_cache(self, text: str) -> Optional[List[float]]:
         """Get embedding dari cache"""
-        cache_key = self._get_cache_key(text)
-        
-        if cache_key in self.embedding_cache:
-            cached_data = self.embedding_cache[cache_key]
-            # Check TTL
-            if time.time() - cached_data['timestamp'] < self.cache_ttl:
-                self.stats['cache_hits'] += 1
-                return cached_data['embedding']
-            else:
-                # Remove expired cache
-                del self.embedding_cache[cache_key]
+        cached = self.embedding_cache.get(self.model_name, text)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
         
         self.stats['cache_misses'] += 1
         return None
     
+    def _get_many_from_cache(self, texts: List[str]) -> Dict[int, List[float]]:
+        """Get embedding banyak text dari cache dalam satu lookup"""
+        cached = self.embedding_cache.get_many(self.model_name, texts)
+        self.stats['cache_hits'] += len(cached)
+        self.stats['cache_misses'] += len(texts) - len(cached)
+        return cached
+    
     def _save_to_cache(self, text: str, embedding: List[float]):
         """Save embedding ke cache"""
-        cache_key = self._get_cache_key(text)
-        
-        # Cleanup cache jika terlalu besar
-        if len(self.embedding_cache) >= self.cache_max_size:
-            # Remove oldest entries
-            oldest_keys = sorted(
-                self.embedding_cache.keys(),
-                key=lambda k: self.embedding_cache[k]['timestamp']
-            )[:100]  # Remove 100 oldest entries
-            
-            for key in oldest_keys:
-                del self.embedding_cache[key]
-        
-        self.embedding_cache[cache_key] = {
-            'embedding': embedding,
-            'timestamp': time.time()
-        }
+        self.embedding_cache.set(self.model_name, text, embedding)
     
     def _tokenize(self, text: str) -> List[str]:
         """Tokenisasi sederhana: huruf kecil, ambil kata alfanumerik."""
@@ -192,8 +207,19 @@ class UnifiedEmbeddingService:
         # Ambil bit terakhir untuk tanda
         return 1 if (h[0] & 1) == 0 else -1
     
+    def _embed_local_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed satu batch dengan local hashed embedder (satu matriks NumPy untuk seluruh batch)"""
+        self.stats['local_usage'] += len(texts)
+        if self.local_embedder is not None:
+            return self.local_embedder.embed_matrix(texts).tolist()
+        return [self._build_local_embedding(text) for text in texts]
+    
     def _build_local_embedding(self, text: str) -> List[float]:
         """Bangun embedding hashed BOW berukuran self.embedding_dim, L2-normalized."""
+        if self.local_embedder is not None:
+            return self.local_embedder.embed_text(text).tolist()
+        
+        # Pure-Python path bila numpy tidak tersedia
         vec = [0.0] * self.embedding_dim
         try:
             tokens = self._tokenize(text)
@@ -222,6 +248,16 @@ class UnifiedEmbeddingService:
         # Generate hash
         text_hash = hashlib.sha256(normalized_text.encode('utf-8')).digest()
         
+        if LOCAL_EMBEDDER_AVAILABLE:
+            # Setiap 4 byte hash -> uint32 big-endian -> float (0-1), sisanya nol
+            embedding = np.zeros(self.embedding_dim, dtype=np.float32)
+            values = np.frombuffer(text_hash, dtype='>u4')[:self.embedding_dim] / (2**32 - 1)
+            embedding[:len(values)] = values
+            norm = np.linalg.norm(embedding)
+            if norm > 0:
+                embedding /= norm
+            return embedding.tolist()
+        
         # Convert hash to embedding vector
         embedding = []
         for i in range(0, len(text_hash), 4):
@@ -255,6 +291,10 @@ class UnifiedEmbeddingService:
         if not text or not text.strip():
             return [0.0] * self.embedding_dim
         
+        # Local provider: murah dihitung, tidak perlu cache
+        if self.provider == 'local':
+            return self._embed_local_batch([text])[0]
+        
         # Check cache first
         cached_embedding = self._get_from_cache(text)
         if cached_embedding:
@@ -264,7 +304,7 @@ class UnifiedEmbeddingService:
         if self.provider in ['openai', 'hybrid'] and self.openai_service and self.openai_service.is_available():
             try:
                 embedding = self.openai_service.embed_text(text)
-                if embedding and len(embedding) > 0:
+                if embedding and any(embedding):
                     self.stats['openai_usage'] += 1
                     self._save_to_cache(text, embedding)
                     return embedding
@@ -277,13 +317,23 @@ class UnifiedEmbeddingService:
         
         # Sentence Transformers removed - using OpenAI only
         
+        # Hybrid: tolak, jangan tulis vektor local ke collection OpenAI
+        if self.provider == 'hybrid':
+            logger.warning("⚠️ OpenAI embedding unavailable, text rejected (hybrid provider)")
+            self.stats['rejected'] += 1
+            return [0.0] * self.embedding_dim
+        
         # Fallback to hash-based embedding
         logger.warning("⚠️ All embedding services failed, using fallback")
         self.stats['fallback_usage'] += 1
         return self._generate_fallback_embedding(text)
     
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        """Buat embedding untuk multiple texts secara batch menggunakan provider yang dikonfigurasi"""
+    def embed_texts(self, texts: List[str], fallback: bool = True) -> List[List[float]]:
+        """Buat embedding untuk multiple texts secara batch menggunakan provider yang dikonfigurasi.
+
+        `fallback=False`: text yang gagal di-embed provider menjadi zero vector, bukan embedding
+        fallback, sehingga pemanggil (mis. embedding query) bisa mendeteksi dan tidak meng-cache-nya.
+        """
         if not texts:
             return []
         
@@ -292,16 +342,17 @@ class UnifiedEmbeddingService:
         if not valid_texts:
             return [[0.0] * self.embedding_dim] * len(texts)
         
+        # Local provider: seluruh batch di-embed sebagai satu matriks
+        if self.provider == 'local':
+            return self._embed_local_batch(texts)
+        
         # Check cache untuk semua texts
-        cached_embeddings = {}
         uncached_texts = []
         uncached_indices = []
         
+        cached_embeddings = self._get_many_from_cache(valid_texts)
         for i, text in enumerate(valid_texts):
-            cached_embedding = self._get_from_cache(text)
-            if cached_embedding:
-                cached_embeddings[i] = cached_embedding
-            else:
+            if i not in cached_embeddings:
                 uncached_texts.append(text)
                 uncached_indices.append(i)
         
@@ -312,23 +363,37 @@ class UnifiedEmbeddingService:
                 try:
                     new_embeddings = self.openai_service.embed_texts(uncached_texts)
                     if new_embeddings and len(new_embeddings) == len(uncached_texts):
-                        # Save to cache dan update results
-                        for i, (text, embedding) in enumerate(zip(uncached_texts, new_embeddings)):
-                            cached_embeddings[uncached_indices[i]] = embedding
-                            self._save_to_cache(text, embedding)
+                        # OpenAIEmbeddingService mengembalikan zero vector untuk text yang gagal: jangan di-cache
+                        embedded = [(i, text, embedding) for i, text, embedding
+                                    in zip(uncached_indices, uncached_texts, new_embeddings)
+                                    if embedding and any(embedding)]
+                        for i, _, embedding in embedded:
+                            cached_embeddings[i] = embedding
+                        if embedded:
+                            self.embedding_cache.set_many(self.model_name, [text for _, text, _ in embedded],
+                                                          [embedding for _, _, embedding in embedded])
                         
-                        self.stats['openai_usage'] += len(uncached_texts)
+                        self.stats['openai_usage'] += len(embedded)
                         return [cached_embeddings.get(i, [0.0] * self.embedding_dim) for i in range(len(texts))]
                 except Exception as e:
                     logger.warning(f"⚠️ OpenAI batch embedding failed: {e}")
-                    if self.provider == 'openai':
+                    if self.provider == 'openai' and fallback:
                         # If OpenAI is primary provider and fails, use fallback
                         for i, text in zip(uncached_indices, uncached_texts):
                             cached_embeddings[i] = self._generate_fallback_embedding(text)
                         self.stats['fallback_usage'] += len(uncached_texts)
                         return [cached_embeddings.get(i, [0.0] * self.embedding_dim) for i in range(len(texts))]
             
+            if not fallback:
+                return [cached_embeddings.get(i, [0.0] * self.embedding_dim) for i in range(len(texts))]
+            
             # Sentence Transformers removed - using OpenAI only
+            # Hybrid: tolak seluruh batch yang gagal, jangan tulis vektor local ke collection OpenAI
+            if self.provider == 'hybrid':
+                logger.warning(f"⚠️ OpenAI embedding unavailable, {len(uncached_texts)} text(s) rejected (hybrid provider)")
+                self.stats['rejected'] += len(uncached_texts)
+                return [cached_embeddings.get(i, [0.0] * self.embedding_dim) for i in range(len(texts))]
+            
             # No valid provider, use fallback
             for i, text in zip(uncached_indices, uncached_texts):
                 cached_embeddings[i] = self._generate_fallback_embedding(text)
@@ -357,6 +422,9 @@ class UnifiedEmbeddingService:
             # Prepare documents for Qdrant - use the format expected by qdrant service
             qdrant_docs = []
             for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
+                if not any(embedding):
+                    # Embedding ditolak/gagal: jangan simpan zero vector ke Qdrant
+                    continue
                 text = doc.get('content', doc.get('text', ''))
                 doc_id = doc.get('id', doc.get('metadata', {}).get('id', f'doc_{i}'))
                 
@@ -399,11 +467,15 @@ class UnifiedEmbeddingService:
             'cache_size': len(self.embedding_cache),
             'cache_max_size': self.cache_max_size,
             'cache_hit_rate': round(cache_hit_rate, 3),
+            'cache': self.embedding_cache.get_stats(),
             'total_embeddings': self.stats['total_embeddings'],
             'model_load_time': round(self.stats['model_load_time'], 2),
             'avg_embedding_time': round(self.stats['avg_embedding_time'], 3),
             'fallback_usage': self.stats['fallback_usage'],
             'openai_usage': self.stats['openai_usage'],
+            'local_usage': self.stats['local_usage'],
+            'rejected': self.stats['rejected'],
+            'local_embedder_available': self.local_embedder is not None,
             'sentence_transformer_usage': 0,  # Deprecated
             'openai_available': self.openai_service is not None and self.openai_service.is_available(),
             'sentence_transformers_available': False,  # Deprecated
@@ -417,6 +489,8 @@ class UnifiedEmbeddingService:
     
     def is_available(self) -> bool:
         """Check apakah service tersedia"""
+        if self.provider == 'local':
+            return True
         return self.openai_service is not None and self.openai_service.is_available()
 
 
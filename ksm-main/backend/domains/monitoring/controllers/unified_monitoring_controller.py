@@ -233,6 +233,44 @@ def get_rag_health():
         }), 500
 
 
+@unified_monitoring_bp.route('/rag/semantic-cache', methods=['GET'])
+def get_semantic_cache_metrics():
+    """Get semantic response cache metrics"""
+    try:
+        result = monitoring_service.get_semantic_cache_metrics()
+        
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to get semantic cache metrics: {e}")
+        return jsonify({
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+
+@unified_monitoring_bp.route('/rag/semantic-cache/clear', methods=['POST'])
+def clear_semantic_cache():
+    """Clear semantic response cache"""
+    try:
+        result = monitoring_service.clear_semantic_cache()
+        
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to clear semantic cache: {e}")
+        return jsonify({
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+
 @unified_monitoring_bp.route('/system/status', methods=['GET'])
 def get_system_status():
     """Get overall system status"""
@@ -708,6 +708,41 @@ class UnifiedMonitoringService:
                 'error': str(e)
             }
     
+    def get_semantic_cache_metrics(self) -> Dict[str, Any]:
+        """Get semantic response cache metrics (hit rate, token yang dihemat)"""
+        try:
+            from domains.knowledge.services.semantic_response_cache import get_semantic_response_cache
+            
+            return {
+                'success': True,
+                'data': get_semantic_response_cache().get_stats()
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get semantic cache metrics: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def clear_semantic_cache(self) -> Dict[str, Any]:
+        """Clear semantic response cache"""
+        try:
+            from domains.knowledge.services.semantic_response_cache import get_semantic_response_cache
+            
+            removed = get_semantic_response_cache().invalidate()
+            return {
+                'success': True,
+                'message': f'Semantic cache cleared ({removed} entries)'
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to clear semantic cache: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def export_metrics(self, format_type: str = 'json') -> Dict[str, Any]:
         """Export metrics data"""
         try:
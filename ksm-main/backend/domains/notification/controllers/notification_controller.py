@@ -186,8 +186,12 @@ def test_telegram():
         data = request.get_json() or {}
         test_message = data.get('message', 'Test message from KSM Main Backend')
         chat_id = data.get('chat_id')
+        notification_id = data.get('notification_id')
         
-        success, message = telegram_sender_service.send_message(chat_id, test_message)
+        success, message = telegram_sender_service.send_message(
+            chat_id, test_message,
+            notification_id=int(notification_id) if notification_id is not None else None
+        )
         
         if success:
             return jsonify({
@@ -13,6 +13,7 @@ import traceback
 import requests
 import os
 from domains.notification.services.telegram_integration_service import telegram_integration, telegram_webhook
+from domains.notification.services.telegram_outbound_scheduler import get_telegram_outbound_scheduler
 # telegram_rag_service removed - using Agent AI directly
 # TelegramSettings sudah diimport di atas
 from domains.integration.services.agent_ai_sync_service import agent_ai_sync
@@ -52,39 +53,23 @@ class TelegramController:
                     'message': 'Admin chat ID tidak tersedia. Silakan kirim pesan ke bot terlebih dahulu.'
                 }
             
-            # Kirim pesan ke Telegram menggunakan bot token
-            bot_token = settings.bot_token
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            
-            payload = {
-                'chat_id': admin_chat_id,
-                'text': message,
-                'parse_mode': 'Markdown'
-            }
-            
-            response = requests.post(url, json=payload, timeout=10)
+            # Kirim pesan lewat outbound scheduler (rate limit, retry_after, pesan panjang dipecah)
+            result = get_telegram_outbound_scheduler().send(
+                settings.bot_token, admin_chat_id, message, 'Markdown', timeout=30
+            )
             
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('ok'):
-                    logger.info(f"Telegram notification sent successfully to chat_id: {admin_chat_id}")
-                    return {
-                        'success': True,
-                        'message': 'Notification sent successfully',
-                        'data': result
-                    }
-                else:
-                    logger.error(f"Telegram API error: {result}")
-                    return {
-                        'success': False,
-                        'message': f'Telegram API error: {result.get("description", "Unknown error")}'
-                    }
-            else:
-                logger.error(f"Failed to send telegram notification: {response.status_code} - {response.text}")
+            if result.success:
+                logger.info(f"Telegram notification sent successfully to chat_id: {admin_chat_id}")
                 return {
-                    'success': False,
-                    'message': f'Failed to send notification: {response.status_code}'
+                    'success': True,
+                    'message': 'Notification sent successfully',
+                    'data': result.to_dict()
                 }
+            logger.error(f"Failed to send telegram notification: {result.error}")
+            return {
+                'success': False,
+                'message': f'Failed to send notification: {result.error}'
+            }
             
         except Exception as e:
             logger.error(f"Error sending telegram notification: {str(e)}")
@@ -716,7 +701,11 @@ def telegram_webhook_info():
 
 @telegram_bp.route('/webhook', methods=['POST'])
 def telegram_webhook_endpoint():
-    """Webhook endpoint untuk menerima pesan dari Telegram"""
+    """Webhook endpoint untuk menerima pesan dari Telegram.
+
+    Update hanya dimasukkan ke dispatcher lalu langsung di-ack; RAG + Agent AI dan pengiriman
+    jawaban berjalan di worker pool (urutan dijaga per chat).
+    """
     try:
         logger.info("Webhook endpoint called")
         
@@ -727,22 +716,6 @@ def telegram_webhook_endpoint():
             return jsonify({'success': False, 'message': 'No data received'}), 400
         
         logger.debug(f"Webhook data: {webhook_data}")
-        
-        # Extract minimal fields
-        message = None
-        chat_id = None
-        user_id = None
-        if 'message' in webhook_data and 'text' in webhook_data['message']:
-            message = webhook_data['message']['text']
-            chat_id = webhook_data['message']['chat']['id']
-            user_id = webhook_data['message']['from']['id']
-        elif 'callback_query' in webhook_data:
-            message = webhook_data['callback_query'].get('data', '')
-            chat_id = webhook_data['callback_query']['message']['chat']['id']
-            user_id = webhook_data['callback_query']['from']['id']
-
-        if not message:
-            return jsonify({'success': True, 'message': 'Ignored non-text update'}), 200
 
         # TODO enterprise: resolve company_id dari mapping telegram_user_links
         company_id = Config.DEFAULT_COMPANY_ID
@@ -758,42 +731,36 @@ def telegram_webhook_endpoint():
         except Exception:
             pass
 
-        # Use RAG Enhanced Telegram Service untuk integrasi RAG + Agent AI
-        try:
-            from domains.knowledge.services.rag_enhanced_telegram_service import rag_enhanced_telegram
-            
-            agent_result = rag_enhanced_telegram.process_telegram_message(
-                user_id=user_id,
-                message=message,
-                session_id=f'telegram_{user_id}',
-                company_id=company_id
-            )
-            
-            logger.info(f"🤖 RAG Enhanced Telegram processed message for user {user_id}")
-            
-        except ImportError as e:
-            logger.warning(f"⚠️ RAG Enhanced Telegram Service not available: {e}, using fallback")
-            # Fallback ke method lama dengan company_id
-            agent_result = telegram_integration.send_message_to_agent(
-                user_id=user_id,
-                message=message,
-                session_id=f'telegram_{user_id}',
-                company_id=company_id
-            )
-
-        # Kirim balik via Telegram API jika ada token terkonfigurasi
-        if agent_result.get('success') and 'data' in agent_result:
-            response_text = agent_result['data'].get('response', 'Maaf, tidak ada respons dari AI.')
-            sent = telegram_integration._send_telegram_response(chat_id, response_text)
-            return jsonify({'success': True, 'message': 'OK', 'sent': bool(sent)}), 200
-
-        return jsonify({'success': False, 'message': agent_result.get('message', 'process_failed')}), 500
+        result = telegram_integration.process_webhook(webhook_data)
+        if result.get('success'):
+            return jsonify(result), 200
+        # 503 agar Telegram mengirim ulang update saat antrian penuh
+        return jsonify(result), 503 if result.get('data', {}).get('status') == 'queue_full' else 500
             
     except Exception as e:
         logger.error(f"Error in webhook endpoint: {e}")
         logger.error(traceback.format_exc())
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
+@telegram_bp.route('/dispatcher/stats', methods=['GET'])
+@jwt_required_custom
+def telegram_dispatcher_stats():
+    """Metrik dispatcher update Telegram (antrian, waktu tunggu, latency) dan outbound scheduler"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                **telegram_integration.dispatcher.get_stats(),
+                'outbound': get_telegram_outbound_scheduler().get_stats()
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting dispatcher stats: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
 @telegram_bp.route('/debug', methods=['GET'])
 def telegram_debug():
     """Endpoint untuk debug info"""
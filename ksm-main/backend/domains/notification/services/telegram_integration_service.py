@@ -15,8 +15,11 @@ import os
 
 # RAG integration (gantikan unified_rag_service dengan qdrant_service langsung)
 from domains.knowledge.services.qdrant_service import get_qdrant_service
-from domains.knowledge.services.openai_embedding_service import OpenAIEmbeddingService
+from domains.knowledge.services.query_embedding_service import get_query_embedding_service
 from config.config import Config
+from .telegram_update_dispatcher import TelegramUpdateDispatcher, ACCEPTED, DUPLICATE
+from .telegram_outbound_scheduler import get_telegram_outbound_scheduler
+from .telegram_stream_reply import TelegramStreamingReply
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +38,13 @@ class TelegramIntegrationService:
         # Polling mode controls
         self._polling_enabled = False
         self._polling_thread = None
+        self._polling_app = None
         self._last_update_id = None
+        # Jawaban Agent AI di-stream dan ditampilkan progresif (edit pesan) di chat
+        self.stream_responses = os.getenv('TELEGRAM_STREAM_RESPONSES', 'true').lower() == 'true'
+        
+        # Update webhook/polling diproses di worker pool (urutan per chat_id), bukan di request/thread polling
+        self.dispatcher = TelegramUpdateDispatcher(self.handle_update)
         
         # Agent AI Sync Service untuk health check dan forward
         try:
@@ -387,6 +396,8 @@ class TelegramIntegrationService:
             'agent_ai_url': self.agent_ai_url,
             'last_health_check': self.last_health_check.isoformat() if self.last_health_check else None,
             'ngrok_available': self._get_ngrok_url() is not None,
+            'dispatcher': self.dispatcher.get_stats(),
+            'outbound': get_telegram_outbound_scheduler().get_stats(),
             'timestamp': datetime.now().isoformat()
         }
     
@@ -470,32 +481,97 @@ class TelegramIntegrationService:
         return hashlib.md5(message.encode()).hexdigest()[:8]
     
     # --- Webhook handling methods ---
-    def process_webhook(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Proses webhook data dari Telegram"""
+    @staticmethod
+    def _parse_update(update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Field minimal (text, chat_id, user_id) dari update text message / callback query"""
+        if 'message' in update and update['message'].get('text'):
+            message = update['message']
+            return {
+                'text': message['text'],
+                'chat_id': message['chat']['id'],
+                'user_id': (message.get('from') or {}).get('id', message['chat']['id'])
+            }
+        if 'callback_query' in update:
+            callback_query = update['callback_query']
+            if not callback_query.get('data'):
+                return None
+            return {
+                'text': callback_query['data'],
+                'chat_id': callback_query['message']['chat']['id'],
+                'user_id': (callback_query.get('from') or {}).get('id', callback_query['message']['chat']['id'])
+            }
+        return None
+    
+    def process_webhook(self, webhook_data: Dict[str, Any], app=None) -> Dict[str, Any]:
+        """Terima update Telegram (webhook atau polling) ke dispatcher; pemrosesan berjalan di worker.
+        
+        Return status 'accepted' | 'duplicate' | 'ignored' | 'queue_full'. Saat queue_full webhook
+        sebaiknya dibalas non-2xx agar Telegram mengirim ulang update tersebut.
+        """
         try:
-            logger.info(f"Processing webhook: {webhook_data.get('update_id', 'unknown')}")
-            
-            # Extract message data
-            message_data = self._extract_message_data(webhook_data)
-            if not message_data:
-                logger.warning("No valid message data found in webhook")
-                return {'success': False, 'message': 'No valid message data'}
-            
-            # Process message
-            result = self._process_message(message_data)
-            
-            # Send response back to user via Telegram API
-            if result['success']:
-                self._send_telegram_response(
-                    chat_id=message_data['chat_id'],
-                    text=result['data']['response']
-                )
-            
-            return result
+            if not self._parse_update(webhook_data):
+                return {'success': True, 'message': 'Ignored non-text update', 'data': {'status': 'ignored'}}
+            
+            status = self.dispatcher.submit(webhook_data, app=app)
+            if status == DUPLICATE:
+                logger.info(f"Duplicate Telegram update {webhook_data.get('update_id')} dropped")
+            elif status != ACCEPTED:
+                logger.warning(f"⚠️ Telegram dispatcher queue full, update {webhook_data.get('update_id')} rejected")
+            return {
+                'success': status in (ACCEPTED, DUPLICATE),
+                'message': 'OK' if status in (ACCEPTED, DUPLICATE) else 'Queue full',
+                'data': {'status': status, 'update_id': webhook_data.get('update_id')}
+            }
             
         except Exception as e:
             logger.error(f"Error processing webhook: {e}")
-            return {'success': False, 'message': f'Error: {str(e)}'}
+            return {'success': False, 'message': f'Error: {str(e)}', 'data': {'status': 'error'}}
+    
+    def handle_update(self, update: Dict[str, Any]) -> bool:
+        """Proses satu update di worker dispatcher: RAG + Agent AI, lalu kirim jawaban ke chat"""
+        parsed = self._parse_update(update)
+        if not parsed:
+            return False
+        user_id = parsed['user_id']
+        company_id = Config.DEFAULT_COMPANY_ID
+        
+        stream_reply = None
+        if self.stream_responses and self.bot_token:
+            stream_reply = TelegramStreamingReply(self.bot_token, parsed['chat_id'])
+        
+        # Use RAG Enhanced Telegram Service untuk integrasi RAG + Agent AI
+        try:
+            from domains.knowledge.services.rag_enhanced_telegram_service import rag_enhanced_telegram
+            
+            agent_result = rag_enhanced_telegram.process_telegram_message(
+                user_id=user_id,
+                message=parsed['text'],
+                session_id=f'telegram_{user_id}',
+                company_id=company_id,
+                on_delta=stream_reply.update if stream_reply else None
+            )
+            logger.info(f"🤖 RAG Enhanced Telegram processed message for user {user_id}")
+            
+        except ImportError as e:
+            logger.warning(f"⚠️ RAG Enhanced Telegram Service not available: {e}, using fallback")
+            agent_result = self.send_message_to_agent(
+                user_id=user_id,
+                message=parsed['text'],
+                session_id=f'telegram_{user_id}',
+                company_id=company_id
+            )
+        
+        if agent_result.get('success') and 'data' in agent_result:
+            response_text = agent_result['data'].get('response', 'Maaf, tidak ada respons dari AI.')
+            if stream_reply and stream_reply.finish(response_text):
+                return True
+            return self._send_telegram_response(parsed['chat_id'], response_text)
+        
+        if stream_reply and stream_reply.started:
+            # Preview sudah tampil tetapi tidak ada jawaban final; ganti dengan pesan error
+            stream_reply.finish(agent_result.get('data', {}).get('response') or 'Maaf, terjadi kesalahan saat memproses pesan Anda.')
+        logger.warning(f"⚠️ Telegram update {update.get('update_id')} not answered: {agent_result.get('message', 'process_failed')}")
+        return False
     
     def _extract_message_data(self, webhook_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Extract data message dari webhook"""
@@ -606,65 +682,42 @@ class TelegramIntegrationService:
             }
     
     def _send_telegram_response(self, chat_id: int, text: str) -> bool:
-        """Send response ke Telegram user dengan optimisasi"""
+        """Antrikan jawaban ke outbound scheduler (rate limit + retry_after); tidak menahan worker.
+        
+        Jawaban di atas 4096 karakter dipecah menjadi beberapa pesan berurutan.
+        """
         try:
             if not self.bot_token:
                 logger.warning("Bot token not set, cannot send response")
                 return False
             
-            # Optimize response untuk Telegram
-            optimized_text = self._optimize_telegram_response(text)
-            
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': optimized_text,
-                'parse_mode': 'HTML'
-            }
+            def on_done(message):
+                if message.success:
+                    logger.info(f"Response sent to chat {chat_id} ({len(message.parts)} part(s))")
+                else:
+                    logger.error(f"Failed to send response to chat {chat_id}: {message.error}")
             
-            # Retry mechanism untuk menghindari timeout
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = requests.post(url, json=data, timeout=15)  # Increased timeout
-                    
-                    if response.status_code == 200:
-                        logger.info(f"Response sent to chat {chat_id}")
-                        return True
-                    else:
-                        logger.warning(f"Attempt {attempt + 1}: Failed to send response: {response.status_code} - {response.text}")
-                        if attempt < max_retries - 1:
-                            time.sleep(1)  # Wait before retry
-                        else:
-                            logger.error(f"Failed to send response after {max_retries} attempts")
-                            return False
-                            
-                except requests.exceptions.Timeout:
-                    logger.warning(f"Attempt {attempt + 1}: Telegram API timeout")
-                    if attempt < max_retries - 1:
-                        time.sleep(2)  # Wait before retry
-                    else:
-                        logger.error(f"Telegram API timeout after {max_retries} attempts")
-                        return False
+            get_telegram_outbound_scheduler().submit(self.bot_token, chat_id, text, 'HTML', callback=on_done)
+            return True
                         
         except Exception as e:
             logger.error(f"Error sending Telegram response: {e}")
             return False
     
-    def _build_rag_context(self, company_id: str, query: str) -> Dict[str, Any]:
+    def _build_rag_context(self, company_id: str, query: str, search_mode: Optional[str] = None) -> Dict[str, Any]:
         """Build RAG context menggunakan Qdrant service + OpenAI embeddings (tanpa unified_rag_service)."""
         try:
             # Konfigurasi Telegram RAG
             top_k = int(os.getenv('TELEGRAM_RAG_TOP_K', '5'))
             similarity_threshold = float(os.getenv('TELEGRAM_RAG_SIMILARITY_THRESHOLD', '0.3'))
+            search_mode = search_mode or os.getenv('TELEGRAM_RAG_SEARCH_MODE') or None
 
             logger.info(f"🔍 Building RAG context for query: {query[:50]}... (top_k={top_k}, threshold={similarity_threshold})")
 
             qdrant_service = get_qdrant_service()
-            embedding_service = OpenAIEmbeddingService()
 
             # Generate embedding
-            query_embedding = embedding_service.embed_text(query)
+            query_embedding = get_query_embedding_service().embed_query(query)
             if not query_embedding:
                 return {
                     'rag_results': [],
@@ -679,7 +732,8 @@ class TelegramIntegrationService:
                 query=query,
                 top_k=top_k,
                 collection='default',
-                query_embedding=query_embedding
+                query_embedding=query_embedding,
+                search_mode=search_mode
             ) or []
 
             # Normalisasi dan filter threshold
@@ -741,43 +795,14 @@ class TelegramIntegrationService:
                 'error': str(e)
             }
     
-    def _optimize_telegram_response(self, text: str) -> str:
-        """Optimize response text untuk Telegram"""
-        try:
-            # Telegram memiliki batasan 4096 karakter per pesan
-            max_length = 4000  # Leave some buffer
-            
-            if len(text) <= max_length:
-                return text
-            
-            # Jika terlalu panjang, potong dan tambahkan indikator
-            truncated = text[:max_length - 100]  # Leave space for indicator
-            
-            # Cari titik potong yang baik (akhir kalimat)
-            last_period = truncated.rfind('.')
-            last_newline = truncated.rfind('\n')
-            
-            if last_period > max_length * 0.8:  # Jika ada titik di 80% terakhir
-                truncated = truncated[:last_period + 1]
-            elif last_newline > max_length * 0.8:  # Jika ada newline di 80% terakhir
-                truncated = truncated[:last_newline]
-            
-            # Tambahkan indikator
-            truncated += "\n\n<i>... (respons dipotong karena terlalu panjang)</i>"
-            
-            return truncated
-            
-        except Exception as e:
-            logger.warning(f"Error optimizing Telegram response: {e}")
-            # Fallback: potong sederhana
-            return text[:4000] + "\n\n<i>... (respons dipotong)</i>" if len(text) > 4000 else text
-
 # ---------------- Polling mode ----------------
     def _start_polling_thread(self):
         try:
             if self._polling_thread and self._polling_thread.is_alive():
                 return
             self._polling_enabled = True
+            # App context pemanggil diteruskan ke worker dispatcher (handler butuh akses database)
+            self._polling_app = self.dispatcher._current_app() or self._polling_app
             self._polling_thread = threading.Thread(target=self._polling_loop, daemon=True)
             self._polling_thread.start()
             logger.info("Telegram polling thread started")
@@ -826,31 +851,13 @@ class TelegramIntegrationService:
                     time.sleep(2)
                     continue
                 for update in data.get('result', []):
+                    # Offset hanya maju jika update diterima dispatcher; saat antrian penuh
+                    # sisa batch diambil ulang pada getUpdates berikutnya
+                    result = self.process_webhook(update, app=self._polling_app)
+                    if result.get('data', {}).get('status') == 'queue_full':
+                        time.sleep(1)
+                        break
                     self._last_update_id = update.get('update_id', self._last_update_id)
-                    # Extract minimal fields
-                    message = None
-                    chat_id = None
-                    if 'message' in update and 'text' in update['message']:
-                        message = update['message']['text']
-                        chat_id = update['message']['chat']['id']
-                    elif 'callback_query' in update:
-                        message = update['callback_query'].get('data', '')
-                        chat_id = update['callback_query']['message']['chat']['id']
-                    if not message or chat_id is None:
-                        continue
-                    # Use default company_id from config
-                    company_id = Config.DEFAULT_COMPANY_ID
-                    user_id = chat_id  # Use chat_id as user_id
-                    # Forward to Agent AI directly with company_id
-                    agent_result = self.send_message_to_agent(
-                        user_id=user_id,
-                        message=message,
-                        session_id=f'telegram_{user_id}',
-                        company_id=company_id
-                    )
-                    if agent_result.get('success') and 'data' in agent_result:
-                        response_text = agent_result['data'].get('response', 'Maaf, tidak ada respons dari AI.')
-                        self._send_telegram_response(chat_id, response_text)
                 # slight delay to avoid tight loop
                 time.sleep(0.5)
             except Exception as e:
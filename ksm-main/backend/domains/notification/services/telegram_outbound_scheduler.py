@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram Outbound Scheduler untuk KSM Main Backend
+Penjadwal pengiriman pesan keluar ke Bot API Telegram.
+
+- Satu requests.Session per proses dengan connection pool (keep-alive ke api.telegram.org)
+- Token bucket global per bot dan per chat (chat privat vs grup) mengikuti batas kirim Telegram
+- 429 dibalas dengan menunda chat tersebut sesuai `retry_after`; error jaringan/5xx memakai backoff eksponensial
+- Pesan di atas 4096 karakter dipecah di batas paragraf/baris; bagian-bagiannya dikirim berurutan per chat
+  tanpa menahan thread pemanggil, sementara chat lain tetap berjalan
+- Setiap pesan menghasilkan OutboundMessage berisi status per penerima (message_ids, error, attempts)
+- try_acquire()/acquire() memberi slot kirim untuk request langsung (edit progresif jawaban streaming)
+  dengan limit per chat/global yang sama
+"""
+
+import os
+import time
+import heapq
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+# Batas panjang text sendMessage
+MAX_MESSAGE_LENGTH = 4096
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Pecah text panjang menjadi bagian <= limit, diutamakan di paragraf, lalu baris, lalu spasi"""
+    text = text or ''
+    parts: List[str] = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = -1
+        for separator in ('\n\n', '\n', ' '):
+            cut = window.rfind(separator)
+            # Potongan terlalu pendek membuang banyak kapasitas; turun ke pemisah berikutnya
+            if cut >= limit // 2:
+                break
+        if cut < limit // 2:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip('\n ')
+    if text or not parts:
+        parts.append(text)
+    return [part for part in parts if part] or ['']
+
+
+class TokenBucket:
+    """Token bucket sederhana; dipakai dengan lock scheduler dipegang"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Detik sampai satu token tersedia (0 jika tersedia sekarang)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1.0
+
+
+class OutboundMessage:
+    """Satu pesan (bisa terdiri dari beberapa bagian) untuk satu chat"""
+
+    def __init__(self, bot_token: str, chat_id: Any, parts: List[str], parse_mode: Optional[str],
+                 notification_id: Optional[int] = None, extra: Optional[Dict[str, Any]] = None,
+                 callback: Optional[Callable[['OutboundMessage'], None]] = None):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.parts = parts
+        self.parse_mode = parse_mode
+        self.notification_id = notification_id
+        self.extra = extra or {}
+        self.callback = callback
+        self.next_part = 0
+        self.attempts = 0          # total request sendMessage
+        self.part_attempts = 0     # percobaan untuk bagian saat ini (dibatasi max_attempts)
+        self.message_ids: List[int] = []
+        self.status = 'queued'  # queued | sent | failed
+        self.error: Optional[str] = None
+        self.enqueued_at = time.time()
+        self.completed_at: Optional[float] = None
+        self._done = threading.Event()
+
+    @property
+    def success(self) -> bool:
+        return self.status == 'sent'
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Tunggu sampai semua bagian terkirim atau gagal; False jika timeout"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'chat_id': self.chat_id,
+            'notification_id': self.notification_id,
+            'status': self.status,
+            'success': self.success,
+            'error': self.error,
+            'parts': len(self.parts),
+            'parts_sent': len(self.message_ids),
+            'message_ids': list(self.message_ids),
+            'attempts': self.attempts,
+            'latency_ms': round((self.completed_at - self.enqueued_at) * 1000.0, 1) if self.completed_at else None
+        }
+
+
+class _ChatState:
+    """Antrian dan limiter satu chat"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.queue: deque = deque()
+        self.blocked_until = 0.0   # retry_after / backoff
+        self.in_flight = False
+        self.scheduled = False
+
+
+class TelegramOutboundScheduler:
+    """Scheduler pengiriman dengan rate limit global/per chat dan worker pool kecil"""
+
+    # Jumlah state chat yang disimpan sebelum chat idle dibersihkan
+    MAX_IDLE_CHATS = 10000
+
+    def __init__(self):
+        self.global_rate = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))            # pesan/detik per bot
+        self.private_chat_rate = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))         # pesan/detik per chat privat
+        self.group_chat_rate = float(os.getenv('TELEGRAM_GROUP_CHAT_RATE', str(20 / 60.0)))  # 20 pesan/menit per grup
+        self.chat_burst = float(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+        self.max_attempts = int(os.getenv('TELEGRAM_SEND_MAX_ATTEMPTS', '5'))
+        self.max_backoff = float(os.getenv('TELEGRAM_SEND_MAX_BACKOFF', '30'))
+        self.request_timeout = float(os.getenv('TELEGRAM_SEND_TIMEOUT', '15'))
+        self.max_workers = int(os.getenv('TELEGRAM_SEND_WORKERS', '4'))
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._global_buckets: Dict[str, TokenBucket] = {}
+        self._chats: Dict[tuple, _ChatState] = {}
+        # Heap (ready_at, seq, chat_key) untuk chat yang punya pesan dan tidak sedang dikirim
+        self._ready: List[tuple] = []
+        self._seq = 0
+        self._pending = 0
+
+        self._session = None
+        self._session_pid = None
+        self._workers: List[threading.Thread] = []
+        self._workers_pid = None
+
+        self.stats = {
+            'messages_queued': 0,
+            'messages_sent': 0,
+            'messages_failed': 0,
+            'parts_sent': 0,
+            'rate_limited': 0,
+            'retries': 0
+        }
+
+    # ===== HTTP =====
+
+    @property
+    def session(self) -> requests.Session:
+        """Session ber-pool per proses (dibuat ulang setelah fork)"""
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    pool_size = max(self.max_workers, 4)
+                    session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def call(self, bot_token: str, method: str, payload: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None) -> requests.Response:
+        """Panggil method Bot API lewat session bersama (tanpa rate limit; untuk getMe dan sejenisnya)"""
+        return self.session.post(f"{TELEGRAM_API_URL}/bot{bot_token}/{method}", json=payload or {},
+                                 timeout=timeout or self.request_timeout)
+
+    # ===== SCHEDULING =====
+
+    def _chat_state(self, bot_token: str, chat_id: Any) -> _ChatState:
+        key = (bot_token, str(chat_id))
+        state = self._chats.get(key)
+        if state is None:
+            if len(self._chats) >= self.MAX_IDLE_CHATS:
+                self._prune_idle_chats()
+            # chat_id negatif = grup/channel (batas kirim lebih ketat)
+            rate = self.group_chat_rate if str(chat_id).startswith('-') else self.private_chat_rate
+            state = self._chats[key] = _ChatState(TokenBucket(rate, self.chat_burst))
+        return state
+
+    def _prune_idle_chats(self):
+        # State chat disimpan setelah antrian kosong agar limit per chat tetap berlaku antar pesan;
+        # chat yang bucket-nya sudah penuh kembali dan tidak diblokir aman dibuang
+        now = time.monotonic()
+        for key, state in list(self._chats.items()):
+            if (not state.queue and not state.in_flight and state.blocked_until <= now
+                    and state.bucket.delay(now) == 0 and state.bucket.tokens >= state.bucket.capacity):
+                del self._chats[key]
+
+    def _global_bucket(self, bot_token: str) -> TokenBucket:
+        bucket = self._global_buckets.get(bot_token)
+        if bucket is None:
+            bucket = self._global_buckets[bot_token] = TokenBucket(self.global_rate, self.global_rate)
+        return bucket
+
+    def _schedule(self, key: tuple, ready_at: float):
+        # Dipanggil dengan self._lock dipegang
+        self._seq += 1
+        heapq.heappush(self._ready, (ready_at, self._seq, key))
+        self._wakeup.notify()
+
+    def _ensure_workers(self):
+        # Dipanggil dengan self._lock dipegang
+        pid = os.getpid()
+        if self._workers_pid != pid:
+            self._workers = []
+            self._workers_pid = pid
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        for index in range(len(self._workers), self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"telegram-send-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, bot_token: str, chat_id: Any, text: str, parse_mode: Optional[str] = None, *,
+               notification_id: Optional[int] = None, extra: Optional[Dict[str, Any]] = None,
+               callback: Optional[Callable[[OutboundMessage], None]] = None) -> OutboundMessage:
+        """Antrikan pesan; langsung kembali. Pesan panjang dipecah dan dikirim berurutan.
+
+        extra: field sendMessage tambahan (reply_markup, disable_web_page_preview, ...)
+        callback: dipanggil dari thread worker setelah pesan selesai (terkirim atau gagal)
+        """
+        message = OutboundMessage(bot_token, chat_id, split_message(text), parse_mode,
+                                  notification_id=notification_id, extra=extra, callback=callback)
+        with self._lock:
+            state = self._chat_state(bot_token, chat_id)
+            state.queue.append(message)
+            self._pending += 1
+            self.stats['messages_queued'] += 1
+            if not state.scheduled and not state.in_flight:
+                state.scheduled = True
+                self._schedule((bot_token, str(chat_id)), time.monotonic())
+            self._ensure_workers()
+        return message
+
+    def send(self, bot_token: str, chat_id: Any, text: str, parse_mode: Optional[str] = None,
+             timeout: Optional[float] = None, **kwargs) -> OutboundMessage:
+        """Antrikan lalu tunggu hasilnya (untuk pemanggil yang butuh status sinkron)"""
+        message = self.submit(bot_token, chat_id, text, parse_mode, **kwargs)
+        if not message.wait(timeout):
+            message.error = message.error or 'Timeout menunggu pengiriman (pesan tetap di antrian)'
+        return message
+
+    def send_many(self, bot_token: str, messages: List[Dict[str, Any]], parse_mode: Optional[str] = None,
+                  timeout: Optional[float] = None) -> List[OutboundMessage]:
+        """Fan-out: antrikan semua pesan {chat_id, text, notification_id?, extra?, callback?} lalu tunggu bersama"""
+        handles = [
+            self.submit(bot_token, item['chat_id'], item['text'], item.get('parse_mode', parse_mode),
+                        notification_id=item.get('notification_id'), extra=item.get('extra'),
+                        callback=item.get('callback'))
+            for item in messages
+        ]
+        deadline = time.monotonic() + timeout if timeout else None
+        for handle in handles:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not handle.wait(remaining):
+                handle.error = handle.error or 'Timeout menunggu pengiriman (pesan tetap di antrian)'
+        return handles
+
+    # ===== SLOT LANGSUNG (edit progresif) =====
+
+    def _slot_delay(self, bot_token: str, chat_id: Any, now: float) -> float:
+        # Dipanggil dengan self._lock dipegang
+        state = self._chat_state(bot_token, chat_id)
+        return max(state.blocked_until - now, state.bucket.delay(now), self._global_bucket(bot_token).delay(now))
+
+    def _consume_slot(self, bot_token: str, chat_id: Any, now: float):
+        self._chat_state(bot_token, chat_id).bucket.consume(now)
+        self._global_bucket(bot_token).consume(now)
+
+    def try_acquire(self, bot_token: str, chat_id: Any) -> bool:
+        """Ambil satu slot kirim untuk chat tanpa menunggu; False jika limit chat/global belum mengizinkan.
+
+        Untuk request yang dikirim langsung lewat call() (mis. editMessageText saat streaming jawaban)
+        agar tetap dihitung dalam limit yang sama dengan antrian.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._slot_delay(bot_token, chat_id, now) > 0:
+                return False
+            self._consume_slot(bot_token, chat_id, now)
+            return True
+
+    def acquire(self, bot_token: str, chat_id: Any, timeout: Optional[float] = None) -> bool:
+        """Seperti try_acquire, tetapi menunggu sampai slot tersedia (False jika timeout)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._slot_delay(bot_token, chat_id, now)
+                if delay <= 0:
+                    self._consume_slot(bot_token, chat_id, now)
+                    return True
+            if deadline is not None:
+                if now + delay > deadline:
+                    return False
+            time.sleep(delay)
+
+    def pause_chat(self, bot_token: str, chat_id: Any, seconds: float):
+        """Tunda semua pengiriman ke chat (retry_after dari 429 pada request langsung)"""
+        with self._lock:
+            state = self._chat_state(bot_token, chat_id)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+            self.stats['rate_limited'] += 1
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                key, state, message = self._next_ready()
+            self._deliver(key, state, message)
+
+    def _next_ready(self):
+        # Dipanggil dengan self._lock dipegang; blok sampai ada chat yang boleh mengirim
+        while True:
+            now = time.monotonic()
+            if not self._ready:
+                self._wakeup.wait()
+                continue
+            ready_at, _, key = self._ready[0]
+            if ready_at > now:
+                self._wakeup.wait(ready_at - now)
+                continue
+            heapq.heappop(self._ready)
+            state = self._chats[key]
+            delay = max(state.blocked_until - now, state.bucket.delay(now), self._global_bucket(key[0]).delay(now))
+            if delay > 0:
+                self._schedule(key, now + delay)
+                continue
+            state.bucket.consume(now)
+            self._global_bucket(key[0]).consume(now)
+            state.scheduled = False
+            state.in_flight = True
+            return key, state, state.queue[0]
+
+    def _deliver(self, key: tuple, state: _ChatState, message: OutboundMessage):
+        """Kirim bagian berikutnya dari pesan terdepan chat, lalu jadwalkan ulang chat tersebut"""
+        retry_in = None
+        finished = False
+        message.attempts += 1
+        message.part_attempts += 1
+        try:
+            payload = {'chat_id': message.chat_id, 'text': message.parts[message.next_part], **message.extra}
+            if message.parse_mode:
+                payload['parse_mode'] = message.parse_mode
+            response = self.call(message.bot_token, 'sendMessage', payload)
+            body = response.json() if response.content else {}
+            if response.status_code == 200 and body.get('ok'):
+                message.message_ids.append((body.get('result') or {}).get('message_id'))
+                message.next_part += 1
+                message.part_attempts = 0
+                finished = message.next_part >= len(message.parts)
+                with self._lock:
+                    self.stats['parts_sent'] += 1
+            elif response.status_code == 429:
+                retry_in = float((body.get('parameters') or {}).get('retry_after', 1))
+                message.error = body.get('description', 'Too Many Requests')
+                with self._lock:
+                    self.stats['rate_limited'] += 1
+            elif response.status_code == 400 and message.parse_mode and "can't parse entities" in body.get('description', ''):
+                # Markup rusak (mis. hasil pemecahan pesan): kirim ulang sebagai text biasa
+                logger.warning(f"⚠️ Telegram rejected {message.parse_mode} markup for chat {message.chat_id}, resending as plain text")
+                message.parse_mode = None
+                retry_in = 0.0
+            elif response.status_code >= 500:
+                message.error = f"HTTP {response.status_code}: {body.get('description', response.text[:200])}"
+                retry_in = min(2.0 ** message.part_attempts, self.max_backoff)
+            else:
+                # 400/403 (chat tidak ditemukan, bot diblokir, ...) tidak akan berhasil jika diulang
+                message.error = f"HTTP {response.status_code}: {body.get('description', response.text[:200])}"
+                finished = True
+        except requests.exceptions.RequestException as e:
+            message.error = f"Request error: {e}"
+            retry_in = min(2.0 ** message.part_attempts, self.max_backoff)
+        except Exception as e:
+            # Response tak terduga (body bukan object, retry_after bukan angka, ...): perlakukan seperti
+            # error sementara agar chat tetap dijadwalkan ulang dan worker tidak mati dengan in_flight=True
+            logger.warning(f"⚠️ Unexpected Telegram response for chat {message.chat_id}: {e}")
+            message.error = f"Unexpected response: {e}"
+            retry_in = min(2.0 ** message.part_attempts, self.max_backoff)
+
+        if retry_in is not None and message.part_attempts >= self.max_attempts:
+            finished = True
+            retry_in = None
+
+        with self._lock:
+            now = time.monotonic()
+            if retry_in is not None:
+                state.blocked_until = now + retry_in
+                self.stats['retries'] += 1
+            if finished:
+                state.queue.popleft()
+                self._pending -= 1
+                message.status = 'sent' if message.next_part >= len(message.parts) else 'failed'
+                if message.success:
+                    message.error = None
+                message.completed_at = time.time()
+                self.stats['messages_sent' if message.success else 'messages_failed'] += 1
+            state.in_flight = False
+            if state.queue:
+                state.scheduled = True
+                self._schedule(key, max(now, state.blocked_until))
+
+        if finished:
+            if not message.success:
+                logger.error(f"❌ Telegram message to chat {message.chat_id} failed: {message.error}")
+            message._done.set()
+            if message.callback:
+                try:
+                    message.callback(message)
+                except Exception as e:
+                    logger.error(f"❌ Telegram send callback error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'pending_messages': self._pending,
+                'active_chats': sum(1 for state in self._chats.values() if state.queue),
+                'workers': sum(1 for worker in self._workers if worker.is_alive()),
+                'global_rate': self.global_rate,
+                'private_chat_rate': self.private_chat_rate,
+                'group_chat_rate': round(self.group_chat_rate, 3)
+            }
+
+
+# Global instance
+_telegram_outbound_scheduler = None
+_telegram_outbound_scheduler_lock = threading.Lock()
+
+
+def get_telegram_outbound_scheduler() -> TelegramOutboundScheduler:
+    """Get global Telegram outbound scheduler instance"""
+    global _telegram_outbound_scheduler
+    if _telegram_outbound_scheduler is None:
+        with _telegram_outbound_scheduler_lock:
+            if _telegram_outbound_scheduler is None:
+                _telegram_outbound_scheduler = TelegramOutboundScheduler()
+    return _telegram_outbound_scheduler
@@ -3,14 +3,21 @@
 """
 Telegram Sender Service - Service untuk kirim notifikasi ke Telegram
 Digunakan untuk Daily Task Notification System
+
+Pengiriman lewat TelegramOutboundScheduler (session bersama, rate limit global/per chat,
+backoff retry_after, pemecahan pesan panjang)
+
+Hasil kirim ditulis ke Notification (notification_id) saat pemanggil selesai menunggu; pesan
+yang masih di antrian saat batas tunggu habis dicatat 'queued' lalu diperbarui begitu selesai.
 """
 
-import requests
-import time
+import os
 import logging
+import threading
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from config.config import Config
+from .telegram_outbound_scheduler import get_telegram_outbound_scheduler, OutboundMessage
 
 logger = logging.getLogger(__name__)
 
@@ -22,18 +29,50 @@ class TelegramSenderService:
         self.bot_token = Config.TELEGRAM_BOT_TOKEN
         self.default_chat_id = Config.TELEGRAM_DEFAULT_CHAT_ID
         self.admin_chat_id = Config.ADMIN_ALERT_CHAT_ID
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-        self.max_retries = 3
-        self.retry_delay = 30  # seconds
+        self.scheduler = get_telegram_outbound_scheduler()
+        # Batas menunggu hasil kirim untuk pemanggil sinkron (detik); pesan tetap di antrian setelahnya
+        self.send_timeout = float(os.getenv('TELEGRAM_SEND_WAIT_TIMEOUT', '120'))
+        # Handle yang dicatat 'queued' dan menunggu hasil akhir dari callback worker
+        self._awaiting_delivery = set()
+        self._delivery_lock = threading.Lock()
+    
+    @staticmethod
+    def _current_app():
+        """Flask app pemanggil agar callback dari thread worker bisa menulis ke database"""
+        try:
+            from flask import current_app, has_app_context
+            return current_app._get_current_object() if has_app_context() else None
+        except ImportError:
+            return None
     
-    def send_message(self, chat_id: str, message: str, parse_mode: str = "Markdown") -> Tuple[bool, str]:
+    def _delivery_callback(self, notification_id: Optional[int]):
+        """Callback submit: tulis hasil akhir jika pemanggil sudah berhenti menunggu"""
+        if notification_id is None:
+            return None
+        app = self._current_app()
+        
+        def on_done(message: OutboundMessage):
+            with self._delivery_lock:
+                if message not in self._awaiting_delivery:
+                    return
+                self._awaiting_delivery.discard(message)
+                if app is not None:
+                    with app.app_context():
+                        self._write_delivery_results([message])
+                else:
+                    self._write_delivery_results([message])
+        return on_done
+    
+    def send_message(self, chat_id: str, message: str, parse_mode: str = "Markdown",
+                     notification_id: Optional[int] = None) -> Tuple[bool, str]:
         """
         Kirim pesan ke Telegram
         
         Args:
             chat_id: ID chat Telegram
-            message: Pesan yang akan dikirim
+            message: Pesan yang akan dikirim (dipecah otomatis jika > 4096 karakter)
             parse_mode: Mode parsing (Markdown, HTML)
+            notification_id: ID Notification yang status kirimnya diperbarui
         
         Returns:
             Tuple[bool, str]: (success, message)
@@ -48,59 +87,105 @@ class TelegramSenderService:
             self.logger.error(error_msg)
             return False, error_msg
         
-        url = f"{self.base_url}/sendMessage"
-        data = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': parse_mode
-        }
+        self.logger.info(f"Sending message to chat {chat_id}")
+        result = self.scheduler.send(self.bot_token, chat_id, message, parse_mode,
+                                     timeout=self.send_timeout, notification_id=notification_id,
+                                     callback=self._delivery_callback(notification_id))
+        if notification_id is not None:
+            self._record_delivery_results([result])
         
-        for attempt in range(self.max_retries):
-            try:
-                self.logger.info(f"Sending message to chat {chat_id} (attempt {attempt + 1})")
-                
-                response = requests.post(url, json=data, timeout=30)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                if result.get('ok'):
-                    self.logger.info(f"Message sent successfully to chat {chat_id}")
-                    return True, "Message sent successfully"
-                else:
-                    error_msg = f"Telegram API error: {result.get('description', 'Unknown error')}"
-                    self.logger.error(error_msg)
-                    
-                    if attempt < self.max_retries - 1:
-                        self.logger.info(f"Retrying in {self.retry_delay} seconds...")
-                        time.sleep(self.retry_delay)
-                    else:
-                        return False, error_msg
-                        
-            except requests.exceptions.RequestException as e:
-                error_msg = f"Request error: {str(e)}"
-                self.logger.error(error_msg)
-                
-                if attempt < self.max_retries - 1:
-                    self.logger.info(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
-                else:
-                    return False, error_msg
-                    
-            except Exception as e:
-                error_msg = f"Unexpected error: {str(e)}"
-                self.logger.error(error_msg)
-                return False, error_msg
+        if result.success:
+            self.logger.info(f"Message sent successfully to chat {chat_id}")
+            return True, "Message sent successfully"
+        if result.status == 'queued':
+            # Belum gagal: pesan masih di antrian (rate limit / retry_after), hasil akhir belum diketahui
+            self.logger.warning(f"Message to chat {chat_id} still queued after {self.send_timeout:.0f}s")
+            return True, "Message queued, delivery not confirmed yet"
+        self.logger.error(f"Failed to send message to chat {chat_id}: {result.error}")
+        return False, result.error or "Message not sent"
+    
+    def send_bulk(self, messages: List[Dict], parse_mode: str = "Markdown",
+                  timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Fan-out banyak pesan sekaligus; antrian dikirim paralel sesuai rate limit Telegram
+        
+        Args:
+            messages: list {chat_id, text, notification_id (opsional), parse_mode (opsional)}
+            parse_mode: Mode parsing default
+            timeout: Batas menunggu seluruh pengiriman (default send_timeout)
+        
+        Returns:
+            List[Dict]: hasil per penerima (status, error, message_ids, attempts)
+        """
+        if not self.bot_token:
+            return [{'chat_id': item.get('chat_id'), 'notification_id': item.get('notification_id'),
+                     'success': False, 'status': 'failed', 'error': 'Bot token tidak tersedia'} for item in messages]
         
-        return False, "Max retries exceeded"
+        messages = [{**item, 'callback': self._delivery_callback(item.get('notification_id'))} for item in messages]
+        handles = self.scheduler.send_many(self.bot_token, messages, parse_mode,
+                                           timeout=timeout or self.send_timeout)
+        self._record_delivery_results(handles)
+        failed = sum(1 for handle in handles if handle.status == 'failed')
+        queued = sum(1 for handle in handles if handle.status == 'queued')
+        self.logger.info(f"Bulk send finished: {len(handles) - failed - queued} sent, {failed} failed, "
+                         f"{queued} still queued")
+        return [handle.to_dict() for handle in handles]
     
-    def send_daily_task_report(self, report_data: Dict, chat_id: str = None) -> Tuple[bool, str]:
+    def _record_delivery_results(self, handles: List[OutboundMessage]):
+        """Catat hasil kirim saat pemanggil selesai menunggu; handle yang masih 'queued'
+        diperbarui lagi oleh callback worker setelah selesai"""
+        with self._delivery_lock:
+            for handle in handles:
+                if handle.notification_id is not None and handle.status == 'queued':
+                    self._awaiting_delivery.add(handle)
+            self._write_delivery_results(handles)
+    
+    def _write_delivery_results(self, handles: List[OutboundMessage]):
+        """Simpan hasil kirim ke Notification (is_sent, sent_at, data.telegram_delivery_status, data.telegram_deliveries).
+
+        Satu notification bisa dikirim ke beberapa chat: is_sent hanya jika semua terkirim,
+        telegram_deliveries berisi daftar hasil per chat.
+        """
+        by_id: Dict[int, List[OutboundMessage]] = {}
+        for handle in handles:
+            if handle.notification_id is not None:
+                by_id.setdefault(handle.notification_id, []).append(handle)
+        if not by_id:
+            return
+        try:
+            from config.database import db
+            from domains.notification.models.notification_models import Notification
+            
+            for notification in Notification.query.filter(Notification.id.in_(list(by_id))).all():
+                data = dict(notification.data or {})
+                deliveries = {str(item.get('chat_id')): item for item in data.get('telegram_deliveries') or []}
+                for handle in by_id[notification.id]:
+                    deliveries[str(handle.chat_id)] = handle.to_dict()
+                statuses = {item.get('status') for item in deliveries.values()}
+                if statuses == {'sent'}:
+                    notification.is_sent = True
+                    notification.sent_at = notification.sent_at or datetime.utcnow()
+                status = 'failed' if 'failed' in statuses else ('queued' if 'queued' in statuses else 'sent')
+                # JSON diganti objek baru agar perubahan terdeteksi SQLAlchemy
+                notification.data = {**data, 'telegram_delivery_status': status,
+                                     'telegram_deliveries': list(deliveries.values())}
+            db.session.commit()
+        except Exception as e:
+            self.logger.error(f"Error recording Telegram delivery results: {e}")
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+    
+    def send_daily_task_report(self, report_data: Dict, chat_id: str = None,
+                               notification_id: Optional[int] = None) -> Tuple[bool, str]:
         """
         Kirim daily task report ke Telegram
         
         Args:
             report_data: Data report dari Agent AI
-            chat_id: ID chat target (default: default_chat_id)
+            chat_id: ID chat target, boleh dipisah koma untuk banyak chat (default: default_chat_id)
+            notification_id: ID Notification report yang status kirimnya diperbarui
         
         Returns:
             Tuple[bool, str]: (success, message)
@@ -109,7 +194,8 @@ class TelegramSenderService:
             if not chat_id:
                 chat_id = self.default_chat_id
             
-            if not chat_id:
+            chat_ids = [item.strip() for item in str(chat_id or '').split(',') if item.strip()]
+            if not chat_ids:
                 error_msg = "Chat ID tidak tersedia untuk daily report"
                 self.logger.error(error_msg)
                 return False, error_msg
@@ -122,11 +208,27 @@ class TelegramSenderService:
                 self.logger.error(error_msg)
                 return False, error_msg
             
+            if len(chat_ids) > 1:
+                # Fan-out: semua chat diantrikan sekaligus, dikirim sesuai rate limit
+                results = self.send_bulk([{'chat_id': item, 'text': message, 'notification_id': notification_id}
+                                          for item in chat_ids])
+                failed = [f"{result['chat_id']}: {result['error']}" for result in results if result['status'] == 'failed']
+                if failed:
+                    result_msg = f"Report gagal ke {len(failed)}/{len(results)} chat: {'; '.join(failed)}"
+                    self.logger.error(f"Failed to send daily task report: {result_msg}")
+                    return False, result_msg
+                queued = sum(1 for result in results if result['status'] == 'queued')
+                if queued:
+                    self.logger.warning(f"Daily task report still queued for {queued}/{len(results)} chats")
+                    return True, f"Report sent to {len(results) - queued} chats, {queued} still queued"
+                self.logger.info(f"Daily task report sent successfully to {len(results)} chats")
+                return True, f"Report sent to {len(results)} chats"
+            
             # Kirim message
-            success, result_msg = self.send_message(chat_id, message)
+            success, result_msg = self.send_message(chat_ids[0], message, notification_id=notification_id)
             
             if success:
-                self.logger.info(f"Daily task report sent successfully to {chat_id}")
+                self.logger.info(f"Daily task report sent successfully to {chat_ids[0]}")
             else:
                 self.logger.error(f"Failed to send daily task report: {result_msg}")
             
@@ -280,8 +382,7 @@ class TelegramSenderService:
             if not self.bot_token:
                 return False, "Bot token tidak tersedia"
             
-            url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self.scheduler.call(self.bot_token, 'getMe', timeout=10)
             response.raise_for_status()
             
             result = response.json()
@@ -309,8 +410,7 @@ class TelegramSenderService:
             if not self.bot_token:
                 return {'error': 'Bot token tidak tersedia'}
             
-            url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self.scheduler.call(self.bot_token, 'getMe', timeout=10)
             response.raise_for_status()
             
             result = response.json()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram Streaming Reply untuk KSM Main Backend
+Menampilkan jawaban Agent AI yang di-stream secara progresif di satu pesan Telegram.
+
+- Pesan pertama dikirim begitu potongan jawaban awal tersedia (time-to-first-visible-token)
+- Pesan yang sama diperbarui dengan editMessageText, paling cepat tiap TELEGRAM_STREAM_EDIT_INTERVAL detik
+  dan hanya jika slot limit per chat/global di outbound scheduler tersedia (edit tidak pernah menahan stream)
+- Preview dikirim sebagai text biasa (markup setengah jadi ditolak Telegram); edit terakhir memakai parse_mode
+- Jawaban di atas 4096 karakter: pesan pertama berisi bagian pertama, sisanya diantrikan sebagai pesan baru
+"""
+
+import os
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from .telegram_outbound_scheduler import (
+    get_telegram_outbound_scheduler, split_message, MAX_MESSAGE_LENGTH
+)
+
+logger = logging.getLogger(__name__)
+
+# Penanda jawaban masih ditulis
+CURSOR = ' ▌'
+
+
+class TelegramStreamingReply:
+    """Satu jawaban streaming untuk satu chat; dipakai dari satu thread (worker dispatcher)"""
+
+    def __init__(self, bot_token: str, chat_id: Any, parse_mode: Optional[str] = 'HTML', scheduler=None):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.parse_mode = parse_mode
+        self.scheduler = scheduler or get_telegram_outbound_scheduler()
+        self.edit_interval = float(os.getenv('TELEGRAM_STREAM_EDIT_INTERVAL', '1.5'))
+        self.min_first_chars = int(os.getenv('TELEGRAM_STREAM_MIN_CHARS', '20'))
+        self.finish_timeout = float(os.getenv('TELEGRAM_STREAM_FINISH_TIMEOUT', '30'))
+
+        self.message_id: Optional[int] = None
+        self.shown_text = ''
+        self.started_at = time.monotonic()
+        self.last_edit_at = 0.0
+        self.first_visible_ms: Optional[float] = None
+        self.edits = 0
+        self.skipped_edits = 0
+
+    @property
+    def started(self) -> bool:
+        """True jika pesan preview sudah terkirim (finish() akan mengedit pesan tersebut)"""
+        return self.message_id is not None
+
+    def _request(self, method: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Panggil Bot API; 429 menunda chat di scheduler. Return body JSON (ok=False jika gagal)"""
+        try:
+            response = self.scheduler.call(self.bot_token, method, payload)
+            body = response.json() if response.content else {}
+        except Exception as e:
+            logger.warning(f"⚠️ Telegram {method} to chat {self.chat_id} failed: {e}")
+            return {'ok': False, 'description': str(e)}
+        if response.status_code == 429:
+            self.scheduler.pause_chat(self.bot_token, self.chat_id,
+                                      float((body.get('parameters') or {}).get('retry_after', 1)))
+        return body if isinstance(body, dict) else {'ok': False}
+
+    @staticmethod
+    def _preview(text: str) -> str:
+        # Selama streaming hanya bagian pertama yang ditampilkan; sisanya dikirim saat finish()
+        return text[:MAX_MESSAGE_LENGTH - len(CURSOR)] + CURSOR
+
+    def update(self, delta: str, text: str):
+        """Callback on_delta: kirim/edit preview jika interval dan limit mengizinkan"""
+        preview = self._preview(text)
+        if preview == self.shown_text:
+            return
+        now = time.monotonic()
+        if self.message_id is None:
+            if len(text.strip()) < self.min_first_chars:
+                return
+        elif now - self.last_edit_at < self.edit_interval:
+            return
+        if not self.scheduler.try_acquire(self.bot_token, self.chat_id):
+            self.skipped_edits += 1
+            return
+
+        if self.message_id is None:
+            body = self._request('sendMessage', {'chat_id': self.chat_id, 'text': preview})
+            if body.get('ok'):
+                self.message_id = (body.get('result') or {}).get('message_id')
+                self.first_visible_ms = round((now - self.started_at) * 1000.0, 1)
+        else:
+            body = self._request('editMessageText', {
+                'chat_id': self.chat_id, 'message_id': self.message_id, 'text': preview
+            })
+            self.edits += 1
+        if body.get('ok'):
+            self.shown_text = preview
+        self.last_edit_at = time.monotonic()
+
+    def _edit_final(self, text: str) -> bool:
+        payload = {'chat_id': self.chat_id, 'message_id': self.message_id, 'text': text}
+        if self.parse_mode:
+            payload['parse_mode'] = self.parse_mode
+        for _ in range(3):
+            if not self.scheduler.acquire(self.bot_token, self.chat_id, timeout=self.finish_timeout):
+                return False
+            body = self._request('editMessageText', payload)
+            self.edits += 1
+            description = body.get('description', '')
+            if body.get('ok') or 'message is not modified' in description:
+                return True
+            if payload.get('parse_mode') and "can't parse entities" in description:
+                # Markup rusak: tampilkan sebagai text biasa
+                payload.pop('parse_mode')
+                continue
+            if body.get('error_code') != 429:
+                logger.warning(f"⚠️ Final edit for chat {self.chat_id} failed: {description}")
+                return False
+        return False
+
+    def finish(self, text: str) -> bool:
+        """Tampilkan jawaban final. False jika preview belum pernah terkirim (pemanggil kirim biasa).
+
+        Jika edit final gagal, jawaban dikirim ulang sebagai pesan baru lewat antrian scheduler.
+        """
+        if self.message_id is None:
+            return False
+        parts = split_message(text)
+        if not self._edit_final(parts[0]):
+            remaining = parts
+        else:
+            remaining = parts[1:]
+        for part in remaining:
+            self.scheduler.submit(self.bot_token, self.chat_id, part, self.parse_mode)
+        logger.info(f"Streamed response to chat {self.chat_id}: first visible {self.first_visible_ms}ms, "
+                    f"{self.edits} edit(s), {self.skipped_edits} throttled, {len(parts)} part(s)")
+        return True
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram Update Dispatcher untuk KSM Main Backend
+Antrian in-process untuk update Telegram (webhook dan polling) dengan worker pool terbatas.
+
+- Webhook/polling hanya memasukkan update ke antrian lalu langsung kembali
+- Urutan dijaga per chat_id: satu chat diproses paling banyak oleh satu worker sekaligus,
+  chat berbeda berjalan paralel
+- update_id yang sudah pernah diterima (retry webhook Telegram) dibuang
+- Antrian dibatasi; update ditolak saat penuh agar Telegram mengirim ulang nanti
+- Metrik: kedalaman antrian, waktu tunggu, dan latency pemrosesan
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, Optional
+
+from shared.utils.stats import summarize
+
+logger = logging.getLogger(__name__)
+
+# Hasil submit()
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+QUEUE_FULL = 'queue_full'
+
+
+def chat_id_of(update: Dict[str, Any]) -> Optional[Any]:
+    """chat_id dari update message / edited_message / callback_query"""
+    for key in ('message', 'edited_message', 'channel_post'):
+        if isinstance(update.get(key), dict):
+            return (update[key].get('chat') or {}).get('id')
+    callback_query = update.get('callback_query')
+    if isinstance(callback_query, dict):
+        return ((callback_query.get('message') or {}).get('chat') or {}).get('id')
+    return None
+
+
+class TelegramUpdateDispatcher:
+    """Worker pool dengan antrian serial per chat"""
+
+    # Jumlah sampel terakhir untuk perhitungan p50/p95
+    SAMPLE_SIZE = 500
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any], name: str = 'telegram-dispatch'):
+        self.handler = handler
+        self.name = name
+        self.max_workers = int(os.getenv('TELEGRAM_DISPATCH_WORKERS', '4'))
+        self.max_queue = int(os.getenv('TELEGRAM_DISPATCH_QUEUE_SIZE', '1000'))
+        self.dedupe_size = int(os.getenv('TELEGRAM_DISPATCH_DEDUPE_SIZE', '5000'))
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # chat_id -> deque[(update, enqueued_at, app)]; chat di _scheduled sudah ada di _ready_chats atau sedang diproses
+        self._chat_queues: Dict[Any, deque] = {}
+        self._ready_chats: deque = deque()
+        self._scheduled: set = set()
+        self._seen_updates: 'OrderedDict[Any, None]' = OrderedDict()
+        self._pending = 0
+        self._busy = 0
+
+        self._workers = []
+        self._workers_pid = None
+        self._stop_event = threading.Event()
+
+        self._wait_samples: deque = deque(maxlen=self.SAMPLE_SIZE)
+        self._latency_samples: deque = deque(maxlen=self.SAMPLE_SIZE)
+        self.stats = {
+            'submitted': 0,
+            'accepted': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'processed': 0,
+            'failed': 0
+        }
+
+    def _ensure_workers(self):
+        # Dipanggil dengan self._lock dipegang. Thread tidak ikut ter-fork, jadi pool dibuat ulang per proses
+        pid = os.getpid()
+        if self._workers_pid == pid and self._workers and all(worker.is_alive() for worker in self._workers):
+            return
+        self._workers = [worker for worker in self._workers if worker.is_alive()] if self._workers_pid == pid else []
+        self._workers_pid = pid
+        self._stop_event.clear()
+        for index in range(len(self._workers), self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"{self.name}-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @staticmethod
+    def _current_app():
+        """Flask app pemanggil (jika ada) agar handler bisa memakai app context / database"""
+        try:
+            from flask import current_app, has_app_context
+            return current_app._get_current_object() if has_app_context() else None
+        except ImportError:
+            return None
+
+    def submit(self, update: Dict[str, Any], app=None) -> str:
+        """Masukkan update ke antrian. Return ACCEPTED, DUPLICATE, atau QUEUE_FULL.
+        
+        `app`: Flask app untuk handler; default app context pemanggil (request webhook)
+        """
+        update_id = update.get('update_id')
+        chat_id = chat_id_of(update)
+        app = app or self._current_app()
+        with self._lock:
+            self.stats['submitted'] += 1
+            if update_id is not None and update_id in self._seen_updates:
+                self.stats['duplicates'] += 1
+                return DUPLICATE
+            if self._pending >= self.max_queue:
+                self.stats['rejected'] += 1
+                return QUEUE_FULL
+
+            # update_id dicatat hanya jika diterima, sehingga retry setelah QUEUE_FULL tetap diproses
+            if update_id is not None:
+                self._seen_updates[update_id] = None
+                while len(self._seen_updates) > self.dedupe_size:
+                    self._seen_updates.popitem(last=False)
+
+            self._chat_queues.setdefault(chat_id, deque()).append((update, time.monotonic(), app))
+            self._pending += 1
+            self.stats['accepted'] += 1
+            if chat_id not in self._scheduled:
+                self._scheduled.add(chat_id)
+                self._ready_chats.append(chat_id)
+                self._ready.notify()
+            self._ensure_workers()
+        return ACCEPTED
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                while not self._ready_chats and not self._stop_event.is_set():
+                    self._ready.wait(timeout=1.0)
+                if self._stop_event.is_set():
+                    return
+                chat_id = self._ready_chats.popleft()
+                update, enqueued_at, app = self._chat_queues[chat_id].popleft()
+                self._pending -= 1
+                self._busy += 1
+                self._wait_samples.append(time.monotonic() - enqueued_at)
+
+            started_at = time.monotonic()
+            failed = False
+            try:
+                if app is not None:
+                    with app.app_context():
+                        self.handler(update)
+                else:
+                    self.handler(update)
+            except Exception as e:
+                failed = True
+                logger.error(f"❌ Error handling Telegram update {update.get('update_id')}: {e}")
+
+            with self._lock:
+                self._latency_samples.append(time.monotonic() - started_at)
+                self._busy -= 1
+                self.stats['failed' if failed else 'processed'] += 1
+                # Update berikutnya dari chat yang sama masuk ke belakang antrian (adil antar chat)
+                if self._chat_queues[chat_id]:
+                    self._ready_chats.append(chat_id)
+                    self._ready.notify()
+                else:
+                    del self._chat_queues[chat_id]
+                    self._scheduled.discard(chat_id)
+
+    def stop(self, timeout: float = 5.0):
+        """Hentikan worker; update yang belum diproses tetap di antrian"""
+        self._stop_event.set()
+        with self._lock:
+            self._ready.notify_all()
+            workers, self._workers = self._workers, []
+            # Submit berikutnya membuat pool baru
+            self._workers_pid = None
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'queue_depth': self._pending,
+                'queue_max_size': self.max_queue,
+                'active_chats': len(self._chat_queues),
+                'busy_workers': self._busy,
+                'workers': sum(1 for worker in self._workers if worker.is_alive()),
+                'max_workers': self.max_workers,
+                'wait_time': summarize(self._wait_samples, scale=1000.0, unit='ms'),
+                'processing_time': summarize(self._latency_samples, scale=1000.0, unit='ms')
+            }
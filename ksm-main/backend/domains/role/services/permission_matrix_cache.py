@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Permission Matrix Cache
+Matriks permission per user yang dikompilasi sekali: {menu_path: bitmask aksi}.
+
+- Dibangun dengan dua query (role aktif user + menu permission role tersebut)
+- Menu tree sidebar di-memo per set role dengan versi yang sama
+- Setiap entry dicap dengan versi permission; perubahan Menu, MenuPermission, Role, atau
+  UserRole lewat ORM menaikkan versi sehingga semua matriks dibangun ulang saat dipakai
+- Jika Redis aktif, versi dibagi antar worker lewat INCR sehingga revoke berlaku di semua worker
+  dalam PERMISSION_VERSION_CHECK_INTERVAL detik; entry boleh hidup selama PERMISSION_CACHE_TTL
+- Tanpa Redis (atau saat Redis gagal), invalidasi hanya sampai ke proses yang melakukan perubahan.
+  Worker lain baru melihat revoke setelah entry kadaluarsa, jadi umur entry dibatasi
+  PERMISSION_CACHE_LOCAL_TTL (default 5 detik)
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.database import db
+from domains.role.models.menu_models import Menu, MenuPermission
+from domains.role.models.role_models import Role, UserRole
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Bit per aksi pada matriks permission
+ACTION_BITS = {
+    'read': 1,
+    'create': 2,
+    'update': 4,
+    'delete': 8
+}
+
+# Model yang perubahannya mempengaruhi hasil permission check
+PERMISSION_MODELS = (Menu, MenuPermission, Role, UserRole)
+
+REDIS_VERSION_KEY = 'ksm:permission_matrix:version'
+
+
+class PermissionMatrixCache:
+    """Cache matriks permission per user dengan invalidasi berbasis versi"""
+
+    def __init__(self):
+        self.shared_ttl = int(os.getenv('PERMISSION_CACHE_TTL', '300'))
+        # Tanpa versi bersama, TTL inilah batas keterlambatan revoke di worker lain
+        self.local_ttl = int(os.getenv('PERMISSION_CACHE_LOCAL_TTL', '5'))
+        self.max_users = int(os.getenv('PERMISSION_CACHE_MAX_USERS', '5000'))
+        # Seberapa sering versi bersama di Redis dibaca ulang (detik)
+        self.version_check_interval = float(os.getenv('PERMISSION_VERSION_CHECK_INTERVAL', '1'))
+
+        self._matrices: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        # Menu tree sidebar per kombinasi role; jumlah kombinasi kecil dibanding jumlah user
+        self._menu_trees: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+        self.max_menu_trees = int(os.getenv('PERMISSION_MENU_TREE_CACHE_SIZE', '256'))
+        self._lock = threading.Lock()
+        self._local_version = 0
+        self._shared_version = 0
+        self._shared_checked_at = 0.0
+        # False setelah Redis gagal dibaca/ditulis: invalidasi tidak lagi sampai ke worker lain
+        self._shared_ok = True
+        self.stats = {'hits': 0, 'builds': 0, 'invalidations': 0, 'menu_tree_hits': 0, 'menu_tree_builds': 0}
+
+        self._redis = None
+        if REDIS_AVAILABLE and os.getenv('REDIS_ENABLED', 'false').lower() == 'true':
+            try:
+                self._redis = redis.Redis.from_url(
+                    os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                    password=os.getenv('REDIS_PASSWORD') or None,
+                    socket_timeout=1, socket_connect_timeout=1
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Redis not available for permission cache versioning: {e}")
+                self._redis = None
+        if self._redis is None:
+            logger.info(f"📋 Permission cache without shared versioning: entries expire after {self.local_ttl}s")
+
+    @property
+    def ttl(self) -> int:
+        """Umur entry: TTL panjang hanya aman jika invalidasi menjangkau semua worker lewat Redis"""
+        if self._redis is None or not self._shared_ok:
+            return min(self.shared_ttl, self.local_ttl)
+        return self.shared_ttl
+
+    # ===== VERSIONING =====
+
+    def _read_shared_version(self) -> int:
+        """Versi bersama dari Redis, dibaca paling sering sekali per version_check_interval"""
+        if self._redis is None:
+            return 0
+        now = time.time()
+        if now - self._shared_checked_at < self.version_check_interval:
+            return self._shared_version
+        try:
+            self._shared_version = int(self._redis.get(REDIS_VERSION_KEY) or 0)
+            self._shared_ok = True
+        except Exception as e:
+            self._shared_ok = False
+            logger.warning(f"⚠️ Failed to read permission version from Redis: {e}")
+        self._shared_checked_at = now
+        return self._shared_version
+
+    def current_version(self) -> tuple:
+        return (self._local_version, self._read_shared_version())
+
+    def bump_version(self, reason: str = ''):
+        """Invalidasi semua matriks (di proses ini, dan di worker lain jika Redis aktif)"""
+        with self._lock:
+            self._local_version += 1
+            self._matrices.clear()
+            self._menu_trees.clear()
+            self.stats['invalidations'] += 1
+        if self._redis is not None:
+            try:
+                self._shared_version = int(self._redis.incr(REDIS_VERSION_KEY))
+                self._shared_checked_at = time.time()
+                self._shared_ok = True
+            except Exception as e:
+                self._shared_ok = False
+                logger.warning(f"⚠️ Failed to bump permission version in Redis: {e}")
+        logger.info(f"🔄 Permission matrix cache invalidated{f' ({reason})' if reason else ''}")
+
+    def invalidate_user(self, user_id: int):
+        """Buang matriks satu user di proses ini"""
+        with self._lock:
+            self._matrices.pop(int(user_id), None)
+
+    # ===== MATRIX =====
+
+    def get_matrix(self, user_id: int) -> Dict[str, Any]:
+        """Matriks permission user: {role_ids, is_admin, is_management, primary_role_name, menus}"""
+        user_id = int(user_id)
+        version = self.current_version()
+        now = time.time()
+        with self._lock:
+            entry = self._matrices.get(user_id)
+            if entry and entry['version'] == version and entry['expires_at'] > now:
+                self._matrices.move_to_end(user_id)
+                self.stats['hits'] += 1
+                return entry
+
+        entry = self._build_matrix(user_id)
+        entry['version'] = version
+        entry['expires_at'] = now + self.ttl
+        with self._lock:
+            # Versi bisa naik saat matriks dibangun; jangan simpan entry yang sudah basi
+            if version == (self._local_version, self._shared_version):
+                self._matrices[user_id] = entry
+                self._matrices.move_to_end(user_id)
+                while len(self._matrices) > self.max_users:
+                    self._matrices.popitem(last=False)
+            self.stats['builds'] += 1
+        return entry
+
+    @staticmethod
+    def _build_matrix(user_id: int) -> Dict[str, Any]:
+        """Kompilasi matriks permission user dengan dua query"""
+        roles = (
+            db.session.query(
+                UserRole.role_id, UserRole.is_primary, UserRole.assigned_at,
+                Role.name, Role.is_active, Role.is_management
+            )
+            .join(Role, Role.id == UserRole.role_id)
+            .filter(UserRole.user_id == user_id, UserRole.is_active == True)
+            .all()
+        )
+        role_ids = [row.role_id for row in roles]
+
+        menus: Dict[str, int] = {}
+        if role_ids:
+            permissions = (
+                db.session.query(
+                    Menu.path, MenuPermission.can_read, MenuPermission.can_create,
+                    MenuPermission.can_update, MenuPermission.can_delete
+                )
+                .join(Menu, Menu.id == MenuPermission.menu_id)
+                .filter(
+                    MenuPermission.role_id.in_(role_ids),
+                    MenuPermission.is_active == True,
+                    Menu.is_active == True
+                )
+                .all()
+            )
+            for row in permissions:
+                mask = (
+                    (ACTION_BITS['read'] if row.can_read else 0)
+                    | (ACTION_BITS['create'] if row.can_create else 0)
+                    | (ACTION_BITS['update'] if row.can_update else 0)
+                    | (ACTION_BITS['delete'] if row.can_delete else 0)
+                )
+                menus[row.path] = menus.get(row.path, 0) | mask
+
+        # Primary role: flag is_primary, fallback ke assignment aktif paling awal
+        primary = None
+        if roles:
+            primary = next((row for row in roles if row.is_primary), None) or min(
+                roles, key=lambda row: (row.assigned_at is None, row.assigned_at or 0)
+            )
+
+        return {
+            'role_ids': role_ids,
+            'is_admin': any(row.is_active and (row.name or '').lower() == 'admin' for row in roles),
+            'is_management': any(row.is_active and row.is_management for row in roles),
+            'primary_role_name': primary.name if primary else None,
+            'menus': menus
+        }
+
+    # ===== MENU TREE =====
+
+    def get_menu_tree(self, role_ids, variant: Any, builder: Callable[[List[int]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Menu tree untuk satu set role, di-memo per (role set, variant) dan dicap versi permission.
+
+        `builder(role_ids)` dipanggil hanya saat cache miss. Hasil yang di-cache dipakai bersama
+        oleh semua user dengan set role yang sama, jadi pemanggil tidak boleh memutasinya.
+        """
+        key = (frozenset(int(role_id) for role_id in role_ids), variant)
+        version = self.current_version()
+        now = time.time()
+        with self._lock:
+            entry = self._menu_trees.get(key)
+            if entry and entry['version'] == version and entry['expires_at'] > now:
+                self._menu_trees.move_to_end(key)
+                self.stats['menu_tree_hits'] += 1
+                return entry['tree']
+
+        tree = builder(sorted(key[0]))
+        with self._lock:
+            if version == (self._local_version, self._shared_version):
+                self._menu_trees[key] = {'tree': tree, 'version': version, 'expires_at': now + self.ttl}
+                self._menu_trees.move_to_end(key)
+                while len(self._menu_trees) > self.max_menu_trees:
+                    self._menu_trees.popitem(last=False)
+            self.stats['menu_tree_builds'] += 1
+        return tree
+
+    def has_menu_permission(self, user_id: int, menu_path: str, action: str = 'read') -> bool:
+        """Cek permission menu dari matriks yang sudah dikompilasi"""
+        bit = ACTION_BITS.get(action)
+        if not bit:
+            return False
+        matrix = self.get_matrix(user_id)
+        return bool(matrix['menus'].get(menu_path, 0) & bit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'cached_users': len(self._matrices),
+                'cached_menu_trees': len(self._menu_trees),
+                'version': list(self.current_version()),
+                'shared_versioning': self._redis is not None and self._shared_ok,
+                'ttl': self.ttl
+            }
+
+
+# ===== ORM HOOKS =====
+# Perubahan pada model permission lewat session manapun menaikkan versi setelah commit.
+
+def _touches_permission_models(instances) -> bool:
+    return any(isinstance(instance, PERMISSION_MODELS) for instance in instances)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_permission_change(session, flush_context):
+    if (
+        _touches_permission_models(session.new)
+        or _touches_permission_models(session.dirty)
+        or _touches_permission_models(session.deleted)
+    ):
+        session.info['permission_matrix_dirty'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_permission_change(orm_execute_state):
+    # query.update()/query.delete() tidak melewati after_flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, PERMISSION_MODELS):
+            orm_execute_state.session.info['permission_matrix_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if session.info.pop('permission_matrix_dirty', False):
+        get_permission_matrix_cache().bump_version('permission data changed')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('permission_matrix_dirty', None)
+
+
+# Global instance
+_permission_matrix_cache = None
+_permission_matrix_cache_lock = threading.Lock()
+
+
+def get_permission_matrix_cache() -> PermissionMatrixCache:
+    """Get global permission matrix cache instance"""
+    global _permission_matrix_cache
+    if _permission_matrix_cache is None:
+        with _permission_matrix_cache_lock:
+            if _permission_matrix_cache is None:
+                _permission_matrix_cache = PermissionMatrixCache()
+    return _permission_matrix_cache
@@ -9,8 +9,11 @@ from datetime import datetime, timedelta
 from config.database import db
 from domains.role.models.menu_models import Menu, MenuPermission, PermissionAuditLog
 from domains.role.models.role_models import Role
+from domains.role.services.permission_matrix_cache import get_permission_matrix_cache
 from shared.utils.logger import get_logger
+import copy
 import json
+import threading
 
 # Centralized registry definitions to avoid duplication across features
 DEFAULT_MENU_DEFINITIONS = [
@@ -369,6 +372,10 @@ DEFAULT_MENU_DEFINITIONS = [
 
 logger = get_logger(__name__)
 
+# Kapabilitas schema (kolom opsional) dideteksi sekali per proses
+_schema_capabilities = None
+_schema_capabilities_lock = threading.Lock()
+
 
 class PermissionService:
     """Service untuk business logic permission management"""
@@ -639,22 +646,13 @@ class PermissionService:
     def check_user_permission(user_id, module, action, scope='own', resource_id=None):
         """Check if user has specific permission for module and action"""
         try:
-            from domains.role.models.role_models import UserRole
-            from models import User
+            matrix = get_permission_matrix_cache().get_matrix(user_id)
             
             # Admin override berbasis assignment aktif, bukan legacy field
-            from domains.role.models.role_models import Role as R, UserRole as UR
-            active_admin = db.session.query(UR).join(R, R.id == UR.role_id) \
-                .filter(UR.user_id == user_id, UR.is_active == True, R.is_active == True, R.name.ilike('admin')) \
-                .first()
-            if active_admin:
+            if matrix['is_admin']:
                 return True
             
-            # Get user roles
-            user_roles = UserRole.query.filter_by(user_id=user_id, is_active=True).all()
-            role_ids = [ur.role_id for ur in user_roles]
-            
-            if not role_ids:
+            if not matrix['role_ids']:
                 return False
             
             # For now, we'll implement a simple permission check
@@ -664,14 +662,7 @@ class PermissionService:
             # This is a simplified implementation - in production you'd have a proper permission matrix
             if module in ['roles', 'permissions', 'departments'] and action in ['create', 'read', 'update', 'delete']:
                 # For role management operations, check if user has management role
-                from domains.role.models.role_models import Role
-                management_roles = Role.query.filter(
-                    Role.id.in_(role_ids),
-                    Role.is_management == True,
-                    Role.is_active == True
-                ).all()
-                
-                if management_roles:
+                if matrix['is_management']:
                     return True
             
             # Default: allow read operations for all authenticated users
@@ -688,230 +679,234 @@ class PermissionService:
     def check_user_menu_permission(user_id, menu_path, action='read'):
         """Check if user has permission for specific menu and action"""
         try:
-            from domains.role.models.role_models import UserRole
-            
-            # Get user roles
-            user_roles = UserRole.query.filter_by(user_id=user_id, is_active=True).all()
-            role_ids = [ur.role_id for ur in user_roles]
-            
-            if not role_ids:
-                return False
-            
-            # Get menu
-            menu = Menu.query.filter_by(path=menu_path, is_active=True).first()
-            if not menu:
-                return False
-            
-            # Check permission
-            permission = MenuPermission.query.filter(
-                MenuPermission.menu_id == menu.id,
-                MenuPermission.role_id.in_(role_ids),
-                MenuPermission.is_active == True
-            ).first()
-            
-            if not permission:
-                return False
-            
-            return permission.has_permission(action)
+            return get_permission_matrix_cache().has_menu_permission(user_id, menu_path, action)
             
         except Exception as e:
             logger.error(f"Error checking user menu permission: {str(e)}")
             return False
     
+    @staticmethod
+    def detect_schema_capabilities(refresh=False):
+        """Deteksi kolom opsional di database sekali per proses (dipanggil saat startup)"""
+        global _schema_capabilities
+        if _schema_capabilities is not None and not refresh:
+            return _schema_capabilities
+        
+        with _schema_capabilities_lock:
+            if _schema_capabilities is None or refresh:
+                from sqlalchemy import inspect
+                try:
+                    columns = {col['name'] for col in inspect(db.engine).get_columns('menu_permissions')}
+                    _schema_capabilities = {'menu_permissions.show_in_sidebar': 'show_in_sidebar' in columns}
+                    logger.info(f"[INIT] Permission schema capabilities: {_schema_capabilities}")
+                except Exception as e:
+                    # Jangan di-cache: coba lagi pada pemanggilan berikutnya
+                    logger.warning(f"[WARNING] Could not inspect menu_permissions schema: {e}")
+                    return {'menu_permissions.show_in_sidebar': False}
+        return _schema_capabilities
+    
+    @staticmethod
+    def _build_menu_tree(role_ids, has_show_in_sidebar):
+        """Bangun menu tree untuk set role: satu query join menu + satu query jumlah permission"""
+        from sqlalchemy import func
+        
+        query = db.session.query(
+            Menu.id, Menu.name, Menu.path, Menu.icon, Menu.parent_id, Menu.order_index,
+            Menu.description, Menu.is_active, Menu.is_system_menu, Menu.created_at, Menu.updated_at
+        ).join(MenuPermission, MenuPermission.menu_id == Menu.id).filter(
+            MenuPermission.role_id.in_(role_ids),
+            MenuPermission.can_read == True,
+            MenuPermission.is_active == True,
+            Menu.is_active == True
+        )
+        
+        # Filter show_in_sidebar berlaku untuk semua user termasuk admin
+        if has_show_in_sidebar:
+            query = query.filter(MenuPermission.show_in_sidebar == True)
+        
+        # distinct: menu yang diberikan oleh lebih dari satu role hanya muncul sekali
+        rows = query.distinct().order_by(Menu.order_index, Menu.id).all()
+        if not rows:
+            return []
+        
+        permission_counts = dict(
+            db.session.query(MenuPermission.menu_id, func.count(MenuPermission.id))
+            .filter(MenuPermission.menu_id.in_([row.id for row in rows]))
+            .group_by(MenuPermission.menu_id)
+            .all()
+        )
+        
+        # Bentuk dict sama dengan Menu.to_dict()
+        menu_dict = {}
+        for row in rows:
+            menu_dict[row.id] = {
+                'id': row.id,
+                'name': row.name,
+                'path': row.path,
+                'icon': row.icon,
+                'parent_id': row.parent_id,
+                'order_index': row.order_index,
+                'description': row.description,
+                'is_active': row.is_active,
+                'is_system_menu': row.is_system_menu,
+                'sub_menus': [],
+                'permissions_count': permission_counts.get(row.id, 0),
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            }
+        
+        root_menus = []
+        for row in rows:
+            if row.parent_id and row.parent_id in menu_dict:
+                menu_dict[row.parent_id]['sub_menus'].append(menu_dict[row.id])
+            else:
+                root_menus.append(menu_dict[row.id])
+        
+        return root_menus
+    
     @staticmethod
     def get_user_accessible_menus(user_id):
-        """Get all menus accessible by user"""
+        """Get all menus accessible by user.
+        
+        Role user diambil dari permission matrix cache dan tree-nya di-memo per set role,
+        sehingga request sidebar yang berulang tidak menyentuh database. User admin tanpa
+        role tidak diperbaiki di sini; jalankan scripts/fix_admin_menu_access.py.
+        """
         try:
-            from domains.role.models.role_models import UserRole, Role
-            from models import User
-            
-            logger.info(f"[get_user_accessible_menus] Starting for user_id: {user_id}")
-            
-            # Check if show_in_sidebar column exists
-            from sqlalchemy import inspect
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('menu_permissions')]
-            has_show_in_sidebar = 'show_in_sidebar' in columns
-            logger.info(f"[get_user_accessible_menus] show_in_sidebar column exists: {has_show_in_sidebar}")
-            
-            # Get user info
-            user = User.query.get(user_id)
-            if not user:
-                logger.warning(f"[get_user_accessible_menus] User {user_id} not found")
-                return []
-            
-            # Get user roles (termasuk admin role jika ada)
-            user_roles = UserRole.query.filter_by(user_id=user_id, is_active=True).all()
-            role_ids = [ur.role_id for ur in user_roles]
-            logger.info(f"[get_user_accessible_menus] User {user_id} has {len(user_roles)} active roles: {role_ids}")
-            
-            # Auto-fix: Jika user tidak punya role tapi adalah admin, assign Admin role
+            role_ids = get_permission_matrix_cache().get_matrix(user_id)['role_ids']
             if not role_ids:
-                is_admin = (user.role == 'admin' or user.username == 'admin')
-                if is_admin:
-                    logger.warning(f"[get_user_accessible_menus] Admin user {user_id} has no roles, attempting to fix...")
-                    try:
-                        # Find or create Admin role
-                        admin_role = Role.query.filter_by(code='ADMIN').first()
-                        if not admin_role:
-                            admin_role = Role.query.filter_by(name='Admin').first()
-                        
-                        if admin_role:
-                            # Assign Admin role to user
-                            existing_user_role = UserRole.query.filter_by(
-                                user_id=user_id,
-                                role_id=admin_role.id
-                            ).first()
-                            
-                            if not existing_user_role:
-                                user_role = UserRole(
-                                    user_id=user_id,
-                                    role_id=admin_role.id,
-                                    is_active=True,
-                                    is_primary=True
-                                )
-                                db.session.add(user_role)
-                                db.session.commit()
-                                logger.info(f"[get_user_accessible_menus] Assigned Admin role to user {user_id}")
-                            else:
-                                if not existing_user_role.is_active:
-                                    existing_user_role.is_active = True
-                                    db.session.commit()
-                                    logger.info(f"[get_user_accessible_menus] Activated Admin role for user {user_id}")
-                            
-                            # Ensure Admin role has permission for all menus with show_in_sidebar = True
-                            all_menus = Menu.query.filter_by(is_active=True).all()
-                            permissions_created = 0
-                            permissions_updated = 0
-                            
-                            for menu in all_menus:
-                                menu_permission = MenuPermission.query.filter_by(
-                                    menu_id=menu.id,
-                                    role_id=admin_role.id
-                                ).first()
-                                
-                                if not menu_permission:
-                                    # Create permission with full access
-                                    if has_show_in_sidebar:
-                                        menu_permission = MenuPermission(
-                                            menu_id=menu.id,
-                                            role_id=admin_role.id,
-                                            can_read=True,
-                                            can_create=True,
-                                            can_update=True,
-                                            can_delete=True,
-                                            is_active=True,
-                                            show_in_sidebar=True
-                                        )
-                                    else:
-                                        menu_permission = MenuPermission(
-                                            menu_id=menu.id,
-                                            role_id=admin_role.id,
-                                            can_read=True,
-                                            can_create=True,
-                                            can_update=True,
-                                            can_delete=True,
-                                            is_active=True
-                                        )
-                                    db.session.add(menu_permission)
-                                    permissions_created += 1
-                                else:
-                                    # Update permission to ensure full access and show_in_sidebar = True
-                                    menu_permission.can_read = True
-                                    menu_permission.can_create = True
-                                    menu_permission.can_update = True
-                                    menu_permission.can_delete = True
-                                    menu_permission.is_active = True
-                                    if has_show_in_sidebar:
-                                        menu_permission.show_in_sidebar = True
-                                    permissions_updated += 1
-                            
-                            if permissions_created > 0 or permissions_updated > 0:
-                                db.session.commit()
-                                logger.info(f"[get_user_accessible_menus] Created {permissions_created} and updated {permissions_updated} menu permissions for Admin role")
-                            
-                            # Re-fetch user roles
-                            user_roles = UserRole.query.filter_by(user_id=user_id, is_active=True).all()
-                            role_ids = [ur.role_id for ur in user_roles]
-                            logger.info(f"[get_user_accessible_menus] After fix, user {user_id} has {len(user_roles)} active roles: {role_ids}")
-                        else:
-                            logger.warning(f"[get_user_accessible_menus] Admin role not found, cannot auto-fix")
-                    except Exception as fix_error:
-                        logger.error(f"[get_user_accessible_menus] Error auto-fixing admin role: {fix_error}")
-                        db.session.rollback()
-                
-                if not role_ids:
-                    logger.warning(f"[get_user_accessible_menus] User {user_id} has no active roles, returning empty menu list")
-                    return []
+                logger.warning(f"[get_user_accessible_menus] User {user_id} has no active roles, returning empty menu list")
+                return []
             
-            # Semua user (termasuk admin) harus melihat menu berdasarkan role mereka sendiri
-            # Admin tidak bypass - mereka juga harus mematuhi show_in_sidebar filter
-            query = db.session.query(Menu).join(MenuPermission).filter(
-                MenuPermission.role_id.in_(role_ids),
-                MenuPermission.can_read == True,
-                MenuPermission.is_active == True,
-                Menu.is_active == True
+            has_show_in_sidebar = PermissionService.detect_schema_capabilities()['menu_permissions.show_in_sidebar']
+            tree = get_permission_matrix_cache().get_menu_tree(
+                role_ids,
+                has_show_in_sidebar,
+                lambda ids: PermissionService._build_menu_tree(ids, has_show_in_sidebar)
             )
             
-            # Filter by show_in_sidebar if column exists (berlaku untuk semua user termasuk admin)
-            if has_show_in_sidebar:
-                query = query.filter(MenuPermission.show_in_sidebar == True)
-                logger.info(f"[get_user_accessible_menus] Applied show_in_sidebar=True filter")
-            
-            accessible_menus = query.order_by(Menu.order_index).all()
-            
-            logger.info(f"[get_user_accessible_menus] User {user_id} with roles {role_ids} has access to {len(accessible_menus)} menus (filtered by show_in_sidebar={has_show_in_sidebar})")
+            if not tree:
+                logger.warning(f"[get_user_accessible_menus] No menus found for user {user_id} with roles {role_ids}")
             
-            if len(accessible_menus) == 0:
-                logger.warning(f"[get_user_accessible_menus] No menus found for user {user_id}. Checking possible causes...")
-                # Debug: Check total menus in database
-                total_menus = Menu.query.filter_by(is_active=True).count()
-                logger.info(f"[get_user_accessible_menus] Total active menus in database: {total_menus}")
-                # Debug: Check permissions for this user's roles
-                total_permissions = MenuPermission.query.filter(
-                    MenuPermission.role_id.in_(role_ids),
-                    MenuPermission.is_active == True
-                ).count()
-                logger.info(f"[get_user_accessible_menus] Total permissions for roles {role_ids}: {total_permissions}")
-                # Debug: Check permissions with can_read=True
-                read_permissions = MenuPermission.query.filter(
-                    MenuPermission.role_id.in_(role_ids),
-                    MenuPermission.can_read == True,
-                    MenuPermission.is_active == True
-                ).count()
-                logger.info(f"[get_user_accessible_menus] Permissions with can_read=True: {read_permissions}")
-                if has_show_in_sidebar:
-                    sidebar_permissions = MenuPermission.query.filter(
-                        MenuPermission.role_id.in_(role_ids),
-                        MenuPermission.can_read == True,
-                        MenuPermission.is_active == True,
-                        MenuPermission.show_in_sidebar == True
-                    ).count()
-                    logger.info(f"[get_user_accessible_menus] Permissions with show_in_sidebar=True: {sidebar_permissions}")
+            # Tree yang di-cache dipakai bersama; kembalikan salinan
+            return copy.deepcopy(tree)
             
-            # Build hierarchical structure
-            menu_dict = {}
-            root_menus = []
-            
-            for menu in accessible_menus:
-                menu_dict[menu.id] = menu.to_dict()
-                menu_dict[menu.id]['sub_menus'] = []
+        except Exception as e:
+            logger.error(f"[get_user_accessible_menus] Error getting user accessible menus for user {user_id}: {str(e)}", exc_info=True)
+            return []
+    
+    @staticmethod
+    def repair_admin_menu_access(user_ids=None):
+        """Maintenance: pastikan user admin punya role Admin aktif dan Admin punya akses penuh ke semua menu.
+        
+        user_ids=None memilih user dengan legacy role 'admin' atau username 'admin'.
+        Dipanggil dari scripts/fix_admin_menu_access.py, bukan dari request path.
+        """
+        from domains.role.models.role_models import UserRole
+        from models import User
+        
+        try:
+            has_show_in_sidebar = PermissionService.detect_schema_capabilities(refresh=True)['menu_permissions.show_in_sidebar']
+            
+            # 1. Find or create Admin role
+            admin_role = Role.query.filter_by(code='ADMIN').first() or Role.query.filter_by(name='Admin').first()
+            if not admin_role:
+                admin_role = Role(
+                    name='Admin',
+                    code='ADMIN',
+                    description='Administrator dengan akses penuh',
+                    level=1,
+                    is_management=True,
+                    is_active=True
+                )
+                db.session.add(admin_role)
+                db.session.flush()
+                logger.info("[SUCCESS] Created Admin role")
+            
+            # 2. Assign/activate Admin role untuk user target (satu query untuk assignment yang ada)
+            if user_ids is None:
+                from sqlalchemy import or_
+                user_ids = [
+                    row.id for row in db.session.query(User.id).filter(
+                        or_(User.role == 'admin', User.username == 'admin')
+                    ).all()
+                ]
+            user_ids = [int(user_id) for user_id in user_ids]
+            
+            existing_assignments = {
+                user_role.user_id: user_role
+                for user_role in UserRole.query.filter(
+                    UserRole.role_id == admin_role.id,
+                    UserRole.user_id.in_(user_ids)
+                ).all()
+            } if user_ids else {}
+            
+            roles_assigned = 0
+            for user_id in user_ids:
+                user_role = existing_assignments.get(user_id)
+                if user_role is None:
+                    db.session.add(UserRole(
+                        user_id=user_id,
+                        role_id=admin_role.id,
+                        is_active=True,
+                        is_primary=True
+                    ))
+                    roles_assigned += 1
+                elif not user_role.is_active:
+                    user_role.is_active = True
+                    roles_assigned += 1
+            
+            # 3. Initialize default menus if not exists
+            if Menu.query.count() == 0:
+                PermissionService.create_default_menus()
+            
+            # 4. Full access untuk semua menu aktif (satu query untuk permission yang ada)
+            menu_ids = [row.id for row in db.session.query(Menu.id).filter(Menu.is_active == True).all()]
+            existing_permissions = {
+                permission.menu_id: permission
+                for permission in MenuPermission.query.filter_by(role_id=admin_role.id).all()
+            }
             
-            for menu in accessible_menus:
-                if menu.parent_id and menu.parent_id in menu_dict:
-                    menu_dict[menu.parent_id]['sub_menus'].append(menu_dict[menu.id])
-                else:
-                    root_menus.append(menu_dict[menu.id])
+            permissions_created = 0
+            permissions_updated = 0
+            full_access = {
+                'can_read': True,
+                'can_create': True,
+                'can_update': True,
+                'can_delete': True,
+                'is_active': True
+            }
+            if has_show_in_sidebar:
+                full_access['show_in_sidebar'] = True
+            
+            for menu_id in menu_ids:
+                permission = existing_permissions.get(menu_id)
+                if permission is None:
+                    db.session.add(MenuPermission(menu_id=menu_id, role_id=admin_role.id, **full_access))
+                    permissions_created += 1
+                elif any(getattr(permission, field) != value for field, value in full_access.items()):
+                    for field, value in full_access.items():
+                        setattr(permission, field, value)
+                    permissions_updated += 1
             
-            logger.info(f"[get_user_accessible_menus] User {user_id} has access to {len(root_menus)} root menus")
-            if root_menus:
-                logger.info(f"[get_user_accessible_menus] Root menu names: {[m.get('name') for m in root_menus]}")
+            db.session.commit()
             
-            return root_menus
+            logger.info(
+                f"[SUCCESS] Admin menu access repaired: {roles_assigned} role assignments, "
+                f"{permissions_created} permissions created, {permissions_updated} permissions updated"
+            )
+            return {
+                'admin_role_id': admin_role.id,
+                'users': user_ids,
+                'roles_assigned': roles_assigned,
+                'permissions_created': permissions_created,
+                'permissions_updated': permissions_updated
+            }
             
         except Exception as e:
-            logger.error(f"[get_user_accessible_menus] Error getting user accessible menus for user {user_id}: {str(e)}", exc_info=True)
-            return []
+            db.session.rollback()
+            logger.error(f"[ERROR] Error repairing admin menu access: {str(e)}")
+            raise e
     
     @staticmethod
     def bulk_update_permissions(role_id, permission_updates, current_user_id):
@@ -7,6 +7,7 @@ Digunakan untuk Daily Task Notification System
 
 import logging
 from datetime import datetime, date
+from typing import Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
@@ -125,6 +126,40 @@ class DailyTaskScheduler:
         except Exception as e:
             self.logger.error(f"Error adding daily report job: {e}")
     
+    def _create_report_notification(self, report_date: date) -> Optional[int]:
+        """Buat Notification untuk report agar status kirim Telegram tercatat. None jika gagal"""
+        from config.database import db
+        try:
+            from domains.auth.models.auth_models import User
+            from domains.notification.models.notification_models import Notification
+            
+            user_id = Config.DAILY_REPORT_NOTIFY_USER_ID
+            if not user_id:
+                admin = User.query.filter(User.role == 'admin', User.is_active.is_(True)).order_by(User.id).first()
+                user_id = admin.id if admin else None
+            if not user_id:
+                self.logger.warning("No owner user for daily report notification, delivery status not recorded")
+                return None
+            
+            notification = Notification(
+                user_id=int(user_id),
+                type='daily_task_report',
+                title=f'Daily Task Report {report_date.isoformat()}',
+                message='Daily task report dikirim ke Telegram',
+                data={'report_date': report_date.isoformat(), 'channel': 'telegram'},
+                priority='normal'
+            )
+            db.session.add(notification)
+            db.session.commit()
+            return notification.id
+        except Exception as e:
+            self.logger.error(f"Error creating daily report notification: {e}")
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            return None
+    
     def send_daily_report(self):
         """Send daily report - main job function"""
         from app import app
@@ -154,7 +189,7 @@ class DailyTaskScheduler:
                 
                 # Send to Telegram
                 telegram_success, telegram_message = telegram_sender_service.send_daily_task_report(
-                    report_data
+                    report_data, notification_id=self._create_report_notification(current_date)
                 )
                 
                 if telegram_success:
@@ -224,7 +259,7 @@ class DailyTaskScheduler:
                 
                 # Send to Telegram
                 telegram_success, telegram_message = telegram_sender_service.send_daily_task_report(
-                    report_data
+                    report_data, notification_id=self._create_report_notification(target_date)
                 )
                 
                 if telegram_success:
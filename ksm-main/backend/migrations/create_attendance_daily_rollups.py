@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migration Script untuk tabel attendance_daily_rollups
+- Membuat tabel rollup harian (jika belum ada)
+- Backfill rollup dari attendance_records untuk rentang tanggal (default: semua data)
+- Aman dijalankan ulang: rollup di-upsert per (user_id, work_date)
+
+Contoh:
+    python migrations/create_attendance_daily_rollups.py
+    python migrations/create_attendance_daily_rollups.py --start-date 2025-01-01 --end-date 2025-01-31
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import date, datetime
+
+# Add parent directory to path untuk import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import db, init_database
+from flask import Flask
+from domains.attendance.models.attendance_models import AttendanceRecord, AttendanceDailyRollup
+from domains.attendance.services.attendance_rollup_service import attendance_rollup_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Buat dan isi tabel attendance_daily_rollups')
+    parser.add_argument('--start-date', type=parse_date, help='YYYY-MM-DD (default: record pertama)')
+    parser.add_argument('--end-date', type=parse_date, help='YYYY-MM-DD (default: hari ini)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    init_database(app)
+
+    with app.app_context():
+        logger.info("🚀 Creating attendance_daily_rollups table...")
+        AttendanceDailyRollup.__table__.create(db.engine, checkfirst=True)
+
+        start_date = args.start_date
+        if not start_date:
+            first_clock_in = db.session.query(db.func.min(AttendanceRecord.clock_in)).scalar()
+            if not first_clock_in:
+                logger.info("📋 No attendance records, nothing to backfill")
+                return 0
+            start_date = first_clock_in.date()
+        end_date = args.end_date or date.today()
+
+        started = time.time()
+        stats = attendance_rollup_service.rebuild(start_date, end_date, batch_size=args.batch_size)
+        logger.info(f"✅ Backfill {start_date}..{end_date} done in {time.time() - started:.1f}s: {stats}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
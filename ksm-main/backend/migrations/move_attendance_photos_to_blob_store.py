@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migration Script untuk memindahkan foto absensi ke blob store
+- Menambahkan kolom clock_in_photo_key / clock_out_photo_key di attendance_records (jika belum ada)
+- Foto base64 di clock_in_photo / clock_out_photo di-decode, disimpan di attendance photo store
+  (dedup per sha256, beserta thumbnail), lalu kolom base64 dikosongkan
+- Diproses per batch berurutan id (keyset), aman dijalankan ulang: row yang sudah pindah dilewati
+
+Contoh:
+    python migrations/move_attendance_photos_to_blob_store.py --dry-run
+    python migrations/move_attendance_photos_to_blob_store.py --batch-size 200 --optimize
+    python migrations/move_attendance_photos_to_blob_store.py --gc
+"""
+
+import os
+import sys
+import time
+import hashlib
+import logging
+import argparse
+
+# Add parent directory to path untuk import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import db, init_database
+from flask import Flask
+from sqlalchemy import inspect
+from domains.attendance.services.attendance_photo_store import get_attendance_photo_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PHOTO_KINDS = ('clock_in', 'clock_out')
+
+
+def ensure_key_columns():
+    """Tambahkan kolom key foto jika belum ada"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('attendance_records')}
+    for kind in PHOTO_KINDS:
+        column = f'{kind}_photo_key'
+        if column in columns:
+            continue
+        logger.info(f"📋 Adding column attendance_records.{column}")
+        with db.engine.begin() as conn:
+            conn.execute(db.text(f"ALTER TABLE attendance_records ADD COLUMN {column} VARCHAR(64) NULL"))
+
+
+def backfill(batch_size: int, dry_run: bool, drop_invalid: bool) -> dict:
+    """Pindahkan semua foto base64 ke blob store"""
+    store = get_attendance_photo_store()
+    stats = {'rows': 0, 'photos': 0, 'deduplicated': 0, 'invalid': 0, 'bytes_moved': 0}
+    seen_keys = set()
+    last_id = 0
+
+    while True:
+        # Batch kecil: setiap row membawa TEXT base64 yang besar
+        rows = db.session.execute(db.text(
+            "SELECT id, clock_in_photo, clock_out_photo FROM attendance_records "
+            "WHERE id > :last_id AND (clock_in_photo IS NOT NULL OR clock_out_photo IS NOT NULL) "
+            "ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': batch_size}).fetchall()
+        if not rows:
+            break
+
+        for row in rows:
+            last_id = row.id
+            stats['rows'] += 1
+            updates = {}
+            for kind in PHOTO_KINDS:
+                legacy = getattr(row, f'{kind}_photo')
+                if not legacy:
+                    continue
+                try:
+                    data = store.decode_base64(legacy)
+                    key = store.save_bytes(data) if not dry_run else hashlib.sha256(data).hexdigest()
+                except ValueError as e:
+                    stats['invalid'] += 1
+                    logger.warning(f"⚠️ Record {row.id} {kind} photo is invalid: {e}")
+                    if drop_invalid:
+                        updates[f'{kind}_photo'] = None
+                    continue
+                stats['photos'] += 1
+                stats['bytes_moved'] += len(legacy)
+                if key in seen_keys:
+                    stats['deduplicated'] += 1
+                seen_keys.add(key)
+                updates[f'{kind}_photo_key'] = key
+                updates[f'{kind}_photo'] = None
+
+            if updates and not dry_run:
+                assignments = ', '.join(f"{column} = :{column}" for column in updates)
+                db.session.execute(db.text(f"UPDATE attendance_records SET {assignments} WHERE id = :id"),
+                                   {**updates, 'id': row.id})
+
+        if not dry_run:
+            db.session.commit()
+        logger.info(f"🔄 Processed up to id {last_id}: {stats['photos']} photo(s), "
+                    f"{stats['bytes_moved'] / (1024 * 1024):.1f}MB base64 moved")
+
+    return stats
+
+
+def collect_garbage(dry_run: bool) -> int:
+    """Hapus blob yang tidak lagi dirujuk oleh attendance_records"""
+    store = get_attendance_photo_store()
+    referenced = set()
+    for kind in PHOTO_KINDS:
+        rows = db.session.execute(db.text(
+            f"SELECT DISTINCT {kind}_photo_key FROM attendance_records WHERE {kind}_photo_key IS NOT NULL"
+        )).fetchall()
+        referenced.update(row[0] for row in rows)
+
+    removed = 0
+    for key in list(store.iter_keys()):
+        if key not in referenced:
+            removed += 1
+            if not dry_run:
+                store.delete(key)
+    return removed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Pindahkan foto absensi base64 ke blob store')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--dry-run', action='store_true', help='Hanya hitung, tidak menulis file/database')
+    parser.add_argument('--drop-invalid', action='store_true', help='Kosongkan foto base64 yang tidak bisa di-decode')
+    parser.add_argument('--optimize', action='store_true', help='OPTIMIZE TABLE setelah backfill (reclaim ruang TEXT)')
+    parser.add_argument('--gc', action='store_true', help='Hapus blob yang tidak dirujuk record manapun')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    init_database(app)
+
+    with app.app_context():
+        logger.info("🚀 Starting attendance photo migration...")
+        started = time.time()
+
+        if not args.dry_run:
+            ensure_key_columns()
+        stats = backfill(args.batch_size, args.dry_run, args.drop_invalid)
+        logger.info(f"✅ Backfill done in {time.time() - started:.1f}s: {stats}")
+
+        if args.optimize and not args.dry_run:
+            logger.info("🧹 Optimizing attendance_records...")
+            with db.engine.begin() as conn:
+                conn.execute(db.text("OPTIMIZE TABLE attendance_records"))
+
+        if args.gc:
+            removed = collect_garbage(args.dry_run)
+            logger.info(f"🧹 {'Would remove' if args.dry_run else 'Removed'} {removed} unreferenced photo blob(s)")
+
+    return 0 if not stats['invalid'] or args.drop_invalid else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
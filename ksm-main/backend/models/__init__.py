@@ -129,14 +129,17 @@ from domains.attendance.models import (
     AttendanceRecord,
     AttendanceLeave,
     OvertimeRequest,
-    AttendanceSettings
+    AttendanceSettings,
+    AttendanceDailyRollup
 )
 
 # Integration models sudah dipindah ke domains/integration/models
 # Import dari domain untuk backward compatibility
 from domains.integration.models import (
     NotionDatabase,
-    PropertyMapping
+    PropertyMapping,
+    NotionTaskMirror,
+    NotionSyncState
 )
 
 # Mobil models sudah dipindah ke domains/mobil/models
@@ -257,9 +260,12 @@ __all__ = [
     'AttendanceLeave',
     'OvertimeRequest',
     'AttendanceSettings',
+    'AttendanceDailyRollup',
     # Other models
     'NotionDatabase',
     'PropertyMapping',
+    'NotionTaskMirror',
+    'NotionSyncState',
     # Mobil models
     'Mobil',
     'MobilRequest',
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script untuk benchmark recall dan latency retrieval dense vs hybrid (dense + BM25, RRF)
+
+Query berlabel dibaca dari file JSON/JSONL:
+    {"query": "prosedur SOP-012 pengadaan", "expected_document_ids": ["42"]}
+Tanpa file, query known-item dibuat otomatis dari sampel chunk di collection: kode/angka
+dan keyword dari text chunk, dengan document_id chunk tersebut sebagai jawaban yang diharapkan.
+
+Contoh:
+    python scripts/benchmark_hybrid_retrieval.py --company-id "PT. Kian Santang Muliatama" --sample 200
+    python scripts/benchmark_hybrid_retrieval.py --company-id "PT. Kian Santang Muliatama" --queries sop_queries.jsonl --top-k 5
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# Add parent directory to path untuk import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domains.knowledge.services.qdrant_service import get_qdrant_service
+from domains.knowledge.services.query_embedding_service import get_query_embedding_service
+from domains.knowledge.services.chunking_service import tokenize_lexical, extract_keywords
+from shared.utils.stats import percentile
+
+
+def load_queries(file_path: str):
+    """Muat query berlabel dari file .json (list) atau .jsonl"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.lower().endswith('.jsonl'):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            items = json.load(f)
+    return [
+        {'query': item['query'], 'expected': {str(doc_id) for doc_id in item.get('expected_document_ids', [])}}
+        for item in items if item.get('query')
+    ]
+
+
+def sample_queries(qdrant_service, collection_name: str, sample: int, seed: int):
+    """Bangun query known-item dari chunk acak: kode/angka + keyword teratas"""
+    points = []
+    offset = None
+    while len(points) < sample * 5:
+        result = qdrant_service.scroll_points(collection_name=collection_name, limit=256, offset=offset)
+        if not result.get('success'):
+            raise RuntimeError(result.get('message'))
+        points.extend(result['data']['points'])
+        offset = result['data'].get('next_page_offset')
+        if offset is None:
+            break
+
+    rng = random.Random(seed)
+    rng.shuffle(points)
+    queries = []
+    for point in points:
+        payload = point.get('payload') or {}
+        document_id = (payload.get('metadata') or {}).get('document_id')
+        text = payload.get('text') or ''
+        if not document_id or not text:
+            continue
+        codes = [token for token in dict.fromkeys(tokenize_lexical(text)) if any(ch.isdigit() for ch in token) and len(token) >= 3]
+        terms = codes[:2] + extract_keywords(text)[:3]
+        if len(terms) < 2:
+            continue
+        queries.append({'query': ' '.join(terms), 'expected': {str(document_id)}})
+        if len(queries) >= sample:
+            break
+    return queries
+
+
+def run_mode(qdrant_service, queries, embeddings, company_id: str, collection: str, top_k: int, mode: str):
+    """Jalankan semua query dengan satu mode; return metrik recall@k, MRR, dan latency (ms)"""
+    latencies = []
+    hits = 0
+    reciprocal_ranks = 0.0
+    for item, embedding in zip(queries, embeddings):
+        if not embedding:
+            continue
+        start = time.perf_counter()
+        results = qdrant_service.search_documents(
+            company_id=company_id, query=item['query'], top_k=top_k,
+            collection=collection, query_embedding=embedding, search_mode=mode
+        ) or []
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        for rank, result in enumerate(results, start=1):
+            if str((result.get('metadata') or {}).get('document_id')) in item['expected']:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+    total = len(latencies) or 1
+    return {
+        'queries': len(latencies),
+        'recall': hits / total,
+        'mrr': reciprocal_ranks / total,
+        'p50_ms': percentile(sorted(latencies), 0.50),
+        'p95_ms': percentile(sorted(latencies), 0.95)
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark recall/latency retrieval dense vs hybrid')
+    parser.add_argument('--company-id', required=True)
+    parser.add_argument('--collection', default='default')
+    parser.add_argument('--queries', help='File .json/.jsonl berisi query berlabel')
+    parser.add_argument('--sample', type=int, default=100, help='Jumlah query known-item otomatis (tanpa --queries)')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    qdrant_service = get_qdrant_service()
+    if not qdrant_service.is_available():
+        print("❌ Qdrant tidak tersedia")
+        return 1
+
+    collection_name = qdrant_service._get_collection_name(args.company_id, args.collection)
+    queries = load_queries(args.queries) if args.queries else sample_queries(
+        qdrant_service, collection_name, args.sample, args.seed
+    )
+    if not queries:
+        print("❌ Tidak ada query untuk di-benchmark")
+        return 1
+
+    # Embedding dihitung sekali di depan agar latency hanya mengukur retrieval
+    embeddings = get_query_embedding_service().embed_queries([item['query'] for item in queries])
+
+    print("=" * 70)
+    print("📊 BENCHMARK HYBRID RETRIEVAL")
+    print("=" * 70)
+    print(f"Collection : {collection_name} (hybrid: {qdrant_service.supports_hybrid(collection_name)})")
+    print(f"Query      : {len(queries)} ({'berlabel' if args.queries else 'known-item otomatis'}), top_k={args.top_k}")
+    print()
+
+    for mode in ('dense', 'hybrid'):
+        # Warm-up: koneksi pool dan schema registry
+        qdrant_service.search_documents(
+            company_id=args.company_id, query=queries[0]['query'], top_k=args.top_k,
+            collection=args.collection, query_embedding=embeddings[0] or None, search_mode=mode
+        )
+        metrics = run_mode(qdrant_service, queries, embeddings, args.company_id, args.collection, args.top_k, mode)
+        print(f"✅ {mode:<6}: recall@{args.top_k}={metrics['recall']:.3f}  MRR={metrics['mrr']:.3f}  "
+              f"p50={metrics['p50_ms']:.1f}ms  p95={metrics['p95_ms']:.1f}ms  ({metrics['queries']} query)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
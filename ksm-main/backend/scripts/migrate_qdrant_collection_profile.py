@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script untuk memindahkan collection Qdrant ke profil lain (quantization, on-disk, HNSW) tanpa downtime
+
+Collection baru dibuat dengan profil target, semua points disalin, lalu alias dengan nama
+collection lama diarahkan ke collection baru. Aplikasi tetap memakai nama yang sama.
+Profil yang tersedia ada di config/qdrant_profiles.py (QDRANT_PROFILES_FILE untuk profil kustom).
+
+Contoh:
+    python scripts/migrate_qdrant_collection_profile.py --list-profiles
+    python scripts/migrate_qdrant_collection_profile.py --company-id "PT. Kian Santang Muliatama" --profile balanced
+    python scripts/migrate_qdrant_collection_profile.py --collection-name KSM_1_default --profile compact --drop-old
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# Add parent directory to path untuk import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.qdrant_profiles import get_qdrant_profile_registry
+from domains.knowledge.services.qdrant_service import get_qdrant_service
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Migrasi collection Qdrant ke profil lain dengan alias swap')
+    parser.add_argument('--company-id', help='Company pemilik collection')
+    parser.add_argument('--collection', default='default', help='Nama collection logis (dengan --company-id)')
+    parser.add_argument('--collection-name', help='Nama collection/alias lengkap (menggantikan --company-id)')
+    parser.add_argument('--profile', help='Profil target (default: profil company dari config)')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--drop-old', action='store_true', help='Hapus collection lama setelah alias dipindah')
+    parser.add_argument('--list-profiles', action='store_true', help='Tampilkan profil yang tersedia')
+    args = parser.parse_args()
+
+    registry = get_qdrant_profile_registry()
+    if args.list_profiles:
+        for name in registry.profiles:
+            print(f"{name:<12} {json.dumps(registry.get_profile(name), sort_keys=True)}")
+        return 0
+
+    if not args.collection_name and not args.company_id:
+        parser.error('--company-id atau --collection-name diperlukan')
+
+    qdrant_service = get_qdrant_service()
+    if not qdrant_service.is_available():
+        print("❌ Qdrant tidak tersedia")
+        return 1
+
+    collection_name = args.collection_name or qdrant_service._get_collection_name(args.company_id, args.collection)
+    profile = args.profile or registry.profile_name_for_collection(collection_name, qdrant_service.collection_prefix)
+
+    print("=" * 70)
+    print("🔄 MIGRASI PROFIL COLLECTION QDRANT")
+    print("=" * 70)
+    print(f"Collection : {collection_name}")
+    print(f"Profil     : {profile}")
+    print()
+
+    result = qdrant_service.migrate_collection_profile(
+        collection_name, profile, batch_size=args.batch_size, drop_old=args.drop_old
+    )
+    if not result.get('success'):
+        print(f"❌ {result.get('message')}")
+        return 1
+
+    data = result['data']
+    print(f"✅ {result['message']}")
+    print(f"   Collection baru : {data['new_collection']} ({data['points_count']} points)")
+    print(f"   Collection lama : {data['previous_collection']}"
+          f"{' (disimpan untuk rollback)' if data['previous_collection_kept'] else ''}")
+    if data['swap'] == 'initial':
+        print("ℹ️ Collection sekarang diakses lewat alias; migrasi berikutnya memakai swap atomik")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
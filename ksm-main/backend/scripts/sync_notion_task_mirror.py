@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script untuk mengisi dan memperbarui mirror task Notion (tabel notion_task_mirror)
+
+Run pertama per database melakukan full backfill (semua page, mengikuti next_cursor);
+run berikutnya hanya mengambil page dengan last_edited_time >= watermark.
+Cocok dijalankan dari cron di samping refresh otomatis saat task dibaca.
+
+Contoh:
+    python scripts/sync_notion_task_mirror.py
+    python scripts/sync_notion_task_mirror.py --full
+    python scripts/sync_notion_task_mirror.py --employee IRMN --status
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# Add parent directory to path untuk import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Sinkronisasi mirror task Notion (backfill/delta)')
+    parser.add_argument('--full', action='store_true', help='Paksa full resync (hapus task yang sudah dihapus di Notion)')
+    parser.add_argument('--employee', help='Hanya database karyawan yang namanya mengandung teks ini')
+    parser.add_argument('--status', action='store_true', help='Tampilkan status mirror setelah sync')
+    args = parser.parse_args()
+
+    from app import app
+    from domains.integration.services.notion_task_mirror_service import get_notion_task_mirror_service
+
+    with app.app_context():
+        mirror_service = get_notion_task_mirror_service()
+
+        print("=" * 70)
+        print("🔄 SYNC MIRROR TASK NOTION")
+        print("=" * 70)
+        result = mirror_service.sync_all(full=args.full, employee_filter=args.employee)
+        for run in result['databases']:
+            icon = '✅' if run.get('status') == 'completed' else ('⏭️' if run.get('status') == 'skipped' else '❌')
+            print(f"{icon} {run['employee_name']:<12} {run.get('mode', '-'):<6} "
+                  f"pages={run.get('pages_fetched', 0):<4} new={run.get('inserted', 0):<5} "
+                  f"updated={run.get('updated', 0):<5} removed={run.get('removed', 0):<4} "
+                  f"{run.get('duration_ms', 0)}ms {run.get('error', '')}")
+        print(f"\n📋 Total: {result['pages_fetched']} page(s), {result['tasks_synced']} task(s) disimpan, "
+              f"{result['removed_tasks']} dihapus, {result['duration_ms']}ms")
+
+        if args.status:
+            print(json.dumps(mirror_service.get_sync_status(), indent=2, default=str))
+
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
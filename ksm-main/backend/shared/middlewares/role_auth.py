@@ -10,9 +10,9 @@ from flask_jwt_extended import get_jwt_identity
 from functools import wraps
 import logging
 from models import User
-from domains.role.models.menu_models import Menu, MenuPermission
 from models import Role, UserRole
 from domains.role.services.user_role_service import UserRoleService
+from domains.role.services.permission_matrix_cache import get_permission_matrix_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,29 +29,8 @@ def check_menu_permission(user_id, menu_path, action='read'):
         bool: True if user has permission, False otherwise
     """
     try:
-        # Get user roles
-        user_roles = UserRole.query.filter_by(user_id=user_id).all()
-        role_ids = [ur.role_id for ur in user_roles]
-        
-        if not role_ids:
-            return False
-        
-        # Get menu
-        menu = Menu.query.filter_by(path=menu_path, is_active=True).first()
-        if not menu:
-            return False
-        
-        # Check permission
-        permission = MenuPermission.query.filter(
-            MenuPermission.menu_id == menu.id,
-            MenuPermission.role_id.in_(role_ids),
-            MenuPermission.is_active == True
-        ).first()
-        
-        if not permission:
-            return False
-        
-        return permission.has_permission(action)
+        # Dijawab dari matriks permission user yang sudah dikompilasi (tanpa query per check)
+        return get_permission_matrix_cache().has_menu_permission(user_id, menu_path, action)
         
     except Exception as e:
         logger.error(f"Error checking menu permission: {str(e)}")
@@ -98,8 +77,8 @@ def require_permission(menu_path, action='read'):
                 # Check menu permission
                 has_permission = check_menu_permission(current_user_id, menu_path, action)
                 
+                primary_role_name = get_permission_matrix_cache().get_matrix(user.id)['primary_role_name'] or user.role
                 if not has_permission:
-                    primary_role_name = UserRoleService.get_primary_role(user.id).name if UserRoleService.get_primary_role(user.id) else user.role
                     logger.warning(f"❌ Permission denied: User {user.username} (role: {primary_role_name}) tried to access {menu_path} with action {action}")
                     return jsonify({
                         'success': False,
@@ -113,7 +92,6 @@ def require_permission(menu_path, action='read'):
                 request.current_user = user
                 request.current_user_id = current_user_id
                 
-                primary_role_name = UserRoleService.get_primary_role(user.id).name if UserRoleService.get_primary_role(user.id) else user.role
                 logger.info(f"✅ Permission granted: User {user.username} (role: {primary_role_name}) accessing {menu_path} with action {action}")
                 return f(*args, **kwargs)
                 
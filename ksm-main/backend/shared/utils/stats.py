@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Statistik Utilities untuk KSM Main Backend
+Ringkasan sampel (avg/p50/p95/max) untuk metrik latency dan ukuran run
+"""
+
+from typing import Dict, Iterable, List
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile dari list yang sudah diurutkan (pct 0..1)"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+
+def summarize(samples: Iterable[float], scale: float = 1.0, unit: str = '') -> Dict[str, float]:
+    """Ringkasan avg/p50/p95/max, dikali `scale` dan dibulatkan 1 desimal.
+
+    `unit` menjadi akhiran key, mis. summarize(detik, scale=1000.0, unit='ms') -> {'avg_ms', 'p50_ms', ...}
+    """
+    suffix = f'_{unit}' if unit else ''
+    ordered = sorted(samples)
+    if not ordered:
+        return {f'{key}{suffix}': 0.0 for key in ('avg', 'p50', 'p95', 'max')}
+    return {
+        f'avg{suffix}': round(sum(ordered) / len(ordered) * scale, 1),
+        f'p50{suffix}': round(percentile(ordered, 0.50) * scale, 1),
+        f'p95{suffix}': round(percentile(ordered, 0.95) * scale, 1),
+        f'max{suffix}': round(ordered[-1] * scale, 1)
+    }
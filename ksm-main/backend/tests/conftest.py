@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pytest configuration untuk KSM Main Backend
+- Menambahkan direktori backend ke sys.path agar import `domains.*` berjalan seperti di app
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Laporan dan export absensi memakai scope yang sama dengan foto absensi (admin semua, manager timnya,
+user lain hanya data sendiri), dan file export sementara selalu dihapus saat response ditutup.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('flask_migrate')
+pytest.importorskip('openpyxl')
+
+from config.database import db
+import models  # noqa: F401  (registrasi semua model untuk foreign key)
+from domains.auth.models.auth_models import User
+from domains.role.models.role_models import Department, Role, UserRole
+from domains.attendance.models.attendance_models import AttendanceRecord
+from domains.attendance.controllers import attendance_controller
+from domains.attendance.services.attendance_export_service import attendance_export_service
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        tables = [User.__table__, Department.__table__, Role.__table__, UserRole.__table__,
+                  AttendanceRecord.__table__]
+        db.metadata.create_all(db.engine, tables=tables)
+        yield app
+        db.session.remove()
+        db.metadata.drop_all(db.engine, tables=tables)
+
+
+@pytest.fixture
+def users(app):
+    admin = User(username='admin', password_hash='x', role='admin', is_active=True)
+    manager = User(username='manager', password_hash='x', role='user', is_active=True)
+    member = User(username='member', password_hash='x', role='user', is_active=True)
+    outsider = User(username='outsider', password_hash='x', role='user', is_active=True)
+    db.session.add_all([admin, manager, member, outsider])
+    team = Role(name='Gudang', code='GDG', level=3, is_management=True)
+    other = Role(name='Kasir', code='KSR', level=1, is_management=False)
+    db.session.add_all([team, other])
+    db.session.flush()
+    db.session.add_all([
+        UserRole(user_id=manager.id, role_id=team.id, is_active=True),
+        UserRole(user_id=member.id, role_id=team.id, is_active=True),
+        UserRole(user_id=outsider.id, role_id=other.id, is_active=True)
+    ])
+    clock_in = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=8)
+    for user in (admin, manager, member, outsider):
+        db.session.add(AttendanceRecord(user_id=user.id, status='present', clock_in=clock_in))
+    db.session.commit()
+    return {user.username: user.id for user in (admin, manager, member, outsider)}
+
+
+def _scoped_filters(app, monkeypatch, viewer_id, query=''):
+    monkeypatch.setattr(attendance_controller, 'get_jwt_identity', lambda: viewer_id)
+    with app.test_request_context(f'/api/attendance/report{query}'):
+        return attendance_controller._parse_scoped_attendance_filters()
+
+
+def _exported_users(filters):
+    return sorted(row[1] for row in attendance_export_service.iter_rows(filters))
+
+
+def test_report_filters_follow_viewer_scope(app, users, monkeypatch):
+    filters, error = _scoped_filters(app, monkeypatch, users['admin'])
+    assert error is None
+    assert _exported_users(filters) == ['admin', 'manager', 'member', 'outsider']
+
+    filters, error = _scoped_filters(app, monkeypatch, users['manager'])
+    assert _exported_users(filters) == ['manager', 'member']
+
+    filters, error = _scoped_filters(app, monkeypatch, users['outsider'])
+    assert _exported_users(filters) == ['outsider']
+
+
+def test_report_rejects_user_outside_scope(app, users, monkeypatch):
+    filters, error = _scoped_filters(app, monkeypatch, users['outsider'], f"?user_id={users['member']}")
+
+    assert filters is None
+    assert error[1] == 403
+
+    filters, error = _scoped_filters(app, monkeypatch, users['manager'], f"?user_id={users['member']}")
+    assert error is None
+    assert _exported_users(filters) == ['member']
+
+
+def test_export_temp_file_removed_when_body_is_never_read(app, users, monkeypatch):
+    filters, _ = _scoped_filters(app, monkeypatch, users['admin'])
+    built = []
+    original = attendance_export_service.build_excel
+    monkeypatch.setattr(attendance_export_service, 'build_excel',
+                        lambda filters: built.append(original(filters)) or built[-1])
+
+    with app.test_request_context('/api/attendance/export/excel'):
+        response = attendance_controller._export_response('excel', filters)
+    assert os.path.exists(built[0])
+
+    response.close()
+
+    assert not os.path.exists(built[0])
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backfill mirror Notion yang terputus dilanjutkan sebagai delta dari watermark, lalu run berikutnya
+tetap menjalankan full resync agar page yang dihapus di Notion ikut terbuang.
+"""
+
+import pytest
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('flask_migrate')
+
+from config.database import db
+import models  # noqa: F401  (registrasi semua model untuk foreign key)
+from domains.integration.models.notion_task_mirror import NotionTaskMirror, NotionSyncState
+from domains.integration.services.notion_task_mirror_service import NotionTaskMirrorService
+
+DATABASE_ID = 'db-budi'
+
+
+def _page(page_id: str, minute: int) -> dict:
+    return {'id': page_id, 'last_edited_time': f'2024-01-15T10:{minute:02d}:00.000Z'}
+
+
+class FakeNotionService:
+    """Database Notion dua batch; batch berikutnya bisa dibuat gagal untuk mensimulasikan putus"""
+
+    def __init__(self, pages):
+        self.employee_databases = {'Budi': DATABASE_ID}
+        self.pages = pages
+        self.fail_after_batches = None
+        self.payloads = []
+
+    def _iter_database_query(self, database_id, payload):
+        self.payloads.append(payload)
+        since = payload.get('filter', {}).get('last_edited_time', {}).get('on_or_after')
+        pages = [page for page in self.pages if since is None or page['last_edited_time'] >= since]
+        for batch_number, start in enumerate(range(0, len(pages), 2)):
+            if self.fail_after_batches is not None and batch_number >= self.fail_after_batches:
+                raise RuntimeError('Notion API timeout')
+            yield pages[start:start + 2]
+
+    @staticmethod
+    def _parse_task_page(page, employee_name):
+        return {'title': page['id'], 'status': 'Not started', 'priority': None, 'date': None,
+                'description': '', 'url': None, 'created_time': page['last_edited_time'],
+                'last_edited_time': page['last_edited_time']}
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        tables = [NotionTaskMirror.__table__, NotionSyncState.__table__]
+        db.metadata.create_all(db.engine, tables=tables)
+        yield app
+        db.session.remove()
+        db.metadata.drop_all(db.engine, tables=tables)
+
+
+def _mirrored_page_ids():
+    return sorted(row.page_id for row in NotionTaskMirror.query.all())
+
+
+def test_interrupted_backfill_resumes_then_runs_full_resync(app):
+    notion = FakeNotionService([_page('p1', 1), _page('p2', 2), _page('p3', 3), _page('p4', 4)])
+    mirror = NotionTaskMirrorService(notion)
+
+    notion.fail_after_batches = 1
+    first = mirror.sync_database('Budi', DATABASE_ID)
+    assert (first['mode'], first['status']) == ('full', 'failed')
+    assert _mirrored_page_ids() == ['p1', 'p2']
+
+    notion.fail_after_batches = None
+    resumed = mirror.sync_database('Budi', DATABASE_ID)
+    assert (resumed['mode'], resumed['status']) == ('delta', 'completed')
+    assert 'filter' in notion.payloads[-1]
+    assert _mirrored_page_ids() == ['p1', 'p2', 'p3', 'p4']
+    state = NotionSyncState.query.filter_by(database_id=DATABASE_ID).one()
+    assert state.backfill_completed is True
+    assert state.last_full_sync_at is None
+
+    # p1 dihapus di Notion: hanya full resync yang bisa membuangnya dari mirror
+    notion.pages = notion.pages[1:]
+    full = mirror.sync_database('Budi', DATABASE_ID)
+    assert (full['mode'], full['status'], full['removed']) == ('full', 'completed', 1)
+    assert _mirrored_page_ids() == ['p2', 'p3', 'p4']
+
+    after = mirror.sync_database('Budi', DATABASE_ID)
+    assert after['mode'] == 'delta'
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache halaman PdfPageExtractor: entry tidak lengkap dan sweep ukuran/umur.
+"""
+
+import io
+import os
+import time
+import hashlib
+
+import pytest
+
+canvas = pytest.importorskip('reportlab.pdfgen.canvas')
+pytest.importorskip('PyPDF2')
+
+from domains.knowledge.services.pdf_page_extractor import PdfPageExtractor, PageTextCache
+
+
+def _pdf_bytes(pages: int) -> bytes:
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for page_number in range(1, pages + 1):
+        pdf.drawString(72, 720, f"Halaman nomor {page_number}")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def extractor(monkeypatch, tmp_path):
+    monkeypatch.setenv('PDF_EXTRACT_WORKERS', '1')
+    monkeypatch.setenv('PDF_PAGE_CACHE_DIR', str(tmp_path / 'pdf_pages'))
+    return PdfPageExtractor()
+
+
+def test_missing_cached_page_without_file_path_is_extracted_from_content(extractor):
+    content = _pdf_bytes(3)
+    sha256 = hashlib.sha256(content).hexdigest()
+    first = list(extractor.iter_pages(None, sha256, content=content))
+    assert [page['from_cache'] for page in first] == [False, False, False]
+
+    os.remove(extractor.cache._page_path('pypdf2', sha256, 2))
+    second = list(extractor.iter_pages(None, sha256, content=content))
+
+    assert [page['text'] for page in second] == [page['text'] for page in first]
+    assert 'Halaman nomor 2' in second[1]['text']
+    assert extractor.cache.has_page('pypdf2', sha256, 2)
+
+    third = list(extractor.iter_pages(None, sha256, content=content))
+    assert all(page['from_cache'] for page in third)
+
+
+def test_sweep_removes_expired_then_least_recently_used(tmp_path):
+    cache = PageTextCache(str(tmp_path), max_bytes=300, max_age_seconds=3600)
+    now = time.time()
+    for sha256, accessed in [('aa' * 32, now - 7200), ('bb' * 32, now - 60),
+                             ('cc' * 32, now - 30), ('dd' * 32, now)]:
+        cache.put_page('pypdf2', sha256, 1, 'x' * 100)
+        cache.mark_complete('pypdf2', sha256, 1)
+        meta_path = os.path.join(cache._document_dir('pypdf2', sha256), 'meta.json')
+        os.utime(meta_path, (accessed, accessed))
+
+    stats = cache.sweep()
+
+    assert stats['documents_removed'] == 2
+    assert cache.get_total_pages('pypdf2', 'aa' * 32) is None
+    assert cache.get_total_pages('pypdf2', 'bb' * 32) is None
+    assert cache.get_total_pages('pypdf2', 'cc' * 32) == 1
+    assert cache.get_total_pages('pypdf2', 'dd' * 32) == 1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrasi profil collection Qdrant (alias swap) terhadap Qdrant in-memory.
+
+- Write yang masuk selama penyalinan ikut tersalin lewat catch-up updated_at
+- Point yang dihapus di source juga hilang dari collection baru
+- Collection lama tidak dibuat ulang kosong selama alias sementara ada
+"""
+
+import pytest
+
+qdrant_client = pytest.importorskip('qdrant_client')
+
+from domains.knowledge.services import qdrant_service as qdrant_module
+from domains.knowledge.services.qdrant_service import (
+    QdrantService, CUTOVER_ALIAS_SUFFIX, UPDATED_AT_FIELD
+)
+
+COLLECTION = 'KSM_1_default'
+
+
+def _vector(seed: float):
+    return [seed, 1.0 - seed, 0.5, 0.25]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('QDRANT_HYBRID_ENABLED', 'false')
+    monkeypatch.setenv('QDRANT_VECTOR_SIZE', '4')
+    monkeypatch.setenv('QDRANT_MIGRATION_CLOCK_SKEW', '0')
+    monkeypatch.setattr(qdrant_module, 'QdrantClient', lambda **kwargs: qdrant_client.QdrantClient(':memory:'))
+    monkeypatch.setattr(qdrant_module, 'HTTPX_AVAILABLE', False)
+    svc = QdrantService()
+    assert svc.create_collection(COLLECTION, 4)['success']
+    points = [{'id': i, 'vector': _vector(i / 10), 'payload': {'text': f'chunk {i}'}} for i in range(1, 6)]
+    assert svc.upsert_points(collection_name=COLLECTION, points=points)['success']
+    return svc
+
+
+def _payloads(svc, name):
+    page = svc.scroll_points(collection_name=name, limit=100)
+    return {point['id']: point['payload'] for point in page['data']['points']}
+
+
+def _write_during_full_copy(monkeypatch, svc, source):
+    """Ubah source tepat setelah salinan penuh (sebelum pass catch-up)"""
+    original = svc._copy_points
+
+    def copy_points(src, target, batch_size, **kwargs):
+        copied = original(src, target, batch_size, **kwargs)
+        if kwargs.get('since') is None:
+            svc.upsert_points(collection_name=source, points=[
+                {'id': 2, 'vector': _vector(0.9), 'payload': {'text': 'chunk 2 v2'}},
+                {'id': 6, 'vector': _vector(0.6), 'payload': {'text': 'chunk 6'}}
+            ])
+            svc.delete_points(collection_name=source, ids=[5])
+        return copied
+
+    monkeypatch.setattr(svc, '_copy_points', copy_points)
+
+
+def test_initial_migration_catches_up_writes_and_deletes(monkeypatch, service):
+    _write_during_full_copy(monkeypatch, service, COLLECTION)
+
+    result = service.migrate_collection_profile(COLLECTION, 'balanced', batch_size=2)
+
+    assert result['success'], result['message']
+    assert result['data']['swap'] == 'initial'
+    assert service._resolve_alias(COLLECTION) == result['data']['new_collection']
+    assert service._resolve_alias(COLLECTION + CUTOVER_ALIAS_SUFFIX) is None
+    payloads = _payloads(service, COLLECTION)
+    assert sorted(payloads) == [1, 2, 3, 4, 6]
+    assert payloads[2]['text'] == 'chunk 2 v2'
+    assert all(UPDATED_AT_FIELD in payload for payload in payloads.values())
+
+
+def test_alias_swap_keeps_previous_collection_and_copies_late_writes(monkeypatch, service):
+    first = service.migrate_collection_profile(COLLECTION, 'balanced')
+    assert first['success'], first['message']
+    _write_during_full_copy(monkeypatch, service, first['data']['new_collection'])
+
+    second = service.migrate_collection_profile(COLLECTION, 'high_recall', batch_size=2)
+
+    assert second['success'], second['message']
+    assert second['data']['swap'] == 'atomic'
+    assert second['data']['previous_collection_kept'] is True
+    assert service._resolve_alias(COLLECTION) == second['data']['new_collection']
+    payloads = _payloads(service, COLLECTION)
+    assert sorted(payloads) == [1, 2, 3, 4, 6]
+    assert payloads[2]['text'] == 'chunk 2 v2'
+
+
+def test_missing_collection_is_not_recreated_during_cutover(service):
+    target = 'KSM_1_default__balanced_test'
+    assert service.create_collection(target, 4, profile='balanced')['success']
+    service._update_aliases(qdrant_module.CreateAliasOperation(create_alias=qdrant_module.CreateAlias(
+        collection_name=target, alias_name=COLLECTION + CUTOVER_ALIAS_SUFFIX)))
+    service.client.delete_collection(collection_name=COLLECTION)
+    service._forget_collection(COLLECTION)
+
+    result = service.upsert_points(collection_name=COLLECTION,
+                                   points=[{'id': 9, 'vector': _vector(0.3), 'payload': {'text': 'late'}}])
+
+    assert result['success'] is False
+    assert COLLECTION not in {c.name for c in service.client.get_collections().collections}
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test streaming jawaban Telegram lewat RAG Enhanced Telegram Service
+- Modul rag_enhanced_telegram_service harus bisa di-import (tanpa fallback non-streaming)
+- Satu update Telegram di-stream end to end: handle_update -> RAG -> Agent AI (stream) -> preview + edit final
+- Query parafrase dengan chunk yang sama dijawab dari semantic response cache
+"""
+
+import pytest
+
+from domains.knowledge.services import rag_enhanced_telegram_service as rag_module
+from domains.knowledge.services.semantic_response_cache import SemanticResponseCache
+from domains.notification.services import telegram_stream_reply
+from domains.notification.services.telegram_integration_service import TelegramIntegrationService
+
+CHUNKS = [
+    {'text': 'Reset password lewat menu Profil > Keamanan.', 'similarity_score': 0.91,
+     'metadata': {'chunk_id': 'doc1_chunk_0', 'document_id': 'doc1'}},
+    {'text': 'Link reset dikirim ke email kantor.', 'similarity_score': 0.84,
+     'metadata': {'chunk_id': 'doc1_chunk_1', 'document_id': 'doc1'}},
+]
+EMBEDDINGS = {
+    'bagaimana cara reset password?': [1.0, 0.0, 0.0],
+    'cara reset kata sandi gimana': [0.98, 0.12, 0.0],  # parafrase: cosine ~0.99
+}
+ANSWER = 'Buka menu Profil > Keamanan lalu pilih Reset Password. Link reset dikirim ke email kantor.'
+
+
+class FakeQdrantService:
+    def __init__(self):
+        self.searches = 0
+
+    def _get_collection_name(self, company_id, collection):
+        return f'KSM_{company_id}_{collection}'
+
+    def search_documents(self, **kwargs):
+        self.searches += 1
+        return [dict(chunk) for chunk in CHUNKS]
+
+
+class FakeQueryEmbeddingService:
+    def embed_query(self, query):
+        return EMBEDDINGS[query]
+
+
+class FakeAgentAI:
+    """Agent AI yang men-stream ANSWER per potongan lewat on_delta"""
+
+    def __init__(self):
+        self.stream_calls = 0
+
+    def check_agent_ai_health(self):
+        return {'success': True, 'status': 'healthy'}
+
+    def send_rag_enhanced_message(self, user_id, message, context, session_id=None, company_id=None, on_delta=None):
+        self.stream_calls += 1
+        text = ''
+        for index in range(0, len(ANSWER), 16):
+            delta = ANSWER[index:index + 16]
+            text += delta
+            on_delta(delta, text)
+        return {'success': True, 'streamed': True, 'ttft_ms': 5.0,
+                'data': {'success': True, 'data': {'response': text, 'tokens_used': 120}}}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self._body = body
+        self.content = b'{}'
+
+    def json(self):
+        return self._body
+
+
+class FakeScheduler:
+    """Pengganti outbound scheduler: mencatat request Bot API tanpa HTTP"""
+
+    def __init__(self):
+        self.calls = []
+        self.queued = []
+
+    def call(self, bot_token, method, payload=None, timeout=None):
+        self.calls.append((method, dict(payload or {})))
+        return FakeResponse({'ok': True, 'result': {'message_id': 77}})
+
+    def try_acquire(self, bot_token, chat_id):
+        return True
+
+    def acquire(self, bot_token, chat_id, timeout=None):
+        return True
+
+    def submit(self, bot_token, chat_id, text, parse_mode=None, **kwargs):
+        self.queued.append(text)
+
+    def pause_chat(self, bot_token, chat_id, seconds):
+        pass
+
+
+@pytest.fixture
+def rag_service(monkeypatch):
+    service = rag_module.RAGEnhancedTelegramService()
+    service.qdrant_service = FakeQdrantService()
+    service.query_embedding_service = FakeQueryEmbeddingService()
+    service.semantic_cache = SemanticResponseCache()
+    service.agent_ai_sync = FakeAgentAI()
+    monkeypatch.setattr(rag_module, 'rag_enhanced_telegram', service)
+    return service
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    scheduler = FakeScheduler()
+    monkeypatch.setenv('TELEGRAM_STREAM_EDIT_INTERVAL', '0')
+    monkeypatch.setattr(telegram_stream_reply, 'get_telegram_outbound_scheduler', lambda: scheduler)
+
+    service = TelegramIntegrationService.__new__(TelegramIntegrationService)
+    service.bot_token = 'TEST_TOKEN'
+    service.stream_responses = True
+    service.sent_plain = []
+    service._send_telegram_response = lambda chat_id, text: service.sent_plain.append((chat_id, text)) or True
+    return service, scheduler
+
+
+def _update(update_id, text):
+    return {'update_id': update_id,
+            'message': {'message_id': update_id, 'text': text, 'chat': {'id': 555}, 'from': {'id': 42}}}
+
+
+def test_module_imports_real_telegram_integration():
+    from domains.notification.services.telegram_integration_service import telegram_integration
+    assert rag_module.telegram_integration is telegram_integration
+
+
+def test_update_is_streamed_end_to_end(rag_service, telegram):
+    service, scheduler = telegram
+
+    assert service.handle_update(_update(1, 'bagaimana cara reset password?')) is True
+
+    methods = [method for method, _ in scheduler.calls]
+    assert methods[0] == 'sendMessage'
+    assert methods.count('editMessageText') >= 2
+    assert scheduler.calls[0][1]['text'].endswith(telegram_stream_reply.CURSOR)
+    final_method, final_payload = scheduler.calls[-1]
+    assert final_method == 'editMessageText'
+    assert final_payload['text'] == ANSWER
+    assert final_payload['message_id'] == 77
+    assert service.sent_plain == []
+    assert rag_service.agent_ai_sync.stream_calls == 1
+
+
+def test_paraphrase_is_served_from_semantic_cache(rag_service, telegram):
+    service, scheduler = telegram
+    service.handle_update(_update(1, 'bagaimana cara reset password?'))
+
+    assert service.handle_update(_update(2, 'cara reset kata sandi gimana')) is True
+
+    # Agent AI tidak dipanggil lagi; jawaban ter-cache dikirim sebagai pesan biasa
+    assert rag_service.agent_ai_sync.stream_calls == 1
+    assert service.sent_plain == [(555, ANSWER)]
+    stats = rag_service.semantic_cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['lookups'] == 2
+
+
+def test_changed_chunk_content_is_not_served_from_cache(rag_service, telegram, monkeypatch):
+    service, _ = telegram
+    service.handle_update(_update(1, 'bagaimana cara reset password?'))
+
+    # Dokumen di-ingest ulang di worker lain: chunk_id sama, isi berubah
+    changed = [dict(CHUNKS[0], text='Reset password sekarang lewat portal SSO.'), CHUNKS[1]]
+    monkeypatch.setattr(rag_service.qdrant_service, 'search_documents', lambda **kwargs: [dict(c) for c in changed])
+    rag_service._rag_cache.clear()
+
+    service.handle_update(_update(2, 'cara reset kata sandi gimana'))
+
+    assert rag_service.agent_ai_sync.stream_calls == 2
+    assert rag_service.semantic_cache.get_stats()['stale_misses'] == 1
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Status kirim Telegram per Notification: timeout tunggu dicatat 'queued', bukan 'failed',
+dan hasil akhir ditulis ulang begitu pesan selesai dikirim.
+"""
+
+import pytest
+
+from domains.notification.services import telegram_sender_service as sender_module
+from domains.notification.services.telegram_outbound_scheduler import OutboundMessage
+
+
+class FakeScheduler:
+    """Antrian yang tidak pernah selesai sendiri; test menyelesaikan pesan secara manual"""
+
+    def __init__(self):
+        self.handles = []
+
+    def _submit(self, chat_id, text, parse_mode, notification_id=None, callback=None, **kwargs):
+        handle = OutboundMessage('token', chat_id, [text], parse_mode,
+                                 notification_id=notification_id, callback=callback)
+        self.handles.append(handle)
+        return handle
+
+    def send(self, bot_token, chat_id, text, parse_mode=None, timeout=None, **kwargs):
+        return self._submit(chat_id, text, parse_mode, **kwargs)
+
+    def send_many(self, bot_token, messages, parse_mode=None, timeout=None):
+        return [self._submit(item['chat_id'], item['text'], parse_mode,
+                             notification_id=item.get('notification_id'), callback=item.get('callback'))
+                for item in messages]
+
+    @staticmethod
+    def complete(handle, status='sent'):
+        handle.status = status
+        if status == 'sent':
+            handle.message_ids.append(1)
+        handle._done.set()
+        handle.callback(handle)
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(sender_module, 'get_telegram_outbound_scheduler', lambda: scheduler)
+    service = sender_module.TelegramSenderService()
+    service.bot_token = 'token'
+    service.send_timeout = 0
+    writes = []
+    monkeypatch.setattr(service, '_write_delivery_results',
+                        lambda handles: writes.append([(h.notification_id, h.chat_id, h.status) for h in handles]))
+    return service, scheduler, writes
+
+
+def test_timed_out_send_is_reported_queued_then_updated(sender):
+    service, scheduler, writes = sender
+
+    success, message = service.send_message('100', 'halo', notification_id=7)
+
+    assert success is True
+    assert 'queued' in message.lower()
+    assert writes == [[(7, '100', 'queued')]]
+
+    scheduler.complete(scheduler.handles[0])
+    assert writes[-1] == [(7, '100', 'sent')]
+
+
+def test_daily_report_threads_notification_id_to_every_chat(sender, monkeypatch):
+    service, scheduler, writes = sender
+    monkeypatch.setattr(service, '_format_daily_report_message', lambda report: 'laporan')
+
+    success, message = service.send_daily_task_report({}, chat_id='1,2', notification_id=9)
+
+    assert success is True
+    assert [handle.notification_id for handle in scheduler.handles] == [9, 9]
+    assert writes == [[(9, '1', 'queued'), (9, '2', 'queued')]]
+
+    scheduler.complete(scheduler.handles[1], status='failed')
+    assert writes[-1] == [(9, '2', 'failed')]
+
+
+def test_completion_before_record_is_not_written_twice(sender):
+    service, scheduler, writes = sender
+    handle = scheduler._submit('100', 'halo', None, notification_id=3,
+                               callback=service._delivery_callback(3))
+    scheduler.complete(handle)
+
+    service._record_delivery_results([handle])
+
+    assert writes == [[(3, '100', 'sent')]]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.content = b'x'
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+
+def test_unexpected_response_does_not_stall_chat(monkeypatch):
+    from domains.notification.services.telegram_outbound_scheduler import TelegramOutboundScheduler
+
+    monkeypatch.setenv('TELEGRAM_SEND_MAX_ATTEMPTS', '1')
+    scheduler = TelegramOutboundScheduler()
+    responses = [FakeResponse(200, ['bukan', 'object']),
+                 FakeResponse(200, {'ok': True, 'result': {'message_id': 5}})]
+    monkeypatch.setattr(scheduler, 'call', lambda bot_token, method, payload: responses.pop(0))
+    completed = []
+
+    first = scheduler.submit('token', '100', 'pertama', callback=completed.append)
+    second = scheduler.submit('token', '100', 'kedua')
+
+    assert first.wait(5) and second.wait(5)
+    assert first.status == 'failed' and 'Unexpected response' in first.error
+    assert completed == [first]
+    assert second.status == 'sent' and second.message_ids == [5]
@@ -10,12 +10,20 @@ export interface AttendanceRecord {
   clock_in_latitude?: number;
   clock_in_longitude?: number;
   clock_in_address?: string;
-  clock_in_photo?: string;
+  /**
+   * URL foto (/api/attendance/:id/photo/...) dilindungi JWT di header Authorization, jadi tidak bisa
+   * dipakai langsung sebagai <img src>. Fetch dengan header Authorization sebagai blob, lalu tampilkan
+   * lewat URL.createObjectURL (dan revoke saat komponen unmount).
+   */
+  clock_in_photo_url?: string | null;
+  clock_in_photo_thumbnail_url?: string | null;
   clock_out?: string;
   clock_out_latitude?: number;
   clock_out_longitude?: number;
   clock_out_address?: string;
-  clock_out_photo?: string;
+  /** Sama seperti clock_in_photo_url: fetch sebagai blob dengan header Authorization */
+  clock_out_photo_url?: string | null;
+  clock_out_photo_thumbnail_url?: string | null;
   work_duration_minutes?: number;
   work_duration_hours?: number;
   overtime_minutes?: number;
@@ -99,6 +107,7 @@ export interface AttendanceStats {
   work_hours: {
     total_work_hours: number;
     total_overtime_hours: number;
+    approved_overtime_hours?: number;
     average_daily_hours: number;
   };
 }